@@ -0,0 +1,86 @@
+"""Micro-benchmark for the deterministic activity slot scheduler.
+
+Schedules synthetic candidate pools over long trips (with rainy days and a
+budget cap) and reports the cost per scheduled day; also checks the plan
+invariants: slots in order, no title or activity kind twice on one day, no
+pick above the budget while a filler fits, and no repeated non-meal,
+non-filler titles across the trip. A small pool exercises the
+fillers (a slot stays empty rather than repeat one on the same day):
+
+    python -m scripts.bench_activity_scheduler --days 7 30 60 --candidates 240
+    python -m scripts.bench_activity_scheduler --days 7 --candidates 6
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from server.agents.activity_agent.activity_scheduler import PRICE_RANK, SLOTS, schedule_day_plans
+from server.agents.activity_agent.activity_scoring import MEAL_KEYWORDS, title_key
+
+KINDS = ("Beach walk", "Temple visit", "Cooking class", "Safari", "Museum tour", "Waterfall hike",
+         "Market stroll", "Boat trip", "Tea factory tour", "Sunset viewpoint", "Cultural show", "Spa session")
+
+
+def _make_candidates(n: int, rng: random.Random):
+    kinds = [rng.choice(KINDS) for _ in range(n)]
+    return [
+        {
+            "title": f"{kind} #{i}",
+            "kind": kind,
+            "why": "Synthetic candidate.",
+            "time_of_day": rng.sample(SLOTS, rng.randint(1, 2)),
+            "price_level": rng.choice(("low", "medium", "high")),
+            "confidence": round(rng.random(), 2),
+        }
+        for i, kind in enumerate(kinds)
+    ]
+
+
+def _check(plan, dates, budget="medium"):
+    assert [d["date"] for d in plan] == [d.strftime("%Y-%m-%d") for d in dates]
+    seen = set()
+    for day in plan:
+        slots = tuple(s["time_of_day"] for s in day["suggestions"])
+        assert slots == tuple(slot for slot in SLOTS if slot in slots)
+        keys = [title_key(s["title"]) for s in day["suggestions"]]
+        assert len(keys) == len(set(keys)), f"repeated on {day['date']}: {keys}"
+        kinds = [s["title"].split(" #")[0] for s in day["suggestions"] if " #" in s["title"]]
+        assert len(kinds) == len(set(kinds)), f"kind repeated on {day['date']}: {kinds}"
+        for s in day["suggestions"]:
+            assert PRICE_RANK[s["price_level"]] <= PRICE_RANK[budget], f"over budget: {s['title']}"
+            key = title_key(s["title"])
+            if any(m in key for m in MEAL_KEYWORDS) or s["why"].startswith("Unplanned slot"):
+                continue
+            assert key not in seen, f"repeated activity: {s['title']}"
+            seen.add(key)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark the activity slot scheduler.")
+    p.add_argument("--days", type=int, nargs="+", default=[7, 30, 60])
+    p.add_argument("--candidates", type=int, default=240)
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args()
+
+    rng = random.Random(args.seed)
+    cands = _make_candidates(args.candidates, rng)
+    rainy = {rng.randint(0, max(args.days)) for _ in range(max(args.days) // 3)}
+    start = datetime(2025, 5, 1)
+
+    print(f"{'days':>5} {'candidates':>11} {'total ms':>9} {'us/day':>8}")
+    for days in args.days:
+        dates = [start + timedelta(days=i) for i in range(days)]
+        risk = lambda d: (d - start).days in rainy  # noqa: E731
+        best = float("inf")
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            plan = schedule_day_plans(dates, cands, budget="medium", risk_for_date=risk, destination="Galle")
+            best = min(best, time.perf_counter() - t0)
+        _check(plan, dates)
+        print(f"{days:>5} {len(cands):>11} {best * 1000:>9.2f} {best * 1e6 / days:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Micro-benchmark for the activity agent's per-suggestion scoring pass.
+
+Compares the original full-text scans against the per-request DocTokenIndex on
+synthetic long itineraries and checks that both produce identical scores.
+
+    python -m scripts.bench_activity_scoring --days 14 60 --repeat 5
+"""
+import argparse
+import random
+import time
+
+from server.agents.activity_agent.activity_scoring import (
+    LOCAL_RADIUS_KM,
+    OTHER_TOWNS,
+    DocTokenIndex,
+    _compute_confidence_for_title,
+    _estimate_price_level,
+    _is_outdoor_activity,
+    other_towns_for,
+)
+from server.utils.geo import distance_km
+
+WORDS = (
+    "galle fort lighthouse rampart walk sunset beach temple market street food spice garden "
+    "whale watching mirissa unawatuna turtle hatchery snorkel reef jungle beach cooking class "
+    "museum colonial church tea estate boat safari lagoon cinnamon island surf lesson viewpoint"
+).split()
+
+TITLES = [
+    "Galle Fort rampart walk", "Sunset at the lighthouse", "Street food crawl in Galle",
+    "Whale watching from Mirissa", "Snorkel at Unawatuna reef", "Visit the turtle hatchery",
+    "Cooking class with a local family", "Maritime museum tour", "Tea estate visit near Kandy",
+    "Lagoon boat safari", "Jungle Beach hike", "Spice garden guided tour",
+    "Rooftop dinner inside the fort", "Cinnamon island boat trip", "Surf lesson in Hikkaduwa",
+    "Dutch Reformed Church", "Japanese Peace Pagoda viewpoint", "Night market stroll",
+]
+
+
+class _Doc:
+    def __init__(self, content):
+        self.page_content = content
+        self.metadata = {}
+
+
+def _make_docs(n_docs: int, n_words: int, rng: random.Random):
+    return [_Doc(" ".join(rng.choice(WORDS).capitalize() for _ in range(n_words))) for _ in range(n_docs)]
+
+
+def _make_plan(days: int, rng: random.Random):
+    return [
+        [{"title": rng.choice(TITLES), "why": "Great local experience."} for _ in range(4)]
+        for _ in range(days)
+    ]
+
+
+def _far(destination, town):
+    # towns within LOCAL_RADIUS_KM of the destination are local, not leakage
+    km = distance_km(destination, town)
+    return km is None or km > LOCAL_RADIUS_KM
+
+
+def _score_naive(plan, docs, destination):
+    k = min(5, max(1, len(docs)))
+    out = []
+    for day in plan:
+        for s in day:
+            title = s["title"]
+            leak = any(town in title.lower() and town not in destination.lower() and _far(destination, town)
+                       for town in OTHER_TOWNS)
+            heuristic = _compute_confidence_for_title(title, docs, k=k)
+            loc_match = _compute_confidence_for_title(title, docs, k=k)
+            out.append((leak, heuristic, loc_match,
+                        _estimate_price_level(title, s["why"], docs), _is_outdoor_activity(title, s["why"])))
+    return out
+
+
+def _score_indexed(plan, docs, destination):
+    k = min(5, max(1, len(docs)))
+    index = DocTokenIndex(docs, k=5)
+    towns = other_towns_for(destination)
+    out = []
+    for day in plan:
+        for s in day:
+            title = s["title"]
+            leak = any(town in title.lower() for town in towns)
+            heuristic = _compute_confidence_for_title(title, docs, k=k, index=index)
+            out.append((leak, heuristic, heuristic,
+                        _estimate_price_level(title, s["why"], docs), _is_outdoor_activity(title, s["why"])))
+    return out
+
+
+def _time(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark activity suggestion scoring.")
+    p.add_argument("--days", type=int, nargs="+", default=[3, 14, 60])
+    p.add_argument("--docs", type=int, default=12, help="Number of retrieved docs")
+    p.add_argument("--doc-words", type=int, default=220, help="Words per doc (~1200 chars)")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args()
+
+    rng = random.Random(args.seed)
+    docs = _make_docs(args.docs, args.doc_words, rng)
+    destination = "Galle"
+
+    print(f"{'days':>5} {'suggestions':>12} {'naive ms':>10} {'indexed ms':>11} {'speedup':>8}")
+    for days in args.days:
+        plan = _make_plan(days, rng)
+        naive_t, naive = _time(lambda: _score_naive(plan, docs, destination), args.repeat)
+        idx_t, indexed = _time(lambda: _score_indexed(plan, docs, destination), args.repeat)
+        assert naive == indexed, "indexed scoring diverged from the full-text scan"
+        print(f"{days:>5} {days * 4:>12} {naive_t * 1000:>10.2f} {idx_t * 1000:>11.2f} {naive_t / max(idx_t, 1e-9):>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Micro-benchmark for the precompiled sanitizers.
+
+Compares the old five-pass regex sanitizer and per-field bleach.clean calls
+with server.utils.sanitizer (cold = caches cleared, warm = repeated input as
+within one request), and checks the outputs match on the generated corpus.
+
+    python -m scripts.bench_sanitizer --n 2000 --repeat 5
+
+Measured with those arguments, per call, over repeated runs:
+
+    text  legacy 5-pass     25-37 us
+    text  compiled cold     10-15 us, typically ~13 us
+    text  compiled warm     ~0.14 us
+    html  bleach.clean      ~190 us
+    html  clean_html cold   ~26 us
+    html  clean_html warm   ~0.35 us
+
+Cold clean_text() is about 13 us on a typical run. The "~10 us" quoted
+when the sanitizer was introduced was the fastest run.
+"""
+import argparse
+import random
+import re
+import time
+
+import bleach
+
+from server.utils import sanitizer
+
+CLEAN = ("Kandy", "beach", "hiking", "family", "trip", "next", "week", "budget", "temple", "Ella", "train",
+         "café", "Sigiriya", "3", "days", "2 adults", "tea", "Galle", "safari")
+DIRTY = ("SELECT", "drop", "<b>bold</b>", "<script>alert(1)</script>", "javascript:", "a;b", "$(rm -rf)",
+         "&&", "R&R", "<i>", "ſelect")
+
+
+def _legacy_text(text: str) -> str:
+    text = re.sub(r"(?i)<\s*script.*?>.*?<\s*/\s*script\s*>", "", text)
+    text = re.sub(r"(?i)javascript:", "", text)
+    text = re.sub(r"(?i)data:text/html", "", text)
+    text = re.sub(r"(?i)\b(SELECT|UPDATE|DELETE|INSERT|DROP|ALTER|TRUNCATE|EXEC)\b", "", text)
+    text = re.sub(r"(\|\||;|&&|`|\$\(.*?\))", "", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _corpus(n: int, rng: random.Random, dirty: float):
+    out = []
+    for _ in range(n):
+        words = [rng.choice(CLEAN) for _ in range(rng.randint(3, 40))]
+        if rng.random() < dirty:
+            words.insert(rng.randint(0, len(words)), rng.choice(DIRTY))
+        out.append("  ".join(words) if rng.random() < 0.2 else " ".join(words))
+    return out
+
+
+def _best(fn, items, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for x in items:
+            fn(x)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark text and HTML sanitizers.")
+    p.add_argument("--n", type=int, default=2000)
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--dirty", type=float, default=0.2, help="share of inputs with markup/injection tokens")
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = _corpus(args.n, rng, args.dirty)
+
+    # outputs must match the legacy implementation (the new one only ever strips more)
+    mismatches = [t for t in corpus if sanitizer.clean_text(t) != _legacy_text(t)]
+    assert not mismatches, f"text mismatch: {mismatches[:3]}"
+    mismatches = [t for t in corpus if sanitizer.clean_html(t) != bleach.clean(t, strip=True)]
+    assert not mismatches, f"html mismatch: {mismatches[:3]}"
+
+    def cold(fn, cache):
+        def run(x):
+            cache.cache_clear()
+            return fn(x)
+        return run
+
+    rows = [
+        ("text  legacy 5-pass", _best(_legacy_text, corpus, args.repeat)),
+        ("text  compiled cold", _best(cold(sanitizer.clean_text, sanitizer.clean_text), corpus, args.repeat)),
+        ("text  compiled warm", _best(sanitizer.clean_text, corpus, args.repeat)),
+        ("html  bleach.clean", _best(lambda t: bleach.clean(t, strip=True), corpus, args.repeat)),
+        ("html  clean_html cold", _best(cold(sanitizer.clean_html, sanitizer._bleach), corpus, args.repeat)),
+        ("html  clean_html warm", _best(sanitizer.clean_html, corpus, args.repeat)),
+    ]
+    print(f"{len(corpus)} inputs, {args.dirty:.0%} dirty")
+    print(f"{'path':<24} {'total ms':>9} {'us/call':>8}")
+    for name, secs in rows:
+        print(f"{name:<24} {secs * 1000:>9.2f} {secs * 1e6 / len(corpus):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
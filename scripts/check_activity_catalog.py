@@ -0,0 +1,52 @@
+"""
+Checks for catalog extraction and deterministic day-plan assembly (no LLM calls).
+
+    python -m scripts.check_activity_catalog
+"""
+
+from datetime import datetime, timedelta
+
+from server.agents.activity_agent.activity_catalog import (
+    attraction_key, catalog_candidates, extract_activities, load_catalog, suggest_from_catalog,
+)
+
+DATES = [datetime(2026, 3, 2) + timedelta(days=i) for i in range(3)]
+
+
+def test_extraction_filters():
+    text = "\n".join([
+        "Udawalawe National Park, LK",
+        "Yala National Park",
+        "Bailey relaxing at Secret Beach in Mirissa, Sri Lanka.",
+        "Tony’s Garden House (Jaffna)",
+        "Take the Ella to Kandy Train Ride",
+        "Spot Leopards on Safari in Yala National Park",
+    ])
+    found = {e["name"]: e for e in extract_activities(text, "src")}
+    assert sorted(found) == ["Spot Leopards on Safari in Yala National Park", "Take the Ella to Kandy Train Ride"], found
+    assert found["Take the Ella to Kandy Train Ride"]["setting"] == "outdoor"
+
+
+def test_same_attraction_once():
+    a = attraction_key({"name": "Observe Worshippers at the Temple of the Sacred Tooth Relic in Kandy", "place": "Kandy"})
+    b = attraction_key({"name": "Temple of the Tooth Relic Kandy", "place": "Kandy"})
+    assert b <= a
+    catalog = load_catalog()
+    titles = [c["title"] for c in catalog_candidates(catalog, "Kandy", 3)]
+    assert sum("Tooth Relic" in t for t in titles) == 1, titles
+
+
+def test_day_one_at_base():
+    for budget in (None, "low"):
+        plan = suggest_from_catalog("Ella", DATES, ["no hiking"], budget=budget)["day_plans"]
+        first = plan[0]["suggestions"][0]["title"]
+        assert first.startswith("Ella"), (budget, first)
+        for day in plan:
+            kinds = [s["title"] for s in day["suggestions"] if "Safari Tour" in s["title"] or "Park Safari" in s["title"]]
+            assert len(kinds) <= 1, day
+
+
+if __name__ == "__main__":
+    for test in (test_extraction_filters, test_same_attraction_once, test_day_one_at_base):
+        test()
+        print(f"{test.__name__} ok")
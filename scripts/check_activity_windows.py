@@ -0,0 +1,98 @@
+"""
+Checks for windowed day-plan generation on long trips (fake LLM, no network).
+
+    python -m scripts.check_activity_windows
+"""
+
+import json
+import re
+import threading
+from datetime import datetime, timedelta
+
+from server.agents.activity_agent.activity_indexer import _date_windows, iter_day_plan_windows, merge_windows
+from server.agents.activity_agent.activity_scoring import title_key
+
+DATES = [datetime(2026, 3, 2) + timedelta(days=i) for i in range(12)]
+TRIP = {"destination": "Ella", "start_date": "2026-03-02", "end_date": "2026-03-13", "user_preferences": ["hiking"]}
+
+
+class _FakeLLM:
+    """Answers each window prompt with unique titles plus one shared across windows.
+
+    Window i only answers once the caller has received window i + 1 (see
+    _consume), so windows complete last-first.
+    """
+
+    def __init__(self, total: int, fail: int = -1):
+        self.received = [threading.Event() for _ in range(total + 1)]
+        self.received[total].set()
+        self.fail = fail
+
+    def predict(self, prompt: str) -> str:
+        idx = int(re.search(r"part (\d+) of", prompt).group(1)) - 1
+        start = re.search(r'"start_date": "([\d-]+)"', prompt).group(1)
+        end = re.search(r'"end_date": "([\d-]+)"', prompt).group(1)
+        assert self.received[idx + 1].wait(5)
+        if idx == self.fail:
+            raise RuntimeError("window failed")
+        day, last = datetime.strptime(start, "%Y-%m-%d"), datetime.strptime(end, "%Y-%m-%d")
+        plans = []
+        while day <= last:
+            fd = day.strftime("%Y-%m-%d")
+            plans.append({"date": fd, "suggestions": [
+                {"title": "Ella Rock hike" if fd == start else f"Sunrise walk {fd}", "why": "",
+                 "time_of_day": "morning"},
+                {"title": f"Tea estate walk {fd}", "why": "", "time_of_day": "noon"},
+                {"title": "Dinner at a local restaurant", "why": "", "time_of_day": "night"},
+            ]})
+            day += timedelta(days=1)
+        return json.dumps({"destination": "Ella", "day_plans": plans, "notes": f"part {idx + 1}"})
+
+
+def _consume(llm: _FakeLLM):
+    parts = []
+    for idx, data in iter_day_plan_windows(llm, TRIP, DATES, [], [], window_days=5, max_workers=3):
+        parts.append((idx, data))
+        llm.received[idx].set()
+    return parts
+
+
+def test_split():
+    assert [len(w) for w in _date_windows(DATES, 5)] == [5, 5, 2]
+    assert [len(w) for w in _date_windows(DATES[:3], 5)] == [3]
+    assert [len(w) for w in _date_windows(DATES, 0)] == [1] * 12
+
+
+def test_completion_order_merge_and_dedupe():
+    llm = _FakeLLM(3)
+    parts = _consume(llm)
+    assert [idx for idx, _ in parts] == [2, 1, 0]  # yielded as each window completes
+
+    plan = merge_windows(dict(parts), "Ella")
+    assert [d["date"] for d in plan["day_plans"]] == [d.strftime("%Y-%m-%d") for d in DATES]
+    assert plan["notes"] == "part 1 part 2 part 3"
+
+    # the shared title stays in the window that finished first and is swapped in the others
+    hikes = [d["date"] for d in plan["day_plans"] for s in d["suggestions"] if s["title"] == "Ella Rock hike"]
+    assert hikes == ["2026-03-12"], hikes
+    swapped = [s for d in plan["day_plans"] for s in d["suggestions"] if "deduplicated_across_days" in s.get("warnings", [])]
+    assert len(swapped) == 2, swapped
+    # meals may repeat; no other title is planned twice
+    titles = [title_key(s["title"]) for d in plan["day_plans"] for s in d["suggestions"]]
+    non_meal = [t for t in titles if "dinner" not in t]
+    assert len(non_meal) == len(set(non_meal)), non_meal
+
+
+def test_failed_window():
+    parts = dict(_consume(_FakeLLM(3, fail=1)))
+    assert parts[1] == {"day_plans": []}
+    plan = merge_windows(parts, "Ella")
+    dates = [d["date"] for d in plan["day_plans"]]
+    assert dates == sorted(dates) and len(dates) == 7
+    assert merge_windows({0: {"day_plans": []}}, "Ella") is None
+
+
+if __name__ == "__main__":
+    for test in (test_split, test_completion_order_merge_and_dedupe, test_failed_window):
+        test()
+        print(f"{test.__name__} ok")
@@ -0,0 +1,52 @@
+"""
+Checks for the explorer content store's disk bounds (no network).
+
+    python -m scripts.check_content_store
+"""
+
+import os
+import tempfile
+import time
+
+from server.utils import content_store
+
+
+def _page(i: int, size: int = 2000):
+    return [{"page_content": f"page {i} " + "x" * size, "metadata": {"i": i}}]
+
+
+def _age(ref: dict, seconds: float) -> None:
+    for suffix in content_store._SUFFIXES:
+        path = content_store._path(ref["content_ref"], suffix)
+        if os.path.exists(path):
+            t = time.time() - seconds
+            os.utime(path, (t, t))
+
+
+def test_ttl_and_size_cap():
+    content_store.EXPLORER_CONTENT_DIR = tempfile.mkdtemp(prefix="explorer_content_")
+    content_store._memory.clear()
+    refs = [content_store.put_chunks(f"https://example.com/{i}", _page(i)) for i in range(4)]
+    content_store.put_embeddings(refs[0]["content_ref"], [[0.1, 0.2]])
+    for age, ref in zip((7200, 300, 200, 100), refs):
+        _age(ref, age)
+
+    # unused past the TTL: the page and its embeddings go
+    assert content_store.sweep(ttl=3600, max_bytes=0) == 1
+    content_store._memory.clear()
+    assert content_store.get_chunks(refs[0]["content_ref"]) is None
+    assert content_store.get_embeddings(refs[0]["content_ref"]) is None
+
+    # reading a page marks it as used: the least recently used one goes first past the cap
+    assert content_store.get_chunks(refs[1]["content_ref"])[0]["metadata"] == {"i": 1}
+    size = os.path.getsize(content_store._path(refs[1]["content_ref"], ".json.gz"))
+    assert content_store.sweep(ttl=0, max_bytes=2 * size) == 1
+    content_store._memory.clear()
+    assert content_store.get_chunks(refs[2]["content_ref"]) is None
+    assert content_store.get_chunks(refs[1]["content_ref"]) and content_store.get_chunks(refs[3]["content_ref"])
+    assert content_store.sweep(ttl=3600, max_bytes=2 * size) == 0
+
+
+if __name__ == "__main__":
+    test_ttl_and_size_cap()
+    print("test_ttl_and_size_cap ok")
@@ -0,0 +1,185 @@
+"""
+Checks for the request latency budget, per-node deadlines and fallbacks.
+
+    python -m scripts.check_deadlines
+"""
+
+import time
+
+from server.utils.deadline import DeadlineExceeded, llm_timeout, remaining, request_deadline, run_with_timeout
+from server.workflow.app_state import apply_update
+from server.workflow.node_deadline import with_deadline
+from server.schemas.orchestrator_schemas import OrchestratorAgent4OutputSchema
+
+TRIP = OrchestratorAgent4OutputSchema(
+    destination="Ella", start_date="2026-03-02", end_date="2026-03-05", no_of_traveler=2,
+    user_preferences=["hiking", "tea"], type_of_trip="leisure", status="complete",
+)
+
+
+def test_deadline():
+    assert remaining() is None and llm_timeout(30) == 30
+    with request_deadline(5):
+        assert 4.5 < remaining() <= 5
+        assert llm_timeout(30) <= 5
+        with request_deadline(60):  # an inner block cannot extend the outer deadline
+            assert remaining() <= 5
+        # the call sees its own (tighter) deadline
+        assert run_with_timeout(remaining, 0.5) <= 0.5
+    assert remaining() is None
+
+    t0 = time.monotonic()
+    try:
+        run_with_timeout(time.sleep, 0.2, 2)
+        raise AssertionError("expected DeadlineExceeded")
+    except DeadlineExceeded:
+        pass
+    assert time.monotonic() - t0 < 0.5
+    assert run_with_timeout(lambda x: x * 2, None, 21) == 42
+
+
+def test_nested_calls():
+    import threading
+    from server.utils import deadline
+
+    real = deadline._slots
+    deadline._slots = threading.BoundedSemaphore(1)  # the outer call holds the only slot
+    try:
+        outer = lambda: run_with_timeout(lambda: 42, 0.5)
+        assert run_with_timeout(outer, 1) == 42
+    finally:
+        deadline._slots = real
+
+
+def test_timed_out_call_frees_its_slot():
+    import threading
+    from server.utils import deadline
+
+    real = deadline._slots
+    deadline._slots = threading.BoundedSemaphore(1)
+    release, running = threading.Event(), threading.Event()
+
+    def hung():
+        running.set()
+        release.wait(5)
+
+    try:
+        try:
+            run_with_timeout(hung, 0.1)
+            raise AssertionError("expected DeadlineExceeded")
+        except DeadlineExceeded:
+            pass
+        # the hung call is still running, but the next call gets the slot at once
+        t0 = time.monotonic()
+        assert run_with_timeout(lambda: 42, 0.5) == 42 and time.monotonic() - t0 < 0.1
+        release.set()
+
+        # a call that is still inside its own limit keeps the slot: the next one waits, then gives up
+        release.clear()
+        running.clear()
+        holder = threading.Thread(target=run_with_timeout, args=(hung, 2))
+        holder.start()
+        assert running.wait(1)
+        try:
+            run_with_timeout(lambda: 42, 0.1)
+            raise AssertionError("expected DeadlineExceeded")
+        except DeadlineExceeded as e:
+            assert "no free worker" in str(e), e
+        release.set()
+        holder.join(2)
+        assert deadline._slots.acquire(timeout=1)  # given back exactly once
+        deadline._slots.release()
+    finally:
+        release.set()
+        deadline._slots = real
+
+
+def _nodes():
+    def fallback(state):
+        return {"recs": {"items": ["rule"], "status": "complete"}}
+
+    @with_deadline("demo", 0.5, fallback, status_keys=("recs",), cap=0.2)
+    def slow(state):
+        time.sleep(0.5)
+        return {"recs": {"items": ["llm"], "status": "complete"}, "late": True}
+
+    @with_deadline("demo", 0.5, fallback, status_keys=("recs",), cap=0.2)
+    def fast(state):
+        return {"recs": {"items": ["llm"], "status": "complete"}}
+
+    return slow, fast
+
+
+def test_node_degrades():
+    slow, fast = _nodes()
+    t0 = time.monotonic()
+    state = {"recs": None, "degraded": ["packing"]}
+    apply_update(state, slow(state))
+    assert time.monotonic() - t0 < 0.4
+    assert state["recs"] == {"items": ["rule"], "status": "degraded"} and state["degraded"] == ["packing", "demo"]
+    time.sleep(0.5)
+    assert "late" not in state  # the abandoned run's update is dropped
+    apply_update(state, fast(state))
+    assert state["recs"]["status"] == "complete" and state["degraded"] == ["packing"]
+
+
+def test_budget_share():
+    slow, _ = _nodes()
+    with request_deadline(0.2):
+        t0 = time.monotonic()
+        slow({})  # half of 0.2s
+        assert time.monotonic() - t0 < 0.2
+        time.sleep(0.2)
+        t0 = time.monotonic()
+        update = slow({})  # budget spent: straight to the fallback
+        assert time.monotonic() - t0 < 0.05 and update["degraded"] == {"demo": True}
+
+
+def test_fallbacks():
+    from server.agents.activity_agent.activity_indexer import fallback_activities
+    from server.agents.location_agent.location_agent import fallback_locations
+
+    acts = fallback_activities(TRIP.model_dump())
+    assert acts["status"] == "fallback" and len(acts["day_plans"]) == 4
+    assert all(d["suggestions"] for d in acts["day_plans"])
+    locs = fallback_locations(TRIP.model_dump())
+    names = [r["name"] for r in locs["recommended_locations"]]
+    assert names[0] == "Ella" and len(names) > 1, names
+
+
+def test_packing_node():
+    from server.agents.packing_agent import packing_agent
+    from server.workflow import agent_nodes, node_cache
+
+    node_cache.set_store(None)
+    cache = packing_agent.packing_cache
+    real = packing_agent._llm_extras, cache.get, cache.get_sibling
+    # a slow LLM and no cached list to fall back on
+    packing_agent._llm_extras = lambda *a, **k: time.sleep(3)
+    cache.get = cache.get_sibling = lambda key: None
+    try:
+        with request_deadline(2):
+            t0 = time.monotonic()
+            update = agent_nodes._run_packing_agent({"trip_data": TRIP, "activity_recs": None})
+            took = time.monotonic() - t0
+    finally:
+        packing_agent._llm_extras, cache.get, cache.get_sibling = real
+    assert took < 1.5, took
+    assert update["degraded"] == {"packing": True} and update["packing_recs"]["categories"]
+
+
+if __name__ == "__main__":
+    test_deadline()
+    print("test_deadline ok")
+    test_nested_calls()
+    print("test_nested_calls ok")
+    test_timed_out_call_frees_its_slot()
+    print("test_timed_out_call_frees_its_slot ok")
+    test_node_degrades()
+    print("test_node_degrades ok")
+    test_budget_share()
+    print("test_budget_share ok")
+    test_fallbacks()
+    print("test_fallbacks ok")
+    test_packing_node()
+    print("test_packing_node ok")
@@ -0,0 +1,81 @@
+"""Checks the place grid index against brute force and the seed/geocode lookups.
+
+    python -m scripts.check_geo
+"""
+import random
+import threading
+import unittest
+from unittest import mock
+
+from server.utils import geo
+from server.utils.places import load_places
+
+
+class GeoChecks(unittest.TestCase):
+    def test_every_place_is_seeded(self):
+        self.assertEqual(set(load_places()), set(geo.seed_coords()))
+
+    def test_grid_matches_brute_force(self):
+        idx = geo.place_index()
+        rng = random.Random(3)
+        for _ in range(300):
+            c = (rng.uniform(4.5, 10.5), rng.uniform(78.5, 82.5))
+            ranked = sorted((geo.haversine_km(c, p), n) for n, p in idx.points.items())
+            k = rng.randint(1, 12)
+            self.assertEqual([n for n, _ in idx.nearest(c, k)], [n for _, n in ranked[:k]])
+            r = rng.uniform(5, 120)
+            self.assertEqual({n for n, _ in idx.within(c, r)}, {n for d, n in ranked if d <= r})
+
+    def test_aliases_and_matrix(self):
+        self.assertEqual(geo.coords_for("ella, sri lanka"), geo.coords_for("Ella"))
+        self.assertEqual(geo.travel_minutes("Kandy", "Ella"), geo.travel_minutes("Ella", "Kandy"))
+        self.assertLess(geo.travel_minutes("Ella", "Haputale"), geo.travel_minutes("Ella", "Jaffna"))
+        m = geo.travel_matrix(["Kandy", "Tissamaharama", "Atlantis"])
+        self.assertEqual(m[1][2], float("inf"))
+        self.assertEqual(m[0][1], geo.travel_minutes("Kandy", "Tissa"))
+
+    def test_nearby_is_sorted_and_bounded(self):
+        near = geo.nearby_places("Galle", 60)
+        self.assertTrue(near)
+        self.assertNotIn("Galle", [n for n, _ in near])
+        self.assertEqual(near, sorted(near, key=lambda t: (t[1], t[0])))
+        self.assertTrue(all(m <= 60 for _, m in near))
+
+    def test_geocode_uses_cache_and_respects_switch(self):
+        with mock.patch.object(geo, "_geocode_cache", {"hidden lake": [7.1, 80.2], "nowhere": None}), \
+                mock.patch.object(geo, "_nominatim") as remote, \
+                mock.patch.object(geo, "GEOCODER_ENABLE", False):
+            self.assertEqual(geo.coords_for("Hidden  Lake"), (7.1, 80.2))
+            self.assertIsNone(geo.coords_for("Nowhere"))
+            self.assertIsNone(geo.coords_for("Unknown Village"))
+            remote.assert_not_called()
+
+    def test_remote_lookup_does_not_block_the_cache(self):
+        started, release, calls = threading.Event(), threading.Event(), []
+
+        def slow_remote(name):
+            calls.append(name)
+            started.set()
+            self.assertTrue(release.wait(5))
+            return 6.9, 81.0
+
+        with mock.patch.object(geo, "_geocode_cache", {"hidden lake": [7.1, 80.2]}), \
+                mock.patch.object(geo, "_nominatim", slow_remote), \
+                mock.patch.object(geo, "_save_geocode_cache"), \
+                mock.patch.object(geo, "GEOCODER_ENABLE", True):
+            results = []
+            threads = [threading.Thread(target=lambda: results.append(geo.geocode("Far Village"))) for _ in range(2)]
+            threads[0].start()
+            self.assertTrue(started.wait(5))
+            threads[1].start()
+            # cached names are answered while the remote call is in flight
+            self.assertEqual(geo.geocode("Hidden Lake"), (7.1, 80.2))
+            release.set()
+            for t in threads:
+                t.join(5)
+            self.assertEqual(results, [(6.9, 81.0)] * 2)
+            self.assertEqual(calls, ["Far Village"])  # the second caller shared the first one's lookup
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+Checks for the location recommendation cache key and pre-warming (fake Gemini, no network).
+
+    python -m scripts.check_location_cache
+"""
+
+import json
+
+from server.agents.location_agent import location_agent, location_cache
+
+TRIP = {"destination": "Ella", "start_date": "2026-03-02", "end_date": "2026-03-05", "no_of_traveler": 2,
+        "user_preferences": ["hiking"], "type_of_trip": "leisure", "budget": "medium"}
+ANSWER = {"recommended_locations": [{"name": "Little Adam's Peak", "type": "hiking", "reason": "Dry season."}]}
+
+
+class _FakeModels:
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, model, contents, config=None):
+        self.prompts.append(contents)
+        return type("Response", (), {"text": json.dumps(ANSWER)})()
+
+
+def _fresh():
+    location_cache._cache.clear()
+    location_cache._cache.hits = location_cache._cache.misses = 0
+    location_cache._popular.clear()
+    location_cache._profiles.clear()
+    fake = _FakeModels()
+    location_agent.client = type("Client", (), {"models": fake})()
+    return fake
+
+
+def test_key_covers_prompt_inputs():
+    base = location_cache.recommendation_key(TRIP)
+    assert location_cache.recommendation_key({**TRIP, "no_of_traveler": 6}) != base
+    assert location_cache.recommendation_key({**TRIP, "budget": "mid-range"}) == base  # same bucket
+    assert location_cache.recommendation_key({**TRIP, "no_of_traveler": "2"}) == base
+
+    fake = _fresh()
+    location_agent.run_location_agent(TRIP)
+    location_agent.run_location_agent(TRIP)
+    location_agent.run_location_agent({**TRIP, "no_of_traveler": 6})
+    assert len(fake.prompts) == 2 and "Number of travelers: 6" in fake.prompts[1]
+    # a caller with an earlier answer to fall back on gets a fresh one
+    location_agent.run_location_agent(TRIP, prev_response=ANSWER)
+    assert len(fake.prompts) == 3
+
+
+def test_prewarm_is_not_traffic():
+    fake = _fresh()
+    profiles = [TRIP, {**TRIP, "destination": "Kandy"}]
+    assert location_agent.prewarm_location_cache(profiles) == 2 and len(fake.prompts) == 2
+    assert location_agent.prewarm_location_cache(profiles) == 0  # already warm
+    stats = location_cache.stats()
+    assert stats["hits"] == 0 and stats["misses"] == 0, stats
+    assert location_cache.popular_profiles() == []
+    assert location_agent.run_location_agent(TRIP)["recommended_locations"] == ANSWER["recommended_locations"]
+    assert len(fake.prompts) == 2 and location_cache.stats()["hits"] == 1
+
+
+if __name__ == "__main__":
+    for test in (test_key_covers_prompt_inputs, test_prewarm_is_not_traffic):
+        test()
+        print(f"{test.__name__} ok")
@@ -0,0 +1,108 @@
+"""
+Checks for planning-graph node memoization.
+
+    python -m scripts.check_node_cache
+"""
+
+import json
+import os
+import tempfile
+import time
+
+from server.workflow import node_cache
+from server.workflow.node_cache import DiskNodeStore, MemoryNodeStore, fingerprint, memoize_node, module_deps
+from server.schemas.orchestrator_schemas import OrchestratorAgent4OutputSchema
+
+TRIP = OrchestratorAgent4OutputSchema(
+    destination="Ella", start_date="2026-03-02", end_date="2026-03-06", no_of_traveler=2,
+    user_preferences=["hiking"], type_of_trip="leisure", status="complete",
+)
+
+
+def _counting_node(name="test_node", version="v1", ttl=None):
+    calls = []
+
+    @memoize_node(name, inputs=("trip_data",), outputs=("result", "final_response"), version=version, ttl=ttl)
+    def node(state):
+        calls.append(1)
+        return {"result": {"destination": state["trip_data"].destination, "n": len(calls)}, "final_response": "done"}
+
+    return node, calls
+
+
+def test_hits_and_versions(store):
+    node_cache.set_store(store)
+    node_cache.clear()
+    node, calls = _counting_node()
+    a = node({"trip_data": TRIP})
+    b = node({"trip_data": TRIP.model_copy(update={"messages": [{"type": "warning", "message": "x"}]})})
+    assert len(calls) == 1 and a["result"] == b["result"] and b["final_response"] == "done"
+    b["result"]["n"] = 99  # callers cannot corrupt the cached copy
+    assert node({"trip_data": TRIP})["result"]["n"] == 1
+    node({"trip_data": TRIP.model_copy(update={"no_of_traveler": 3})})
+    assert len(calls) == 2
+    # a new code/prompt fingerprint invalidates the old entries
+    node_v2, calls_v2 = _counting_node(version="v2")
+    node_v2({"trip_data": TRIP})
+    assert len(calls_v2) == 1
+    row = node_cache.stats()["nodes"]["test_node"]
+    assert row["hits"] == 2 and row["misses"] == 3, row
+
+
+def test_ttl():
+    node_cache.set_store(MemoryNodeStore())
+    node, calls = _counting_node(name="ttl_node", ttl=0.05)
+    node({"trip_data": TRIP})
+    time.sleep(0.1)
+    node({"trip_data": TRIP})
+    assert len(calls) == 2
+
+
+def test_fingerprint():
+    assert fingerprint("prompt a") != fingerprint("prompt b")
+    assert fingerprint(node_cache) == fingerprint(node_cache)
+    # a node's version also covers the helpers its agent imports
+    from server.agents.activity_agent import activity_indexer
+    names = [m.__name__ for m in module_deps(activity_indexer)]
+    for dep in ("activity_agent.activity_scoring", "activity_agent.activity_scheduler", "utils.climate",
+                "utils.geo", "utils.routing"):
+        assert f"server.{dep}" in names or f"server.agents.{dep}" in names, (dep, names)
+    assert names == sorted(names) and len(names) == len(set(names))
+
+
+def test_disk_sweep():
+    with tempfile.TemporaryDirectory() as root:
+        store = DiskNodeStore(root, sweep_interval=0)
+        store.set("aa11", {"v": 1}, ttl=3600)
+        store.set("aa22", {"v": 2}, ttl=None)
+        store.set("bb33", {"v": 3}, ttl=0.01)
+        with open(os.path.join(root, "bb", "crashed.tmp"), "w") as f:
+            f.write("{")
+        os.utime(os.path.join(root, "bb", "crashed.tmp"), (time.time() - 7200,) * 2)
+        time.sleep(0.05)
+        assert store.sweep() == 2
+        left = sorted(f for _, _, fs in os.walk(root) for f in fs)
+        assert left == ["aa11.json", "aa22.json"], left
+
+        # with an interval, a write sweeps once it has passed
+        store = DiskNodeStore(root, sweep_interval=0.05)
+        store.set("cc44", {"v": 4}, ttl=0.01)
+        time.sleep(0.06)
+        store.set("dd55", {"v": 5}, ttl=3600)
+        assert not os.path.exists(store._path("cc44")) and store.get("dd55") == {"v": 5}
+        with open(store._path("aa11"), encoding="utf-8") as f:
+            assert json.load(f)["value"] == {"v": 1}
+
+
+if __name__ == "__main__":
+    test_hits_and_versions(MemoryNodeStore())
+    print("test_hits_and_versions (memory) ok")
+    with tempfile.TemporaryDirectory() as root:
+        test_hits_and_versions(DiskNodeStore(root))
+    print("test_hits_and_versions (disk) ok")
+    test_ttl()
+    print("test_ttl ok")
+    test_fingerprint()
+    print("test_fingerprint ok")
+    test_disk_sweep()
+    print("test_disk_sweep ok")
@@ -0,0 +1,113 @@
+"""
+Checks for the packing list cache tiers and the quantity stage (no LLM calls).
+
+    python -m scripts.check_packing
+"""
+
+import json
+import os
+import tempfile
+import time
+
+from server.agents.packing_agent import packing_agent, packing_cache
+from server.agents.packing_agent.quantities import compute_quantities
+
+TRIP = {
+    "destination": "Ella", "start_date": "2026-03-02", "end_date": "2026-03-06", "no_of_traveler": 2,
+    "season": "Inter-monsoon", "user_preferences": ["hiking"], "type_of_trip": "leisure",
+}
+EXTRAS = {"items": [{"name": "Headlamp", "category": "Activity-specific", "reason": "Pre-dawn start."}]}
+
+
+def _fresh_cache():
+    packing_cache._memory.clear()
+    packing_cache.PACKING_CACHE_DIR = tempfile.mkdtemp(prefix="packing_cache_")
+
+
+def _names(packing):
+    return {it["name"]: it for cat in packing["categories"] for it in cat["items"]}
+
+
+def test_tiers():
+    _fresh_cache()
+    key = packing_cache.packing_key("dry", ["hiking"], no_of_traveler=2, duration_days=5)
+    assert packing_cache.get(key) is None
+    packing_cache.put(key, {"categories": [{"name": "Essentials", "items": [{"name": "Hat"}]}]})
+    packing_cache.put(key + ("x",), {"categories": []})  # empty lists are not stored
+    assert packing_cache.get(key + ("x",)) is None
+
+    # a restarted worker reads the disk tier and warms memory from it
+    packing_cache._memory.clear()
+    hit = packing_cache.get(key)
+    assert hit["categories"][0]["items"] == [{"name": "Hat"}] and key in packing_cache._memory
+    hit["categories"].clear()  # callers get private copies
+    assert packing_cache.get(key)["categories"]
+
+    # rows older than PACKING_CACHE_PERSIST_DAYS are dropped from disk
+    path = packing_cache._path(packing_cache._digest(key))
+    with open(path, encoding="utf-8") as f:
+        row = json.load(f)
+    row["stored_at"] = time.time() - packing_cache.PACKING_CACHE_PERSIST_DAYS * 86400 - 1
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(row, f)
+    packing_cache._memory.clear()
+    assert packing_cache.get(key) is None and not os.path.exists(path)
+
+
+def test_sibling_reuses_extras():
+    _fresh_cache()
+    calls = []
+    real = packing_agent._llm_extras
+    packing_agent._llm_extras = lambda payload, packed, n: (calls.append(payload["no_of_traveler"]), EXTRAS)[1]
+    try:
+        pair = packing_agent.generate_packing_list(TRIP, ["Ella Rock hike"])
+        again = packing_agent.generate_packing_list(TRIP, ["Ella Rock hike"])
+        group = packing_agent.generate_packing_list({**TRIP, "no_of_traveler": 4}, ["Ella Rock hike"])
+    finally:
+        packing_agent._llm_extras = real
+    assert calls == [2], calls  # the repeat is a hit, the group reuses the pair's extras
+    assert again == pair
+    assert _names(group)["Headlamp"]["quantity"] == 4 and _names(pair)["Headlamp"]["quantity"] == 2
+    # the group list is cached under its own key (one file per key on disk)
+    files = [f for _, _, fs in os.walk(packing_cache.PACKING_CACHE_DIR) for f in fs]
+    assert len(files) == 2, files
+
+
+def test_without_llm():
+    _fresh_cache()
+    calls = []
+    real = packing_agent._llm_extras
+    packing_agent._llm_extras = lambda *a: calls.append(a)
+    try:
+        rules_only = packing_agent.generate_packing_list(TRIP, ["Ella Rock hike"], use_llm=False)
+        packing_agent._llm_extras = lambda *a: (calls.append(a), 1 / 0)
+        failed = packing_agent.generate_packing_list(TRIP, ["Ella Rock hike"])
+    finally:
+        packing_agent._llm_extras = real
+    assert len(calls) == 1  # use_llm=False never asks
+    assert rules_only["categories"] and _names(rules_only) == _names(failed)
+    assert not os.listdir(packing_cache.PACKING_CACHE_DIR)  # neither the rule list nor a failed call is cached
+
+
+def test_quantities():
+    names = ["Underwear", "T-shirts", "Sunscreen", "Universal plug adapter", "Basic meds", "ID/Passport"]
+    short, notes = compute_quantities(names, no_of_traveler=3, duration_days=3)
+    assert short == [12, 9, 3, 2, 1, 3], short
+    assert notes[0] == "4 each" and notes[3] == "one per 2 travelers" and notes[4] == "for the group"
+
+    # clothing stops growing at the laundry cycle, non-capped items keep scaling
+    long, notes = compute_quantities(names, no_of_traveler=1, duration_days=30, laundry_cycle_days=7)
+    assert long == [8, 7, 3, 1, 1, 1], long
+    assert notes[0].endswith("wash or restock every 7 days") and "wash" not in notes[2]
+    assert compute_quantities(names, 1, 30, laundry_cycle_days=10)[0][:2] == [11, 10]
+
+    packed = packing_agent.generate_packing_list(TRIP, ["Ella Rock hike"], use_llm=False)
+    solo = packing_agent.requantify(packed, no_of_traveler=1)
+    assert solo["no_of_traveler"] == 1 and _names(solo)["ID/Passport"]["quantity"] == 1
+    assert _names(packed)["ID/Passport"]["quantity"] == 2  # the input is left alone
+
+
+if __name__ == "__main__":
+    for test in (test_tiers, test_sibling_reuses_extras, test_without_llm, test_quantities):
+        test()
+        print(f"{test.__name__} ok")
@@ -0,0 +1,103 @@
+"""Checks the explorer page fetcher against a local http.server stand-in.
+
+    python -m scripts.check_page_fetcher
+"""
+import asyncio
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from server.agents.explorer_agent import page_fetcher
+
+PAGE = b"""<html><head><title>Galle Fort guide</title><script>var x = "<p>nope</p>";</script>
+<style>p { color: red }</style></head>
+<body><nav><a href="/">Home</a> | <a href="/about">About</a></nav>
+<main><h1>Galle Fort</h1><p>Walk the ramparts at sunset.</p><p>Visit the lighthouse &amp; museum.</p></main>
+<footer>Copyright 2025</footer></body></html>"""
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    hits = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        _StandIn.hits += 1
+        if self.path == "/page":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            self._send(200, "text/html; charset=utf-8", PAGE, etag='"v1"')
+        elif self.path == "/big":
+            self._send(200, "text/plain", b"a" * 50_000)
+        elif self.path == "/pdf":
+            self._send(200, "application/pdf", b"%PDF-1.4")
+        else:
+            self._send(404, "text/plain", b"missing")
+
+    def _send(self, status, ctype, body, etag=None):
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class PageFetcherTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _StandIn)
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        page_fetcher._page_cache.clear()
+
+    def test_extracts_main_text_and_drops_boilerplate(self):
+        page = asyncio.run(page_fetcher.fetch_page(self.base + "/page"))
+        self.assertEqual(page.title, "Galle Fort guide")
+        self.assertIn("Walk the ramparts at sunset.", page.text)
+        self.assertIn("lighthouse & museum", page.text)
+        for noise in ("nope", "color", "Home", "Copyright"):
+            self.assertNotIn(noise, page.text)
+
+    def test_max_bytes_truncates(self):
+        page = asyncio.run(page_fetcher.fetch_page(self.base + "/big", max_bytes=1000))
+        self.assertTrue(page.truncated)
+        self.assertEqual(len(page.text), 1000)
+
+    def test_rejects_unsupported_content_and_errors(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(page_fetcher.fetch_page(self.base + "/pdf"))
+        with self.assertRaises(ValueError):
+            asyncio.run(page_fetcher.fetch_page(self.base + "/missing"))
+        with self.assertRaises(ValueError):
+            asyncio.run(page_fetcher.fetch_page("file:///etc/passwd"))
+
+    def test_etag_revalidation_reuses_cached_page(self):
+        url = self.base + "/page"
+        first = asyncio.run(page_fetcher.fetch_page(url))
+        # age the entry past the freshness window so it gets revalidated
+        page_fetcher._page_cache.set(url, first._replace(fetched_at=0))
+        hits = _StandIn.hits
+        again = asyncio.run(page_fetcher.fetch_page(url))
+        self.assertEqual(_StandIn.hits, hits + 1)
+        self.assertEqual(again.text, first.text)
+        self.assertGreater(again.fetched_at, 0)
+
+    def test_fetch_documents_sync_wrapper(self):
+        docs = page_fetcher.fetch_documents(self.base + "/page")
+        self.assertEqual(len(docs), 1)
+        self.assertEqual(docs[0].metadata["title"], "Galle Fort guide")
+
+
+if __name__ == "__main__":
+    unittest.main()
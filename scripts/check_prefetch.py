@@ -0,0 +1,135 @@
+"""
+Checks for speculative prefetch while the orchestrator collects fields.
+
+    python -m scripts.check_prefetch
+"""
+
+import threading
+import time
+
+from server.workflow import prefetch
+
+AWAITING = {"destination": "Ella", "start_date": "2026-03-02", "end_date": "2026-03-05",
+            "user_preferences": ["hiking"], "type_of_trip": None, "status": "awaiting_user_input"}
+
+
+def _fake_tasks(delay=0.2):
+    runs = []
+
+    def task(name):
+        def run(trip):
+            runs.append((name, trip["destination"]))
+            time.sleep(delay)
+            return f"{name}:{trip['destination']}"
+        return run
+
+    prefetch.TASKS = {name: task(name) for name in ("activity_docs", "climate", "locations")}
+    prefetch.SIGNATURES = {}
+    return runs
+
+
+def test_park_and_take():
+    runs = _fake_tasks()
+    spec = prefetch.update("s1", AWAITING)
+    assert spec is not None
+    assert prefetch.update("s1", {**AWAITING, "type_of_trip": None}) is spec  # same key: keep running
+    done = {**AWAITING, "type_of_trip": "leisure", "status": "complete"}
+    t0 = time.monotonic()
+    assert prefetch.take("s1", "activity_docs", done) == "activity_docs:Ella"  # waits for the running task
+    assert time.monotonic() - t0 < 0.5
+    assert prefetch.take("s1", "activity_docs", {**done, "end_date": "2026-03-09"}) is None
+    assert len(runs) == 3
+    prefetch.cancel("s1")
+
+
+def test_cancel_on_destination_change():
+    real_pool = prefetch._pool
+    prefetch._pool = type(prefetch._pool)(max_workers=1)  # one worker: later tasks stay queued
+    runs = _fake_tasks(delay=0.3)
+    old = prefetch.update("s2", AWAITING)
+    time.sleep(0.05)
+    new = prefetch.update("s2", {**AWAITING, "destination": "Galle"})
+    assert old.cancelled.is_set() and new is not old
+    galle = {**AWAITING, "destination": "Galle"}
+    assert prefetch.take("s2", "climate", galle) == "climate:Galle"
+    assert prefetch.take("s2", "climate", AWAITING) is None
+    time.sleep(0.2)
+    # only the task that was already running for Ella ran; its queued siblings never started
+    assert sum(1 for _, dest in runs if dest == "Ella") == 1, runs
+    assert prefetch.stats()["cancelled"] >= 1
+    prefetch.cancel("s2")
+    prefetch._pool = real_pool
+
+
+def test_not_started():
+    _fake_tasks()
+    assert prefetch.update("s3", {**AWAITING, "end_date": None}) is None
+    assert prefetch.update("s3", {**AWAITING, "status": "complete"}) is None
+    assert prefetch.update(None, AWAITING) is None
+
+
+def test_signature_refresh_and_drop():
+    runs = _fake_tasks(delay=0.05)
+    prefetch.SIGNATURES = {"activity_docs": lambda trip: trip.get("type_of_trip")}
+    spec = prefetch.update("s5", AWAITING)
+    first = spec.futures["activity_docs"]
+    first.result(timeout=5)
+    # the last answer changes the retrieval query: the docs are fetched again
+    assert prefetch.update("s5", {**AWAITING, "type_of_trip": "leisure"}) is spec
+    refreshed = spec.futures["activity_docs"]
+    assert refreshed is not first
+    refreshed.result(timeout=5)
+    done = {**AWAITING, "type_of_trip": "leisure", "status": "complete"}
+    assert prefetch.take("s5", "activity_docs", {**done, "type_of_trip": "family"}) is None  # wrong query
+    assert runs.count(("activity_docs", "Ella")) == 2, runs
+    prefetch.update("s6", AWAITING)
+    assert prefetch.take("s6", "activity_docs", done) is None  # never refreshed: not used
+    prefetch.update("s7", AWAITING)
+    prefetch.update("s7", {**AWAITING, "type_of_trip": "leisure"})
+    assert prefetch.take("s7", "activity_docs", done) == "activity_docs:Ella"
+    assert prefetch.take("s7", "locations", done) == "locations:Ella"
+    # used up: a later re-plan of the same trip does not see it
+    assert prefetch._sessions.get("s7") is None
+    assert prefetch.take("s7", "activity_docs", done) is None
+    prefetch.cancel("s5")
+    prefetch.cancel("s6")
+
+
+def test_activity_node_uses_docs():
+    from server.schemas.orchestrator_schemas import OrchestratorAgent4OutputSchema
+    from server.workflow import agent_nodes, node_cache
+
+    node_cache.set_store(None)
+    prefetch.TASKS = {"activity_docs": lambda trip: ["doc-a", "doc-b"]}
+    prefetch.SIGNATURES = {"activity_docs": prefetch._activity_query}
+    awaiting = OrchestratorAgent4OutputSchema(**{**AWAITING, "no_of_traveler": 2}).model_dump()
+    prefetch.update("s4", awaiting)
+    prefetch.update("s4", {**awaiting, "type_of_trip": "leisure"})
+    seen = {}
+
+    def fake_suggest(trip, prefetched_docs=None):
+        seen["docs"] = prefetched_docs
+        return {"day_plans": [], "status": "complete"}
+
+    real = agent_nodes.suggest_activities
+    agent_nodes.suggest_activities = fake_suggest
+    try:
+        trip = OrchestratorAgent4OutputSchema(**{**AWAITING, "type_of_trip": "leisure", "no_of_traveler": 2,
+                                                 "status": "complete"})
+        agent_nodes._run_activity_agent({"trip_data": trip, "session_id": "s4"})
+    finally:
+        agent_nodes.suggest_activities = real
+    assert seen["docs"] == ["doc-a", "doc-b"], seen
+
+
+if __name__ == "__main__":
+    test_park_and_take()
+    print("test_park_and_take ok")
+    test_cancel_on_destination_change()
+    print("test_cancel_on_destination_change ok")
+    test_not_started()
+    print("test_not_started ok")
+    test_signature_refresh_and_drop()
+    print("test_signature_refresh_and_drop ok")
+    test_activity_node_uses_docs()
+    print("test_activity_node_uses_docs ok")
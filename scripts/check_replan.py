@@ -0,0 +1,132 @@
+"""
+Checks for dependency-aware partial re-planning (no LLM calls).
+
+    python -m scripts.check_replan
+"""
+
+from datetime import date, timedelta
+
+from server.agents.packing_agent.packing_agent import generate_packing_list
+from server.workflow import agent_nodes
+from server.workflow.replan import affected_agents, apply_changes, changed_fields, parse_trip_changes
+from server.schemas.orchestrator_schemas import OrchestratorAgent4OutputSchema
+
+TRIP = {
+    "destination": "Ella", "start_date": "2026-03-02", "end_date": "2026-03-06", "trip_duration": 5,
+    "no_of_traveler": 2, "season": "Inter-monsoon", "budget": "medium",
+    "user_preferences": ["hiking", "tea"], "type_of_trip": "leisure", "status": "complete", "messages": [],
+}
+
+
+def _plan(query):
+    updates = parse_trip_changes(query, TRIP)
+    new = apply_changes(TRIP, updates)
+    return updates, affected_agents(changed_fields(TRIP, new))
+
+
+def test_parse():
+    assert parse_trip_changes("push it 3 days later", TRIP) == {"start_date": "2026-03-05", "end_date": "2026-03-09"}
+    assert parse_trip_changes("make it 3 days", TRIP) == {"end_date": "2026-03-04"}
+    assert parse_trip_changes("we are 4 people now", TRIP) == {"no_of_traveler": 4}
+    # relative traveler counts, and words that are neither counts nor activities
+    assert parse_trip_changes("add two extra people", TRIP) == {"no_of_traveler": 4}
+    assert parse_trip_changes("add 3 people", TRIP) == {"no_of_traveler": 5}
+    assert parse_trip_changes("make it one more person", TRIP) == {"no_of_traveler": 3}
+    assert parse_trip_changes("someone of us is sick", TRIP) == {}
+    assert parse_trip_changes("a day later", TRIP) == {"start_date": "2026-03-03", "end_date": "2026-03-07"}
+    assert parse_trip_changes("no hiking please", TRIP) == {"user_preferences": ["tea", "no hiking"]}
+    assert parse_trip_changes("let's go to Kandy instead", TRIP) == {"destination": "Kandy"}
+    assert parse_trip_changes("luxury budget", TRIP) == {"budget": "luxury"}
+    assert parse_trip_changes("make it shorter and friendlier", TRIP) == {}
+    # questions and chat after a plan exists are not edits
+    for chat in ("What is there to visit in Kandy?", "What time does the train go to Ella?",
+                 "thanks, no more questions", "are there any whale tours? I dont want sharks"):
+        assert parse_trip_changes(chat, TRIP) == {}, chat
+    assert parse_trip_changes("can we switch to Mirissa?", TRIP) == {"destination": "Mirissa"}
+    assert parse_trip_changes("change destination to Galle", TRIP) == {"destination": "Galle"}
+    assert parse_trip_changes("base in Kandy", TRIP) == {"destination": "Kandy"}
+    assert parse_trip_changes("add some surfing", TRIP) == {"user_preferences": ["hiking", "tea", "surfing"]}
+    nxt = parse_trip_changes("change dates to next week", TRIP)
+    monday = date.today() + timedelta(days=7 - date.today().weekday())
+    assert nxt["start_date"] == monday.isoformat()
+
+
+def test_dependencies():
+    # dates within the same month and season: location output is kept
+    assert _plan("push it 3 days later")[1] == ["activity_agent", "packing_agent", "summary_agent"]
+    # dates moving into another season re-run location too
+    assert _plan("2026-07-01 to 2026-07-05")[1][0] == "location_agent"
+    assert _plan("no hiking please")[1] == ["location_agent", "activity_agent", "packing_agent", "summary_agent"]
+    assert _plan("we are 4 people now")[1] == ["packing_agent", "summary_agent"]
+    new = apply_changes(TRIP, {"start_date": "2026-07-01", "end_date": "2026-07-05"})
+    assert new["season"] == "Southwest Monsoon" and new["trip_duration"] == 5
+
+
+def test_replan_node_runs_only_affected():
+    ran = []
+    saved = dict(agent_nodes._PLAN_NODES)
+    try:
+        for name in saved:
+            agent_nodes._PLAN_NODES[name] = lambda state, name=name: (ran.append(name), {})[1]
+        state = {
+            "user_query": "push it 3 days later", "trip_data": OrchestratorAgent4OutputSchema(**TRIP),
+            "location_recs": {"recommended_locations": [{"name": "Ella Rock"}]}, "latest_summary": "old",
+        }
+        out = agent_nodes.replan_node(state)
+    finally:
+        agent_nodes._PLAN_NODES.update(saved)
+    assert ran == ["activity_agent", "packing_agent", "summary_agent"], ran
+    assert out["trip_data"].start_date == "2026-03-05"
+    assert "location_recs" not in out and "latest_summary" not in out  # kept, not re-sent
+
+
+def test_questions_do_not_replan():
+    real = agent_nodes._run_decision_agent
+    agent_nodes._run_decision_agent = lambda state: {**state, "intent": "chat_agent"}
+    try:
+        for query, intent in (("What is there to visit in Kandy?", "chat_agent"),
+                              ("are there any whale tours? I dont want sharks", "chat_agent"),
+                              ("I don't like the second day", "replan"),
+                              ("switch to Kandy", "replan")):
+            state = {"user_query": query, "trip_data": OrchestratorAgent4OutputSchema(**TRIP),
+                     "latest_summary": "old"}
+            assert agent_nodes.route_user_query(state)["intent"] == intent, query
+    finally:
+        agent_nodes._run_decision_agent = real
+
+
+def test_traveler_change_requantifies_packing():
+    ran = []
+    saved = dict(agent_nodes._PLAN_NODES)
+    real_summary = agent_nodes._run_summary_agent
+    packing = generate_packing_list(TRIP, suggested_activities=["Ella Rock hike"], use_llm=False)
+    summary = "# Your Ella trip\n\n## Days\n- Ella Rock hike\n\n## Packing\n- 2 × ID/Passport\n\n## Responsible AI\n- Be kind\n"
+    try:
+        for name in saved:
+            agent_nodes._PLAN_NODES[name] = lambda state, name=name: (ran.append(name), {})[1]
+        agent_nodes._run_summary_agent = lambda *a, **kw: ran.append("summary_llm")
+        state = {"user_query": "we are 4 people now", "trip_data": OrchestratorAgent4OutputSchema(**TRIP),
+                 "packing_recs": packing, "latest_summary": summary}
+        out = agent_nodes.replan_node(state)
+        # any other change still rebuilds the list
+        agent_nodes.replan_node({**state, "user_query": "push it 3 days later"})
+    finally:
+        agent_nodes._PLAN_NODES.update(saved)
+        agent_nodes._run_summary_agent = real_summary
+    assert ran == ["activity_agent", "packing_agent", "summary_agent"], ran
+    # only the packing section of the summary changed
+    new = out["latest_summary"]
+    assert new.startswith("# Your Ella trip\n\n## Days\n- Ella Rock hike\n\n") and new.endswith("## Responsible AI\n- Be kind\n")
+    assert "4 × ID/Passport" in new and "2 × ID/Passport" not in new and out["final_response"] == new
+    items = {it["name"]: it for cat in out["packing_recs"]["categories"] for it in cat["items"]}
+    before = {it["name"]: it for cat in packing["categories"] for it in cat["items"]}
+    assert set(items) == set(before) and out["packing_recs"]["no_of_traveler"] == 4
+    assert all(items[n]["quantity"] >= before[n]["quantity"] for n in items)
+    assert items["ID/Passport"]["quantity"] == 4 and items["Basic meds"]["quantity"] == 1
+
+
+if __name__ == "__main__":
+    for test in (test_parse, test_dependencies, test_replan_node_runs_only_affected, test_questions_do_not_replan,
+                 test_traveler_change_requantifies_packing):
+        test()
+        print(f"{test.__name__} ok")
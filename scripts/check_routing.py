@@ -0,0 +1,49 @@
+"""Checks the route heuristic against brute force and the per-day split.
+
+    python -m scripts.check_routing
+"""
+import itertools
+import random
+import time
+import unittest
+
+from server.utils import geo, routing
+
+
+class RoutingChecks(unittest.TestCase):
+    def test_close_to_optimal_on_small_trips(self):
+        names = list(geo.seed_coords())
+        rng = random.Random(5)
+        gaps = []
+        for _ in range(40):
+            stops = rng.sample(names, 7)
+            m = geo.travel_matrix(stops)
+            got = routing.route_minutes(routing.solve_route(m, start=0), m)
+            best = min(routing.route_minutes((0,) + p, m) for p in itertools.permutations(range(1, 7)))
+            gaps.append(got / best - 1)
+        self.assertLess(max(gaps), 0.15)
+        self.assertLess(sum(gaps) / len(gaps), 0.03)
+
+    def test_fast_for_fifty_stops(self):
+        stops = list(geo.seed_coords())[:50]
+        t0 = time.perf_counter()
+        route = routing.plan_route(stops, start="Colombo", n_days=10)
+        self.assertLess(time.perf_counter() - t0, 0.05)
+        self.assertEqual(sorted(route["order"]), list(range(50)))
+
+    def test_split_days(self):
+        self.assertEqual(routing.split_days([0, 1, 2, 3], 2), [[0, 1], [2, 3]])
+        # a heavy base stop spans several days
+        self.assertEqual(routing.split_days([0, 1, 2], 3, [4, 1, 1]), [[0], [0], [1, 2]])
+        self.assertEqual(routing.split_days([0], 3), [[0], [0], [0]])
+
+    def test_unlocated_go_last(self):
+        route = routing.plan_route(["Sigiriya", "Atlantis", "Galle", "Kandy"], start="Colombo", n_days=2)
+        self.assertEqual(route["order"][-1], 1)
+        self.assertEqual(route["unlocated"], [1])
+        self.assertNotIn(1, [i for day in route["days"] for i in day])
+        self.assertEqual(len(route["legs_minutes"]), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
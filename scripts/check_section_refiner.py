@@ -0,0 +1,91 @@
+"""
+Checks for section-targeted summary refinement (no network: a fake model).
+
+    python -m scripts.check_section_refiner
+"""
+
+import copy
+import time
+
+from server.agents.summary_agent.section_refiner import refine_sections, split_sections, target_sections
+from server.agents.summary_agent.summary_agent import generate_summary
+from scripts.check_summary_sections import BASE
+
+
+class FakeLLM:
+    """Upper-cases the section it is given; answers classification prompts with `targets`."""
+
+    def __init__(self, delay: float = 0.0, targets: str = "ALL"):
+        self.delay = delay
+        self.targets = targets
+        self.calls = []
+
+    def invoke(self, prompt: str):
+        self.calls.append(prompt)
+        time.sleep(self.delay)
+        if "SECTION:\n" not in prompt:
+            return self.targets
+        section = prompt.split("SECTION:\n", 1)[1].rsplit("\n\nUSER FEEDBACK:", 1)[0]
+        return section.upper()
+
+
+def _summary(**changes):
+    state = copy.deepcopy(BASE)
+    state.update(changes)
+    return generate_summary(state, use_llm=False).summary
+
+
+def _index(sections, word):
+    return next(i for i, s in enumerate(sections) if word in s.heading)
+
+
+def test_split_round_trips():
+    text = _summary()
+    sections = split_sections(text)
+    assert "".join(s.text for s in sections) == text
+    assert len(sections) >= 8
+    assert sections[-1].protected or any(s.protected for s in sections)
+    assert split_sections("no headings here")[0].text == "no headings here"
+
+
+def test_targets():
+    sections = split_sections(_summary())
+    assert target_sections(sections, "Add a rain jacket to the packing list") == [_index(sections, "Packing")]
+    assert _index(sections, "Recommended Destinations") in target_sections(sections, "Swap Galle Fort for something else")
+    everything = target_sections(sections, "Make the tone friendlier")
+    assert len(everything) == len(sections) - 1 and _index(sections, "Responsible") not in everything
+    assert target_sections(sections, "Hmm, not sure about this") is None
+
+
+def test_only_targeted_sections_change():
+    text = _summary()
+    sections = split_sections(text)
+    llm = FakeLLM()
+    new, targets = refine_sections(text, "More detail on packing please", llm)
+    assert targets == [_index(sections, "Packing")] and len(llm.calls) == 1
+    after = split_sections(new)
+    for i, (a, b) in enumerate(zip(sections, after)):
+        assert (a.text == b.text) == (i not in targets), a.heading
+    # unresolved feedback goes through one classification call first
+    llm = FakeLLM(targets=str(_index(sections, "Vibe")))
+    _, targets = refine_sections(text, "Hmm, not sure about this", llm)
+    assert targets == [_index(sections, "Vibe")] and len(llm.calls) == 2
+
+
+def test_parallel_speedup():
+    days = [{"date": f"2026-01-{d:02d}", "suggestions": [
+        {"time_of_day": "morning", "title": f"Stop {d}", "why": "Because. " * 40}]} for d in range(10, 30)]
+    text = _summary(activity_recommendations={"status": "completed", "day_plans": days})
+    llm = FakeLLM(delay=0.2)
+    t = time.perf_counter()
+    refine_sections(text, "Make the tone friendlier", llm, max_workers=8)
+    elapsed = time.perf_counter() - t
+    sequential = 0.2 * len(llm.calls)
+    print(f"  {len(llm.calls)} section calls in {elapsed:.2f}s (sequential would be {sequential:.1f}s)")
+    assert elapsed < sequential / 2
+
+
+if __name__ == "__main__":
+    for test in (test_split_round_trips, test_targets, test_only_targeted_sections_change, test_parallel_speedup):
+        test()
+        print(f"{test.__name__} ok")
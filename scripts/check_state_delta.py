@@ -0,0 +1,101 @@
+"""
+Checks for delta-returning graph nodes and the TripPlanState reducers.
+
+    python -m scripts.check_state_delta
+"""
+
+from langgraph.graph import END, StateGraph
+
+from server.workflow import app_state
+from server.workflow.app_state import TripPlanState, apply_update, check_delta, delta_checked
+
+
+def test_reducers():
+    state = {"chat_history": [("human", "hi")], "degraded": ["location"], "intent": "chat_agent"}
+    apply_update(state, {"chat_history": [("ai", "hello")], "degraded": {"packing": True, "location": False},
+                         "intent": "replan"})
+    assert state["chat_history"] == [("human", "hi"), ("ai", "hello")]
+    assert state["degraded"] == ["packing"] and state["intent"] == "replan"
+    apply_update(state, {"degraded": ["summary"]})  # a list replaces, as in a client's previous_state
+    assert state["degraded"] == ["summary"]
+    assert app_state.add_turns(None, None) == [] and app_state.merge_degraded(None, {"a": False}) == []
+
+
+def test_check_delta():
+    state = {"chat_history": [], "trip_data": {"destination": "Ella"}, "intent": "chat_agent"}
+    check_delta("ok", state, {"intent": "chat_agent", "final_response": "hi"})  # equal strings are fine
+    for bad in (state, {"trip_data": state["trip_data"]}, {**state, "final_response": "hi"}):
+        try:
+            check_delta("bad", state, bad)
+            raise RuntimeError("expected AssertionError")
+        except AssertionError:
+            pass
+
+
+def test_parallel_branches_merge():
+    def start(state):
+        return {}
+
+    def left(state):
+        return {"chat_history": [("ai", "left")], "degraded": {"location": True}}
+
+    def right(state):
+        return {"chat_history": [("ai", "right")], "degraded": {"activity": True}}
+
+    graph = StateGraph(TripPlanState)
+    graph.add_node("start", start)
+    graph.add_node("left", left)
+    graph.add_node("right", right)
+    graph.set_entry_point("start")
+    graph.add_edge("start", "left")
+    graph.add_edge("start", "right")
+    graph.add_edge("left", END)
+    graph.add_edge("right", END)
+    out = graph.compile().invoke({"user_query": "x", "chat_history": [("human", "x")], "degraded": ["summary"]})
+    assert out["chat_history"][0] == ("human", "x") and len(out["chat_history"]) == 3, out["chat_history"]
+    assert sorted(out["degraded"]) == ["activity", "location", "summary"], out["degraded"]
+
+
+def test_chat_turn_through_graph():
+    from server.workflow import agent_nodes
+    from server.workflow.workflow import build_trip_workflow
+
+    real = (app_state.STATE_DELTA_CHECK, agent_nodes._run_decision_agent, agent_nodes._run_chat_agent)
+    app_state.STATE_DELTA_CHECK = True
+    agent_nodes._run_decision_agent = lambda state: {**state, "intent": "chat_agent"}
+    agent_nodes._run_chat_agent = lambda state: {
+        "chat_history": [("human", state["user_query"]), ("ai", "hello")], "final_summary": "hello"}
+    try:
+        app = build_trip_workflow()
+        state = {"user_query": "hi", "chat_history": [("human", "earlier"), ("ai", "reply")],
+                 "intent": None, "trip_data": None, "conversation_id": "c1"}
+        for step_output in app.stream(state):
+            last_node = list(step_output.keys())[-1]
+            apply_update(state, step_output[last_node] or {})
+    finally:
+        app_state.STATE_DELTA_CHECK, agent_nodes._run_decision_agent, agent_nodes._run_chat_agent = real
+    assert state["final_response"] == "hello" and state["conversation_id"] == "c1"
+    assert [t[1] for t in state["chat_history"]] == ["earlier", "reply", "hi", "hello"], state["chat_history"]
+
+    # with the check on, a node returning the whole state fails loudly
+    app_state.STATE_DELTA_CHECK = True
+    try:
+        leaky = delta_checked("leaky", lambda s: s)
+    finally:
+        app_state.STATE_DELTA_CHECK = real[0]
+    try:
+        leaky({"chat_history": []})
+        raise RuntimeError("expected AssertionError")
+    except AssertionError:
+        pass
+
+
+if __name__ == "__main__":
+    test_reducers()
+    print("test_reducers ok")
+    test_check_delta()
+    print("test_check_delta ok")
+    test_parallel_branches_merge()
+    print("test_parallel_branches_merge ok")
+    test_chat_turn_through_graph()
+    print("test_chat_turn_through_graph ok")
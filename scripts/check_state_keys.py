@@ -0,0 +1,62 @@
+"""
+Checks for the single canonical key per agent output in TripPlanState.
+
+    python -m scripts.check_state_keys
+"""
+
+from server.workflow.app_state import (
+    RECS_KEYS, apply_update, get_recs, normalize_state, record_state_size, state_size_stats,
+)
+from server.schemas.orchestrator_schemas import OrchestratorAgent4OutputSchema
+
+TRIP = OrchestratorAgent4OutputSchema(
+    destination="Ella", start_date="2026-03-02", end_date="2026-03-05", no_of_traveler=2,
+    user_preferences=["hiking", "tea"], type_of_trip="leisure", status="complete",
+)
+
+
+def test_normalize():
+    legacy = {"activity_recommendations": {"day_plans": [1]}, "packing_list": {"categories": []},
+              "location_recs": {"recommended_locations": ["a"]}, "location_recommendations": {"stale": True}}
+    assert get_recs(legacy, "activity_recs") == {"day_plans": [1]}
+    state = normalize_state(legacy)
+    assert not set(RECS_KEYS.values()) & set(state), state
+    assert state["activity_recs"] == {"day_plans": [1]}
+    assert state["location_recs"] == {"recommended_locations": ["a"]}  # canonical wins
+    assert state["packing_recs"] == {"categories": []}
+    assert get_recs(None, "packing_recs") is None
+
+
+def test_nodes_write_once():
+    from server.workflow import agent_nodes, node_cache
+
+    node_cache.set_store(None)
+    real = agent_nodes.suggest_activities
+    agent_nodes.suggest_activities = lambda trip, prefetched_docs=None: {"day_plans": [], "status": "complete"}
+    try:
+        state = {"trip_data": TRIP}
+        apply_update(state, agent_nodes._run_activity_agent(state))
+        apply_update(state, agent_nodes._packing_fallback(state))
+    finally:
+        agent_nodes.suggest_activities = real
+    assert state["activity_recs"] and state["packing_recs"]
+    assert not set(RECS_KEYS.values()) & set(state), sorted(state)
+    summary_in = agent_nodes._summary_input({**state, "packing_recs": None, "packing_list": {"legacy": 1}})
+    assert summary_in["activity_recommendations"] == state["activity_recs"]
+    assert summary_in["packing_list"] == {"legacy": 1}
+
+
+def test_size_metric():
+    sizes = record_state_size({"a": "xx", "b": [1, 2, 3]})
+    assert sizes["a"] == 4 and sizes["b"] == 9 and sizes["total"] > sizes["a"] + sizes["b"]
+    stats = state_size_stats()
+    assert stats["turns"] >= 1 and stats["last_bytes"] == sizes["total"]
+
+
+if __name__ == "__main__":
+    test_normalize()
+    print("test_normalize ok")
+    test_nodes_write_once()
+    print("test_nodes_write_once ok")
+    test_size_metric()
+    print("test_size_metric ok")
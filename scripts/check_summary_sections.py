@@ -0,0 +1,110 @@
+"""
+Checks for the sectioned summary renderer.
+
+    python -m scripts.check_summary_sections [path/to/previous/summary_agent.py]
+
+With a path to the previous (string-concatenation) summary_agent.py, the raw
+summaries are also compared byte-for-byte against it.
+"""
+
+import copy
+import importlib.util
+import sys
+
+from server.agents.summary_agent import summary_sections
+from server.agents.summary_agent.summary_agent import generate_summary
+
+BASE = {
+    "destination": "Mirissa",
+    "start_date": "2026-01-10",
+    "end_date": "2026-01-14",
+    "no_of_traveler": 4,
+    "type_of_trip": "family",
+    "budget": "medium",
+    "user_preferences": ["beach", "wildlife"],
+    "location_recommendations": {
+        "status": "completed",
+        "recommended_locations": [
+            {"name": "Mirissa Beach", "type": "beach", "reason": "Calm <b>bay</b> in the dry season."},
+            {"name": "Galle Fort", "type": "heritage", "reason": "Dutch-era ramparts."},
+        ],
+    },
+    "activity_recommendations": {
+        "status": "completed",
+        "day_plans": [
+            {"date": "2026-01-10", "suggestions": [
+                {"time_of_day": "morning", "title": "Whale watching", "why": "Peak season.",
+                 "price_level": "medium", "confidence": 0.8, "source_hints": ["catalog"]},
+                {"time_of_day": "evening", "title": "Sunset at Coconut Hill", "why": "Short walk."},
+            ]},
+        ],
+    },
+    "packing_list": {
+        "summary": "Light clothes and sun protection.",
+        "duration_days": 5,
+        "categories": [
+            {"name": "Essentials", "items": [
+                {"name": "Sunscreen", "reason": "Strong sun", "quantity": 4},
+                {"name": "Passport", "quantity": 1},
+            ]},
+            {"name": "", "items": ["Hat"]},
+        ],
+        "notes": ["Cover shoulders at temples."],
+    },
+    "additional_info": "Vegetarian meals please.",
+}
+
+VARIANTS = [
+    {},
+    {"no_of_traveler": 1, "budget": None, "type_of_trip": None},
+    {"start_date": "10/01/2026"},
+    {"location_recommendations": {}, "locations_to_visit": ["Ella", "Kandy"]},
+    {"activity_recommendations": {}, "activities": ["Surfing", "Hiking"]},
+    {"packing_list": ["Hat", "Sunscreen"]},
+    {"packing_list": None, "additional_info": None, "user_preferences": []},
+    {"location_recommendations": None, "activity_recommendations": None},
+    {"destination": None, "start_date": None},
+]
+
+
+def _load_previous(path):
+    spec = importlib.util.spec_from_file_location("previous_summary_agent", path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod.generate_summary
+
+
+def _state(variant):
+    state = copy.deepcopy(BASE)
+    state.update(copy.deepcopy(variant))
+    return state
+
+
+def test_matches_previous(previous):
+    for variant in VARIANTS:
+        state = _state(variant)
+        old = previous(copy.deepcopy(state), use_llm=False).summary
+        new = generate_summary(copy.deepcopy(state), use_llm=False).summary
+        assert old == new, f"summary differs for variant {variant}"
+
+
+def test_only_changed_sections_rerender():
+    summary_sections._sections.clear()
+    state = _state({})
+    first = generate_summary(copy.deepcopy(state), use_llm=False).summary
+    before = summary_sections.stats()["misses"]
+    assert generate_summary(copy.deepcopy(state), use_llm=False).summary == first
+    assert summary_sections.stats()["misses"] == before
+
+    state["packing_list"]["categories"][0]["items"][0]["quantity"] = 6
+    second = generate_summary(copy.deepcopy(state), use_llm=False).summary
+    assert summary_sections.stats()["misses"] == before + 1  # the packing section only
+    assert second != first and "6 × Sunscreen" in second
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        test_matches_previous(_load_previous(sys.argv[1]))
+        print("test_matches_previous ok")
+    test_only_changed_sections_rerender()
+    print("test_only_changed_sections_rerender ok")
@@ -0,0 +1,556 @@
+# server/agents/activity_agent/activity_catalog.py
+"""
+Offline structured activity catalog + deterministic day-plan assembly.
+
+build_catalog() walks the chunks already stored in the activity FAISS index,
+pulls out activity-like headings (tour/listing titles, "Visit X in Y" lines),
+and records for each one:
+
+    name, place (canonical), region, tags, setting (indoor/outdoor),
+    time_of_day (slots it suits), price_level, best_months, sources
+
+The result is written as gzip'd JSON with per-place and per-tag indexes.
+assemble_day_plans() then fills morning/noon/evening/night for every trip date
+straight from the catalog, with no retrieval or LLM calls.
+
+Usage:
+    python -m server.agents.activity_agent.activity_catalog            # build
+    python -m server.agents.activity_agent.activity_catalog --show Ella
+"""
+
+import gzip
+import json
+import os
+import pickle
+import re
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from server.agents.activity_agent.activity_scheduler import schedule_day_plans
+from server.agents.activity_agent.activity_scoring import (
+    _estimate_price_level,
+    _is_outdoor_activity,
+    title_key,
+)
+from server.utils.climate import dry_months, is_rain_risky
+from server.utils.geo import nearby_places
+from server.utils.places import find_places, region_for
+
+try:
+    from server.utils.config import ACTIVITY_CATALOG_PATH, ACTIVITY_FAISS_DIR
+except Exception:
+    ACTIVITY_CATALOG_PATH = os.getenv("ACTIVITY_CATALOG_PATH", "server/data/activity_catalog.json.gz")
+    ACTIVITY_FAISS_DIR = os.getenv("ACTIVITY_FAISS_DIR", "server/data/activity_faiss")
+
+CATALOG_VERSION = 1
+SLOTS = ("morning", "noon", "evening", "night")
+FIELDS = ("name", "place", "region", "tags", "setting", "time_of_day", "price_level", "best_months", "sources")
+
+# keyword -> tag; a heading must hit at least one of these to count as an activity
+TAG_KEYWORDS = {
+    "wildlife": ("safari", "leopard", "elephant", "whale", "dolphin", "bird", "turtle", "wildlife", "national park"),
+    "water": ("beach", "snorkel", "diving", "dive", "surf", "boat", "lagoon", "rafting", "river", "kayak", "swim", "cruise"),
+    "culture": ("temple", "stupa", "dagoba", "fort", "museum", "mosque", "ruins", "ancient", "cultural", "relic",
+                "cave", "heritage", "kovil", "church", "dance", "show", "festival"),
+    "food": ("cooking", "food", "culinary", "seafood", "curry", "cuisine", "tea tasting", "spice"),
+    "adventure": ("hike", "hiking", "trek", "climb", "rafting", "zipline", "ziplining", "canyoning", "helicopter",
+                  "balloon", "atv", "cycling", "bike"),
+    "nature": ("falls", "waterfall", "garden", "tea", "peak", "rock", "mountain", "forest", "viewpoint",
+               "sunset", "sunrise", "bridge", "train", "hill"),
+    "city": ("city tour", "tuk tuk", "tuk-tuk", "market", "shopping", "city highlights"),
+    "wellness": ("massage", "spa", "ayurveda", "yoga", "wellness"),
+}
+_TAG_RES = {
+    tag: re.compile(r"\b(" + "|".join(re.escape(k) for k in kws) + r")", re.IGNORECASE)
+    for tag, kws in TAG_KEYWORDS.items()
+}
+
+# slot preference rules, checked in order; first hit decides
+_SLOT_RULES = (
+    (re.compile(r"\b(night|dinner|barbecue|bar|fire danc|nightlife)", re.I), ("night", "evening")),
+    (re.compile(r"\b(sunset|evening|dance|cultural show|show|lagoon)", re.I), ("evening",)),
+    (re.compile(r"\b(sunrise|safari|hike|hiking|trek|climb|whale|dolphin|snorkel|div|surf|rafting|bird|peak|rock|falls|train)", re.I), ("morning",)),
+    (re.compile(r"\b(cooking|lunch|museum|tea|spice|temple|mosque|food|tuk|city|massage|spa|ayurveda|market)", re.I), ("noon", "evening")),
+)
+
+ALL_MONTHS = tuple(range(1, 13))
+# how far (estimated driving minutes) catalog_candidates() looks to top up a thin pool
+NEARBY_MINUTES = 120
+
+# headings that look like activities but are site chrome / listings / packages
+_NOISE = re.compile(
+    r"(touris|guide|\bdays?\b|day tour|accommodation|tips|gear|\bmap\b|news|authority|levy|hotel|itinerar|"
+    r"holiday|package|read more|how to|show less|show more|booking|ratings|where to|recognition|announce|"
+    r"spain|india|maldives)",
+    re.IGNORECASE,
+)
+# scraped text with lost separators, e.g. "Galle FortWhere to stay"
+_GLUED_RE = re.compile(r"[a-z][A-Z][a-z]|[a-z][A-Z]{3,}")
+# outdoor sights the shared outdoor heuristic does not know about; rides and transfers are weather-bound too
+_OUTDOOR_EXTRA_RE = re.compile(r"\b(fort|rampart|ruins|rock|stupa|garden|park|falls|peak|bridge|"
+                               r"train|ride|transfer|helicopter|tuk)", re.I)
+# photo captions ("Bailey relaxing at Secret Beach in Mirissa, Sri Lanka.") and places to sleep
+_CAPTION_RE = re.compile(r"\.$|^[A-Z][a-z]+ (?:relaxing|sitting|standing|posing|enjoying|looking|walking)\b")
+_LODGING_RE = re.compile(r"\b(house|guest ?house|villa|hostel|resort|lodge|homestay|bungalow|inn|cottage|cabana|"
+                         r"apartments?|suites?)\b", re.IGNORECASE)
+_SPLIT_RE = re.compile(r"\s*\n\s*|\s{3,}|\s\|\s")
+_PRICE_RE = re.compile(r"\$\s?([\d,]+(?:\.\d+)?)")
+_TRAILING_JUNK_RE = re.compile(r"(Cost|,)+$")
+# listing location lines ("Yala National Park, LK") are where, not what
+_GEOCODE_RE = re.compile(r",\s*[A-Z]{2,3}$")
+# words that only name a kind of place; a heading of place names + these is a bare place
+_PLACE_WORDS_RE = re.compile(
+    r"\b(national park|forest reserve|park|reserve|sanctuary|district|province|town|city|village|sri lanka)\b",
+    re.IGNORECASE,
+)
+
+# activity kind -> pattern, checked in order; one kind per day (no two safaris on the same day)
+ACTIVITY_KINDS = (
+    ("boat trip", re.compile(r"\b(boat|river safari|lagoon|cruiser)", re.I)),
+    ("city tour", re.compile(r"\b(city tour|city highlights|tuk[ -]tuk)", re.I)),
+    ("safari", re.compile(r"\b(safari|national park|jeep)", re.I)),
+    ("whale watching", re.compile(r"\b(whale|dolphin)", re.I)),
+    ("diving", re.compile(r"\b(div|snorkel)", re.I)),
+    ("rafting", re.compile(r"\brafting", re.I)),
+    ("helicopter", re.compile(r"\bhelicopter", re.I)),
+    ("cooking class", re.compile(r"\bcook", re.I)),
+    ("food tour", re.compile(r"\b(food|culinary|seafood)", re.I)),
+    ("train ride", re.compile(r"\btrain", re.I)),
+    ("tea tour", re.compile(r"\btea\b", re.I)),
+    ("sunrise", re.compile(r"\bsunrise", re.I)),
+)
+
+
+def _tags_for(text: str) -> List[str]:
+    return [tag for tag, rx in _TAG_RES.items() if rx.search(text or "")]
+
+
+def activity_kind(title: str) -> Optional[str]:
+    """Coarse activity type of a title ("safari", "city tour", ...), or None."""
+    for kind, rx in ACTIVITY_KINDS:
+        if rx.search(title or ""):
+            return kind
+    return None
+
+
+# words that do not tell two attractions apart ("Observe Worshippers at the Temple of the Tooth")
+_FILLER_WORDS = {"a", "an", "the", "of", "in", "at", "on", "to", "from", "and", "with", "for", "by", "near",
+                 "sri", "lanka", "lankan", "explore", "discover", "visit", "observe", "watch", "see", "take",
+                 "enjoy", "experience", "private"}
+
+
+def attraction_key(entry: dict) -> frozenset:
+    """Significant words of an entry's name, place names left out; see _same_attraction()."""
+    name = entry.get("name") or ""
+    for p in find_places(name) + ([entry["place"]] if entry.get("place") else []):
+        name = re.sub(re.escape(p), " ", name, flags=re.IGNORECASE)
+    words = (re.sub(r"s$", "", w) if len(w) > 3 else w for w in re.findall(r"[a-z]+", name.lower()))
+    return frozenset(w for w in words if w not in _FILLER_WORDS)
+
+
+def _same_attraction(a: frozenset, b: frozenset) -> bool:
+    # "Temple of the Tooth Relic" is inside "Temple of the Sacred Tooth Relic": the same place to see
+    small, large = (a, b) if len(a) <= len(b) else (b, a)
+    return len(small) >= 2 and small <= large
+
+
+def _is_place_heading(seg: str) -> bool:
+    """True for "Udawalawe National Park, LK" / "Yala National Park": a place, not an activity."""
+    if _GEOCODE_RE.search(seg):
+        return True
+    rest = seg
+    for p in find_places(seg):
+        rest = re.sub(re.escape(p), " ", rest, flags=re.IGNORECASE)
+    return not re.search(r"[A-Za-z]{3,}", _PLACE_WORDS_RE.sub(" ", rest))
+
+
+# words that also mean the activity a traveler asks to avoid ("no hiking" also drops "Ella Rock")
+AVOID_SYNONYMS = {
+    "hik": ("hike", "trek", "climb", "trail", "peak", "rock"),
+    "beach": ("beach", "surf", "snorkel", "swim"),
+    "templ": ("temple", "stupa", "dagoba", "kovil", "shrine"),
+    "safari": ("safari", "national park", "jeep"),
+    "train": ("train", "railway"),
+}
+_NEGATION_RE = re.compile(r"^\s*(?:no|not|avoid|skip|without|don'?t (?:like|want))\s+(.+?)\s*$", re.IGNORECASE)
+
+
+def split_preferences(preferences: Optional[List[str]]) -> Tuple[List[str], List]:
+    """
+    (wanted, avoided) preferences: "no hiking" / "avoid temples" go to
+    `avoided` as a pattern matching the activity word and its inflections.
+    """
+    wanted, avoided = [], []
+    for p in preferences or []:
+        m = _NEGATION_RE.match(p or "")
+        if not m:
+            wanted.append(p)
+            continue
+        term = m.group(1).lower()
+        stem = re.sub(r"(ing|es|s)$", "", term) if len(term) > 4 else term
+        words = (stem,) + AVOID_SYNONYMS.get(stem, ())
+        avoided.append(re.compile(r"\b(" + "|".join(re.escape(w) for w in words) + ")", re.IGNORECASE))
+    return wanted, avoided
+
+
+def is_avoided(title: str, tags: Optional[List[str]], avoided: List) -> bool:
+    return any(rx.search(title or "") or any(rx.fullmatch(t) for t in tags or []) for rx in avoided)
+
+
+def _slots_for(text: str) -> List[str]:
+    for rx, slots in _SLOT_RULES:
+        if rx.search(text or ""):
+            return list(slots)
+    return ["morning", "noon"]
+
+
+def _price_from_text(text: str) -> Optional[str]:
+    m = _PRICE_RE.search(text or "")
+    if not m:
+        return None
+    try:
+        usd = float(m.group(1).replace(",", ""))
+    except ValueError:
+        return None
+    if usd < 25:
+        return "low"
+    if usd <= 120:
+        return "medium"
+    return "high"
+
+
+def _place_for(heading: str, following: str) -> Optional[str]:
+    # "Day trip from Colombo to Yala": the origin is not where the activity is
+    places = [p for p in find_places(heading) if not re.search(r"\bfrom\s+" + re.escape(p), heading, re.I)]
+    if places:
+        return places[0]
+    # listing pages put the location on the next line ("Yala National Park, LK")
+    if following and len(following) < 60 and "," in following:
+        places = find_places(following)
+        if places:
+            return places[0]
+    return None
+
+
+def extract_activities(text: str, source: str = "") -> List[dict]:
+    """Activity candidates found in one corpus chunk."""
+    segs = [s.strip(" -•*:|") for s in _SPLIT_RE.split(text or "")]
+    segs = [s for s in segs if s]
+    out = []
+    for i, seg in enumerate(segs):
+        words = seg.split()
+        if not (2 <= len(words) <= 14) or not seg[0].isupper():
+            continue
+        if sum(1 for w in words if w[0].isupper()) < len(words) / 2:
+            continue
+        if (_NOISE.search(seg) or _GLUED_RE.search(seg) or _CAPTION_RE.search(seg) or _LODGING_RE.search(seg)
+                or _is_place_heading(seg)):
+            continue
+        tags = _tags_for(seg)
+        if not tags:
+            continue
+        following = segs[i + 1] if i + 1 < len(segs) else ""
+        place = _place_for(seg, following)
+        if not place:
+            continue
+
+        name = _TRAILING_JUNK_RE.sub("", seg).strip()
+        nearby = " ".join(segs[max(0, i - 3):i + 4])
+        outdoor = (
+            _is_outdoor_activity(name, "")
+            or _OUTDOOR_EXTRA_RE.search(name) is not None
+            or bool({"wildlife", "water", "adventure"} & set(tags))
+        )
+        setting = "outdoor" if outdoor else "indoor"
+        region = region_for(place)
+        out.append({
+            "name": name,
+            "place": place,
+            "region": region,
+            "tags": tags,
+            "setting": setting,
+            "time_of_day": _slots_for(name),
+            "price_level": _price_from_text(nearby) or _estimate_price_level(name, "", []),
+            "best_months": dry_months(region) if setting == "outdoor" and region else list(ALL_MONTHS),
+            "sources": [source] if source else [],
+        })
+    return out
+
+
+def _load_indexed_chunks(index_dir: str = ACTIVITY_FAISS_DIR) -> List:
+    try:
+        from server.agents.activity_agent.activity_indexer import _load_vectorstore
+        return list(_load_vectorstore().docstore._dict.values())
+    except Exception as e:
+        # the docstore pickle is enough; no embeddings/faiss binary needed
+        print(f"[catalog] Vector store unavailable ({e}); reading docstore directly.")
+    with open(os.path.join(index_dir, "index.pkl"), "rb") as f:
+        docstore, _ = pickle.load(f)
+    return list(docstore._dict.values())
+
+
+def build_catalog(chunks: Optional[List] = None, path: str = ACTIVITY_CATALOG_PATH) -> dict:
+    """Extract the catalog from indexed chunks and write it to `path`."""
+    if chunks is None:
+        chunks = _load_indexed_chunks()
+    print(f"[catalog] Extracting activities from {len(chunks)} chunks...")
+
+    merged: Dict[str, dict] = {}
+    for c in chunks:
+        meta = getattr(c, "metadata", None) or {}
+        src = meta.get("source") or meta.get("url") or ""
+        for entry in extract_activities(getattr(c, "page_content", "") or "", src):
+            key = f"{title_key(entry['name'])}|{entry['place']}"
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = entry
+            elif src and src not in existing["sources"]:
+                existing["sources"].append(src)
+
+    entries = sorted(merged.values(), key=lambda e: (e["place"], -len(e["sources"]), e["name"]))
+    by_place: Dict[str, List[int]] = {}
+    by_tag: Dict[str, List[int]] = {}
+    for i, e in enumerate(entries):
+        by_place.setdefault(e["place"], []).append(i)
+        for t in e["tags"]:
+            by_tag.setdefault(t, []).append(i)
+
+    payload = {
+        "version": CATALOG_VERSION,
+        "built_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "fields": list(FIELDS),
+        "rows": [[e[f] for f in FIELDS] for e in entries],
+        "index": {"place": by_place, "tag": by_tag},
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+    print(f"[catalog] Saved {len(entries)} activities across {len(by_place)} places to: {path}")
+    _CACHE.clear()
+    return payload
+
+
+class ActivityCatalog:
+    def __init__(self, payload: dict):
+        fields = payload.get("fields", FIELDS)
+        self.entries = [dict(zip(fields, row)) for row in payload.get("rows", [])]
+        index = payload.get("index", {})
+        self.by_place = {k: list(v) for k, v in index.get("place", {}).items()}
+        self.by_tag = {k: list(v) for k, v in index.get("tag", {}).items()}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def for_places(self, places: List[str]) -> List[dict]:
+        seen, out = set(), []
+        for p in places:
+            for i in self.by_place.get(p, []):
+                if i not in seen:
+                    seen.add(i)
+                    out.append(self.entries[i])
+        return out
+
+
+_CACHE: Dict[str, tuple] = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def load_catalog(path: str = ACTIVITY_CATALOG_PATH) -> Optional[ActivityCatalog]:
+    """Load (and memoize by mtime) the catalog; None when it has not been built."""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _CACHE_LOCK:
+        hit = _CACHE.get(path)
+        if hit and hit[0] == mtime:
+            return hit[1]
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            catalog = ActivityCatalog(json.load(f))
+    except Exception as e:
+        print(f"[catalog] Could not load catalog {path}: {e}")
+        return None
+    with _CACHE_LOCK:
+        _CACHE[path] = (mtime, catalog)
+    return catalog
+
+
+def _why_for(entry: dict, month: int) -> str:
+    tags = " / ".join(entry.get("tags", [])[:2]) or "local"
+    n = len(entry.get("sources", []))
+    article = "An" if tags[0] in "aeiou" else "A"
+    why = f"{article} {tags} pick in {entry['place']}, listed by {n} travel source{'s' if n != 1 else ''}"
+    if month and entry.get("setting") == "outdoor" and month in entry.get("best_months", ALL_MONTHS):
+        why += f"; {datetime(2000, month, 1).strftime('%B')} is usually good weather for it"
+    return why + "."
+
+
+def entry_to_candidate(entry: dict, month: Optional[int] = None, targets: Optional[List[str]] = None) -> dict:
+    """Catalog entry -> scheduler candidate (suggestion-shaped dict)."""
+    in_target = not targets or entry["place"] in targets
+    return {
+        "title": entry["name"],
+        "why": _why_for(entry, month or 0),
+        "time_of_day": entry.get("time_of_day", []),
+        "source_hints": entry.get("sources", [])[:2],
+        "price_level": entry.get("price_level", "medium"),
+        "confidence": 0.75 if len(entry.get("sources", [])) > 1 else 0.65,
+        "locality_confidence": 1.0 if in_target else 0.6,
+        "tags": entry.get("tags", []),
+        "setting": entry.get("setting"),
+        "best_months": entry.get("best_months"),
+        "place": entry.get("place"),
+        "kind": activity_kind(entry["name"]),
+    }
+
+
+def catalog_candidates(catalog: ActivityCatalog, destination: str, month: Optional[int] = None,
+                       preferences: Optional[List[str]] = None, budget: Optional[str] = None,
+                       suggest_locations: Optional[List[str]] = None, min_pool: int = 12) -> List[dict]:
+    """
+    Ranked scheduler candidates for a destination: in-destination first, then
+    preference-tag overlap, budget fit and how many sources mention it;
+    activities the traveler wants to avoid ("no hiking") are dropped, and
+    so are lower-ranked entries for an attraction already in the pool. The
+    pool is topped up with places within NEARBY_MINUTES' drive when the
+    destination has few entries; those rank by drive time before the rest,
+    and the scheduler keeps them behind the destination's own on day one.
+    """
+    targets = find_places(" , ".join([destination or ""] + list(suggest_locations or [])))
+    if not targets:
+        return []
+    pool = catalog.for_places(targets)
+    if not pool:
+        return []
+    drive = {}
+    if len(pool) < min_pool:
+        drive = {p: mins for p, mins in nearby_places(targets[0], NEARBY_MINUTES) if p not in targets}
+        names = {e["name"] for e in pool}
+        pool += [e for e in catalog.for_places(list(drive)) if e["name"] not in names]
+
+    preferences, avoided = split_preferences(preferences)
+    if avoided:
+        pool = [e for e in pool if not is_avoided(e["name"], e.get("tags"), avoided)]
+    pref_tags = set(_tags_for(" ".join(preferences or [])))
+    pref_tags |= {p.strip().lower() for p in (preferences or []) if p and p.strip().lower() in TAG_KEYWORDS}
+    budget = (budget or "").strip().lower()
+
+    def rank(entry):
+        return (
+            0 if entry["place"] in targets else 1,
+            # nearby places in 30-minute bands, so a much closer place wins before tag overlap
+            int(drive.get(entry["place"], 0) // 30),
+            -len(pref_tags & set(entry.get("tags", []))),
+            0 if (budget not in ("low", "medium", "high") or entry.get("price_level") == budget) else 1,
+            -len(entry.get("sources", [])),
+            entry["name"],
+        )
+
+    ranked: List[dict] = []
+    kept: Dict[Optional[str], List[frozenset]] = {}
+    for e in sorted(pool, key=rank):
+        key = attraction_key(e)
+        if any(_same_attraction(key, k) for k in kept.get(e["place"], [])):
+            continue
+        kept.setdefault(e["place"], []).append(key)
+        ranked.append(e)
+    return [entry_to_candidate(e, month, targets) for e in ranked]
+
+
+def assemble_day_plans(catalog: ActivityCatalog, destination: str, dates: List[datetime],
+                       preferences: Optional[List[str]] = None, budget: Optional[str] = None,
+                       suggest_locations: Optional[List[str]] = None,
+                       risk_for_date=None) -> Optional[List[dict]]:
+    """
+    Deterministically fill morning/noon/evening/night for every date from the
+    catalog (see activity_scheduler for the slot rules). Returns None when the
+    catalog knows nothing about the destination.
+    """
+    month = dates[0].month if dates else None
+    candidates = catalog_candidates(catalog, destination, month, preferences, budget, suggest_locations,
+                                    min_pool=4 * min(len(dates), 3))
+    if not candidates:
+        return None
+    primary = (find_places(destination) or [destination])[0]
+    return schedule_day_plans(dates, candidates, budget=budget, risk_for_date=risk_for_date, destination=primary)
+
+
+def suggest_from_catalog(destination: str, dates: List[datetime], preferences: Optional[List[str]] = None,
+                         budget: Optional[str] = None, suggest_locations: Optional[List[str]] = None,
+                         path: str = ACTIVITY_CATALOG_PATH) -> Optional[dict]:
+    """suggest_activities()-shaped result built from the catalog, or None if it cannot cover the trip."""
+    catalog = load_catalog(path)
+    if catalog is None or not len(catalog):
+        return None
+    day_plans = assemble_day_plans(catalog, destination, dates, preferences, budget, suggest_locations,
+                                   risk_for_date=lambda d: is_rain_risky(destination, d))
+    if not day_plans:
+        return None
+    sources = []
+    for d in day_plans:
+        for s in d["suggestions"]:
+            for src in s.get("source_hints", []):
+                if src not in sources:
+                    sources.append(src)
+    return {
+        "destination": destination,
+        "overall_theme": f"Activities near {destination}" if destination else "Suggested activities",
+        "day_plans": day_plans,
+        "notes": "Assembled from the offline activity catalog.",
+        "status": "complete",
+        "mode": "catalog",
+        "top_sources": sources[:3],
+    }
+
+
+def polish_day_plans(day_plans: List[dict], llm, destination: str = "") -> List[dict]:
+    """Optional: one LLM call to rewrite the `why` lines; titles/slots never change."""
+    items = [
+        {"i": i, "title": s.get("title", ""), "why": s.get("why", "")}
+        for i, s in enumerate(s for d in day_plans for s in d.get("suggestions", []))
+    ]
+    if not items or llm is None:
+        return day_plans
+    prompt = (
+        "Rewrite each 'why' as one friendly, specific sentence for a traveller visiting "
+        f"{destination or 'Sri Lanka'}. Keep facts conservative; do not invent prices or places.\n"
+        "Return ONLY a JSON array of strings, same order and length as the input.\n\n"
+        + json.dumps(items, ensure_ascii=False)
+    )
+    try:
+        from server.agents.activity_agent.activity_indexer import _invoke_llm
+        text = _invoke_llm(llm, prompt).strip()
+        if text.startswith("```"):
+            text = text.strip("`")
+            if text.lower().startswith("json"):
+                text = text[4:]
+        rewritten = json.loads(text)
+        if isinstance(rewritten, list) and len(rewritten) == len(items):
+            flat = [s for d in day_plans for s in d.get("suggestions", [])]
+            for s, why in zip(flat, rewritten):
+                if isinstance(why, str) and why.strip():
+                    s["why"] = why.strip()
+    except Exception as e:
+        print(f"[catalog] LLM polish skipped: {e}")
+    return day_plans
+
+
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Build or inspect the offline activity catalog.")
+    p.add_argument("--show", help="Print catalog entries for a place instead of building")
+    p.add_argument("--path", default=ACTIVITY_CATALOG_PATH)
+    args = p.parse_args()
+
+    if args.show:
+        cat = load_catalog(args.path)
+        if cat is None:
+            print("Catalog not built yet.")
+        else:
+            for e in cat.for_places(find_places(args.show)):
+                print(f"- {e['name']} [{e['setting']}, {'/'.join(e['time_of_day'])}, {e['price_level']}] {','.join(e['tags'])}")
+    else:
+        build_catalog(path=args.path)
@@ -13,8 +13,9 @@ import os
 import json
 import re
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
 from fastapi.encoders import jsonable_encoder
 
@@ -58,12 +59,22 @@ try:
         OPENAI_MODEL,
         ACTIVITY_FAISS_DIR,
         ACTIVITY_SOURCES_JSON,
+        ACTIVITY_WINDOW_DAYS,
+        ACTIVITY_WINDOW_WORKERS,
+        ACTIVITY_MODE,
+        ACTIVITY_CATALOG_POLISH,
+        LLM_MAX_RETRIES,
     )
 except Exception:
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
     ACTIVITY_FAISS_DIR = os.getenv("ACTIVITY_FAISS_DIR", "server/data/activity_faiss")
     ACTIVITY_SOURCES_JSON = os.getenv("ACTIVITY_SOURCES_JSON", "server/data/activity_sources.json")
+    ACTIVITY_WINDOW_DAYS = int(os.getenv("ACTIVITY_WINDOW_DAYS", "5"))
+    ACTIVITY_WINDOW_WORKERS = int(os.getenv("ACTIVITY_WINDOW_WORKERS", "4"))
+    ACTIVITY_MODE = os.getenv("ACTIVITY_MODE", "rag").lower()
+    ACTIVITY_CATALOG_POLISH = os.getenv("ACTIVITY_CATALOG_POLISH", "false").lower() in ("1", "true", "yes")
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "1"))
 
 # Where to read default sources from
 try:
@@ -71,6 +82,19 @@ try:
 except Exception:
     default_sources = []
 
+from server.agents.activity_agent.activity_scheduler import schedule_day_plans
+from server.utils.climate import is_rain_risky
+from server.utils.deadline import llm_timeout
+from server.agents.activity_agent.activity_scoring import (
+    DocTokenIndex,
+    _compute_confidence_for_title,
+    _estimate_price_level,
+    _is_outdoor_activity,
+    _suggest_alternatives_for_activity,
+    dedupe_day_plans,
+    other_towns_for,
+)
+
 INDEX_DIR = ACTIVITY_FAISS_DIR
 SOURCES_JSON = ACTIVITY_SOURCES_JSON
 
@@ -138,6 +162,13 @@ def build_or_refresh_index(sources: Optional[List[str]] = None) -> str:
     os.makedirs(INDEX_DIR, exist_ok=True)
     vs.save_local(INDEX_DIR)
     print(f"[indexer] Saved FAISS index to: {INDEX_DIR}")
+
+    # keep the offline activity catalog in step with the corpus
+    try:
+        from server.agents.activity_agent.activity_catalog import build_catalog
+        build_catalog(chunks)
+    except Exception as e:
+        print(f"[indexer] Activity catalog rebuild failed: {e}")
     return INDEX_DIR
 
 
@@ -231,10 +262,12 @@ def _retriever_for_location(vs: FAISS, locs: List[str], llm: ChatOpenAI, top_k:
 
 
 def _llm():
+    # the client timeout is capped by what is left of the request's latency budget
+    limits = {"timeout": llm_timeout(), "max_retries": LLM_MAX_RETRIES}
     try:
-        return ChatOpenAI(openai_api_key=OPENAI_API_KEY, model=OPENAI_MODEL, temperature=0.2)
+        return ChatOpenAI(openai_api_key=OPENAI_API_KEY, model=OPENAI_MODEL, temperature=0.2, **limits)
     except TypeError:
-        return ChatOpenAI(api_key=OPENAI_API_KEY, model=OPENAI_MODEL, temperature=0.2)
+        return ChatOpenAI(api_key=OPENAI_API_KEY, model=OPENAI_MODEL, temperature=0.2, **limits)
 
 
 BASE_SYSTEM = (
@@ -299,94 +332,133 @@ def _extract_top_sources(docs: List, k: int = 3) -> List[str]:
 
 
 
-def _compute_confidence_for_title(title: str, docs: List, k: int = 5) -> float:
-    if not title or not docs:
-        return 0.0
-    cleaned = re.sub(r"[^\w\s]", " ", title.lower())
-    tokens = [t for t in cleaned.split() if len(t) > 3]
-    if not tokens:
-        tokens = [title.lower()]
-
-    check_k = min(k, len(docs))
-    if check_k <= 0:
-        return 0.0
-
-    count = 0
-    for d in docs[:check_k]:
-        content = (d.page_content or "").lower()
-        if any(tok in content for tok in tokens) or title.lower() in content:
-            count += 1
-    return float(count) / float(check_k)
-
-
-def _estimate_price_level(title: str, why: str, docs: List, user_budget: Optional[str] = None) -> str:
-    text = f"{(title or '')} {(why or '')}".lower()
-    low_kw = ("free", "walk", "hike", "market", "street food", "beach", "temple", "public", "park", "local eatery")
-    high_kw = ("rooftop", "fine dining", "spa", "luxury", "private", "exclusive", "guided tour", "paid tour", "ticket", "entrance fee")
-    for kw in low_kw:
-        if kw in text:
-            return "low"
-    for kw in high_kw:
-        if kw in text:
-            return "high"
-    if isinstance(user_budget, str):
-        ub = user_budget.strip().lower()
-        if ub in ("low", "medium", "high"):
-            return ub
-    return "medium"
-
-
-def _is_outdoor_activity(title: str, why: str) -> bool:
-    text = f"{(title or '')} {(why or '')}".lower()
-    outdoor_kw = (
-        "hike", "trek", "beach", "waterfall", "viewpoint", "sunset",
-        "walk", "wild", "safari", "trekking", "cycling", "boat",
-        "rafting", "snorkel", "surf", "climb", "mountain", "hiking"
-    )
-    return any(kw in text for kw in outdoor_kw)
-
+def _invoke_llm(llm, prompt_text: str) -> str:
+    from langchain.schema import HumanMessage
 
-def _seasonal_risk_for_location(location: str, date: datetime) -> bool:
+    # Primary attempt: use generate with a nested list of HumanMessage objects
     try:
-        from server.agents.weather_agent import get_weather_forecast  # type: ignore
+        response = llm.generate([[HumanMessage(content=prompt_text)]])
+        gens = getattr(response, "generations", None)
+        if isinstance(gens, list) and gens:
+            first = gens[0]
+            if isinstance(first, list) and first and hasattr(first[0], "text"):
+                return first[0].text
+            return str(first[0]) if first else str(response)
+        return getattr(response, "llm_output", {}).get("content", "") or str(response)
+    except Exception as e:
         try:
-            forecast = get_weather_forecast(location, date)
-            if isinstance(forecast, dict):
-                prob = forecast.get("rain_probability") or forecast.get("precipitation_probability") or forecast.get("precip_prob")
-                if isinstance(prob, (int, float)):
-                    return float(prob) >= 0.4
-                summary = str(forecast.get("summary", "") or forecast.get("weather", "")).lower()
-                if any(r in summary for r in ("rain", "shower", "storm", "thunder", "wet")):
-                    return True
+            return llm.predict(prompt_text)
         except Exception:
-            pass
+            try:
+                res = llm([HumanMessage(content=prompt_text)])
+                if isinstance(res, str):
+                    return res
+                return getattr(res, "content", "") or getattr(res, "text", "") or str(res)
+            except Exception as e2:
+                print(f"[activity_agent] LLM calls failed: {e} | fallback: {e2}")
+                return ""
+
+
+def _parse_plan_json(text: str) -> Optional[dict]:
+    if not isinstance(text, str) or not text.strip():
+        return None
+    cleaned = text.strip()
+    if cleaned.startswith("```"):
+        cleaned = cleaned.strip("`")
+        if cleaned.lower().startswith("json"):
+            cleaned = cleaned[4:]
+    try:
+        parsed = json.loads(cleaned)
     except Exception:
-        pass
+        return None
+    return parsed if isinstance(parsed, dict) else None
 
-    month = date.month
-    wet_months_general = {4, 5, 10, 11}
-    if month in wet_months_general:
-        return True
 
-    loc_low = (location or "").lower()
-    if "trincomalee" in loc_low or "east" in loc_low:
-        if month in {12, 1, 2}:
-            return True
+def _date_windows(dates: List[datetime], window_days: int) -> List[List[datetime]]:
+    size = max(1, window_days)
+    return [dates[i:i + size] for i in range(0, len(dates), size)]
 
-    return False
 
+def _generate_window(llm, trip: dict, window: List[datetime], index: int, total: int,
+                     num_days: int, docs: List, top_sources: List[str]) -> dict:
+    # each window sees a rotated slice of the retrieved docs so windows do not
+    # all anchor on the same top snippets (fewer repeats to dedupe later)
+    offset = (index * 3) % len(docs) if docs else 0
+    context = _format_context(docs[offset:] + docs[:offset])
 
-def _suggest_alternatives_for_activity(title: str) -> List[str]:
-    text = (title or "").lower()
-    if "hike" in text or "trek" in text or "mountain" in text:
-        return ["Visit a tea factory / factory tour", "Explore a covered local market or museum"]
-    if "beach" in text or "snorkel" in text or "surf" in text:
-        return ["Visit an indoor aquarium or marine museum", "Relax at a local cafe or indoor cultural show"]
-    if "waterfall" in text or "river" in text or "boat" in text:
-        return ["Visit a nearby museum or botanical garden", "Take a cooking class or tea tasting session"]
-    if "sunset" in text or "viewpoint" in text:
-        return ["Explore a nearby indoor market or craft centre", "Visit the Royal Botanical Gardens or a tea factory tour"]
-    return ["Visit a museum or cultural center", "Take a local cooking class or tea tasting", "Explore covered local markets"]
+    window_trip = dict(trip)
+    window_trip["start_date"] = window[0].strftime("%Y-%m-%d")
+    window_trip["end_date"] = window[-1].strftime("%Y-%m-%d")
+    window_trip["trip_window"] = f"part {index + 1} of {total} of a {num_days}-day trip"
+    trip_json = json.dumps(window_trip, indent=2, ensure_ascii=False, default=str)
+
+    prompt_text = BASE_SYSTEM + "\n\n" + PROMPT_INSTRUCTIONS.format(trip=trip_json, context=context)
+    prompt_text += (
+        "\n\nOnly plan the dates between start_date and end_date above. "
+        "Other parts of the trip are planned separately, so favour variety over the most obvious picks."
+    )
+    if top_sources:
+        prompt_text += "\n\nTop sources used (for provenance):\n" + "\n".join(top_sources)
+
+    data = _parse_plan_json(_invoke_llm(llm, prompt_text)) or {}
+    wanted = {d.strftime("%Y-%m-%d") for d in window}
+    data["day_plans"] = [
+        d for d in data.get("day_plans", []) or []
+        if isinstance(d, dict) and (d.get("date") or "").strip() in wanted
+    ]
+    return data
+
+
+def iter_day_plan_windows(llm, trip: dict, dates: List[datetime], docs: List, top_sources: List[str],
+                          window_days: int = ACTIVITY_WINDOW_DAYS,
+                          max_workers: int = ACTIVITY_WINDOW_WORKERS) -> Iterator[Tuple[int, dict]]:
+    """
+    Plan a long trip as independent day windows on a bounded thread pool.
+
+    Yields (window_index, window_data) in completion order, so callers can show
+    each window's days as soon as it is ready. Suggestions repeated from an
+    earlier-completed window are swapped for alternatives before yielding.
+    """
+    windows = _date_windows(dates, window_days)
+    seen = set()
+    workers = max(1, min(max_workers, len(windows)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_generate_window, llm, trip, w, i, len(windows), len(dates), docs, top_sources): i
+            for i, w in enumerate(windows)
+        }
+        for fut in as_completed(futures):
+            idx = futures[fut]
+            try:
+                data = fut.result()
+            except Exception as e:
+                print(f"[activity_agent] Day window {idx + 1}/{len(windows)} failed: {e}")
+                data = {"day_plans": []}
+            replaced = dedupe_day_plans(data.get("day_plans", []), seen)
+            if replaced:
+                print(f"[activity_agent] Window {idx + 1}: replaced {replaced} repeated suggestion(s)")
+            yield idx, data
+
+
+def merge_windows(parts: Dict[int, dict], destination: str = "") -> Optional[dict]:
+    """Window index -> window data, merged into one plan in date order; None when no window has days."""
+    ordered = [parts[idx] for idx in sorted(parts)]
+    merged_days = [d for p in ordered for d in p.get("day_plans", []) or []]
+    if not merged_days:
+        return None
+    first = next((p for p in ordered if p.get("day_plans")), {})
+    notes = [p.get("notes") for p in ordered if p.get("notes")]
+    return {
+        "destination": first.get("destination") or destination,
+        "overall_theme": first.get("overall_theme") or (f"Activities near {destination}" if destination else "Suggested activities"),
+        "day_plans": merged_days,
+        "notes": " ".join(dict.fromkeys(notes)),
+    }
+
+
+def _seasonal_risk_for_location(location: str, date: datetime) -> bool:
+    # precomputed region x month table (+ optional cached live overlay)
+    return is_rain_risky(location, date)
 
 
 # single cache path (no duplicates)
@@ -488,15 +560,173 @@ def _llm_fetch_local_activities(location: str, prefs: str, num_days: int = 3, it
     return []
 
 
-def suggest_activities(inp: dict) -> dict:
-    print(f"\nDEBUG: suggest_activities called with inp={inp}")
+def _scheduler_candidates(docs: List, destination: str, month: Optional[int], preferences: List[str],
+                          budget: Optional[str], suggest_locations: Optional[List[str]]) -> List[dict]:
+    """Activities extracted from the retrieved docs, then catalog entries for the destination."""
+    from server.agents.activity_agent.activity_catalog import (
+        catalog_candidates,
+        entry_to_candidate,
+        extract_activities,
+        is_avoided,
+        load_catalog,
+        split_preferences,
+    )
 
+    cands = []
+    for d in docs[:20]:
+        meta = d.metadata or {}
+        src = meta.get("source") or meta.get("url") or ""
+        for entry in extract_activities(d.page_content or "", src):
+            cands.append(entry_to_candidate(entry, month))
+    catalog = load_catalog()
+    if catalog is not None:
+        cands.extend(catalog_candidates(catalog, destination, month, preferences, budget, suggest_locations))
+    _, avoided = split_preferences(preferences)
+    return [c for c in cands if not is_avoided(c.get("title"), c.get("tags"), avoided)] if avoided else cands
+
+
+def _fallback_templates(primary: str, top_sources: List[str], docs: List, user_budget: Optional[str]) -> List[dict]:
+    """Generic one-per-slot suggestions for when neither the LLM nor the sources produce a plan."""
+    return [
+        {
+            "time_of_day": "morning",
+            "title": f"Visit {primary}",
+            "why": f"{primary} offers a great morning experience and cooler temperatures.",
+            "source_hints": top_sources,
+            "confidence": 0.5,
+            "price_level": _estimate_price_level(f"Visit {primary}", "", docs, user_budget)
+        },
+        {
+            "time_of_day": "noon",
+            "title": f"Local lunch and short indoor stop near {primary}",
+            "why": "Rest and try local cuisine.",
+            "source_hints": top_sources,
+            "confidence": 0.4,
+            "price_level": _estimate_price_level("Local lunch", "Try local stalls or mid-range cafes", docs, user_budget)
+        },
+        {
+            "time_of_day": "evening",
+            "title": f"Sunset viewpoint or market walk at {primary}",
+            "why": "Golden hour and local vibes.",
+            "source_hints": top_sources,
+            "confidence": 0.4,
+            "price_level": _estimate_price_level("Sunset viewpoint or market walk", "Local atmosphere", docs, user_budget)
+        },
+        {
+            "time_of_day": "night",
+            "title": "Dinner / cultural show",
+            "why": "Relax and enjoy local cuisine or a brief cultural performance.",
+            "source_hints": top_sources,
+            "confidence": 0.4,
+            "price_level": _estimate_price_level("Dinner / cultural show", "Local cuisine/culture", docs, user_budget)
+        },
+    ]
+
+
+def fallback_activities(inp: dict) -> dict:
+    """
+    suggest_activities()-shaped plan built without any LLM or index call:
+    the offline catalog when it knows the destination, else the generic
+    slot templates. Used when the activity node runs out of time.
+    """
+    inp = inp if isinstance(inp, dict) else {}
+    destination = (inp.get("destination") or "").strip()
+    user_prefs = inp.get("user_preferences") or inp.get("preferences") or []
+    budget = inp.get("budget")
+    try:
+        start = datetime.strptime(inp["start_date"], "%Y-%m-%d") if inp.get("start_date") else datetime.today()
+        end = datetime.strptime(inp["end_date"], "%Y-%m-%d") if inp.get("end_date") else start
+    except Exception:
+        start = end = datetime.today()
+    dates = _date_range(start, end)
+
+    try:
+        from server.agents.activity_agent.activity_catalog import suggest_from_catalog
+        out = suggest_from_catalog(destination, dates, user_prefs, budget, inp.get("suggest_locations") or [])
+        if out:
+            out["status"] = "fallback"
+            return out
+    except Exception as e:
+        print(f"[activity_agent] Catalog fallback failed: {e}")
+
+    primary = destination or "the area"
+    return {
+        "destination": destination,
+        "overall_theme": f"Activities near {destination}" if destination else "Suggested activities",
+        "day_plans": schedule_day_plans(
+            dates,
+            _fallback_templates(primary, [], [], budget),
+            budget=budget,
+            risk_for_date=lambda d: _seasonal_risk_for_location(primary, d),
+            destination=primary,
+        ),
+        "notes": "Generic suggestions; detailed planning was not available in time.",
+        "status": "fallback",
+        "top_sources": [],
+    }
+
+
+def activity_query(destination: str, type_of_trip: Optional[str] = None, budget: Optional[str] = "any",
+                   season: Optional[str] = "any", prefs: str = "", suggest_locations: Optional[List[str]] = None) -> str:
+    blocks = [
+        f"Activities in/near {destination}" if destination else "Activities",
+        f"Best things to do in {destination} for {(type_of_trip or 'travelers')}",
+        f"Budget: {budget}; Season: {season}; Preferences: {prefs or 'any'}"
+    ]
+    if suggest_locations:
+        blocks.append("Also consider: " + ", ".join(suggest_locations))
+    return " | ".join(blocks)
+
+
+def retrieve_activity_docs(destination: str, suggest_locations: Optional[List[str]], num_days: int,
+                           query: str, llm=None) -> List:
+    """
+    Index documents for a destination (multi-query MMR retrieval, filtered to
+    the destination's tokens); builds the index on first use. The retrieval
+    step of suggest_activities(), also run speculatively by the prefetcher.
+    """
     if not os.path.isdir(INDEX_DIR):
         print("[activity_agent] Index not found; building now (this may take a few minutes)...")
         build_or_refresh_index()
 
     vs = _load_vectorstore()
-    llm = _llm()
+    llm = llm or _llm()
+
+    locs = _expand_locations(destination, suggest_locations)
+    desired_docs = max(12, num_days * 8)
+    desired_docs = min(desired_docs, 200)
+    retriever = _retriever_for_location(vs, locs, llm, top_k=desired_docs)
+
+    docs = []
+    try:
+        if callable(retriever):
+            docs = retriever(query) or []
+        else:
+            get_docs = getattr(retriever, "get_relevant_documents", None)
+            if callable(get_docs):
+                docs = get_docs(query) or []
+            else:
+                docs = getattr(retriever, "retrieve", lambda q: [])(query) or []
+    except Exception as e:
+        print(f"[activity_agent] Retriever failed: {e}")
+        docs = []
+    return docs
+
+
+def suggest_activities(inp: dict, mode: Optional[str] = None, prefetched_docs: Optional[List] = None) -> dict:
+    """
+    Long trips are planned in day windows (see iter_day_plan_windows, which
+    yields each window as soon as it is ready) and merged in date order.
+
+    `prefetched_docs`, if given, are used instead of running the retrieval
+    (see server/workflow/prefetch.py).
+
+    `mode` (default ACTIVITY_MODE): "rag" for retrieval + LLM synthesis, or
+    "catalog" to assemble plans from the offline activity catalog without any
+    LLM call (ACTIVITY_CATALOG_POLISH adds one call to polish the prose).
+    Catalog mode falls back to "rag" when the catalog does not know the place.
+    """
+    print(f"\nDEBUG: suggest_activities called with inp={inp}")
 
     def _get(key, default=None):
         try:
@@ -520,33 +750,27 @@ def suggest_activities(inp: dict) -> dict:
     dates = _date_range(start, end)
     num_days = max(1, len(dates))
 
-    locs = _expand_locations(destination, suggest_locations)
-    desired_docs = max(12, num_days * 8)
-    desired_docs = min(desired_docs, 200)
-    retriever = _retriever_for_location(vs, locs, llm, top_k=desired_docs)
-
-    blocks = [
-        f"Activities in/near {destination}" if destination else "Activities",
-        f"Best things to do in {destination} for {(_get('type_of_trip') or 'travelers')}",
-        f"Budget: {_get('budget','any')}; Season: {_get('season','any')}; Preferences: {prefs or 'any'}"
-    ]
-    if suggest_locations:
-        blocks.append("Also consider: " + ", ".join(suggest_locations))
-    query = " | ".join(blocks)
+    if (mode or ACTIVITY_MODE or "rag").lower() == "catalog":
+        try:
+            from server.agents.activity_agent.activity_catalog import polish_day_plans, suggest_from_catalog
+            out = suggest_from_catalog(destination, dates, user_prefs, _get("budget", None), suggest_locations)
+            if out:
+                if ACTIVITY_CATALOG_POLISH:
+                    polish_day_plans(out["day_plans"], _llm(), destination)
+                return out
+            print(f"[activity_agent] Catalog has no activities for '{destination}'; using retrieval.")
+        except Exception as e:
+            print(f"[activity_agent] Catalog mode failed, using retrieval: {e}")
 
-    docs = []
-    try:
-        if callable(retriever):
-            docs = retriever(query) or []
-        else:
-            get_docs = getattr(retriever, "get_relevant_documents", None)
-            if callable(get_docs):
-                docs = get_docs(query) or []
-            else:
-                docs = getattr(retriever, "retrieve", lambda q: [])(query) or []
-    except Exception as e:
-        print(f"[activity_agent] Retriever failed: {e}")
-        docs = []
+    llm = _llm()
+    locs = _expand_locations(destination, suggest_locations)
+    if prefetched_docs is not None:
+        print(f"[activity_agent] Using {len(prefetched_docs)} prefetched documents for '{destination}'.")
+        docs = list(prefetched_docs)
+    else:
+        query = activity_query(destination, _get("type_of_trip"), _get("budget", "any"), _get("season", "any"),
+                               prefs, suggest_locations)
+        docs = retrieve_activity_docs(destination, suggest_locations, num_days, query, llm=llm)
 
     # # LLM fallback when index has insufficient local hits
     # try:
@@ -622,102 +846,55 @@ def suggest_activities(inp: dict) -> dict:
 
     context = _format_context(docs)
     top_sources = _extract_top_sources(docs, k=3)
+    # lowercase/tokenize the top docs once; per-suggestion scoring then becomes set lookups
+    doc_index = DocTokenIndex(docs, k=5)
 
-    try:
-        trip_json = json.dumps(jsonable_encoder(inp), indent=2, ensure_ascii=False)
-    except Exception:
-        trip_json = json.dumps(inp if isinstance(inp, dict) else str(inp), indent=2, ensure_ascii=False)
+    location_hint = destination or (locs[0] if locs else "")
 
-    prompt_text = BASE_SYSTEM + "\n\n" + PROMPT_INSTRUCTIONS.format(trip=trip_json, context=context)
-    if top_sources:
-        prompt_text += "\n\nTop sources used (for provenance):\n" + "\n".join(top_sources)
-
-    print(f"[activity_agent] Calling LLM with prompt (truncated)...")
-    from langchain.schema import HumanMessage
-
-    text = ""
+    def risk_for_date(d: datetime) -> bool:
+        return _seasonal_risk_for_location(location_hint, d)
 
-    # Primary attempt: use generate with a nested list of HumanMessage objects
-    try:
-        response = llm.generate([[HumanMessage(content=prompt_text)]])
-        gens = getattr(response, "generations", None)
-        if isinstance(gens, list) and gens:
-            first = gens[0]
-            if isinstance(first, list) and first and hasattr(first[0], "text"):
-                text = first[0].text
-            else:
-                text = str(first[0]) if first else str(response)
-        else:
-            text = getattr(response, "llm_output", {}).get("content", "") or str(response)
-    except Exception as e:
+    def _safe_candidates() -> List[dict]:
         try:
-            text = llm.predict(prompt_text)
-        except Exception:
-            try:
-                res = llm([HumanMessage(content=prompt_text)])
-                if isinstance(res, str):
-                    text = res
-                else:
-                    text = getattr(res, "content", "") or getattr(res, "text", "") or str(res)
-            except Exception as e2:
-                text = ""
-                print(f"[activity_agent] LLM calls failed: {e} | fallback: {e2}")
+            return _scheduler_candidates(docs, destination, start.month, user_prefs, _get("budget", None), suggest_locations)
+        except Exception as e:
+            print(f"[activity_agent] Could not build scheduler candidates: {e}")
+            return []
 
-    if not isinstance(text, str) or not text.strip():
-        logger.error("[activity_agent] LLM returned empty response; using fallback suggestions. Prompt (truncated): %s", prompt_text[:600])
-        day_plans = []
-        for d in dates:
-            user_budget = _get("budget", None)
-            fd = d.strftime("%Y-%m-%d")
-            suggestions = []
-            primary = destination or (locs[0] if locs else "the area")
+    try:
+        trip = jsonable_encoder(inp)
+        trip_json = json.dumps(trip, indent=2, ensure_ascii=False)
+    except Exception:
+        trip = inp if isinstance(inp, dict) else {"trip": str(inp)}
+        trip_json = json.dumps(trip, indent=2, ensure_ascii=False, default=str)
 
-            suggestions.append({
-                "time_of_day": "morning",
-                "title": f"Visit {primary}",
-                "why": f"{primary} offers a great morning experience and cooler temperatures.",
-                "source_hints": top_sources,
-                "confidence": 0.5,
-                "price_level": _estimate_price_level(f"Visit {primary}", "", docs, user_budget)
-            })
-            suggestions.append({
-                "time_of_day": "noon",
-                "title": f"Local lunch and short indoor stop near {primary}",
-                "why": "Rest and try local cuisine.",
-                "source_hints": top_sources,
-                "confidence": 0.4,
-                "price_level": _estimate_price_level("Local lunch", "Try local stalls or mid-range cafes", docs, user_budget)
-            })
-            suggestions.append({
-                "time_of_day": "evening",
-                "title": f"Sunset viewpoint or market walk at {primary}",
-                "why": "Golden hour and local vibes.",
-                "source_hints": top_sources,
-                "confidence": 0.4,
-                "price_level": _estimate_price_level("Sunset viewpoint or market walk", "Local atmosphere", docs, user_budget)
-            })
-            suggestions.append({
-                "time_of_day": "night",
-                "title": "Dinner / cultural show",
-                "why": "Relax and enjoy local cuisine or a brief cultural performance.",
-                "source_hints": top_sources,
-                "confidence": 0.4,
-                "price_level": _estimate_price_level("Dinner / cultural show", "Local cuisine/culture", docs, user_budget)
-            })
+    text = ""
+    windowed = None
+    if len(dates) > ACTIVITY_WINDOW_DAYS:
+        # Long trips: one prompt per day window instead of one huge JSON
+        # answer that times out / truncates.
+        print(f"[activity_agent] Planning {len(dates)} days in windows of {ACTIVITY_WINDOW_DAYS}...")
+        windowed = merge_windows(dict(iter_day_plan_windows(llm, trip, dates, docs, top_sources)), destination)
+    else:
+        prompt_text = BASE_SYSTEM + "\n\n" + PROMPT_INSTRUCTIONS.format(trip=trip_json, context=context)
+        if top_sources:
+            prompt_text += "\n\nTop sources used (for provenance):\n" + "\n".join(top_sources)
 
-            try:
-                location_hint = destination or (locs[0] if locs else "")
-                date_obj = datetime.strptime(fd, "%Y-%m-%d")
-                risk = _seasonal_risk_for_location(location_hint, date_obj)
-                if risk:
-                    for s in suggestions:
-                        if _is_outdoor_activity(s.get("title", ""), s.get("why", "")):
-                            s["weather_risk"] = True
-                            s["alternatives"] = _suggest_alternatives_for_activity(s.get("title", ""))
-            except Exception:
-                pass
+        print(f"[activity_agent] Calling LLM with prompt (truncated)...")
+        text = _invoke_llm(llm, prompt_text)
 
-            day_plans.append({"date": fd, "suggestions": suggestions})
+    if windowed is None and (not isinstance(text, str) or not text.strip()):
+        logger.error("[activity_agent] LLM returned empty response; using fallback suggestions. Trip (truncated): %s", trip_json[:600])
+        user_budget = _get("budget", None)
+        primary = destination or (locs[0] if locs else "the area")
+        templates = _fallback_templates(primary, top_sources, docs, user_budget)
+        day_plans = schedule_day_plans(
+            dates,
+            _safe_candidates() + templates,
+            budget=user_budget,
+            risk_for_date=risk_for_date,
+            destination=primary,
+        )
 
         return {
             "destination": destination,
@@ -729,25 +906,21 @@ def suggest_activities(inp: dict) -> dict:
         }
 
     try:
-        data = json.loads(text)
+        data = windowed if windowed is not None else json.loads(text)
         data["status"] = "complete"
         if "top_sources" not in data:
             data["top_sources"] = top_sources
 
         # --- POST-LM VERIFICATION PASS: quick fact-check / anchoring ---
         # quick verify each suggestion is anchored to the destination tokens
+        heuristic_k = min(5, max(1, len(docs)))
+        other_towns = other_towns_for(destination)
         for day in data.get("day_plans", []):
             for s in day.get("suggestions", []):
                 title = (s.get("title", "") or "").lower()
-                # small blacklist of other known towns to detect cross-town leakage
-                other_towns = ["ella", "kandy", "nuwara eliya", "hikkaduwa", "mirissa", "trincomalee"]
-                if destination:
-                    dest_low = destination.lower()
-                else:
-                    dest_low = ""
                 # flag suggestions that mention a different known-town token
                 for town in other_towns:
-                    if town in title and town not in dest_low:
+                    if town in title:
                         s.setdefault("warnings", []).append("suggestion_mentions_other_town")
                         s["confidence"] = min(s.get("confidence", 1.0), 0.5)
                         s["source_hints"] = s.get("source_hints", []) + ["potentially_nonlocal"]
@@ -755,12 +928,11 @@ def suggest_activities(inp: dict) -> dict:
                 # ensure locality_confidence exists, default low if absent
                 if "locality_confidence" not in s:
                     try:
-                        s["locality_confidence"] = float(_compute_confidence_for_title(s.get("title", ""), docs, k=min(5, max(1, len(docs)))))
+                        s["locality_confidence"] = float(_compute_confidence_for_title(s.get("title", ""), docs, k=heuristic_k, index=doc_index))
                     except Exception:
                         s["locality_confidence"] = 0.0
 
         try:
-            heuristic_k = min(5, max(1, len(docs)))
             user_budget = _get("budget", None)
             for day in data.get("day_plans", []):
                 suggestions = day.get("suggestions", [])
@@ -777,7 +949,7 @@ def suggest_activities(inp: dict) -> dict:
 
                 for s in suggestions:
                     title = s.get("title", "") or ""
-                    heuristic = _compute_confidence_for_title(title, docs, k=heuristic_k)
+                    heuristic = _compute_confidence_for_title(title, docs, k=heuristic_k, index=doc_index)
                     confidence = max(heuristic, 0.8)
                     confidence = max(0.0, min(1.0, float(confidence)))
                     s["confidence"] = confidence
@@ -787,7 +959,8 @@ def suggest_activities(inp: dict) -> dict:
                         why = s.get("why", "")
                         s["price_level"] = _estimate_price_level(title, why, docs, user_budget)
 
-                    loc_match = _compute_confidence_for_title(title, docs, k=heuristic_k)
+                    # same title/docs/k as the confidence heuristic above
+                    loc_match = heuristic
                     if loc_match < 0.2:
                         s["confidence"] = min(s["confidence"], 0.6)
                         s["locality_confidence"] = float(loc_match)
@@ -807,52 +980,16 @@ def suggest_activities(inp: dict) -> dict:
         print(f"\nDEBUG: (try block) ACTIVITY AGENT LLM RAW RESPONSE parsed successfully.")
 
         try:
-            existing_days = { (d.get("date") or "").strip(): d for d in data.get("day_plans", []) if isinstance(d, dict) }
-            final_days = []
-            for d in dates:
-                fd = d.strftime("%Y-%m-%d")
-                day_obj = existing_days.get(fd)
-                if not day_obj:
-                    sample = next(iter(existing_days.values()), None)
-                    if sample and sample.get("suggestions"):
-                        suggestions = []
-                        for s in sample["suggestions"][:4]:
-                            cloned = dict(s)
-                            cloned["confidence"] = min(0.9, cloned.get("confidence", 0.6) * 0.9)
-                            cloned["why"] = (cloned.get("why","") + f" (planned for {fd})").strip()
-                            suggestions.append(cloned)
-                    else:
-                        suggestions = [
-                            {"time_of_day":"morning", "title": f"Explore around {destination or 'the area'}", "why":"Good morning activity.", "source_hints": top_sources, "confidence":0.5, "price_level": _estimate_price_level("", "", docs)},
-                            {"time_of_day":"noon", "title": "Local lunch and short indoor stop", "why":"Rest and try local cuisine.", "source_hints": top_sources, "confidence":0.45, "price_level": _estimate_price_level("Local lunch","",docs)},
-                            {"time_of_day":"evening", "title": "Sunset viewpoint or market walk", "why":"Golden hour.", "source_hints": top_sources, "confidence":0.45, "price_level": _estimate_price_level("Sunset viewpoint","",docs)},
-                            {"time_of_day":"night", "title": "Dinner / cultural show", "why":"Relax and enjoy local cuisine.", "source_hints": top_sources, "confidence":0.45, "price_level": _estimate_price_level("Dinner","",docs)}
-                        ]
-                    day_obj = {"date": fd, "suggestions": suggestions}
-                else:
-                    present_tods = { s.get("time_of_day") for s in day_obj.get("suggestions", []) if isinstance(s, dict) and s.get("time_of_day") }
-                    forced_slots = []
-                    for tod in ("morning","noon","evening","night"):
-                        if tod not in present_tods:
-                            forced_slots.append({
-                                "time_of_day": tod,
-                                "title": f"{'Visit' if tod=='morning' else 'Enjoy'} local { 'sights' if tod=='morning' else 'food' } at {destination or 'the area'}",
-                                "why": "Filled placeholder to ensure itinerary completeness.",
-                                "source_hints": top_sources,
-                                "confidence": 0.35,
-                                "price_level": _estimate_price_level("", "", docs)
-                            })
-                    if forced_slots:
-                        day_obj.setdefault("suggestions", []).extend(forced_slots)
-
-                    def tod_key(s):
-                        order = {"morning":0,"noon":1,"evening":2,"night":3}
-                        return order.get(s.get("time_of_day"), 99)
-                    day_obj["suggestions"] = sorted(day_obj.get("suggestions", []), key=tod_key)
-
-                final_days.append(day_obj)
-
-            data["day_plans"] = final_days
+            # fill missing dates/slots and drop repeats deterministically instead
+            # of cloning day one or inserting placeholders
+            data["day_plans"] = schedule_day_plans(
+                dates,
+                _safe_candidates(),
+                budget=_get("budget", None),
+                risk_for_date=risk_for_date,
+                seed_plans=data.get("day_plans", []),
+                destination=destination or (locs[0] if locs else ""),
+            )
         except Exception as completeness_exc:
             print(f"[activity_agent] Day completeness enforcement failed: {completeness_exc}")
 
@@ -865,57 +1002,48 @@ def suggest_activities(inp: dict) -> dict:
         print(f"[activity_agent] Raw LLM text (truncated): {text[:600]}")
 
         user_budget = _get("budget", None)
-        day_plans = []
-        for d in dates:
-            fd = d.strftime("%Y-%m-%d")
-            day_plans.append({
-                "date": fd,
-                "suggestions": [
-                    {
-                        "time_of_day": "morning",
-                        "title": f"Explore around {destination or 'the area'}",
-                        "why": "Nice light and cooler temps.",
-                        "source_hints": [],
-                        "confidence": 0.3,
-                        "price_level": _estimate_price_level(f"Explore around {destination or 'the area'}", "Nice light and cooler temps.", docs, user_budget)
-                    },
-                    {
-                        "time_of_day": "noon",
-                        "title": "Local lunch & shorter indoor stop",
-                        "why": "Avoid the heat.",
-                        "source_hints": [],
-                        "confidence": 0.3,
-                        "price_level": _estimate_price_level("Local lunch & shorter indoor stop", "Avoid the heat.", docs, user_budget)
-                    },
-                    {
-                        "time_of_day": "evening",
-                        "title": "Sunset viewpoint or market walk",
-                        "why": "Golden hour and local vibes.",
-                        "source_hints": [],
-                        "confidence": 0.3,
-                        "price_level": _estimate_price_level("Sunset viewpoint or market walk", "Golden hour and local vibes.", docs, user_budget)
-                    },
-                    {
-                        "time_of_day": "night",
-                        "title": "Dinner / cultural show",
-                        "why": "Relax and enjoy local cuisine/culture.",
-                        "source_hints": [],
-                        "confidence": 0.3,
-                        "price_level": _estimate_price_level("Dinner / cultural show", "Relax and enjoy local cuisine/culture.", docs, user_budget)
-                    },
-                ]
-            })
-            try:
-                location_hint = destination or (locs[0] if locs else "")
-                date_obj = datetime.strptime(fd, "%Y-%m-%d")
-                risk = _seasonal_risk_for_location(location_hint, date_obj)
-                if risk:
-                    for s in day_plans[-1]["suggestions"]:
-                        if _is_outdoor_activity(s.get("title", ""), s.get("why", "")):
-                            s["weather_risk"] = True
-                            s["alternatives"] = _suggest_alternatives_for_activity(s.get("title", ""))
-            except Exception:
-                pass
+        area = destination or 'the area'
+        templates = [
+            {
+                "time_of_day": "morning",
+                "title": f"Explore around {area}",
+                "why": "Nice light and cooler temps.",
+                "source_hints": [],
+                "confidence": 0.3,
+                "price_level": _estimate_price_level(f"Explore around {area}", "Nice light and cooler temps.", docs, user_budget)
+            },
+            {
+                "time_of_day": "noon",
+                "title": "Local lunch & shorter indoor stop",
+                "why": "Avoid the heat.",
+                "source_hints": [],
+                "confidence": 0.3,
+                "price_level": _estimate_price_level("Local lunch & shorter indoor stop", "Avoid the heat.", docs, user_budget)
+            },
+            {
+                "time_of_day": "evening",
+                "title": "Sunset viewpoint or market walk",
+                "why": "Golden hour and local vibes.",
+                "source_hints": [],
+                "confidence": 0.3,
+                "price_level": _estimate_price_level("Sunset viewpoint or market walk", "Golden hour and local vibes.", docs, user_budget)
+            },
+            {
+                "time_of_day": "night",
+                "title": "Dinner / cultural show",
+                "why": "Relax and enjoy local cuisine/culture.",
+                "source_hints": [],
+                "confidence": 0.3,
+                "price_level": _estimate_price_level("Dinner / cultural show", "Relax and enjoy local cuisine/culture.", docs, user_budget)
+            },
+        ]
+        day_plans = schedule_day_plans(
+            dates,
+            _safe_candidates() + templates,
+            budget=user_budget,
+            risk_for_date=risk_for_date,
+            destination=area,
+        )
 
         return {
             "destination": destination,
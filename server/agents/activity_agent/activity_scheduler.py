@@ -0,0 +1,294 @@
+# server/agents/activity_agent/activity_scheduler.py
+"""
+Deterministic time-slot scheduler for activity day plans.
+
+schedule_day_plans() takes candidate activities (LLM suggestions, retrieval
+extractions or catalog entries, in priority order) and assigns them to the
+morning/noon/evening/night slots of every trip date:
+
+- every date gets its slots in slot order; a slot is only left empty when
+  even the free-time fillers would repeat on that day;
+- no activity is used twice (meals are exempt), and a day holds at most one
+  of each activity kind (candidate "kind", e.g. two safaris never share a day);
+- on risky-weather days outdoor picks are swapped for indoor candidates, or
+  for an alternative from _suggest_alternatives_for_activity();
+- picks above the user's budget are only used when nothing else fits, not
+  even a meal, an indoor alternative or a free-time filler (on the first
+  date the destination's own picks still come before nearby places);
+- when candidates span several places (catalog "place"), the places are put
+  in driving order and split into per-day clusters (routing.plan_route), and
+  each date prefers candidates from its own cluster; the first date starts
+  with the destination's own candidates before nearby places.
+
+Seed plans (e.g. the LLM's own day_plans) are kept where they are valid and
+only the gaps are filled. Pure Python; the only data read is the place
+coordinate seed file (once, via server.utils.geo).
+"""
+
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from server.agents.activity_agent.activity_scoring import (
+    MEAL_KEYWORDS,
+    _is_outdoor_activity,
+    _suggest_alternatives_for_activity,
+    title_key,
+)
+from server.utils.routing import plan_route
+
+SLOTS = ("morning", "noon", "evening", "night")
+# where a candidate may go when its preferred slot is taken, in order
+# (nothing moves into "night": a dinner beats a temple visit at 9pm)
+_NEIGHBOURS = {
+    "morning": ("noon",),
+    "noon": ("morning", "evening"),
+    "evening": ("night", "noon"),
+    "night": (),
+}
+PRICE_RANK = {"low": 0, "medium": 1, "high": 2}
+
+_MEAL_FILLERS = {
+    "noon": ("Lunch at a local eatery near {place}", "Rice and curry or short eats; a good midday break."),
+    "night": ("Dinner at a local restaurant near {place}", "Wind down with Sri Lankan dishes."),
+}
+# last resort for an empty slot, worded per slot; a slot stays empty rather than repeat one on the same day
+_FREE_TIME = {
+    "morning": ("Slow morning around {place}", "Unplanned slot; a late breakfast or a walk nearby."),
+    "evening": ("Free evening to explore {place}", "Unplanned slot; rest or revisit a favourite."),
+}
+
+
+class _Candidate:
+    __slots__ = ("payload", "title", "key", "slots", "outdoor", "price", "meal", "best_months", "place", "kind")
+
+    def __init__(self, payload: dict):
+        self.payload = payload
+        self.title = payload.get("title", "") or ""
+        self.key = title_key(self.title)
+        tod = payload.get("time_of_day") or ()
+        self.slots = (tod,) if isinstance(tod, str) else tuple(tod)
+        setting = payload.get("setting")
+        self.outdoor = setting == "outdoor" if setting else _is_outdoor_activity(self.title, payload.get("why", ""))
+        self.price = PRICE_RANK.get(payload.get("price_level"), 1)
+        self.meal = any(m in self.key for m in MEAL_KEYWORDS)
+        self.best_months = payload.get("best_months")
+        self.place = payload.get("place")
+        self.kind = payload.get("kind")
+
+    def risky_on(self, date: datetime, day_risk: bool) -> bool:
+        if not self.outdoor:
+            return False
+        if day_risk:
+            return True
+        return bool(self.best_months) and date.month not in self.best_months
+
+
+def _suggestion(c: _Candidate, slot: str, **extra) -> dict:
+    s = {k: v for k, v in c.payload.items() if k not in ("setting", "best_months", "place", "region", "sources", "name", "kind")}
+    s["time_of_day"] = slot
+    s.update(extra)
+    return s
+
+
+def day_clusters(dates: List[datetime], pool: List[_Candidate], destination: str = "") -> Dict[str, set]:
+    """
+    Date -> set of places that day should draw from, or {} when the pool
+    covers a single place. Places are weighted by how many candidates they
+    have, so the base town can fill several days before moving on.
+    """
+    counts: Dict[str, int] = {}
+    for c in pool:
+        if c.place:
+            counts[c.place] = counts.get(c.place, 0) + 1
+    if len(counts) < 2 or len(dates) < 2:
+        return {}
+    places = list(counts)
+    try:
+        route = plan_route(places, start=destination or None, n_days=len(dates),
+                           weights=[counts[p] for p in places])
+    except Exception as e:
+        print(f"[Scheduler] Could not cluster places by route: {e}")
+        return {}
+    return {d.strftime("%Y-%m-%d"): {places[i] for i in day} for d, day in zip(dates, route["days"])}
+
+
+def schedule_day_plans(
+    dates: List[datetime],
+    candidates: Iterable[dict],
+    budget: Optional[str] = None,
+    risk_for_date: Optional[Callable[[datetime], bool]] = None,
+    seed_plans: Optional[List[dict]] = None,
+    destination: str = "",
+) -> List[dict]:
+    """
+    Return one {"date", "suggestions"} entry per date, its slots filled in
+    slot order (see the module docstring for when one stays empty).
+
+    `candidates` are suggestion-shaped dicts (title, why, time_of_day as a slot
+    or list of slots, price_level, optional setting/best_months); earlier ones
+    win. `seed_plans` entries are kept per date/slot unless they repeat an
+    activity, and their leftovers join the candidate pool.
+    """
+    budget_rank = PRICE_RANK.get((budget or "").strip().lower())
+    place = destination or "the area"
+    risk_cache: Dict[str, bool] = {}
+
+    def day_risk(d: datetime) -> bool:
+        fd = d.strftime("%Y-%m-%d")
+        if fd not in risk_cache:
+            try:
+                risk_cache[fd] = bool(risk_for_date(d)) if risk_for_date else False
+            except Exception:
+                risk_cache[fd] = False
+        return risk_cache[fd]
+
+    used = set()
+    plan: Dict[str, Dict[str, dict]] = {d.strftime("%Y-%m-%d"): {} for d in dates}
+    day_kinds: Dict[str, set] = {fd: set() for fd in plan}
+    pool: List[_Candidate] = []
+
+    # 1) keep valid seed suggestions in place; everything else becomes a candidate
+    seeds_by_date = {(d.get("date") or "").strip(): d for d in (seed_plans or []) if isinstance(d, dict)}
+    for fd, slots in plan.items():
+        for s in (seeds_by_date.get(fd) or {}).get("suggestions", []) or []:
+            if not isinstance(s, dict):
+                continue
+            c = _Candidate(s)
+            slot = s.get("time_of_day")
+            if slot in SLOTS and slot not in slots and c.key and (c.meal or c.key not in used):
+                slots[slot] = s
+                used.add(c.key)
+                if c.kind:
+                    day_kinds[fd].add(c.kind)
+            else:
+                pool.append(c)
+    for fd, day in seeds_by_date.items():
+        if fd not in plan:
+            pool.extend(_Candidate(s) for s in day.get("suggestions", []) or [] if isinstance(s, dict))
+    pool.extend(_Candidate(c) for c in candidates or [] if isinstance(c, dict))
+
+    # 2) bucket by preferred slot; candidates with no slot preference fit anywhere
+    buckets: Dict[str, List[_Candidate]] = {slot: [] for slot in SLOTS}
+    anywhere: List[_Candidate] = []
+    seen_keys = set()
+    for c in pool:
+        if not c.key or (c.key in seen_keys and not c.meal):
+            continue
+        seen_keys.add(c.key)
+        targets = [t for t in c.slots if t in buckets]
+        if targets:
+            for t in targets:
+                buckets[t].append(c)
+        else:
+            anywhere.append(c)
+
+    clusters = day_clusters(dates, pool, destination)
+
+    def ordered(slot: str):
+        yield from buckets[slot]
+        for n in _NEIGHBOURS[slot]:
+            yield from buckets[n]
+        yield from anywhere
+
+    def options(slot: str, near: Optional[set], first: bool):
+        """(candidate, at_base) pairs in preference order."""
+        if first and destination:
+            # day one opens at the base: nearby top-ups only once its own candidates are used
+            yield from ((c, True) for c in ordered(slot) if not c.place or c.place == destination)
+        if not near:
+            yield from ((c, False) for c in ordered(slot))
+            return
+        # this day's cluster first (unplaced candidates belong everywhere), then the rest
+        yield from ((c, False) for c in ordered(slot) if not c.place or c.place in near)
+        yield from ((c, False) for c in ordered(slot) if c.place and c.place not in near)
+
+    def take(slot: str, d: datetime, today: set, kinds: set) -> Tuple[Optional[dict], Optional[_Candidate]]:
+        """(suggestion, None), or (None, the best over-budget candidate) to use only if no filler fits."""
+        risk = day_risk(d)
+        fallback_budget = fallback_weather = base_over = None
+        for c, at_base in options(slot, clusters.get(d.strftime("%Y-%m-%d")), d == dates[0]):
+            if not at_base and base_over is not None:
+                # on day one the base outranks the budget: its pick beats any place further out
+                return pick(base_over, slot, kinds), None
+            if (c.key in used and not c.meal) or c.key in today or (c.kind and c.kind in kinds):
+                continue
+            over_budget = budget_rank is not None and c.price > budget_rank
+            risky = c.risky_on(d, risk)
+            if not over_budget and not risky:
+                return pick(c, slot, kinds), None
+            if over_budget:
+                if not risky and at_base and base_over is None:
+                    base_over = c
+                if not risky and fallback_budget is None:
+                    fallback_budget = c
+            elif fallback_weather is None:
+                fallback_weather = c
+        if fallback_weather is not None and slot != "night":
+            alt = fresh_alternative(fallback_weather.title)
+            if alt:
+                used.add(fallback_weather.key)
+                return _suggestion(
+                    fallback_weather, slot,
+                    title=alt,
+                    why=f"Indoor swap for '{fallback_weather.title}' because of likely rain.",
+                    weather_risk=True,
+                    alternatives=[fallback_weather.title],
+                    confidence=min(fallback_weather.payload.get("confidence", 0.5), 0.5),
+                ), None
+            return pick(fallback_weather, slot, kinds, weather_risk=True,
+                        alternatives=_suggest_alternatives_for_activity(fallback_weather.title)), None
+        # at night a rained-out outdoor pick becomes dinner (see filler)
+        return None, fallback_budget
+
+    def pick(c: _Candidate, slot: str, kinds: set, **extra) -> dict:
+        used.add(c.key)
+        if c.kind:
+            kinds.add(c.kind)
+        return _suggestion(c, slot, **extra)
+
+    def fresh_alternative(title: str) -> Optional[str]:
+        for alt in _suggest_alternatives_for_activity(title):
+            k = title_key(alt)
+            if k not in used:
+                used.add(k)
+                return alt
+        return None
+
+    def filler(slot: str, today: set) -> Optional[dict]:
+        if slot in _MEAL_FILLERS:
+            title, why = _MEAL_FILLERS[slot]
+            return {"time_of_day": slot, "title": title.format(place=place), "why": why,
+                    "source_hints": [], "price_level": budget if budget_rank is not None else "low",
+                    "confidence": 0.5}
+        alt = fresh_alternative("")
+        if alt:
+            return {"time_of_day": slot, "title": f"{alt} in {place}", "why": "Flexible indoor option.",
+                    "source_hints": [], "price_level": "low", "confidence": 0.4}
+        for title, why in [_FREE_TIME.get(slot)] + [v for k, v in _FREE_TIME.items() if k != slot]:
+            if title and title_key(title.format(place=place)) not in today:
+                return {"time_of_day": slot, "title": title.format(place=place), "why": why,
+                        "source_hints": [], "price_level": "low", "confidence": 0.3}
+        return None
+
+    # 3) fill the gaps date by date, slot by slot
+    day_plans = []
+    for d in dates:
+        fd = d.strftime("%Y-%m-%d")
+        slots = plan[fd]
+        today = {title_key(s.get("title", "")) for s in slots.values()}
+        kinds = day_kinds[fd]
+        for slot in SLOTS:
+            if slot in slots:
+                continue
+            s, over_budget = take(slot, d, today, kinds)
+            s = s or filler(slot, today) or (pick(over_budget, slot, kinds) if over_budget else None)
+            if s is None:
+                continue
+            slots[slot] = s
+            today.add(title_key(s.get("title", "")))
+        day_plans.append({
+            "date": fd,
+            **{k: v for k, v in (seeds_by_date.get(fd) or {}).items() if k not in ("date", "suggestions")},
+            "suggestions": [slots[slot] for slot in SLOTS if slot in slots],
+        })
+    return day_plans
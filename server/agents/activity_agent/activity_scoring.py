@@ -0,0 +1,202 @@
+# server/agents/activity_agent/activity_scoring.py
+"""
+Scoring helpers used by suggest_activities() post-processing.
+
+The helpers are kept free of LangChain imports so they can be reused by the
+scheduler/benchmarks. DocTokenIndex precomputes, once per request, the
+lowercased text of the top retrieved documents and an inverted index of the
+title tokens looked up against them, so that per-suggestion confidence and
+locality scoring become set lookups instead of repeated full-text scans.
+"""
+
+import re
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from server.utils.geo import distance_km
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+
+LOW_PRICE_KEYWORDS = ("free", "walk", "hike", "market", "street food", "beach", "temple", "public", "park", "local eatery")
+HIGH_PRICE_KEYWORDS = ("rooftop", "fine dining", "spa", "luxury", "private", "exclusive", "guided tour", "paid tour", "ticket", "entrance fee")
+OUTDOOR_KEYWORDS = (
+    "hike", "trek", "beach", "waterfall", "viewpoint", "sunset",
+    "walk", "wild", "safari", "trekking", "cycling", "boat",
+    "rafting", "snorkel", "surf", "climb", "mountain", "hiking"
+)
+# small blacklist of other known towns to detect cross-town leakage
+OTHER_TOWNS = ("ella", "kandy", "nuwara eliya", "hikkaduwa", "mirissa", "trincomalee")
+# towns this close to the destination are day-trip material, not leakage
+LOCAL_RADIUS_KM = 25.0
+# meals legitimately recur every day, so they are exempt from cross-day dedupe
+MEAL_KEYWORDS = ("breakfast", "lunch", "dinner", "meal")
+
+
+def _keyword_regex(keywords) -> "re.Pattern":
+    # substring semantics, identical to `any(kw in text for kw in keywords)`
+    return re.compile("|".join(re.escape(kw) for kw in keywords))
+
+
+_LOW_PRICE_RE = _keyword_regex(LOW_PRICE_KEYWORDS)
+_HIGH_PRICE_RE = _keyword_regex(HIGH_PRICE_KEYWORDS)
+_OUTDOOR_RE = _keyword_regex(OUTDOOR_KEYWORDS)
+
+
+def _title_tokens(title: str) -> List[str]:
+    cleaned = _PUNCT_RE.sub(" ", title.lower())
+    tokens = [t for t in cleaned.split() if len(t) > 3]
+    return tokens or [title.lower()]
+
+
+class DocTokenIndex:
+    """
+    Per-request inverted index over the first `k` retrieved docs.
+
+    Doc bodies are lowercased once, and every needle (title token or full
+    title) is resolved at most once to the set of doc positions containing it.
+    Needles are matched as substrings, so results are identical to the
+    original per-call scans; repeated titles and shared tokens across a long
+    itinerary become dict/set lookups.
+    """
+
+    def __init__(self, docs: List, k: int = 5):
+        docs = docs or []
+        self.k = k
+        self.total = len(docs)
+        self.size = max(0, min(k, self.total))
+        self._texts = [(d.page_content or "").lower() for d in docs[:self.size]]
+        self._postings: Dict[str, FrozenSet[int]] = {}
+        self._scores: Dict[Tuple[str, int], float] = {}
+
+    def covers(self, k: int) -> bool:
+        """True when a confidence query with this `k` can be answered from the index."""
+        return k <= self.k or self.size == self.total
+
+    def docs_containing(self, needle: str) -> FrozenSet[int]:
+        hits = self._postings.get(needle)
+        if hits is None:
+            hits = frozenset(i for i, text in enumerate(self._texts) if needle in text)
+            self._postings[needle] = hits
+        return hits
+
+    def confidence(self, title: str, k: int = 5) -> float:
+        if not title or self.total == 0:
+            return 0.0
+        check_k = min(k, self.size)
+        if check_k <= 0:
+            return 0.0
+
+        key = (title, check_k)
+        score = self._scores.get(key)
+        if score is not None:
+            return score
+
+        matched = set(self.docs_containing(title.lower()))
+        for tok in _title_tokens(title):
+            matched |= self.docs_containing(tok)
+        score = float(sum(1 for i in matched if i < check_k)) / float(check_k)
+        self._scores[key] = score
+        return score
+
+
+def _compute_confidence_for_title(title: str, docs: List, k: int = 5, index: Optional[DocTokenIndex] = None) -> float:
+    if index is not None and index.covers(k):
+        return index.confidence(title, k)
+
+    if not title or not docs:
+        return 0.0
+    tokens = _title_tokens(title)
+
+    check_k = min(k, len(docs))
+    if check_k <= 0:
+        return 0.0
+
+    count = 0
+    for d in docs[:check_k]:
+        content = (d.page_content or "").lower()
+        if any(tok in content for tok in tokens) or title.lower() in content:
+            count += 1
+    return float(count) / float(check_k)
+
+
+def _estimate_price_level(title: str, why: str, docs: List, user_budget: Optional[str] = None) -> str:
+    text = f"{(title or '')} {(why or '')}".lower()
+    if _LOW_PRICE_RE.search(text):
+        return "low"
+    if _HIGH_PRICE_RE.search(text):
+        return "high"
+    if isinstance(user_budget, str):
+        ub = user_budget.strip().lower()
+        if ub in ("low", "medium", "high"):
+            return ub
+    return "medium"
+
+
+def _is_outdoor_activity(title: str, why: str) -> bool:
+    text = f"{(title or '')} {(why or '')}".lower()
+    return _OUTDOOR_RE.search(text) is not None
+
+
+def _suggest_alternatives_for_activity(title: str) -> List[str]:
+    text = (title or "").lower()
+    if "hike" in text or "trek" in text or "mountain" in text:
+        return ["Visit a tea factory / factory tour", "Explore a covered local market or museum"]
+    if "beach" in text or "snorkel" in text or "surf" in text:
+        return ["Visit an indoor aquarium or marine museum", "Relax at a local cafe or indoor cultural show"]
+    if "waterfall" in text or "river" in text or "boat" in text:
+        return ["Visit a nearby museum or botanical garden", "Take a cooking class or tea tasting session"]
+    if "sunset" in text or "viewpoint" in text:
+        return ["Explore a nearby indoor market or craft centre", "Visit the Royal Botanical Gardens or a tea factory tour"]
+    return ["Visit a museum or cultural center", "Take a local cooking class or tea tasting", "Explore covered local markets"]
+
+
+def other_towns_for(destination: Optional[str]) -> Tuple[str, ...]:
+    """Known towns that would count as cross-town leakage for this destination."""
+    dest_low = (destination or "").lower()
+    towns = []
+    for town in OTHER_TOWNS:
+        if town in dest_low:
+            continue
+        km = distance_km(destination, town) if destination else None
+        if km is None or km > LOCAL_RADIUS_KM:
+            towns.append(town)
+    return tuple(towns)
+
+
+def title_key(title: Optional[str]) -> str:
+    """Normalised title used to spot the same activity across day windows."""
+    return " ".join(_PUNCT_RE.sub(" ", (title or "").lower()).split())
+
+
+def dedupe_day_plans(day_plans: List[dict], seen: set) -> int:
+    """
+    Swap suggestions whose title was already planned in another window for an
+    unused alternative. Repeats inside `day_plans` itself are left to the LLM.
+    `seen` is shared across windows and updated in place.
+    Returns the number of suggestions that were replaced.
+    """
+    replaced = 0
+    window_keys = set()
+    for day in day_plans or []:
+        for s in day.get("suggestions", []) or []:
+            if not isinstance(s, dict):
+                continue
+            title = s.get("title", "") or ""
+            key = title_key(title)
+            if not key or key not in seen or any(m in key for m in MEAL_KEYWORDS):
+                window_keys.add(key)
+                continue
+            alt = next((a for a in _suggest_alternatives_for_activity(title)
+                        if title_key(a) not in seen and title_key(a) not in window_keys), None)
+            if alt is None:
+                # nothing fresh to offer; keep the repeat but say so
+                s.setdefault("warnings", []).append("repeated_across_days")
+                continue
+            window_keys.add(title_key(alt))
+            s["why"] = f"Instead of repeating '{title}': {s.get('why', '')}".strip()
+            s["title"] = alt
+            s["confidence"] = min(s.get("confidence", 0.6), 0.5)
+            s.setdefault("warnings", []).append("deduplicated_across_days")
+            replaced += 1
+    window_keys.discard("")
+    seen.update(window_keys)
+    return replaced
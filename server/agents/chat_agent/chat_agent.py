@@ -3,7 +3,8 @@ from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 
 from server.utils.text_security import sanitize_input
-from server.utils.config import OPENAI_API_KEY, OPENAI_MODEL
+from server.utils.config import OPENAI_API_KEY, OPENAI_MODEL, LLM_MAX_RETRIES
+from server.utils.deadline import llm_timeout
 
 # Current Date for temporal grounding
 CURRENT_DATE = "October 1, 2025"
@@ -193,7 +194,7 @@ def create_chat_agent_chain():
     Creates the LangChain runnable for the Chat Agent using the OpenAI API.
     """
     # Use a conversational model
-    llm = ChatOpenAI(model=OPENAI_MODEL, temperature=0.7)
+    llm = ChatOpenAI(model=OPENAI_MODEL, temperature=0.7, timeout=llm_timeout(), max_retries=LLM_MAX_RETRIES)
 
     # Define the chat prompt template
     prompt = ChatPromptTemplate.from_messages(
@@ -216,14 +217,16 @@ def create_chat_agent_chain():
 def chat_agent_node(state: dict) -> dict:
     """
     The function that acts as the LangGraph node for the Chat Agent.
-    It handles simple conversations and general queries.
+    It handles simple conversations and general queries, and returns only the
+    new chat_history turns and the reply (final_summary).
     """
     chat_chain = create_chat_agent_chain()
     user_query = state["user_query"]
 
     # === NEW: SANITIZE INPUT ===
     friendly_response = ""
-    sanitized_query = sanitize_input(user_query)
+    new_turns = []
+    sanitized_query = sanitize_input(user_query, session_id=state.get("session_id"))
 
     # If the input was too long, the Decision Agent *should* have routed it elsewhere.
     # But if it ends up here, provide a friendly fail/redirect.
@@ -241,13 +244,12 @@ def chat_agent_node(state: dict) -> dict:
         friendly_response = sanitize_festival_recommendations(friendly_response, sanitized_query)
 
         # Update the conversation history (use the original query for clarity in history)
-        state["chat_history"].append(("human", user_query))
+        new_turns.append(("human", user_query))
 
         # If long input, we only add the AI's response
-    state["chat_history"].append(("ai", friendly_response))
-    state["final_summary"] = friendly_response
+    new_turns.append(("ai", friendly_response))
 
-    return state
+    return {"chat_history": new_turns, "final_summary": friendly_response}
 
 # --- Example of How the Agent Responds ---
 # chat_func = chat_agent_node
@@ -5,7 +5,8 @@ from sympy.physics.units import temperature
 
 from server.schemas.decision_agent_schema import AgentRouteDecision
 from server.utils.text_security import sanitize_input
-from server.utils.config import GEMINI_API_KEY, GEMINI_MODEL
+from server.utils.config import GEMINI_API_KEY, GEMINI_MODEL, LLM_MAX_RETRIES
+from server.utils.deadline import llm_timeout
 
 system_prompt = """
                 You are the **Decision Agent** for a multi-agent trip planning system. 
@@ -29,7 +30,8 @@ def create_decision_agent():
     """
     Creates the LangChain runnable for the Decision Agent using the Gemini API.
     """
-    llm=ChatGoogleGenerativeAI(model=GEMINI_MODEL, temperature=0, api_key=GEMINI_API_KEY)
+    llm=ChatGoogleGenerativeAI(model=GEMINI_MODEL, temperature=0, api_key=GEMINI_API_KEY,
+                               timeout=llm_timeout(), max_retries=LLM_MAX_RETRIES)
 
     prompt=ChatPromptTemplate.from_messages(
         [
@@ -49,7 +51,7 @@ def decision_agent_node(state: dict) -> dict:
     decision_chain=create_decision_agent()
     user_query=state["user_query"]
 
-    sanitized_query = sanitize_input(user_query)
+    sanitized_query = sanitize_input(user_query, session_id=state.get("session_id"))
 
     # If the input was too long, route directly to the Explorer Agent (RAG)
     if sanitized_query == "LONG_INPUT_STORED":
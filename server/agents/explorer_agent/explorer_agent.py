@@ -1,21 +1,36 @@
+import hashlib
 import os
 import re
+import threading
 from typing import Dict, Any, List, Tuple, Optional
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_community.document_loaders import WebBaseLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.vectorstores import Chroma
 from langchain.chains import RetrievalQA
 from langchain_core.documents import Document
 
 # Assuming these are correct imports for your configuration
-from server.utils.config import OPENAI_API_KEY, OPENAI_MODEL
+from server.utils.config import OPENAI_API_KEY, OPENAI_MODEL, LLM_TIMEOUT_SECONDS, LLM_MAX_RETRIES
 from server.workflow.app_state import TripPlanState
 from server.utils.text_security import sanitize_input
-from server.utils.vector_store import get_vectorstore
+from server.utils.vector_store import get_vectorstore, session_filter
+from server.utils.cache import TTLCache
+from server.utils import content_store
+from server.agents.explorer_agent.page_fetcher import fetch_documents
+from server.agents.explorer_agent.page_summarizer import is_summary_request, summarize_documents
+
+try:
+    from server.utils.config import EXPLORER_CACHE_MAX_PAGES, EXPLORER_CACHE_TTL_SECONDS, EXPLORER_CACHE_MAX_MB
+except Exception:
+    EXPLORER_CACHE_MAX_PAGES = int(os.getenv('EXPLORER_CACHE_MAX_PAGES', '32'))
+    EXPLORER_CACHE_TTL_SECONDS = int(os.getenv('EXPLORER_CACHE_TTL_SECONDS', '3600'))
+    EXPLORER_CACHE_MAX_MB = int(os.getenv('EXPLORER_CACHE_MAX_MB', '256'))
 
 LLM_MODEL = OPENAI_MODEL
 
+# rough per-chunk footprint of an OpenAI embedding (1536 float32) plus index overhead
+_EMBEDDING_BYTES = 1536 * 4 * 2
+
 
 # --- Helper Functions ---
 
@@ -66,41 +81,169 @@ def docs_from_state_format(content: List[Dict[str, Any]]) -> List[Document]:
     ]
 
 
-def run_explorer_rag(url: str, question: str, content: Optional[List[Dict[str, Any]]] = None) -> Tuple[
-    str, List[Document]]:
+# --- Per-page retriever cache ---
+
+def _collection_name(key: Tuple[str, str]) -> str:
+    # one collection per cache key: two URLs serving the same content must not
+    # share a collection, or evicting one entry would drop the other's index
+    return "explorer_" + hashlib.sha256("\0".join(key).encode("utf-8")).hexdigest()[:32]
+
+
+def _drop_vectorstore(key, vectorstore) -> None:
+    try:
+        vectorstore.delete_collection()
+    except Exception as e:
+        print(f"WARN: Could not drop explorer collection for {key[0]}: {e}")
+
+
+_VECTORSTORE_CACHE = TTLCache(
+    maxsize=EXPLORER_CACHE_MAX_PAGES,
+    ttl=EXPLORER_CACHE_TTL_SECONDS,
+    max_bytes=EXPLORER_CACHE_MAX_MB * 1024 * 1024,
+    sizeof=lambda vs: getattr(vs, "_explorer_nbytes", 0),
+    on_evict=_drop_vectorstore,
+    name="explorer",
+)
+_build_locks: Dict[Tuple[str, str], threading.Lock] = {}
+_build_locks_guard = threading.Lock()
+_clients: Dict[str, Any] = {}
+
+
+def _get_clients() -> Tuple[ChatOpenAI, OpenAIEmbeddings]:
+    """One LLM and one embeddings client per process instead of per question."""
+    with _build_locks_guard:
+        if not _clients:
+            _clients["llm"] = ChatOpenAI(model=LLM_MODEL, temperature=0, api_key=OPENAI_API_KEY,
+                                          timeout=LLM_TIMEOUT_SECONDS, max_retries=LLM_MAX_RETRIES)
+            _clients["embeddings"] = OpenAIEmbeddings(api_key=OPENAI_API_KEY)
+    return _clients["llm"], _clients["embeddings"]
+
+
+def _chroma_metadata(meta: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    # Chroma only accepts non-empty metadata with scalar values
+    meta = {k: v for k, v in (meta or {}).items() if isinstance(v, (str, int, float, bool))}
+    return meta or None
+
+
+def get_page_vectorstore(url: str, splits: List[Document], embeddings: OpenAIEmbeddings,
+                         digest: Optional[str] = None):
+    """
+    Return the in-memory Chroma index for this page, embedding it only on a
+    cache miss. Keyed by URL plus content hash; bounded by entry count, TTL
+    and an estimated memory budget. Chunk embeddings are kept in the content
+    store, so a rebuild after eviction or a restart does not re-embed.
+    """
+    texts = [d.page_content for d in splits]
+    digest = digest or content_store.content_hash(texts)
+    key = (url or "", digest)
+    vectorstore = _VECTORSTORE_CACHE.get(key)
+    if vectorstore is not None:
+        print(f"INFO: Reusing cached vector store for {url} ({_VECTORSTORE_CACHE.stats()['hit_rate']:.0%} hit rate)")
+        return vectorstore
+
+    with _build_locks_guard:
+        lock = _build_locks.setdefault(key, threading.Lock())
+    with lock:
+        # another request may have built it while we waited
+        vectorstore = _VECTORSTORE_CACHE.peek(key)
+        if vectorstore is None:
+            vectors = content_store.get_embeddings(digest)
+            if vectors is None or len(vectors) != len(texts):
+                print(f"INFO: Embedding {len(splits)} chunks for {url}")
+                vectors = embeddings.embed_documents(texts)
+                try:
+                    content_store.put_embeddings(digest, vectors)
+                except Exception as e:
+                    print(f"WARN: Could not store embeddings for {url}: {e}")
+            else:
+                print(f"INFO: Loaded stored embeddings for {url}")
+            # unique collection per page: the default shared collection would
+            # accumulate chunks from every page embedded in this process
+            vectorstore = Chroma(collection_name=_collection_name(key), embedding_function=embeddings)
+            vectorstore._collection.upsert(
+                ids=[str(i) for i in range(len(texts))],
+                embeddings=[list(map(float, v)) for v in vectors],
+                documents=texts,
+                metadatas=[_chroma_metadata(d.metadata) for d in splits],
+            )
+            vectorstore._explorer_nbytes = sum(len(t) for t in texts) + len(texts) * _EMBEDDING_BYTES
+            _VECTORSTORE_CACHE.set(key, vectorstore)
+    with _build_locks_guard:
+        _build_locks.pop(key, None)
+    return vectorstore
+
+
+def store_page_content(url: str, splits: List[Document]) -> Dict[str, Any]:
+    """Save chunks in the shared content store and return the small reference kept in state."""
+    return content_store.put_chunks(url, format_docs_for_state(splits))
+
+
+def load_page_content(content: Any) -> Tuple[List[Document], Optional[str]]:
+    """
+    Chunks for a state reference (or a legacy inline chunk list), plus the
+    content hash when known. Returns ([], None) if the stored copy is gone.
+    """
+    if content_store.is_reference(content):
+        chunks = content_store.get_chunks(content["content_ref"])
+        if chunks is None:
+            return [], None
+        return docs_from_state_format(chunks), content["content_ref"]
+    if isinstance(content, list):
+        return docs_from_state_format(content), None
+    return [], None
+
+
+def _fetch_and_split(url: str) -> List[Document]:
+    print(f"INFO: Loading content from the web page: {url}")
+    # streamed, size-capped fetch with boilerplate stripped before chunking
+    documents = fetch_documents(url)
+
+    if not documents:
+        raise ValueError(f"Could not retrieve content from the URL: {url}.")
+
+    print("INFO: Splitting content into chunks...")
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    return text_splitter.split_documents(documents)
+
+
+def run_explorer_rag(url: str, question: str, content: Any = None) -> Tuple[str, List[Document]]:
     """
     Core RAG logic to process a URL or resume from stored content, and answer a question.
 
+    `content` is the reference from store_page_content() (or, for older
+    sessions, the inline chunk list).
+
     Returns: (final_answer, document_chunks)
     """
 
-    splits: List[Document]
+    splits: List[Document] = []
+    digest: Optional[str] = None
 
     if content:
-        # Resume RAG: Recreate splits from stored state
-        print("INFO: Recreating documents from state for RAG resumption.")
-        splits = docs_from_state_format(content)
-        if not splits:
+        # Resume RAG: load the page chunks from the content store
+        print("INFO: Loading stored page content for RAG resumption.")
+        splits, digest = load_page_content(content)
+        if not splits and url:
+            print(f"INFO: Stored content for {url} is gone; fetching the page again.")
+        elif not splits:
             raise ValueError("Stored link content is empty or invalid.")
-    else:
-        # Initial RAG: Scrape the URL and create splits
-        print(f"INFO: Loading content from the web page: {url}")
-        loader = WebBaseLoader(url)
-        documents = loader.load()
-
-        if not documents:
-            raise ValueError(f"Could not retrieve content from the URL: {url}.")
 
-        print("INFO: Splitting content into chunks...")
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        splits = text_splitter.split_documents(documents)
+    if not splits:
+        # Initial RAG: Scrape the URL and create splits
+        splits = _fetch_and_split(url)
 
     # 4. Set up RAG Chain
-    llm = ChatOpenAI(model=LLM_MODEL, temperature=0, api_key=OPENAI_API_KEY)
-    embeddings = OpenAIEmbeddings(api_key=OPENAI_API_KEY)
+    llm, embeddings = _get_clients()
 
-    # Create a vector store from the chunks (in-memory, using Chroma)
-    vectorstore = Chroma.from_documents(documents=splits, embedding=embeddings)
+    # Whole-page summaries go through map-reduce over every chunk instead of
+    # the top few retrieved ones (and need no embeddings at all)
+    if is_summary_request(question):
+        print(f"INFO: Map-reduce summary over {len(splits)} chunks for: {question}")
+        return summarize_documents(splits, llm, question), splits
+
+    # In-memory Chroma index for the page; follow-up questions reuse it and
+    # only pay for the query embedding plus the LLM call
+    vectorstore = get_page_vectorstore(url, splits, embeddings, digest)
     retriever = vectorstore.as_retriever()
 
     # Create the RetrievalQA chain
@@ -119,6 +262,28 @@ def run_explorer_rag(url: str, question: str, content: Optional[List[Dict[str, A
 
     return final_answer, splits
 
+def answer_from_session_text(user_query: str, session_id: Optional[str]) -> str:
+    """
+    RAG over the long text this session pasted (stored by sanitize_input);
+    retrieval is filtered to the caller's own chunks.
+    """
+    from langchain.chains import create_retrieval_chain
+    from langchain.chains.combine_documents import create_stuff_documents_chain
+    from langchain_core.prompts import ChatPromptTemplate
+
+    llm, _ = _get_clients()
+    rag_prompt = ChatPromptTemplate.from_messages([
+        ("system",
+         "You are an expert travel assistant. Based *only* on the context provided, answer the user's query and generate a comprehensive response. Context: {context}"),
+        ("human", "{input}"),
+    ])
+    retriever = get_vectorstore().as_retriever(search_kwargs={"k": 4, "filter": session_filter(session_id)})
+    retrieval_chain = create_retrieval_chain(retriever, create_stuff_documents_chain(llm, rag_prompt))
+
+    # Note: We use the *original* user_query here to get the full context of the question
+    result = retrieval_chain.invoke({"input": user_query})
+    return result["answer"]
+
 # === 7. Explorer Node ===
 def explorer_agent_node(state: TripPlanState) -> Dict[str, Any]:
     """
@@ -129,7 +294,7 @@ def explorer_agent_node(state: TripPlanState) -> Dict[str, Any]:
     link_content = state.get("current_link_content")
 
     # === SANITIZE INPUT ===
-    sanitized_query = sanitize_input(user_query)
+    sanitized_query = sanitize_input(user_query, session_id=state.get("session_id"))
     state["user_query"] = sanitized_query  # Update state with sanitized query
     # ============================
 
@@ -137,35 +302,7 @@ def explorer_agent_node(state: TripPlanState) -> Dict[str, Any]:
     if sanitized_query == "LONG_INPUT_STORED":
         print("--- NODE: Explorer Agent Executing (Vector Store RAG) ---")
         try:
-            # 1. Retrieve relevant chunks from the vector store
-            vectorstore = get_vectorstore()
-            # The original user_query (now sanitized but long) is what we search for
-            docs = vectorstore.similarity_search(user_query, k=4)
-
-            # 2. Use a standard RAG chain (similar to run_explorer_rag but without scraping)
-            # This requires creating a dedicated RAG chain or modifying run_explorer_rag
-            # to accept Documents directly. We'll use a placeholder logic:
-
-            from langchain_openai import ChatOpenAI
-            from langchain.chains import create_stuff_documents_chain, create_retrieval_chain
-            from langchain_core.prompts import ChatPromptTemplate
-
-            llm = ChatOpenAI(model=LLM_MODEL, temperature=0)
-
-            rag_prompt = ChatPromptTemplate.from_messages([
-                ("system",
-                 "You are an expert travel assistant. Based *only* on the context provided, answer the user's query and generate a comprehensive response. Context: {context}"),
-                ("human", "{input}"),
-            ])
-
-            # Simulating RAG response generation for the stored context
-            retriever = vectorstore.as_retriever()
-            retrieval_chain = create_retrieval_chain(retriever, create_stuff_documents_chain(llm, rag_prompt))
-
-            # Note: We use the *original* user_query here to get the full context of the question
-            result = retrieval_chain.invoke({"input": user_query})
-
-            state["final_response"] = result["answer"]
+            state["final_response"] = answer_from_session_text(user_query, state.get("session_id"))
             return state
         except Exception as e:
             print(f"ERROR: Failed RAG on long input. {e}")
@@ -186,8 +323,8 @@ def explorer_agent_node(state: TripPlanState) -> Dict[str, Any]:
             # New RAG: Scrape and generate answer/chunks
             answer, doc_chunks = run_explorer_rag(new_url, question, content=None)
 
-            # Persist the content for future questions
-            state["current_link_content"] = format_docs_for_state(doc_chunks)
+            # Persist the content server-side; state only keeps a reference
+            state["current_link_content"] = store_page_content(new_url, doc_chunks)
             state["final_response"] = answer
             return state
         except Exception as e:
@@ -0,0 +1,240 @@
+# server/agents/explorer_agent/page_fetcher.py
+"""
+Async page fetcher for the explorer agent.
+
+- httpx streaming GET with connect/read timeouts and a max-bytes cutoff
+  (bodies past the cap are truncated, not buffered);
+- only HTML / XHTML / plain text is accepted;
+- HTML is turned into text while it streams in: script/style/nav/header/
+  footer/aside/form and friends are dropped before anything is chunked;
+- pages are kept in a shared cache and revalidated with ETag /
+  Last-Modified once they are older than PAGE_FRESH_SECONDS.
+
+fetch_page() is the coroutine; fetch_documents() is the sync entry point the
+RAG code uses and works whether or not an event loop is already running.
+"""
+
+import asyncio
+import codecs
+import concurrent.futures
+import os
+import re
+import time
+from html.parser import HTMLParser
+from typing import List, NamedTuple, Optional
+from urllib.parse import urlparse
+
+import httpx
+from langchain_core.documents import Document
+
+from server.utils.cache import TTLCache
+
+try:
+    from server.utils.config import (
+        EXPLORER_FETCH_CONNECT_TIMEOUT,
+        EXPLORER_FETCH_READ_TIMEOUT,
+        EXPLORER_FETCH_MAX_BYTES,
+    )
+except Exception:
+    EXPLORER_FETCH_CONNECT_TIMEOUT = float(os.getenv('EXPLORER_FETCH_CONNECT_TIMEOUT', '5'))
+    EXPLORER_FETCH_READ_TIMEOUT = float(os.getenv('EXPLORER_FETCH_READ_TIMEOUT', '10'))
+    EXPLORER_FETCH_MAX_BYTES = int(os.getenv('EXPLORER_FETCH_MAX_BYTES', str(2 * 1024 * 1024)))
+
+USER_AGENT = "seasonal-travel-recommender/1.0 (+explorer)"
+ALLOWED_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+PAGE_FRESH_SECONDS = 10 * 60
+
+# elements whose whole subtree is boilerplate for our purposes
+_SKIP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe", "object",
+    "nav", "header", "footer", "aside", "form", "button", "select", "menu", "dialog",
+}
+_BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "br", "li", "ul", "ol", "table", "tr", "td", "th",
+    "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "dd", "dt", "figcaption", "hr",
+}
+_VOID_TAGS = {"br", "hr", "img", "input", "meta", "link", "area", "base", "col", "embed", "source", "track", "wbr"}
+_WS_RE = re.compile(r"[ \t\r\f\v]+")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+
+_page_cache = TTLCache(maxsize=128, ttl=24 * 60 * 60, name="explorer_pages")
+
+
+class FetchedPage(NamedTuple):
+    url: str
+    title: str
+    text: str
+    content_type: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    truncated: bool
+    fetched_at: float
+
+
+class _TextExtractor(HTMLParser):
+    """Incremental HTML -> text; feed() it decoded chunks as they arrive."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._skip_depth = 0
+        self._in_title = False
+        self.title_parts: List[str] = []
+        self.parts: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag in _BLOCK_TAGS and not self._skip_depth:
+            self.parts.append("\n")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in _BLOCK_TAGS and not self._skip_depth:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            if self._skip_depth:
+                self._skip_depth -= 1
+        elif tag == "title":
+            self._in_title = False
+        elif tag in _BLOCK_TAGS and tag not in _VOID_TAGS and not self._skip_depth:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title_parts.append(data)
+        elif not self._skip_depth:
+            self.parts.append(data)
+
+    def text(self) -> str:
+        lines = (_WS_RE.sub(" ", line).strip() for line in "".join(self.parts).split("\n"))
+        return _BLANK_LINES_RE.sub("\n\n", "\n".join(line for line in lines if line)).strip()
+
+    def title(self) -> str:
+        return _WS_RE.sub(" ", "".join(self.title_parts)).strip()
+
+
+def _charset(content_type: str) -> str:
+    m = re.search(r"charset=([\w.-]+)", content_type or "", re.IGNORECASE)
+    if m:
+        try:
+            codecs.lookup(m.group(1))
+            return m.group(1)
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+def _check_url(url: str) -> None:
+    parsed = urlparse(url or "")
+    if parsed.scheme not in ("http", "https") or not parsed.netloc:
+        raise ValueError(f"Only http(s) links can be explored: {url}")
+
+
+async def fetch_page(
+    url: str,
+    client: Optional[httpx.AsyncClient] = None,
+    max_bytes: Optional[int] = None,
+    use_cache: bool = True,
+) -> FetchedPage:
+    """
+    Fetch and extract one page. Raises ValueError for unsupported links,
+    content types or HTTP errors; httpx timeouts propagate as httpx errors.
+    """
+    _check_url(url)
+    max_bytes = max_bytes or EXPLORER_FETCH_MAX_BYTES
+    cached: Optional[FetchedPage] = _page_cache.get(url) if use_cache else None
+    if cached and time.time() - cached.fetched_at < PAGE_FRESH_SECONDS:
+        return cached
+
+    headers = {"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml,text/plain;q=0.8"}
+    if cached and cached.etag:
+        headers["If-None-Match"] = cached.etag
+    if cached and cached.last_modified:
+        headers["If-Modified-Since"] = cached.last_modified
+
+    timeout = httpx.Timeout(EXPLORER_FETCH_READ_TIMEOUT, connect=EXPLORER_FETCH_CONNECT_TIMEOUT)
+    own_client = client is None
+    if own_client:
+        client = httpx.AsyncClient(follow_redirects=True, max_redirects=5, timeout=timeout)
+    try:
+        async with client.stream("GET", url, headers=headers, timeout=timeout) as resp:
+            if resp.status_code == 304 and cached:
+                page = cached._replace(fetched_at=time.time())
+                _page_cache.set(url, page)
+                return page
+            if resp.status_code >= 400:
+                raise ValueError(f"Could not retrieve content from the URL: {url} (HTTP {resp.status_code}).")
+
+            content_type = resp.headers.get("content-type", "")
+            mime = content_type.split(";")[0].strip().lower()
+            if mime and mime not in ALLOWED_CONTENT_TYPES:
+                raise ValueError(f"Unsupported content type '{mime}' at {url}.")
+
+            decoder = codecs.getincrementaldecoder(_charset(content_type))(errors="replace")
+            extractor = _TextExtractor() if mime != "text/plain" else None
+            plain: List[str] = []
+            received = 0
+            truncated = False
+            async for chunk in resp.aiter_bytes():
+                if received + len(chunk) > max_bytes:
+                    chunk = chunk[: max_bytes - received]
+                    truncated = True
+                received += len(chunk)
+                text = decoder.decode(chunk)
+                if extractor is not None:
+                    extractor.feed(text)
+                else:
+                    plain.append(text)
+                if truncated:
+                    break
+            tail = decoder.decode(b"", final=True)
+            if extractor is not None:
+                extractor.feed(tail)
+                extractor.close()
+                title, body = extractor.title(), extractor.text()
+            else:
+                title, body = "", "".join(plain + [tail]).strip()
+
+            page = FetchedPage(
+                url=str(resp.url),
+                title=title,
+                text=body,
+                content_type=mime or "text/html",
+                etag=resp.headers.get("etag"),
+                last_modified=resp.headers.get("last-modified"),
+                truncated=truncated,
+                fetched_at=time.time(),
+            )
+    finally:
+        if own_client:
+            await client.aclose()
+
+    if truncated:
+        print(f"INFO: {url} exceeded {max_bytes} bytes; using the first part only.")
+    if use_cache:
+        _page_cache.set(url, page)
+    return page
+
+
+def _run_sync(coro):
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    # called from inside an event loop (e.g. an async route): run on a worker thread
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+
+def fetch_documents(url: str) -> List[Document]:
+    """Sync wrapper: fetch a page and return it as a single LangChain Document (empty list if no text)."""
+    page = _run_sync(fetch_page(url))
+    if not page.text:
+        return []
+    metadata = {"source": url, "title": page.title, "content_type": page.content_type}
+    if page.truncated:
+        metadata["truncated"] = True
+    return [Document(page_content=page.text, metadata=metadata)]
@@ -0,0 +1,123 @@
+# server/agents/explorer_agent/page_summarizer.py
+"""
+Map-reduce summarization for long explorer pages.
+
+Chunks are grouped and each group is summarized concurrently (bounded pool);
+the partial summaries are then merged level by level until they fit one
+final call that also sees the user's request. Every LLM result is cached by
+a hash of its inputs, so asking for a summary of the same page again, or of
+a page that shares most of its chunks, does not re-run those calls.
+"""
+
+import hashlib
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence
+
+from langchain_core.documents import Document
+
+from server.utils.cache import TTLCache
+
+try:
+    from server.utils.config import EXPLORER_SUMMARY_GROUP_CHUNKS, EXPLORER_SUMMARY_WORKERS
+except Exception:
+    EXPLORER_SUMMARY_GROUP_CHUNKS = int(os.getenv('EXPLORER_SUMMARY_GROUP_CHUNKS', '4'))
+    EXPLORER_SUMMARY_WORKERS = int(os.getenv('EXPLORER_SUMMARY_WORKERS', '4'))
+
+# partial summaries merged per reduce call
+REDUCE_FAN_IN = 6
+
+_SUMMARY_RE = re.compile(r"\b(summari[sz]e|summary|overview|tl;?dr|gist|key points|main points)\b", re.IGNORECASE)
+
+_MAP_PROMPT = (
+    "You are summarizing part {part} of {total} of a web page for a traveller.\n"
+    "Write a concise bullet-point summary of the facts in this part (places, activities, "
+    "prices, opening times, tips). Do not add information that is not in the text.\n\n"
+    "Text:\n{text}"
+)
+_REDUCE_PROMPT = (
+    "Merge these partial summaries of one web page into a single concise bullet-point summary. "
+    "Remove duplicates and keep concrete details.\n\n{text}"
+)
+_FINAL_PROMPT = (
+    "You are an expert travel assistant. Using only the summaries below of a web page, "
+    "answer the user's request.\n\nRequest: {question}\n\nSummaries:\n{text}"
+)
+
+_partials = TTLCache(maxsize=4096, ttl=24 * 60 * 60, name="explorer_summaries")
+
+
+def is_summary_request(question: str) -> bool:
+    return bool(_SUMMARY_RE.search(question or ""))
+
+
+def _key(kind: str, *parts: str) -> str:
+    h = hashlib.sha256(kind.encode("utf-8"))
+    for p in parts:
+        h.update(b"\x00")
+        h.update((p or "").encode("utf-8", "ignore"))
+    return h.hexdigest()
+
+
+def _call(llm, prompt: str) -> str:
+    resp = llm.invoke(prompt)
+    return (getattr(resp, "content", resp) or "").strip()
+
+
+def _cached_call(llm, key: str, prompt: str) -> str:
+    return _partials.get_or_set(key, lambda: _call(llm, prompt))
+
+
+def _groups(items: Sequence, size: int) -> List[Sequence]:
+    size = max(1, size)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _parallel(fn: Callable, jobs: list, workers: int) -> List[str]:
+    if len(jobs) == 1:
+        return [fn(*jobs[0])]
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(jobs)))) as pool:
+        return list(pool.map(lambda job: fn(*job), jobs))
+
+
+def summarize_documents(
+    docs: List[Document],
+    llm,
+    question: str = "Please summarize the content of this document.",
+    group_chunks: Optional[int] = None,
+    max_workers: Optional[int] = None,
+) -> str:
+    """Summarize all chunks of a page, answering `question` in the final step."""
+    group_chunks = group_chunks or EXPLORER_SUMMARY_GROUP_CHUNKS
+    max_workers = max_workers or EXPLORER_SUMMARY_WORKERS
+    texts = [d.page_content for d in docs if d.page_content and d.page_content.strip()]
+    if not texts:
+        return "The page did not contain any text to summarize."
+
+    groups = _groups(texts, group_chunks)
+    if len(groups) == 1:
+        body = "\n\n".join(groups[0])
+        return _cached_call(llm, _key("final", question, body), _FINAL_PROMPT.format(question=question, text=body))
+
+    # map: one partial summary per chunk group
+    total = len(groups)
+
+    def map_one(i: int, group: Sequence[str]) -> str:
+        body = "\n\n".join(group)
+        # key on the group text only, so the same chunks hit the cache wherever they sit
+        return _cached_call(llm, _key("map", body), _MAP_PROMPT.format(part=i + 1, total=total, text=body))
+
+    partials = _parallel(map_one, list(enumerate(groups)), max_workers)
+    print(f"INFO: Summarized {len(texts)} chunks into {len(partials)} partial summaries.")
+
+    # reduce: merge partials level by level until one final call can take them all
+    def reduce_one(group: Sequence[str]) -> str:
+        body = "\n\n---\n\n".join(group)
+        return _cached_call(llm, _key("reduce", body), _REDUCE_PROMPT.format(text=body))
+
+    while len(partials) > REDUCE_FAN_IN:
+        partials = _parallel(reduce_one, [(g,) for g in _groups(partials, REDUCE_FAN_IN)], max_workers)
+
+    body = "\n\n---\n\n".join(partials)
+    return _cached_call(llm, _key("final", question, body), _FINAL_PROMPT.format(question=question, text=body))
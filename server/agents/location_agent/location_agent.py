@@ -149,10 +149,15 @@
 import os
 import json
 from typing import Any, Optional
+import httpx
 from dotenv import load_dotenv
 from google import genai
-import bleach
-
+from google.genai import types
+from server.utils.sanitizer import clean_html
+from server.utils.deadline import DeadlineExceeded, llm_timeout
+from server.utils.geo import nearby_places
+from server.utils.places import canonical_place
+from server.agents.location_agent import location_cache
 from server.schemas.location_agent_schemas import LocationAgentInputSchema, LocationAgentOutputSchema
 
 load_dotenv()
@@ -160,7 +165,14 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if not GEMINI_API_KEY:
     raise ValueError("GEMINI_API_KEY is not set in your .env file.")
 
-client = genai.Client(api_key=GEMINI_API_KEY)
+try:
+    from server.utils.config import LLM_TIMEOUT_SECONDS
+except Exception:
+    LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', '30'))
+
+# HttpOptions.timeout is in milliseconds; without it a hung request never returns
+client = genai.Client(api_key=GEMINI_API_KEY,
+                      http_options=types.HttpOptions(timeout=int(LLM_TIMEOUT_SECONDS * 1000)))
 
 
 def _get_field(state: Any, name: str, default: Any = "") -> Any:
@@ -180,17 +192,9 @@ def sanitize_text(val: Any) -> str:
     - dict/list -> JSON string
     - None -> empty string
     - other types -> str(...)
+    Memoized; plain text skips bleach (see server.utils.sanitizer).
     """
-    if val is None:
-        text = ""
-    elif isinstance(val, (dict, list)):
-        try:
-            text = json.dumps(val, ensure_ascii=False)
-        except Exception:
-            text = str(val)
-    else:
-        text = str(val)
-    return bleach.clean(text, strip=True)
+    return clean_html(val)
 
 
 def safe_parse_locations(text: str, prev_response: Optional[dict] = None) -> dict:
@@ -211,11 +215,24 @@ def safe_parse_locations(text: str, prev_response: Optional[dict] = None) -> dic
         }
 
 
-def run_location_agent(state: Any, prev_response: Optional[dict] = None) -> dict:
+def run_location_agent(state: Any, prev_response: Optional[dict] = None, warm: bool = False) -> dict:
     """
     Core Location Agent: accepts `state` (dict or model), builds a safe prompt,
     queries Gemini, and returns parsed recommendations.
+
+    Answers are cached per canonical trip profile (see location_cache); a hit
+    skips the Gemini call entirely. With a `prev_response` to fall back on the
+    cache is not read (a cached answer would ignore it), only filled. `warm`
+    marks pre-warming runs, whose lookups do not count towards cache stats.
     """
+    if prev_response is not None:
+        cached = None
+    else:
+        cached = location_cache.peek(state) if warm else location_cache.get(state)
+    if cached is not None:
+        print(f"[LocationAgent] Cache hit for {_get_field(state, 'destination', '')} ({location_cache.stats()['hit_rate']:.0%} hit rate)")
+        return cached
+
     destination = sanitize_text(_get_field(state, "destination", ""))
     start_date = sanitize_text(_get_field(state, "start_date", ""))
     end_date = sanitize_text(_get_field(state, "end_date", ""))
@@ -252,21 +269,51 @@ Type of trip: {trip_type}
     print("[Comm Flow] User → LocationAgent → Gemini")
 
     try:
+        # the HTTP timeout ends the request (and its thread) when the request's budget is spent
         response = client.models.generate_content(
             model="gemini-2.5-flash",
-            contents=prompt
+            contents=prompt,
+            config=types.GenerateContentConfig(http_options=types.HttpOptions(timeout=int(llm_timeout() * 1000))),
         )
         text_output = getattr(response, "text", None) or json.dumps(response.__dict__, default=str)
+    except httpx.TimeoutException as exc:
+        raise DeadlineExceeded(f"Gemini location request timed out: {exc}") from exc
     except Exception as exc:
         print(f"[LocationAgent] Gemini request failed: {exc}")
         return safe_parse_locations("", prev_response)
 
     parsed = safe_parse_locations(text_output, prev_response)
+    location_cache.put(state, parsed)
 
     print(f"DEBUG: [LocationAgent] Parsed response: {parsed}")
     return parsed
 
 
+def fallback_locations(state: Any, k: int = 5) -> dict:
+    """
+    Deterministic recommendations for when Gemini does not answer in time:
+    the destination and the known places within a 90 minute drive of it.
+    """
+    destination = canonical_place(sanitize_text(_get_field(state, "destination", "")))
+    if not destination:
+        return safe_parse_locations("")
+    recs = [{"name": destination, "type": "destination", "reason": "Your chosen base for this trip."}]
+    for name, minutes in nearby_places(destination, max_minutes=90.0, k=k - 1):
+        recs.append({"name": name, "type": "nearby",
+                     "reason": f"About {int(round(minutes))} minutes' drive from {destination}."})
+    return {
+        "recommended_locations": recs,
+        "status": "complete",
+        "messages": [],
+        "disclaimer": "Recommendations are generated fairly and do not store personal user data.",
+    }
+
+
+def prewarm_location_cache(profiles=None) -> int:
+    """Fill the recommendation cache for popular profiles (see location_cache.prewarm)."""
+    return location_cache.prewarm(lambda profile: run_location_agent(profile, warm=True), profiles)
+
+
 if __name__ == "__main__":
     demo_state = {
         "destination": "Galle",
@@ -0,0 +1,307 @@
+# server/agents/location_agent/location_cache.py
+"""
+Recommendation cache for the location agent.
+
+Most planning runs ask about the same dozen destinations in the same months
+with overlapping preferences, so Gemini answers are cached under a
+canonicalized profile key:
+
+    (destination, months of travel | season, sorted preference tags,
+     trip type, budget bucket, number of travelers)
+
+i.e. every trip field the Gemini prompt reads, with the free-text ones
+canonicalized. Entries use LRU eviction with a TTL. Keys that keep missing are remembered
+(with the profile that produced them) in a small popularity file, and
+prewarm() can fill those, plus the top destinations for the current month,
+in the background at startup; its lookups go through peek(), so they
+neither count as misses nor make a profile look popular.
+"""
+
+import copy
+import json
+import os
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from server.utils.cache import TTLCache
+from server.utils.places import canonical_place
+
+try:
+    from server.utils.config import (
+        LOCATION_CACHE_MAX,
+        LOCATION_CACHE_TTL_HOURS,
+        LOCATION_CACHE_POPULAR_PATH,
+    )
+except Exception:
+    LOCATION_CACHE_MAX = int(os.getenv('LOCATION_CACHE_MAX', '512'))
+    LOCATION_CACHE_TTL_HOURS = float(os.getenv('LOCATION_CACHE_TTL_HOURS', '24'))
+    LOCATION_CACHE_POPULAR_PATH = os.getenv('LOCATION_CACHE_POPULAR_PATH', os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'location_popular.json'))
+
+# where most of our traffic goes; used to pre-warm when no popularity data exists yet
+POPULAR_DESTINATIONS = (
+    "Kandy", "Galle", "Ella", "Sigiriya", "Nuwara Eliya", "Mirissa",
+    "Colombo", "Trincomalee", "Arugam Bay", "Yala", "Anuradhapura", "Jaffna",
+)
+
+_BUDGET_BUCKETS = (
+    ("low", ("low", "cheap", "budget", "backpack", "economy", "shoestring", "affordable")),
+    ("high", ("high", "luxury", "lux", "premium", "upscale", "5 star", "five star", "splurge")),
+    ("medium", ("medium", "mid", "moderate", "average", "standard", "normal")),
+)
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_POPULAR_SAVE_EVERY = 20
+_POPULAR_KEEP = 200
+
+_cache = TTLCache(
+    maxsize=LOCATION_CACHE_MAX,
+    ttl=LOCATION_CACHE_TTL_HOURS * 3600,
+    name="location",
+)
+_popular: Counter = Counter()
+_profiles: Dict[Tuple, dict] = {}
+_popular_lock = threading.Lock()
+_misses_since_save = 0
+
+
+def _field(state: Any, name: str, default: Any = None) -> Any:
+    if state is None:
+        return default
+    if isinstance(state, dict):
+        return state.get(name, default)
+    return getattr(state, name, default)
+
+
+def _as_date(value) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(str(value or "")[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def _norm_word(w: str) -> str:
+    # cheap singularization so "beaches"/"beach" and "temples"/"temple" share a key
+    if len(w) > 4 and w.endswith("ies"):
+        return w[:-3] + "y"
+    if len(w) > 4 and w.endswith(("ches", "shes", "sses")):
+        return w[:-2]
+    if len(w) > 3 and w.endswith("s") and not w.endswith("ss"):
+        return w[:-1]
+    return w
+
+
+def preference_tags(prefs: Any) -> Tuple[str, ...]:
+    if isinstance(prefs, str):
+        prefs = re.split(r"[,;/]| and ", prefs)
+    tags = set()
+    for p in prefs or []:
+        words = [_norm_word(w) for w in _WORD_RE.findall(str(p).lower())]
+        if words:
+            tags.add(" ".join(words))
+    return tuple(sorted(tags))
+
+
+def budget_bucket(budget: Any) -> str:
+    b = str(budget or "").strip().lower()
+    for bucket, words in _BUDGET_BUCKETS:
+        if any(w in b for w in words):
+            return bucket
+    return "any"
+
+
+def _travel_months(start, end) -> Optional[Tuple[int, ...]]:
+    s, e = _as_date(start), _as_date(end)
+    if s is None:
+        return None
+    e = e if e and e >= s else s
+    months, y, m = [], s.year, s.month
+    while (y, m) <= (e.year, e.month) and len(months) < 12:
+        months.append(m)
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return tuple(months)
+
+
+def _travelers(value: Any) -> Any:
+    try:
+        return int(value) if value not in (None, "") else "any"
+    except (TypeError, ValueError):
+        return "any"
+
+
+def recommendation_key(state: Any) -> Optional[Tuple]:
+    """Canonical cache key for a trip profile, or None if there is no destination."""
+    dest_raw = str(_field(state, "destination", "") or "").strip()
+    if not dest_raw:
+        return None
+    destination = canonical_place(dest_raw) or " ".join(_WORD_RE.findall(dest_raw.lower()))
+    when = _travel_months(_field(state, "start_date"), _field(state, "end_date"))
+    if when is None:
+        when = (str(_field(state, "season", "") or "").strip().lower() or "any",)
+    return (
+        destination,
+        when,
+        preference_tags(_field(state, "user_preferences", [])),
+        str(_field(state, "type_of_trip", "") or "").strip().lower() or "any",
+        budget_bucket(_field(state, "budget")),
+        _travelers(_field(state, "no_of_traveler")),
+    )
+
+
+def get(state: Any) -> Optional[dict]:
+    key = recommendation_key(state)
+    if key is None:
+        return None
+    hit = _cache.get(key)
+    if hit is None:
+        _note_miss(key, state)
+        return None
+    return copy.deepcopy(hit)
+
+
+def peek(state: Any) -> Optional[dict]:
+    """Like get() but without counting a hit or miss or noting a popular profile (for pre-warming)."""
+    key = recommendation_key(state)
+    hit = _cache.peek(key) if key is not None else None
+    return copy.deepcopy(hit) if hit is not None else None
+
+
+def put(state: Any, response: dict) -> None:
+    """Cache a response; only complete answers with recommendations are kept."""
+    key = recommendation_key(state)
+    if key is None or not isinstance(response, dict):
+        return
+    if response.get("status") != "complete" or not response.get("recommended_locations"):
+        return
+    _cache.set(key, copy.deepcopy(response))
+
+
+def stats() -> dict:
+    return _cache.stats()
+
+
+# --- popularity + pre-warming -------------------------------------------------
+
+def _profile(state: Any) -> dict:
+    fields = ("destination", "start_date", "end_date", "season", "user_preferences", "type_of_trip", "budget",
+              "no_of_traveler")
+    return {f: _field(state, f) for f in fields}
+
+
+def _note_miss(key: Tuple, state: Any) -> None:
+    global _misses_since_save
+    with _popular_lock:
+        _popular[key] += 1
+        _profiles.setdefault(key, _profile(state))
+        _misses_since_save += 1
+        save = _misses_since_save >= _POPULAR_SAVE_EVERY
+        if save:
+            _misses_since_save = 0
+    if save:
+        save_popular()
+
+
+def popular_profiles(n: int = 12) -> List[dict]:
+    with _popular_lock:
+        return [_profiles[k] for k, _ in _popular.most_common(n) if k in _profiles]
+
+
+def save_popular(path: str = LOCATION_CACHE_POPULAR_PATH) -> None:
+    with _popular_lock:
+        rows = [{"count": c, "profile": _profiles[k]} for k, c in _popular.most_common(_POPULAR_KEEP) if k in _profiles]
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, default=str)
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"[LocationCache] Could not save popular profiles: {e}")
+
+
+def load_popular(path: str = LOCATION_CACHE_POPULAR_PATH) -> int:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            rows = json.load(f)
+    except FileNotFoundError:
+        return 0
+    except Exception as e:
+        print(f"[LocationCache] Could not read popular profiles: {e}")
+        return 0
+    with _popular_lock:
+        for row in rows:
+            profile = row.get("profile") or {}
+            key = recommendation_key(profile)
+            if key is not None:
+                _popular[key] += int(row.get("count", 1))
+                _profiles.setdefault(key, profile)
+    return len(rows)
+
+
+def _shift_to_upcoming(profile: dict) -> dict:
+    """Move a remembered profile's dates to the same month this or next year."""
+    p = dict(profile)
+    s, e = _as_date(p.get("start_date")), _as_date(p.get("end_date"))
+    if s is None:
+        return p
+    today = date.today()
+    year = today.year if (s.month, s.day) >= (today.month, today.day) else today.year + 1
+    try:
+        ns = s.replace(year=year)
+        p["start_date"] = ns.isoformat()
+        if e is not None:
+            p["end_date"] = (ns + (e - s)).isoformat()
+    except ValueError:
+        pass
+    return p
+
+
+def default_prewarm_profiles(top: int = 12) -> List[dict]:
+    profiles = [_shift_to_upcoming(p) for p in popular_profiles(top)]
+    if len(profiles) < top:
+        start = date.today().replace(day=1)
+        for dest in POPULAR_DESTINATIONS[: top - len(profiles)]:
+            profiles.append({"destination": dest, "start_date": start.isoformat(), "end_date": start.isoformat(),
+                             "user_preferences": [], "type_of_trip": None, "budget": "medium", "no_of_traveler": 2})
+    return profiles
+
+
+def prewarm(run: Callable[[dict], dict], profiles: Optional[Iterable[dict]] = None, max_workers: int = 2) -> int:
+    """
+    Fill the cache for `profiles` (default: remembered popular ones, then the
+    top destinations for this month) by calling `run(profile)` for each key
+    not already cached. Returns the number of keys filled.
+    """
+    if profiles is None:
+        load_popular()
+        profiles = default_prewarm_profiles()
+    todo = []
+    seen = set()
+    for p in profiles:
+        key = recommendation_key(p)
+        if key is None or key in seen or key in _cache:
+            continue
+        seen.add(key)
+        todo.append(p)
+    if not todo:
+        return 0
+
+    def one(profile: dict) -> bool:
+        try:
+            out = run(profile)
+            return recommendation_key(profile) in _cache or bool(out and out.get("recommended_locations"))
+        except Exception as e:
+            print(f"[LocationCache] Pre-warm failed for {profile.get('destination')}: {e}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        filled = sum(pool.map(one, todo))
+    print(f"[LocationCache] Pre-warmed {filled}/{len(todo)} location profiles.")
+    return filled
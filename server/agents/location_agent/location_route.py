@@ -0,0 +1,60 @@
+# server/agents/location_agent/location_route.py
+"""
+Visiting order for location recommendations.
+
+Gemini lists places in whatever order it likes, which can send travellers
+back and forth across the island. order_recommendations() reorders
+"recommended_locations" into a driving route from the trip's destination
+(nearest-neighbour + 2-opt over the geo travel-time matrix, see
+server/utils/routing.py) and adds a "route" block with per-day clusters:
+
+    "route": {"days": [{"day": 1, "locations": [...]}, ...],
+              "legs_minutes": [...], "total_drive_minutes": 312.5,
+              "unlocated": [...]}
+
+Places that cannot be located keep their relative order at the end.
+"""
+
+import copy
+from datetime import datetime
+from typing import Any, Optional
+
+from server.utils.routing import plan_route
+
+
+def _trip_days(start_date: Any, end_date: Any) -> int:
+    try:
+        s = datetime.strptime(str(start_date)[:10], "%Y-%m-%d")
+        e = datetime.strptime(str(end_date)[:10], "%Y-%m-%d")
+    except (TypeError, ValueError):
+        return 1
+    return max(1, min(30, (e - s).days + 1))
+
+
+def order_recommendations(response: Optional[dict], destination: Optional[str] = None,
+                          start_date: Any = None, end_date: Any = None) -> Optional[dict]:
+    """A copy of `response` with recommended_locations in route order plus a "route" block."""
+    if not isinstance(response, dict):
+        return response
+    recs = [r for r in response.get("recommended_locations") or [] if isinstance(r, dict)]
+    if len(recs) < 2:
+        return response
+    names = [str(r.get("name") or "") for r in recs]
+    try:
+        route = plan_route(names, start=destination or None, n_days=_trip_days(start_date, end_date))
+    except Exception as e:
+        print(f"[LocationRoute] Could not order locations: {e}")
+        return response
+    if len(route["unlocated"]) >= len(recs) - 1:
+        # nothing (or one place) to order; leave the model's order alone
+        return response
+
+    out = copy.copy(response)
+    out["recommended_locations"] = [recs[i] for i in route["order"]]
+    out["route"] = {
+        "days": [{"day": n, "locations": [names[i] for i in day]} for n, day in enumerate(route["days"], 1)],
+        "legs_minutes": route["legs_minutes"],
+        "total_drive_minutes": route["total_minutes"],
+        "unlocated": [names[i] for i in route["unlocated"]],
+    }
+    return out
@@ -10,7 +10,7 @@ from langchain.chains import LLMChain
 
 # Local Imports
 # Assuming your config file has OPENAI_API_KEY and OPENAI_MODEL
-from server.utils.config import OPENAI_API_KEY, OPENAI_MODEL
+from server.utils.config import OPENAI_API_KEY, OPENAI_MODEL, LLM_TIMEOUT_SECONDS, LLM_MAX_RETRIES
 from server.utils.text_security import sanitize_input
 from server.schemas.orchestrator_schemas import (
     OrchestratorAgent4OutputSchema,
@@ -28,7 +28,8 @@ from server.agents.orchestrator_agent.orchestrator_utils import (
 # --- 1. INITIALIZATION ---
 
 # NOTE: Replace with your actual LLM initialization logic if different
-llm = ChatOpenAI(api_key=OPENAI_API_KEY, model=OPENAI_MODEL, temperature=0.3)
+llm = ChatOpenAI(api_key=OPENAI_API_KEY, model=OPENAI_MODEL, temperature=0.3,
+                 timeout=LLM_TIMEOUT_SECONDS, max_retries=LLM_MAX_RETRIES)
 parser = PydanticOutputParser(pydantic_object=OrchestratorExtractionSchema)
 
 # --- 2. EXTRACTION PROMPT & AGENT ---
@@ -123,7 +124,7 @@ def run_llm_agent(
         chat_history = []
 
     # === SANITIZE INPUT IS HERE ===
-    sanitized_query = sanitize_input(state.query)
+    sanitized_query = sanitize_input(state.query, session_id=state.session_id)
 
     if sanitized_query == "LONG_INPUT_STORED":
         # Cannot extract structured data from a long text flag.
@@ -195,7 +196,7 @@ def call_orchestrator_agent(
 
     # Keep a sanitized copy of the original user input so follow-up validations
     # can re-parse previously-provided information (like trip_duration).
-    sanitized_query = sanitize_input(state.query)
+    sanitized_query = sanitize_input(state.query, session_id=state.session_id)
 
     # Initialize json_response based on previous state or new run
     if prev_json_response:
@@ -1,14 +1,15 @@
 import os, json
 from openai import OpenAI
 
-from server.utils.config import OPENAI_API_KEY, OPENAI_MODEL
+from server.utils.config import OPENAI_API_KEY, OPENAI_MODEL, LLM_MAX_RETRIES
+from server.utils.deadline import llm_timeout
 
 def call_chat_completion(messages, model=None, temperature=0.3, max_tokens=600):
     """
     
     Thin wrapper around OpenAI Chat Completions for portability.
     """
-    client = OpenAI(api_key=OPENAI_API_KEY)
+    client = OpenAI(api_key=OPENAI_API_KEY, timeout=llm_timeout(), max_retries=LLM_MAX_RETRIES)
     model = OPENAI_MODEL
 
     resp = client.chat.completions.create(
@@ -91,16 +91,26 @@
 
 # server/agents/packing_agent/packing_agent.py
 
+import copy
 import json
+import os
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Union
-import bleach
-
-from .prompt import SYSTEM_PROMPT, build_user_prompt
+from .prompt import DELTA_SYSTEM_PROMPT, build_delta_prompt
 from .openai_client import call_chat_completion
-from .rules import rule_based_pack, fairness_sort
+from . import packing_cache
+from .quantities import apply_quantities
+from .rules import OPTIONAL, normalize, rule_based_pack, fairness_sort
 
 from server.schemas.global_schema import TravelState, PackingOutput
+from server.utils.climate import trip_climate
+from server.utils.places import region_for
+from server.utils.sanitizer import clean_html
+
+try:
+    from server.utils.config import PACKING_LLM_EXTRAS
+except Exception:
+    PACKING_LLM_EXTRAS = int(os.getenv('PACKING_LLM_EXTRAS', '5'))
 
 
 def sanitize(value: Any, max_len: int = 300) -> str:
@@ -109,19 +119,10 @@ def sanitize(value: Any, max_len: int = 300) -> str:
     - None -> ''
     - dict/list -> JSON string
     - other types -> str(...)
-    Then run bleach.clean on the resulting text and truncate to max_len.
+    Then run bleach.clean on the resulting text and truncate to max_len
+    (memoized; plain text skips bleach, see server.utils.sanitizer).
     """
-    if value is None:
-        text = ""
-    elif isinstance(value, (dict, list)):
-        try:
-            text = json.dumps(value, ensure_ascii=False)
-        except Exception:
-            text = str(value)
-    else:
-        text = str(value)
-    cleaned = bleach.clean(text, strip=True)
-    return cleaned[:max_len]
+    return clean_html(value, max_len=max_len)
 
 
 def days_between(start: Optional[str], end: Optional[str]) -> int:
@@ -154,6 +155,11 @@ def to_model_payload(state_input: Dict[str, Any], suggested_activities: Optional
         "user_preferences": [sanitize(x) for x in (state_input.get("user_preferences") or [])],
         "suggest_locations": [sanitize(x) for x in (state_input.get("locations_to_visit") or state_input.get("suggest_locations") or [])],
         "suggested_activities": [sanitize(x) for x in (suggested or [])],
+        "climate": trip_climate(
+            state_input.get("destination") or state_input.get("location"),
+            state_input.get("start_date"),
+            state_input.get("end_date"),
+        ),
     }
 
 
@@ -172,6 +178,47 @@ def parse_strict_json(s: str) -> Optional[Dict[str, Any]]:
         return None
 
 
+def _llm_extras(payload: Dict[str, Any], packed: Dict[str, Any], max_items: int) -> Optional[Dict[str, Any]]:
+    """Ask the LLM for up to `max_items` items missing from the rule-based list."""
+    names = [it["name"] for cat in packed["categories"] for it in cat["items"]]
+    messages = [
+        {"role": "system", "content": DELTA_SYSTEM_PROMPT},
+        {"role": "user", "content": build_delta_prompt(payload, names, max_items)},
+    ]
+    raw = call_chat_completion(messages, max_tokens=60 * max_items + 80)
+    cand = parse_strict_json(raw or "")
+    return cand if isinstance(cand, dict) else None
+
+
+def merge_extras(packed: Dict[str, Any], extras: Optional[Dict[str, Any]], max_items: int) -> int:
+    """Add LLM extras to `packed` in place: new names only, known categories, at most max_items. Returns count."""
+    if not extras:
+        return 0
+    by_name = {cat["name"]: cat for cat in packed["categories"]}
+    seen = {normalize(it["name"]) for cat in packed["categories"] for it in cat["items"]}
+    added = 0
+    for item in extras.get("items") or []:
+        if added >= max_items:
+            break
+        if not isinstance(item, dict):
+            continue
+        name = sanitize(item.get("name"), max_len=80).strip()
+        if not name or normalize(name) in seen:
+            continue
+        category = item.get("category") if item.get("category") in by_name else OPTIONAL
+        reason = sanitize(item.get("reason"), max_len=160) or None
+        by_name[category]["items"].append({"name": name, "reason": reason})
+        # remembered so a cached list can be rebuilt for another traveler count without the LLM
+        packed.setdefault("llm_items", []).append({"category": category, "name": name, "reason": reason})
+        seen.add(normalize(name))
+        added += 1
+    for note in (extras.get("notes") or [])[:2]:
+        note = sanitize(note, max_len=200).strip()
+        if note and note not in packed["notes"]:
+            packed["notes"].append(note)
+    return added
+
+
 def generate_packing_list(
     state_input: Union[Dict[str, Any], TravelState],
     suggested_activities: Optional[List[Any]] = None,
@@ -182,8 +229,11 @@ def generate_packing_list(
     Returns a plain dict (compatible with callers that use .get()).
 
     - Normalizes input from TravelState fields.
-    - If use_llm=True and an LLM response parsable to the expected schema is available, use it.
-    - Otherwise fall back to deterministic rule_based_pack and apply fairness_sort.
+    - Builds the list from the indexed rule tables (season/climate, region,
+      activity tags, trip type, traveler count, duration).
+    - If use_llm=True and PACKING_LLM_EXTRAS > 0, asks the LLM for a few
+      missing items on top; a failed or empty answer just keeps the rule list.
+    - Applies fairness_sort.
     """
     # Normalize incoming state to a dict
     if isinstance(state_input, TravelState):
@@ -194,36 +244,65 @@ def generate_packing_list(
         raise TypeError("state_input must be TravelState or dict")
 
     payload = to_model_payload(state_dict, suggested_activities)
+    climate = payload.get("climate") or {}
+    profile = dict(
+        season=payload["season"],
+        activities=payload["suggested_activities"] + payload["user_preferences"],
+        climate=climate,
+        region=climate.get("region") or region_for(payload["location"]),
+        type_of_trip=payload["type_of_trip"],
+        no_of_traveler=payload["no_of_traveler"],
+        duration_days=payload["duration_days"],
+    )
+    with_llm = use_llm and PACKING_LLM_EXTRAS > 0
 
-    llm_result: Optional[Dict[str, Any]] = None
-    if use_llm:
+    # Only the LLM path is worth caching; the rule list alone takes microseconds
+    key = packing_cache.packing_key(**profile) if with_llm else None
+    if key is not None:
+        cached = packing_cache.get(key)
+        if cached is not None:
+            print(f"DEBUG: Packing cache hit ({packing_cache.stats()['hit_rate']:.0%} hit rate)")
+            return _for_trip(cached, payload)
+
+    packed = rule_based_pack(**profile)
+
+    llm_ok = False
+    sibling = packing_cache.get_sibling(key) if key is not None else None
+    if sibling is not None:
+        # same trip apart from the group size: reuse that list's LLM extras on the new rule list
+        merge_extras(packed, {"items": sibling.get("llm_items") or []}, PACKING_LLM_EXTRAS)
+        llm_ok = True
+    elif with_llm:
         try:
-            messages = [
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": build_user_prompt(payload)},
-            ]
-            raw = call_chat_completion(messages)
-            cand = parse_strict_json(raw or "")
-            if cand and "categories" in cand:
-                llm_result = cand
-        except Exception:
-            llm_result = None
-
-    if not llm_result:
-        # Deterministic fallback
-        rb = rule_based_pack(payload["season"], payload["suggested_activities"])
-        rb["duration_days"] = payload["duration_days"]
-        rb["categories"] = fairness_sort(rb.get("categories", []))
-        # Return a dict for compatibility with graph_builder and other callers
-        return PackingOutput(**rb).dict()
-
-    # Normalize LLM output and apply fairness sorting
-    llm_result["duration_days"] = payload["duration_days"]
-    llm_result["categories"] = fairness_sort(llm_result.get("categories", []))
-    if "notes" not in llm_result:
-        llm_result["notes"] = []
-
-    print(f"\nDEBUG: Packing LLM output:\n{json.dumps(llm_result, indent=2, ensure_ascii=False)}\n")
+            added = merge_extras(packed, _llm_extras(payload, packed, PACKING_LLM_EXTRAS), PACKING_LLM_EXTRAS)
+            print(f"DEBUG: Packing LLM added {added} item(s) to the rule-based list.")
+            llm_ok = True
+        except Exception as e:
+            print(f"DEBUG: Packing LLM extras skipped: {e}")
+
+    packed["categories"] = fairness_sort(packed.get("categories", []))
+    if llm_ok:
+        # failed calls are not cached, so the next trip with this profile tries the LLM again
+        packing_cache.put(key, packed)
+    return _for_trip(packed, payload)
+
 
+def _for_trip(packed: Dict[str, Any], payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply the per-trip fields (duration, quantities) to a (possibly cached) list and validate it."""
+    packed["duration_days"] = payload["duration_days"]
+    apply_quantities(packed, payload["no_of_traveler"], payload["duration_days"])
     # Return a dict for compatibility with graph_builder and other callers
-    return PackingOutput(**llm_result).dict()
\ No newline at end of file
+    return PackingOutput(**packed).dict()
+
+
+def requantify(packing: Dict[str, Any], no_of_traveler: Any = None, duration_days: Any = None) -> Dict[str, Any]:
+    """
+    Recompute quantities of an existing packing list for a new traveler count
+    and/or trip length; no rules or LLM involved.
+    """
+    packed = copy.deepcopy(packing) if isinstance(packing, dict) else packing.dict()
+    days = duration_days if duration_days is not None else packed.get("duration_days")
+    travelers = no_of_traveler if no_of_traveler is not None else packed.get("no_of_traveler")
+    packed["duration_days"] = days
+    apply_quantities(packed, travelers, days)
+    return PackingOutput(**packed).dict()
@@ -0,0 +1,140 @@
+# server/agents/packing_agent/packing_cache.py
+"""
+Cache for finished packing lists (rule list + LLM extras).
+
+Packing lists barely change between trips with the same weather, a similar
+activity mix and a similar length, so lists are cached under a normalized
+profile key:
+
+    (weather keys, region, sorted activity tags, duration bucket,
+     trip-type keys, traveler bucket)
+
+There are two tiers: an in-memory LRU with a TTL, and one JSON file per key
+under PACKING_CACHE_DIR that survives restarts (and is shared by workers)
+for PACKING_CACHE_PERSIST_DAYS. Anything trip-specific (duration_days,
+quantities) is applied by the caller after a hit, and get_sibling() lets a
+profile that differs only in group size reuse another entry's LLM extras.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from server.utils.cache import TTLCache
+from .rules import climate_weather_keys, duration_bucket, infer_activity_tags, traveler_bucket, trip_type_keys
+
+try:
+    from server.utils.config import (
+        PACKING_CACHE_MAX,
+        PACKING_CACHE_TTL_HOURS,
+        PACKING_CACHE_DIR,
+        PACKING_CACHE_PERSIST_DAYS,
+    )
+except Exception:
+    PACKING_CACHE_MAX = int(os.getenv('PACKING_CACHE_MAX', '256'))
+    PACKING_CACHE_TTL_HOURS = float(os.getenv('PACKING_CACHE_TTL_HOURS', '24'))
+    PACKING_CACHE_DIR = os.getenv('PACKING_CACHE_DIR', os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'packing_cache'))
+    PACKING_CACHE_PERSIST_DAYS = float(os.getenv('PACKING_CACHE_PERSIST_DAYS', '30'))
+
+_memory = TTLCache(
+    maxsize=PACKING_CACHE_MAX,
+    ttl=PACKING_CACHE_TTL_HOURS * 3600,
+    name="packing",
+)
+
+
+def packing_key(
+    season: str,
+    activities: List[str],
+    climate: Optional[Dict[str, Any]] = None,
+    region: Optional[str] = None,
+    type_of_trip: Optional[str] = None,
+    no_of_traveler: Any = 1,
+    duration_days: Any = None,
+) -> Tuple:
+    """Canonical cache key for a packing profile (same inputs as rules.rule_based_pack)."""
+    return (
+        tuple(sorted(climate_weather_keys(season, climate))),
+        region or (climate or {}).get("region") or "",
+        tuple(sorted(infer_activity_tags(activities))),
+        duration_bucket(duration_days),
+        tuple(sorted(trip_type_keys(type_of_trip))),
+        traveler_bucket(no_of_traveler),
+    )
+
+
+def _digest(key: Tuple) -> str:
+    return hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+
+
+def _path(digest: str) -> str:
+    return os.path.join(PACKING_CACHE_DIR, digest[:2], f"{digest}.json")
+
+
+def _read_disk(key: Tuple) -> Optional[dict]:
+    path = _path(_digest(key))
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            row = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"[PackingCache] Could not read {path}: {e}")
+        return None
+    if time.time() - float(row.get("stored_at", 0)) > PACKING_CACHE_PERSIST_DAYS * 86400:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+    return row.get("packing")
+
+
+def _write_disk(key: Tuple, packing: dict) -> None:
+    path = _path(_digest(key))
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "stored_at": time.time(), "packing": packing}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"[PackingCache] Could not write {path}: {e}")
+
+
+def get(key: Tuple) -> Optional[dict]:
+    """A private copy of the cached list for `key`, from memory or disk, or None."""
+    hit = _memory.get(key)
+    if hit is None:
+        hit = _read_disk(key)
+        if hit is None:
+            return None
+        _memory.set(key, hit)
+    return copy.deepcopy(hit)
+
+
+def get_sibling(key: Tuple) -> Optional[dict]:
+    """A cached list for the same profile with a different traveler bucket, or None."""
+    for bucket in ("solo", "pair", "group", "large_group"):
+        if bucket != key[-1]:
+            hit = get(key[:-1] + (bucket,))
+            if hit is not None:
+                return hit
+    return None
+
+
+def put(key: Tuple, packing: dict) -> None:
+    if not isinstance(packing, dict) or not packing.get("categories"):
+        return
+    packing = copy.deepcopy(packing)
+    _memory.set(key, packing)
+    _write_disk(key, packing)
+
+
+def stats() -> dict:
+    return _memory.stats()
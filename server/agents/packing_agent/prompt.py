@@ -54,3 +54,28 @@ def build_user_prompt(payload: dict) -> str:
         + str(payload)
         + "\nGenerate the packing JSON as specified in the system message."
     )
+
+
+DELTA_SYSTEM_PROMPT = """You are PackingPro, a careful travel-packing assistant.
+A deterministic packing list has already been built for this trip. Suggest ONLY items that are
+missing from it and specific to this trip (destination, dates, activities, travelers). Do not repeat
+or rename items already on the list. Be budget-conscious, safe and respectful of local dress codes.
+
+OUTPUT FORMAT (MUST BE STRICT JSON):
+{
+  "items": [{"category": "Activity-specific", "name": "Leech socks", "reason": "Wet rainforest trails"}],
+  "notes": ["optional short tip"]
+}
+"category" must be one of: Essentials, Weather-specific, Activity-specific, Documents & Safety,
+Optional nice-to-have. Return ONLY the JSON object. Never include markdown, code fences, or commentary.
+"""
+
+
+def build_delta_prompt(payload: dict, packed: list, max_items: int) -> str:
+    return (
+        "Consider this trip request JSON:\n"
+        + str(payload)
+        + "\nAlready packed:\n"
+        + str(packed)
+        + f"\nSuggest at most {max_items} additional items as specified in the system message."
+    )
@@ -0,0 +1,122 @@
+# server/agents/packing_agent/quantities.py
+"""
+Per-traveler, per-day quantities for packing items.
+
+Every item name is matched once (memoized) against QUANTITY_RULES to get a
+rate row, and the quantities of a whole list are then computed in one numpy
+pass:
+
+    unit     = ceil(fixed + per_day * days')
+    quantity = unit                      (share 0: one lot for the group)
+             = unit * travelers          (share 1: each traveler)
+             = ceil(unit * travelers / share)
+
+where days' is the trip length, capped at PACKING_LAUNDRY_CYCLE_DAYS for
+clothing that can be washed and consumables that are easy to restock. The
+stage is deterministic and cheap, so it runs after the rule path, the LLM
+path and cache hits alike, and a change in traveler count or trip length
+only needs a re-run of this stage.
+"""
+
+import math
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from server.utils.config import PACKING_LAUNDRY_CYCLE_DAYS
+except Exception:
+    PACKING_LAUNDRY_CYCLE_DAYS = int(os.getenv('PACKING_LAUNDRY_CYCLE_DAYS', '7'))
+
+# anything not matched below: one per traveler (passports, shoes, hats, chargers...)
+DEFAULT_RATE = (1, 0, False, 1)
+GROUP_RATE = (1, 0, False, 0)
+
+# pattern -> (fixed, per_day, capped, share); first match wins
+#   fixed/per_day: units per person (or per sharing group); capped: per_day stops at the
+#   laundry/restock cycle; share: travelers per unit (1 = each, 2 = one per two, 0 = one for the group)
+QUANTITY_RULES: List[Tuple[str, Tuple[float, float, bool, int]]] = [
+    (r"shared expense|copies of everyone|group first-aid|insurance details", GROUP_RATE),
+    (r"leech socks|socks for|shawl|sarong", DEFAULT_RATE),
+    (r"underwear|socks", (1, 1, True, 1)),
+    (r"t-?shirt|cotton clothes|\bclothes\b|\btops?\b", (0, 1, True, 1)),
+    (r"shorts|trousers|pants|modest attire", (1, 1 / 4, True, 1)),
+    (r"swim|rash guard", (1, 1 / 4, True, 1)),
+    (r"sunscreen|repellent|after-?sun", (0, 1 / 14, False, 1)),
+    (r"electrolyte", (0, 1, True, 1)),
+    (r"snack", (1, 1 / 2, True, 0)),
+    (r"wet wipes|tissues", (1, 1 / 4, True, 0)),
+    (r"laundry soap|detergent", (0, 1 / 10, False, 0)),
+    (r"first-?aid|basic meds|medication|prescriptions|seasickness|motion-sickness", GROUP_RATE),
+    (r"adapter|multi-port|power strip", (1, 0, False, 2)),
+    (r"umbrella|raincoat|rain jacket", DEFAULT_RATE),
+    (r"binoculars|dry bag|padlock|guidebook|book|e-reader|packing cubes", (1, 0, False, 2)),
+    (r"mask|buff", (1, 1 / 7, False, 1)),
+]
+_QUANTITY_RES = [(re.compile(rx, re.IGNORECASE), row) for rx, row in QUANTITY_RULES]
+
+
+@lru_cache(maxsize=1024)
+def rate_for(name: str) -> Tuple[float, float, bool, int]:
+    for rx, row in _QUANTITY_RES:
+        if rx.search(name or ""):
+            return row
+    return DEFAULT_RATE
+
+
+def compute_quantities(names: List[str], no_of_traveler: Any = 1, duration_days: Any = 1,
+                       laundry_cycle_days: Optional[int] = None) -> Tuple[List[int], List[str]]:
+    """Quantities and short notes for `names`, in order."""
+    if not names:
+        return [], []
+    travelers = max(1, _as_int(no_of_traveler, 1))
+    days = max(1, _as_int(duration_days, 1))
+    cycle = max(1, laundry_cycle_days or PACKING_LAUNDRY_CYCLE_DAYS)
+
+    rows = [rate_for(n) for n in names]
+    fixed = np.fromiter((r[0] for r in rows), dtype=float, count=len(rows))
+    per_day = np.fromiter((r[1] for r in rows), dtype=float, count=len(rows))
+    capped = np.fromiter((r[2] for r in rows), dtype=bool, count=len(rows))
+    share = np.fromiter((r[3] for r in rows), dtype=int, count=len(rows))
+
+    eff_days = np.where(capped, min(days, cycle), days)
+    unit = np.maximum(np.ceil(fixed + per_day * eff_days - 1e-9), 1)
+    qty = np.where(share == 0, unit, np.ceil(unit * travelers / np.maximum(share, 1) - 1e-9)).astype(int)
+
+    notes = []
+    for (_, _, cap, sh), u in zip(rows, unit.astype(int).tolist()):
+        if sh == 0:
+            note = "for the group"
+        elif sh == 1:
+            note = f"{u} each" if travelers > 1 else ""
+        else:
+            note = f"one per {sh} travelers"
+        if cap and days > cycle:
+            note = "; ".join(filter(None, (note, f"wash or restock every {cycle} days")))
+        notes.append(note)
+    return qty.tolist(), notes
+
+
+def apply_quantities(packing: Dict[str, Any], no_of_traveler: Any = 1, duration_days: Any = 1) -> Dict[str, Any]:
+    """Set "quantity"/"quantity_note" on every item of a packing dict, in place; returns it."""
+    items = [it for cat in packing.get("categories", []) or [] for it in cat.get("items", []) or []
+             if isinstance(it, dict)]
+    qty, notes = compute_quantities([str(it.get("name") or "") for it in items], no_of_traveler, duration_days)
+    for it, q, note in zip(items, qty, notes):
+        it["quantity"] = q
+        it["quantity_note"] = note or None
+    packing["no_of_traveler"] = max(1, _as_int(no_of_traveler, 1))
+    return packing
+
+
+def _as_int(value: Any, default: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            return int(math.ceil(float(value)))
+        except (TypeError, ValueError):
+            return default
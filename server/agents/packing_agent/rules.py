@@ -1,6 +1,28 @@
-from typing import List, Dict, Any, Tuple
+import re
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 
-# Deterministic rules to ensure you can demo without LLM (or to post-process LLM output)
+# Deterministic packing rules. This is the primary packing path: every rule
+# table below is keyed by one trip fact (weather key, region, activity tag,
+# trip type, traveler bucket, duration bucket) and compiled at import into a
+# single (dimension, key) -> item ids index, so a packing list is a handful
+# of dict lookups. The LLM only ever adds a small delta on top.
+
+CATEGORIES = (
+    "Essentials",
+    "Weather-specific",
+    "Activity-specific",
+    "Documents & Safety",
+    "Optional nice-to-have",
+)
+ESSENTIALS, WEATHER, ACTIVITY, DOCS, OPTIONAL = CATEGORIES
+
+ALWAYS = [
+    (ESSENTIALS, "Toothbrush & toiletries", "Daily hygiene"),
+    (ESSENTIALS, "Phone charger & power bank", "Battery for maps/photos"),
+    (ESSENTIALS, "Insect repellent", "Mosquitoes are common island-wide"),
+    (ESSENTIALS, "Universal plug adapter (Type D/G)", "Sri Lankan sockets differ from most countries"),
+    (OPTIONAL, "Travel pillow", "Comfort on buses"),
+]
 
 WEATHER_RULES = {
     "summer": [
@@ -11,17 +33,48 @@ WEATHER_RULES = {
     "monsoon": [
         ("Umbrella/Raincoat", "Frequent showers"),
         ("Quick-dry shoes", "Wet conditions"),
+        ("Dry bag / zip pouches", "Keep phone and documents dry"),
     ],
     "winter": [
         ("Warm jacket", "Low night temperatures"),
         ("Scarf/Gloves", "Wind chill protection"),
     ]
 }
+
+REGION_RULES = {
+    "hill": [
+        (WEATHER, "Light fleece or sweater", "Hill-country mornings and evenings are cool"),
+        (ESSENTIALS, "Motion-sickness tablets", "Winding mountain roads and trains"),
+    ],
+    "west_south": [
+        (WEATHER, "Sunglasses", "Glare on the coast"),
+    ],
+    "east": [
+        (WEATHER, "Sunglasses", "Glare on the coast"),
+    ],
+    "deep_south": [
+        (WEATHER, "Sunglasses", "Strong sun in the dry zone"),
+        (ESSENTIALS, "Electrolyte sachets", "Hot, dry days on safari roads"),
+    ],
+    "cultural_triangle": [
+        (ESSENTIALS, "Electrolyte sachets", "Hot, dry days climbing rock sites"),
+        (ACTIVITY, "Socks for temple floors", "Stone floors get very hot barefoot"),
+    ],
+    "north": [
+        (ESSENTIALS, "Electrolyte sachets", "Hot, dry climate in the north"),
+        (DOCS, "Cash in small notes", "Fewer ATMs and card machines outside Jaffna town"),
+    ],
+    "north_west": [
+        (WEATHER, "Sunglasses", "Glare on lagoons and beaches"),
+    ],
+}
+
 ACTIVITY_RULES = {
     "hiking": [
         ("Hiking shoes", "Grip on trails"),
         ("Water bottle (1L)", "Hydration during activity"),
         ("Small first-aid kit", "Minor injuries on trails"),
+        ("Leech socks", "Leeches on wet-zone trails"),
     ],
     "temple": [
         ("Modest attire", "Dress code for sacred sites"),
@@ -30,39 +83,223 @@ ACTIVITY_RULES = {
     "beach": [
         ("Swimwear", "Water activities"),
         ("Microfiber towel", "Quick drying"),
+        ("Reef-safe sunscreen", "Protects skin and coral"),
+        ("Flip-flops", "Beach and shower wear"),
+    ],
+    "safari": [
+        ("Binoculars", "Spotting wildlife at a distance"),
+        ("Neutral-coloured clothing", "Less likely to disturb animals"),
+        ("Dust mask/buff", "Dusty jeep tracks"),
+    ],
+    "water_sports": [
+        ("Rash guard", "Sun and board protection in the water"),
+        ("Waterproof phone pouch", "Photos on boats and in the surf"),
+    ],
+    "whale_watching": [
+        ("Seasickness tablets", "Open-sea boat trips can be rough"),
+        ("Windbreaker", "Spray and wind on deck"),
+    ],
+    "tea_country": [
+        ("Light rain jacket", "Sudden showers in tea country"),
+        ("Comfortable walking shoes", "Estate paths and factory tours"),
+    ],
+    "city": [
+        ("Anti-theft day bag", "Crowded markets and buses"),
+        ("Comfortable walking shoes", "Exploring on foot"),
+    ],
+    "train": [
+        ("Snacks for the journey", "Long scenic train rides have few food stops"),
+    ],
+}
+
+TRIP_TYPE_RULES = {
+    "family": [
+        (ESSENTIALS, "Kids' sunscreen & hats", "Children burn quickly in tropical sun"),
+        (ESSENTIALS, "Snacks and wet wipes", "Long drives with kids"),
+        (DOCS, "Children's medication and dosage card", "Pharmacies may stock different brands"),
+    ],
+    "adventure": [
+        (ACTIVITY, "Headlamp", "Pre-dawn hikes and power cuts"),
+        (ACTIVITY, "Daypack (20-30L)", "Carry water and layers on outings"),
+    ],
+    "business": [
+        (ESSENTIALS, "Smart-casual outfit", "Meetings and dinners"),
+        (DOCS, "Business cards / invitation letter", "Business visa and meetings"),
+    ],
+    "romantic": [
+        (OPTIONAL, "Evening outfit", "Dinners at beach or hill-country hotels"),
+    ],
+    "backpacking": [
+        (ESSENTIALS, "Padlock", "Hostel lockers"),
+        (ESSENTIALS, "Quick-dry travel towel", "Not all guesthouses provide one"),
+    ],
+    "cultural": [
+        (ACTIVITY, "Modest attire", "Dress code for sacred sites"),
+        (ACTIVITY, "Socks for temple floors", "Stone floors get very hot barefoot"),
+    ],
+    "relaxation": [
+        (OPTIONAL, "Book or e-reader", "Downtime by the pool or beach"),
+    ],
+}
+
+TRAVELER_RULES = {
+    "solo": [
+        (DOCS, "Emergency contact card", "Someone to call if you travel alone"),
+    ],
+    "pair": [],
+    "group": [
+        (ESSENTIALS, "Multi-port USB charger", "Fewer sockets than devices"),
+        (DOCS, "Shared expense app / cash envelope", "Splitting tuk-tuk and entrance fees"),
+    ],
+    "large_group": [
+        (ESSENTIALS, "Multi-port USB charger", "Fewer sockets than devices"),
+        (ESSENTIALS, "Group first-aid kit", "One well-stocked kit for everyone"),
+        (DOCS, "Copies of everyone's passports", "Group check-ins and permits"),
+    ],
+}
+
+DURATION_RULES = {
+    "short": [],
+    "week": [
+        (ESSENTIALS, "Travel laundry soap", "Wash a few items mid-trip"),
+    ],
+    "long": [
+        (ESSENTIALS, "Travel laundry soap", "Wash clothes as you go"),
+        (ESSENTIALS, "Refill prescriptions for the whole trip", "Brands differ locally"),
+        (OPTIONAL, "Packing cubes", "Keep a long trip's clothes organised"),
     ],
 }
 
 DOC_SAFETY = [
     ("ID/Passport", "ID verification at check-ins"),
     ("Basic meds", "Headache/cold relief"),
+    ("Visa / ETA confirmation", "Checked on arrival in Sri Lanka"),
+    ("Travel insurance details", "Medical cover and emergencies"),
+]
+
+# short tips keyed like the rules; shown once per list
+NOTE_RULES = {
+    ("weather", "monsoon"): "Expect afternoon showers; plan outdoor sights for the morning.",
+    ("tag", "temple"): "Shoulders and knees must be covered at temples; hats and shoes come off at the entrance.",
+    ("tag", "safari"): "Park jeeps leave before dawn; pack the night before.",
+    ("region", "hill"): "Hill-country nights can drop below 15°C; layers beat one heavy jacket.",
+    ("duration", "long"): "Plan a laundry stop every 5-7 days instead of packing more clothes.",
+}
+BASE_NOTES = [
+    "Prioritize essentials; add items based on final itinerary.",
+    "Check airline liquid limits and baggage policy.",
 ]
 
 LOW_COST_PRIORITY = ["water bottle", "umbrella", "hat", "shawl", "towel", "light", "scarf", "raincoat"]
 
+# activity/preference text -> tag; patterns are word-prefix matches
+TAG_PATTERNS = {
+    "hiking": r"hik|trail|trek|climb|rock\b|peak|summit",
+    "temple": r"temple|religious|shrine|monastery|stupa|dagoba|kovil|mosque|church|sacred|relic",
+    "beach": r"beach|coast|swim|seaside|lagoon|bay\b",
+    "safari": r"safari|national park|wildlife|elephant|leopard|bird ?watch",
+    "water_sports": r"surf|snorkel|div(e|ing)|kayak|raft|paddle|canoe",
+    "whale_watching": r"whale|dolphin",
+    "tea_country": r"tea\b|tea (estate|factory|plantation)|plantation",
+    "city": r"\bcity|market|shopping|street food|museum|fort\b",
+    "train": r"train|railway",
+}
+_TAG_RES = {tag: re.compile(r"\b(?:" + rx + ")", re.IGNORECASE) for tag, rx in TAG_PATTERNS.items()}
+
+# free-text trip type -> TRIP_TYPE_RULES key
+_TRIP_TYPE_WORDS = (
+    ("family", ("family", "kids", "children", "child")),
+    ("business", ("business", "work", "conference")),
+    ("romantic", ("honeymoon", "romantic", "couple", "anniversary")),
+    ("backpacking", ("backpack", "budget travel", "shoestring")),
+    ("adventure", ("adventure", "hiking", "trekking", "active")),
+    ("cultural", ("cultural", "culture", "heritage", "pilgrim", "religious")),
+    ("relaxation", ("relax", "leisure", "beach holiday", "wellness", "spa")),
+)
+
+
 def normalize(s: str) -> str:
     return (s or "").strip().lower()
 
+
 def infer_activity_tags(activities: List[str]) -> List[str]:
+    """Activity tags (TAG_PATTERNS keys) mentioned in `activities`, in first-seen order."""
     tags = []
     for a in activities or []:
-        a_l = normalize(a)
-        if "hiking" in a_l or "trail" in a_l:
-            tags.append("hiking")
-        if "temple" in a_l or "religious" in a_l or "shrine" in a_l or "monastery" in a_l:
-            tags.append("temple")
-        if "beach" in a_l or "coast" in a_l or "swim" in a_l:
-            tags.append("beach")
-    return list(dict.fromkeys(tags))  # de-dup preserving order
+        text = str(a or "")
+        for tag, rx in _TAG_RES.items():
+            if tag not in tags and rx.search(text):
+                tags.append(tag)
+    return tags
+
+
+def trip_type_keys(type_of_trip: Optional[str]) -> List[str]:
+    t = normalize(type_of_trip)
+    return [key for key, words in _TRIP_TYPE_WORDS if any(w in t for w in words)]
+
+
+def traveler_bucket(no_of_traveler: Any) -> str:
+    try:
+        n = int(no_of_traveler or 1)
+    except (TypeError, ValueError):
+        n = 1
+    if n <= 1:
+        return "solo"
+    if n == 2:
+        return "pair"
+    return "group" if n <= 5 else "large_group"
+
+
+def duration_bucket(duration_days: Any) -> str:
+    try:
+        d = int(duration_days or 1)
+    except (TypeError, ValueError):
+        d = 1
+    if d <= 3:
+        return "short"
+    return "week" if d <= 8 else "long"
+
+
+# --- compiled index -----------------------------------------------------------
+
+def _compile(tables: Iterable[Tuple[str, Dict[str, List[tuple]]]]):
+    """
+    Flatten the rule tables into an item list and a (dimension, key) -> item
+    ids index. Identical rows share an id; rule_based_pack() drops repeated
+    names across ids.
+    """
+    items: List[Tuple[int, str, str]] = []
+    ids: Dict[Tuple[int, str, str], int] = {}
+    index: Dict[Tuple[str, str], Tuple[int, ...]] = {}
+    for dim, table in tables:
+        for key, rows in table.items():
+            found = []
+            for category, name, reason in rows:
+                cat = CATEGORIES.index(category)
+                ident = ids.setdefault((cat, normalize(name), reason), len(items))
+                if ident == len(items):
+                    items.append((cat, name, reason))
+                if ident not in found:
+                    found.append(ident)
+            index[(dim, key)] = tuple(found)
+    return tuple(items), index
+
+
+_RULE_ITEMS, _RULE_INDEX = _compile((
+    ("always", {"": ALWAYS}),
+    ("weather", {k: [(WEATHER, n, r) for n, r in v] for k, v in WEATHER_RULES.items()}),
+    ("region", REGION_RULES),
+    ("tag", {k: [(ACTIVITY, n, r) for n, r in v] for k, v in ACTIVITY_RULES.items()}),
+    ("trip_type", TRIP_TYPE_RULES),
+    ("travelers", TRAVELER_RULES),
+    ("duration", DURATION_RULES),
+    ("docs", {"": [(DOCS, n, r) for n, r in DOC_SAFETY]}),
+))
+
 
 def seed_categories() -> List[Dict[str, Any]]:
-    return [
-        {"name": "Essentials", "items": []},
-        {"name": "Weather-specific", "items": []},
-        {"name": "Activity-specific", "items": []},
-        {"name": "Documents & Safety", "items": []},
-        {"name": "Optional nice-to-have", "items": []},
-    ]
+    return [{"name": name, "items": []} for name in CATEGORIES]
+
 
 def push_items(cat: Dict[str, Any], pairs: List[Tuple[str, str]]):
     for name, reason in pairs:
@@ -70,40 +307,90 @@ def push_items(cat: Dict[str, Any], pairs: List[Tuple[str, str]]):
         if not any(normalize(x["name"]) == normalize(name) for x in cat["items"]):
             cat["items"].append({"name": name, "reason": reason})
 
-def rule_based_pack(season: str, activities: List[str]) -> Dict[str, Any]:
-    cats = seed_categories()
-
-    # Essentials: always present
-    push_items(cats[0], [
-        ("Toothbrush & toiletries", "Daily hygiene"),
-        ("Phone charger & power bank", "Battery for maps/photos")
-    ])
 
-    # Weather
+def climate_weather_keys(season: str, climate: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Map the trip's season and climate-table rollup onto WEATHER_RULES keys."""
+    keys = []
     s = normalize(season)
     if s in WEATHER_RULES:
-        push_items(cats[1], WEATHER_RULES[s])
+        keys.append(s)
+    elif "monsoon" in s:
+        keys.append("monsoon")
+    if climate:
+        if (climate.get("max_rain_probability") or 0) >= 0.4 and "monsoon" not in keys:
+            keys.append("monsoon")
+        bands = climate.get("temperature_bands") or []
+        if ("hot" in bands or "warm" in bands) and "summer" not in keys:
+            keys.append("summer")
+        if "cool" in bands and "winter" not in keys:
+            keys.append("winter")
+    return keys
+
 
-    # Activities
-    for tag in infer_activity_tags(activities):
-        push_items(cats[2], ACTIVITY_RULES.get(tag, []))
+def rule_keys(
+    season: str,
+    activities: List[str],
+    climate: Optional[Dict[str, Any]] = None,
+    region: Optional[str] = None,
+    type_of_trip: Optional[str] = None,
+    no_of_traveler: Any = 1,
+    duration_days: Any = None,
+) -> List[Tuple[str, str]]:
+    """The (dimension, key) facts of a trip, in the order their items are listed."""
+    region = region or (climate or {}).get("region")
+    keys = [("always", "")]
+    keys += [("weather", k) for k in climate_weather_keys(season, climate)]
+    if region:
+        keys.append(("region", region))
+    keys += [("tag", t) for t in infer_activity_tags(activities)]
+    keys += [("trip_type", t) for t in trip_type_keys(type_of_trip)]
+    keys.append(("travelers", traveler_bucket(no_of_traveler)))
+    keys.append(("duration", duration_bucket(duration_days)))
+    keys.append(("docs", ""))
+    return keys
 
-    # Documents & Safety
-    push_items(cats[3], DOC_SAFETY)
 
-    # Optional (cheap comfort items first)
-    push_items(cats[4], [("Travel pillow", "Comfort on buses")])
+def rule_based_pack(
+    season: str,
+    activities: List[str],
+    climate: Optional[Dict[str, Any]] = None,
+    region: Optional[str] = None,
+    type_of_trip: Optional[str] = None,
+    no_of_traveler: Any = 1,
+    duration_days: Any = None,
+) -> Dict[str, Any]:
+    keys = rule_keys(season, activities, climate, region, type_of_trip, no_of_traveler, duration_days)
+    cats = seed_categories()
+    seen = set()
+    for key in keys:
+        for ident in _RULE_INDEX.get(key, ()):
+            if ident in seen:
+                continue
+            seen.add(ident)
+            cat, name, reason = _RULE_ITEMS[ident]
+            cats[cat]["items"].append({"name": name, "reason": reason})
+
+    # the same name can sit in two categories (e.g. modest attire); keep the first
+    names = set()
+    for cat in cats:
+        kept = []
+        for it in cat["items"]:
+            n = normalize(it["name"])
+            if n not in names:
+                names.add(n)
+                kept.append(it)
+        cat["items"] = kept
 
+    notes = list(BASE_NOTES)
+    notes += [NOTE_RULES[k] for k in keys if k in NOTE_RULES]
     return {
         "summary": "Packing list tailored to season and planned activities.",
-        "duration_days": None,
+        "duration_days": duration_days,
         "categories": cats,
-        "notes": [
-            "Prioritize essentials; add items based on final itinerary.",
-            "Check airline liquid limits and baggage policy."
-        ]
+        "notes": notes,
     }
 
+
 def fairness_sort(categories: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     def is_low_cost(item_name: str) -> bool:
         name = normalize(item_name)
@@ -0,0 +1,237 @@
+# server/agents/summary_agent/section_refiner.py
+"""
+Section-targeted summary refinement.
+
+Instead of sending the whole itinerary plus the feedback to the model and
+getting a full rewrite back, the Markdown is split into its top-level
+sections, the sections the feedback is about are picked (keyword/heading
+heuristics first, a one-line LLM classification as fallback), only those are
+rewritten - concurrently when there are several - and the results are
+spliced back in place. Untouched sections, including the Responsible AI
+notes, are returned byte-for-byte, and long plans no longer hit the
+completion token limit.
+"""
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+
+try:
+    from server.utils.config import SUMMARY_REFINE_WORKERS
+except Exception:
+    SUMMARY_REFINE_WORKERS = int(os.getenv('SUMMARY_REFINE_WORKERS', '4'))
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_PROTECTED_RE = re.compile(r"responsible ai|data notes|disclaimer", re.IGNORECASE)
+_GLOBAL_RE = re.compile(
+    r"\b(whole|entire|overall|everything|every section|all sections|throughout|tone|"
+    r"translate|language|emojis?|formatting|format|shorter|longer|concise|friendlier|more formal)\b",
+    re.IGNORECASE,
+)
+
+# topic -> (feedback pattern, heading pattern)
+TOPICS = {
+    "dates": (r"\b(dates?|season|weather|monsoon|when|duration)\b",
+              r"date|season|weather|when"),
+    "travelers": (r"\b(travell?ers?|people|group|family|solo|couple|kids|budget|cost|price)\b",
+                  r"travel|who|budget"),
+    "preferences": (r"\b(interests?|preferences?|vibe)\b",
+                    r"vibe|interest|preference"),
+    "destinations": (r"\b(destinations?|locations?|places?|cit(y|ies)|towns?|beach(es)?|visit|sites?)\b",
+                     r"destination|location|place|where|highlight"),
+    "activities": (r"\b(activit(y|ies)|itinerary|schedule|day \d+|morning|afternoon|evening|things to do|tours?)\b",
+                   r"activit|day|schedule"),
+    "packing": (r"\b(pack(ing)?|bring|luggage|clothes|clothing|gear|items?)\b",
+                r"pack|bring|essentials"),
+    "tips": (r"\b(tips?|advice|transport(ation)?|getting around|culture|etiquette)\b",
+             r"tip|advice|practical|transport"),
+    "extra": (r"\b(extra|additional|notes?)\b",
+              r"extra|additional|details"),
+}
+_TOPIC_RES = {name: (re.compile(fb, re.IGNORECASE), re.compile(hd, re.IGNORECASE))
+              for name, (fb, hd) in TOPICS.items()}
+
+# capitalised words in feedback that are never place or activity names
+_NAME_STOPWORDS = {
+    "please", "make", "can", "could", "would", "add", "remove", "change", "replace", "also", "more",
+    "less", "the", "this", "that", "instead", "keep", "section", "summary", "thanks", "thank",
+}
+_NAME_RE = re.compile(r"\b[A-Z][A-Za-z'\-]{3,}\b")
+# heading words too generic to show that feedback is about that section
+_HEADING_STOPWORDS = {
+    "your", "with", "here", "there", "hello", "trip", "custom", "suggested", "recommended",
+    "itinerary", "personalized", "creative", "overview", "exciting", "about", "notes",
+}
+
+_SECTION_PROMPT = (
+    "You are a skilled and friendly document editor. Apply the USER FEEDBACK to this one "
+    "section of a Markdown trip summary.\n"
+    "Rules: do NOT invent or alter trip facts (dates, places, prices); change only what the "
+    "feedback asks for; keep the section's heading line and Markdown style; return ONLY the "
+    "revised section.\n\n"
+    "SECTION:\n{section}\n\nUSER FEEDBACK: {feedback}"
+)
+_TARGET_PROMPT = (
+    "A user gave feedback on a trip summary with these sections:\n{headings}\n\n"
+    "USER FEEDBACK: {feedback}\n\n"
+    "Reply with the numbers of the sections the feedback should change, comma-separated, "
+    "or ALL if it applies to the whole summary."
+)
+
+
+class Section:
+    """A top-level chunk of the summary: its heading text ('' for the preamble) and raw text."""
+
+    __slots__ = ("heading", "text")
+
+    def __init__(self, heading: str, text: str):
+        self.heading = heading
+        self.text = text
+
+    @property
+    def protected(self) -> bool:
+        return bool(_PROTECTED_RE.search(self.heading))
+
+    def __repr__(self) -> str:
+        return f"Section({self.heading!r}, {len(self.text)} chars)"
+
+
+def _split_level(lines: Sequence[str]) -> Optional[int]:
+    # the shallowest heading level that occurs at least twice (a lone "# Title" is not a split point)
+    levels = [len(m.group(1)) for m in (_HEADING_RE.match(l.rstrip("\n")) for l in lines) if m]
+    for level in sorted(set(levels)):
+        if levels.count(level) >= 2:
+            return level
+    return None
+
+
+def split_sections(markdown: str) -> List[Section]:
+    """Split Markdown at its top-level headings; "".join of the texts is the input."""
+    lines = (markdown or "").splitlines(keepends=True)
+    level = _split_level(lines)
+    if level is None:
+        return [Section("", markdown or "")]
+    sections: List[Section] = []
+    heading, buf = "", []
+    for line in lines:
+        m = _HEADING_RE.match(line.rstrip("\n"))
+        if m and len(m.group(1)) == level:
+            # blank lines and "---" rules before a heading belong to the section they introduce
+            tail = []
+            while buf and buf[-1].strip() in ("", "---"):
+                tail.insert(0, buf.pop())
+            if buf or heading:
+                sections.append(Section(heading, "".join(buf)))
+            heading, buf = m.group(2), tail + [line]
+        else:
+            buf.append(line)
+    sections.append(Section(heading, "".join(buf)))
+    return sections
+
+
+def target_sections(sections: Sequence[Section], feedback: str) -> Optional[List[int]]:
+    """
+    Indexes of the sections the feedback is about, from headings and keywords.
+    Returns every editable section for document-wide feedback, and None when
+    the heuristics cannot tell (the caller may then ask the model).
+    """
+    editable = [i for i, s in enumerate(sections) if not s.protected]
+    feedback = feedback or ""
+    hits = set()
+    for fb_re, heading_re in _TOPIC_RES.values():
+        if fb_re.search(feedback):
+            hits.update(i for i in editable if sections[i].heading and heading_re.search(sections[i].heading))
+    lowered = feedback.lower()
+    for i in editable:
+        words = [w for w in re.findall(r"[a-z]{4,}", sections[i].heading.lower()) if w not in _HEADING_STOPWORDS]
+        if any(w in lowered for w in words):
+            hits.add(i)
+    names = {n for n in _NAME_RE.findall(feedback) if n.lower() not in _NAME_STOPWORDS}
+    for i in editable:
+        if any(n in sections[i].text for n in names):
+            hits.add(i)
+    if _GLOBAL_RE.search(feedback) and not hits:
+        return editable
+    return sorted(hits) or None
+
+
+def _call(llm, prompt: str) -> str:
+    resp = llm.invoke(prompt)
+    return (getattr(resp, "content", resp) or "").strip()
+
+
+def llm_target_sections(sections: Sequence[Section], feedback: str, llm) -> List[int]:
+    """Ask the model which sections to change; every editable section if the answer is unusable."""
+    editable = [i for i, s in enumerate(sections) if not s.protected]
+    headings = "\n".join(f"{i}. {sections[i].heading or '(introduction)'}" for i in editable)
+    try:
+        answer = _call(llm, _TARGET_PROMPT.format(headings=headings, feedback=feedback))
+    except Exception as e:
+        print(f"[SectionRefiner] Could not classify feedback: {e}")
+        return editable
+    picked = [int(n) for n in re.findall(r"\d+", answer) if int(n) in editable]
+    return sorted(set(picked)) if picked and "ALL" not in answer.upper() else editable
+
+
+def _splice(original: str, revised: str) -> str:
+    # keep the original surrounding whitespace so the document layout does not drift
+    lead = original[:len(original) - len(original.lstrip())]
+    trail = original[len(original.rstrip()):]
+    return lead + revised.strip() + trail
+
+
+def replace_section(markdown: str, topic: str, text: str) -> Optional[str]:
+    """
+    `markdown` with the first editable section whose heading matches `topic`
+    (a TOPICS name) replaced by `text`, or None when no heading matches.
+    """
+    sections = split_sections(markdown)
+    heading_re = _TOPIC_RES[topic][1]
+    for s in sections:
+        if s.heading and not s.protected and heading_re.search(s.heading):
+            s.text = _splice(s.text, text)
+            return "".join(s.text for s in sections)
+    return None
+
+
+def _parallel(fn: Callable, jobs: list, workers: int) -> list:
+    if len(jobs) == 1:
+        return [fn(jobs[0])]
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(jobs)))) as pool:
+        return list(pool.map(fn, jobs))
+
+
+def refine_sections(
+    previous_summary: str,
+    user_feedback: str,
+    llm,
+    max_workers: Optional[int] = None,
+) -> Tuple[str, List[int]]:
+    """
+    Apply `user_feedback` to the targeted sections of `previous_summary`.
+    Returns the new summary and the indexes of the sections that were sent
+    to the model. Raises if every section call failed.
+    """
+    sections = split_sections(previous_summary)
+    targets = target_sections(sections, user_feedback)
+    if targets is None:
+        targets = llm_target_sections(sections, user_feedback, llm)
+    if not targets:
+        return previous_summary, []
+
+    def rewrite(i: int) -> Optional[str]:
+        body = sections[i].text.strip()
+        try:
+            return _call(llm, _SECTION_PROMPT.format(section=body, feedback=user_feedback)) or None
+        except Exception as e:
+            print(f"[SectionRefiner] Section {sections[i].heading!r} failed: {e}")
+            return None
+
+    results = _parallel(rewrite, targets, max_workers or SUMMARY_REFINE_WORKERS)
+    if all(r is None for r in results):
+        raise RuntimeError("no section could be refined")
+    for i, revised in zip(targets, results):
+        if revised is not None:
+            sections[i].text = _splice(sections[i].text, revised)
+    return "".join(s.text for s in sections), targets
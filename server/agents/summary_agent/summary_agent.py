@@ -3,63 +3,27 @@ import json
 from typing import Any, List, Dict
 from pydantic import BaseModel  # Added for type hinting clarity on raw outputs
 
-try:
-    import bleach
-except Exception:
-    bleach = None
-
 # LangChain imports are now moved inside the function for lazy loading and clarity
 # from langchain_core.prompts import ChatPromptTemplate
 # from langchain_core.output_parsers import StrOutputParser
 # from langchain_openai import ChatOpenAI
 
 from server.utils.config import OPENAI_API_KEY, OPENAI_MODEL
-from server.utils.config import OPENAI_API_KEY, OPENAI_MODEL
+from server.utils.config import OPENAI_API_KEY, OPENAI_MODEL, LLM_MAX_RETRIES
+from server.utils.deadline import llm_timeout
 from server.schemas.summary_schemas import SummaryAgentInputSchema, SummaryAgentOutputSchema
+from server.agents.summary_agent.summary_sections import render_document
 
 def _get_summary_llm(api_key: str, model_name: str, temperature: float = 0.5):
     """Initializes and returns the ChatOpenAI instance for summarization."""
     try:
         from langchain_openai import ChatOpenAI
-        return ChatOpenAI(api_key=api_key, model=model_name, temperature=temperature, max_tokens=1000)
+        return ChatOpenAI(api_key=api_key, model=model_name, temperature=temperature, max_tokens=1000,
+                          timeout=llm_timeout(), max_retries=LLM_MAX_RETRIES)
     except Exception as e:
         print(f"Error initializing LLM: {e}")
         return None
 
-# --- Helper Functions (No change, retained for context) ---
-def _bleach_clean(text: str, strip: bool = True) -> str:
-    """Use bleach.clean if available, otherwise perform a minimal HTML tag strip."""
-    if bleach is not None:
-        return bleach.clean(text, strip=strip)
-    import re
-    if text is None:
-        return ""
-
-    s = str(text)
-    s = re.sub(r"<[^>]*>", "", s)
-    return s
-
-
-def _sanitize(val: Any, max_len: int = 1000) -> str:
-    """Safely coerce to string, clean HTML and truncate."""
-    if val is None: return ""
-    if isinstance(val, (dict, list)):
-        try:
-            s = json.dumps(val, ensure_ascii=False)
-        except Exception:
-            s = str(val)
-    else:
-        s = str(val)
-    return _bleach_clean(s, strip=True)[:max_len]
-
-
-def _short(val: Any, max_len: int = 250) -> str:
-    s = _sanitize(val, max_len=max_len)
-    if len(s) > max_len:
-        return s[: max_len - 3] + "..."
-    return s
-
-
 # --- Core Function Update ---
 
 def generate_summary(state: SummaryAgentInputSchema | dict, use_llm: bool = True) -> SummaryAgentOutputSchema:
@@ -69,8 +33,6 @@ def generate_summary(state: SummaryAgentInputSchema | dict, use_llm: bool = True
     The summary is creative, accurate, friendly, and adheres to RAI rules.
     """
 
-    print(f"\nDEBUG: Generating summary for state: {state}")
-
     # --- Data Extraction (Retained) ---
     if isinstance(state, dict):
         _dst = state.get("destination")
@@ -117,178 +79,36 @@ def generate_summary(state: SummaryAgentInputSchema | dict, use_llm: bool = True
     except Exception:
         pass
 
-    # --- Build raw summary parts (structured, human readable) ---
-    response_parts: List[str] = []
-
-    # Title and Quick Index (Retained structure)
-    if _dst:
-        response_parts.append(f"# 🎉 Your Custom Trip to {_short(_dst, 120)}\n")
-
-    index_lines = ["## Quick Links"]
-    if _start and _end:
-        index_lines.append("- Dates & Season")
-    if _locations:
-        index_lines.append("- Recommended Destinations")
-    if _activities:
-        index_lines.append("- Daily Activities")
-    if _packing:
-        index_lines.append("- Packing Essentials")
-    index_lines.append("- Responsible AI Notes")
-    response_parts.extend(index_lines)
-    response_parts.append("\n---")
-
-    # Trip Overview (Friendly Introduction)
-    if _dst:
-        intro = f"## Hello there! Your exciting trip to **{_dst}** is all set. Here's a creative overview of your personalized itinerary:"
-        response_parts.append(intro)
-
-    # Dates
-    if _start and _end:
-        try:
-            start_dt = datetime.datetime.strptime(_start, "%Y-%m-%d").strftime("%B %d, %Y")
-            end_dt = datetime.datetime.strptime(_end, "%Y-%m-%d").strftime("%B %d, %Y")
-            response_parts.append(f"\n## 🗓️ Dates & Season\n- You'll be exploring from **{start_dt}** to **{end_dt}**.")
-
-            # Attempt to pull season from state or infer if possible
-            season_text = ""
-            if _season:
-                season_text = f" This falls during the **{_season}** in Sri Lanka, which is a great time for {('coastal activities on the South/West' if 'Southwest' in _season else 'North/East coast exploration') if 'Monsoon' in _season else 'island-wide travel'}. Be prepared!"
-            response_parts.append(f"- Duration: **{start_dt}** to **{end_dt}**.{season_text}")
-        except ValueError:
-            response_parts.append(f"\n## 🗓️ Dates\n- {_start} → {_end} (Please confirm the date format).\n")
-
-    # Travelers and Type
-    traveler_text = "a fantastic solo adventure" if _num == 1 else f"a wonderful journey for **{_num} people**"
-    type_text = f" as a **{_type}** trip" if _type else ""
-    budget_text = f" with a **{str(_budget).capitalize()}** budget" if _budget else ""
-
-    response_parts.append(f"\n## 👥 Who's Traveling?\n- This is planned as {traveler_text}{type_text}{budget_text}.")
-
-    # Preferences
-    if _prefs:
-        prefs = ", ".join([p.capitalize() for p in _prefs])
-        response_parts.append(f"\n## 🎯 Your Vibe\n- We've focused the itinerary around your interests in: **{prefs}**.")
-
-    # Locations
-    if _loc_raw and isinstance(_loc_raw, dict) and _loc_raw.get("recommended_locations"):
-        response_parts.append("\n## 🗺️ Recommended Destinations")
-        for loc in _loc_raw.get("recommended_locations", []):
-            name = _short(loc.get("name"))
-            ltype = _short(loc.get("type"))
-            reason = _short(loc.get("reason"), max_len=600)
-            response_parts.append(f"- **{name}** ({ltype}): {reason}")
-        response_parts.append("")
-    elif _locations:
-        response_parts.append("\n## 🗺️ Recommended Destinations")
-        response_parts.append(f"- Destinations include: {', '.join([_short(loc) for loc in _locations])}")
-        response_parts.append("")
-
-    # Activities
-    if _act_raw and isinstance(_act_raw, dict) and _act_raw.get("day_plans"):
-        response_parts.append("\n## 🎡 Daily Activities")
-        for day in _act_raw.get("day_plans", []):
-            date = day.get("date", "")
-            response_parts.append(f"### 📅 {date}")
-            for sug in day.get("suggestions", []):
-                tod = sug.get("time_of_day", "")
-                title = _short(sug.get("title"), max_len=200)
-                why = _short(sug.get("why"), max_len=400)
-                sources = sug.get("source_hints", [])
-                price_level = sug.get("price_level", "")
-                confidence = sug.get("confidence", "")
-
-                # build suggestion block
-                suggestion_text = f"- **{tod.capitalize()}**: {title}\n"
-                suggestion_text += f"  - 📝 *{why}*\n"
-                if price_level:
-                    suggestion_text += f"  - 💰 Price Level: {price_level.capitalize()}\n"
-                if confidence:
-                    suggestion_text += f"  - 📊 Confidence: {confidence}\n"
-                if sources:
-                    src_list = ", ".join(sources) if isinstance(sources, list) else str(sources)
-                    suggestion_text += f"  - 🔗 Sources: {src_list}\n"
-
-                response_parts.append(suggestion_text.strip())
-            response_parts.append("")
-    elif _activities:
-        response_parts.append("\n## 🎡 Key Activities")
-        for act in _activities:
-            response_parts.append(f"- {_short(act)}")
-        response_parts.append("")
-
-    # Packing List (Retained logic for structured rendering)
-    if _packing:
-        response_parts.append("\n## 🎒 Suggested Packing List")
-        try:
-            if hasattr(_packing, "model_dump"):
-                packing_obj = _packing.model_dump()
-            elif isinstance(_packing, dict):
-                packing_obj = _packing
-            else:
-                packing_obj = None
-        except Exception:
-            packing_obj = None
-
-        if packing_obj and isinstance(packing_obj, dict):
-            # ✅ Show summary & duration
-            if packing_obj.get("summary"):
-                response_parts.append(f"**Overview:** {packing_obj['summary']}")
-            if packing_obj.get("duration_days"):
-                response_parts.append(f"**Duration:** {packing_obj['duration_days']} days\n")
-
-            # ✅ Show categories & items
-            if packing_obj.get("categories"):
-                for cat in packing_obj.get("categories", []):
-                    cat_name = cat.get("name") or ""
-                    if cat_name:
-                        response_parts.append(f"### {cat_name}")
-                    for it in cat.get("items", []):
-                        if isinstance(it, dict):
-                            name, reason = it.get("name"), it.get("reason")
-                            response_parts.append(f"- **{name}** — {reason}" if reason else f"- **{name}**")
-                        else:
-                            response_parts.append(f"- {it}")
-                    response_parts.append("")
-
-            # ✅ Show notes at the end
-            if packing_obj.get("notes"):
-                response_parts.append("### 📝 Notes")
-                for note in packing_obj["notes"]:
-                    response_parts.append(f"- {note}")
-                response_parts.append("")
-
-        else:
-            for item in _packing:
-                response_parts.append(f"- {item}")
-            response_parts.append("")
-
-    if _additional:
-        response_parts.append("\n## ℹ️ Extra Details\n")
-        response_parts.append(f"{_short(_additional, max_len=800)}\n")
-
-    # --- Responsible AI & Disclaimers (Enhanced) ---
-    response_parts.append("\n---\n## 🔒 Responsible AI & Data Notes (Mandatory)")
-    response_parts.append(
-        "- **Accuracy Disclaimer**: This itinerary is AI-generated based on the provided data. Please **always verify** dates, opening hours, travel advisories, and prices before booking or departing.")
-    response_parts.append(
-        "- **Safety First**: Prioritize local guidance and official travel warnings. This system is for planning only and is **not a substitute for professional advice**.")
-    response_parts.append(
-        "- **Bias Mitigation**: Recommendations aim to be diverse but may reflect patterns in available data. If you notice bias or a preference for a certain area/activity, please provide feedback.")
-    response_parts.append(
-        "- **Privacy**: No personal identifying information (beyond what you explicitly typed) is stored in this summary output. We Store minimal data to improve service quality.")
-
-    # Source and status notes (Retained)
+    # --- Render sections (each is cached by a hash of its own inputs) ---
     try:
-        loc_status = _loc_raw.get("status") if isinstance(_loc_raw, dict) else None
-        act_status = _act_raw.get("status") if isinstance(_act_raw, dict) else None
-        pack_status = "completed" if _packing else "skipped"
-        if loc_status or act_status:
-            response_parts.append(
-                f"- **Agent Status**: Location planning: {loc_status if loc_status else 'N/A'}, Activity planning: {act_status if act_status else 'N/A'}, Packing list: {pack_status}.")
+        if hasattr(_packing, "model_dump"):
+            _packing = _packing.model_dump()
     except Exception:
         pass
-
-    raw_summary = "\n".join(response_parts)
+    fields = {
+        "destination": _dst,
+        "start_date": _start,
+        "end_date": _end,
+        "season": _season,
+        "no_of_traveler": _num,
+        "type_of_trip": _type,
+        "budget": _budget,
+        "user_preferences": _prefs,
+        "location_recs": _loc_raw,
+        "locations": _locations,
+        "activity_recs": _act_raw,
+        "activities": _activities,
+        "packing_list": _packing,
+        "additional_info": _additional,
+        "location_status": _loc_raw.get("status") if isinstance(_loc_raw, dict) else None,
+        "activity_status": _act_raw.get("status") if isinstance(_act_raw, dict) else None,
+        "has_dates": bool(_start and _end),
+        "has_locations": bool(_locations),
+        "has_activities": bool(_activities),
+        "has_packing": bool(_packing),
+    }
+    raw_summary, rendered = render_document(fields)
+    print(f"DEBUG: Summary sections re-rendered: {', '.join(rendered) or 'none'}")
 
     # --- LLM Refinement (Updated Prompt) ---
     if not use_llm:
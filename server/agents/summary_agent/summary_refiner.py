@@ -24,7 +24,9 @@ except ImportError:
     RefinementChain = Any
 
 # Assuming OPENAI_API_KEY and OPENAI_MODEL are imported and available
-from server.utils.config import OPENAI_API_KEY, OPENAI_MODEL
+from server.utils.config import OPENAI_API_KEY, OPENAI_MODEL, LLM_MAX_RETRIES
+from server.utils.deadline import llm_timeout
+from server.agents.summary_agent.section_refiner import refine_sections, split_sections
 
 
 def get_summary_refinement_chain(
@@ -72,7 +74,8 @@ def get_summary_refinement_chain(
     # Note on Fix 1: LLMChain components internally handle SecretStr/str conversion.
     # By setting the function argument type hint to Optional[str], we satisfy the
     # linter that was flagging OPENAI_API_KEY (which is likely a string from config).
-    llm = ChatOpenAI(api_key=api_key, model=model_name, temperature=0.5, max_tokens=1000)
+    llm = ChatOpenAI(api_key=api_key, model=model_name, temperature=0.5, max_tokens=1000,
+                     timeout=llm_timeout(), max_retries=LLM_MAX_RETRIES)
 
     return LLMChain(
         llm=llm,
@@ -88,7 +91,21 @@ def refine_summary(
         api_key: Optional[str] = OPENAI_API_KEY,
         model_name: Optional[str] = OPENAI_MODEL,
 ) -> str:
-    """Runs the refinement chain and returns the new summary text."""
+    """
+    Applies the feedback to the sections it targets and returns the new summary text.
+    Falls back to the full-document refinement chain when the summary has no
+    sections or every section call failed.
+    """
+    if ChatOpenAI is not None and len(split_sections(previous_summary)) > 1:
+        try:
+            llm = ChatOpenAI(api_key=api_key, model=model_name, temperature=0.5, max_tokens=1000,
+                             timeout=llm_timeout(), max_retries=LLM_MAX_RETRIES)
+            new_summary, targets = refine_sections(previous_summary, user_feedback, llm)
+            print(f"DEBUG: Refined summary sections: {targets}")
+            return new_summary
+        except Exception as e:
+            print(f"WARNING: Section refinement failed, refining the whole summary: {e}")
+
     chain = get_summary_refinement_chain(api_key, model_name)
 
     # Fix 4: 'None' object is not callable
@@ -0,0 +1,289 @@
+# server/agents/summary_agent/summary_sections.py
+"""
+Section templates for the raw trip summary.
+
+The summary is a fixed sequence of sections (title, quick links, dates,
+travelers, destinations, activities, packing, Responsible AI notes, ...).
+Each section declares the state fields it reads and a renderer built on the
+format strings below; render_document() hashes every section's inputs and
+only re-renders sections whose inputs changed, so a follow-up that only
+touches the packing list re-renders just the packing section. The output is
+the same Markdown the summary agent has always produced.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from server.utils.cache import TTLCache
+from server.utils.climate import trip_climate
+from server.utils.sanitizer import clean_html
+
+try:
+    from server.utils.config import SUMMARY_SECTION_CACHE_MAX
+except Exception:
+    SUMMARY_SECTION_CACHE_MAX = int(os.getenv('SUMMARY_SECTION_CACHE_MAX', '512'))
+
+_sections = TTLCache(maxsize=SUMMARY_SECTION_CACHE_MAX, name="summary_sections")
+
+# --- Templates ---
+T_TITLE = "# 🎉 Your Custom Trip to {destination}\n"
+T_INTRO = ("## Hello there! Your exciting trip to **{destination}** is all set. "
+           "Here's a creative overview of your personalized itinerary:")
+T_DATES = "\n## 🗓️ Dates & Season\n- You'll be exploring from **{start}** to **{end}**."
+T_DURATION = "- Duration: **{start}** to **{end}**.{season}"
+T_DATES_RAW = "\n## 🗓️ Dates\n- {start} → {end} (Please confirm the date format).\n"
+T_CLIMATE = (" This falls during the **{season}** in Sri Lanka; {side}. "
+             "Expect rain on roughly {rain_pct}% of days and {temps} temperatures.")
+T_TRAVELERS = "\n## 👥 Who's Traveling?\n- This is planned as {travelers}{trip_type}{budget}."
+T_PREFS = "\n## 🎯 Your Vibe\n- We've focused the itinerary around your interests in: **{prefs}**."
+T_LOCATION = "- **{name}** ({type}): {reason}"
+T_SUGGESTION = "- **{time_of_day}**: {title}\n  - 📝 *{why}*\n"
+T_ITEM = "- **{name}** — {reason}"
+T_STATUS = ("- **Agent Status**: Location planning: {location}, Activity planning: {activity}, "
+            "Packing list: {packing}.")
+
+RAI_NOTES = [
+    "\n---\n## 🔒 Responsible AI & Data Notes (Mandatory)",
+    "- **Accuracy Disclaimer**: This itinerary is AI-generated based on the provided data. Please **always verify** dates, opening hours, travel advisories, and prices before booking or departing.",
+    "- **Safety First**: Prioritize local guidance and official travel warnings. This system is for planning only and is **not a substitute for professional advice**.",
+    "- **Bias Mitigation**: Recommendations aim to be diverse but may reflect patterns in available data. If you notice bias or a preference for a certain area/activity, please provide feedback.",
+    "- **Privacy**: No personal identifying information (beyond what you explicitly typed) is stored in this summary output. We Store minimal data to improve service quality.",
+]
+
+
+def _sanitize(val: Any, max_len: int = 1000) -> str:
+    """Safely coerce to string, clean HTML and truncate."""
+    return clean_html(val, max_len=max_len)
+
+
+def _short(val: Any, max_len: int = 250) -> str:
+    s = _sanitize(val, max_len=max_len)
+    if len(s) > max_len:
+        return s[: max_len - 3] + "..."
+    return s
+
+
+def _climate_note(destination: Any, start: Any, end: Any, season: Any) -> str:
+    """One-line season/weather note from the shared climate table."""
+    clim = trip_climate(str(destination or ""), start, end)
+    if not clim:
+        return ""
+    side = ("this part of the island is on the wet side of it, so plan indoor backups"
+            if clim["wet_side"] else "this part of the island is usually on the drier side")
+    return T_CLIMATE.format(
+        season=str(season) if season else " / ".join(clim["monsoons"]),
+        side=side,
+        rain_pct=int(round(clim["mean_rain_probability"] * 100)),
+        temps=" to ".join(clim["temperature_bands"]),
+    )
+
+
+# --- Section renderers: inputs dict -> list of lines ---
+
+def _title(d: Dict[str, Any]) -> List[str]:
+    return [T_TITLE.format(destination=_short(d["destination"], 120))] if d["destination"] else []
+
+
+def _index(d: Dict[str, Any]) -> List[str]:
+    lines = ["## Quick Links"]
+    if d["has_dates"]:
+        lines.append("- Dates & Season")
+    if d["has_locations"]:
+        lines.append("- Recommended Destinations")
+    if d["has_activities"]:
+        lines.append("- Daily Activities")
+    if d["has_packing"]:
+        lines.append("- Packing Essentials")
+    lines.append("- Responsible AI Notes")
+    lines.append("\n---")
+    return lines
+
+
+def _intro(d: Dict[str, Any]) -> List[str]:
+    return [T_INTRO.format(destination=d["destination"])] if d["destination"] else []
+
+
+def _dates(d: Dict[str, Any]) -> List[str]:
+    start, end = d["start_date"], d["end_date"]
+    if not (start and end):
+        return []
+    try:
+        start_dt = datetime.datetime.strptime(start, "%Y-%m-%d").strftime("%B %d, %Y")
+        end_dt = datetime.datetime.strptime(end, "%Y-%m-%d").strftime("%B %d, %Y")
+        season = _climate_note(d["destination"], start, end, d["season"])
+    except ValueError:
+        return [T_DATES_RAW.format(start=start, end=end)]
+    return [T_DATES.format(start=start_dt, end=end_dt), T_DURATION.format(start=start_dt, end=end_dt, season=season)]
+
+
+def _travelers(d: Dict[str, Any]) -> List[str]:
+    num, trip_type, budget = d["no_of_traveler"], d["type_of_trip"], d["budget"]
+    return [T_TRAVELERS.format(
+        travelers="a fantastic solo adventure" if num == 1 else f"a wonderful journey for **{num} people**",
+        trip_type=f" as a **{trip_type}** trip" if trip_type else "",
+        budget=f" with a **{str(budget).capitalize()}** budget" if budget else "",
+    )]
+
+
+def _preferences(d: Dict[str, Any]) -> List[str]:
+    if not d["user_preferences"]:
+        return []
+    return [T_PREFS.format(prefs=", ".join([p.capitalize() for p in d["user_preferences"]]))]
+
+
+def _locations(d: Dict[str, Any]) -> List[str]:
+    raw = d["location_recs"]
+    if raw and isinstance(raw, dict) and raw.get("recommended_locations"):
+        lines = ["\n## 🗺️ Recommended Destinations"]
+        for loc in raw.get("recommended_locations", []):
+            lines.append(T_LOCATION.format(
+                name=_short(loc.get("name")), type=_short(loc.get("type")),
+                reason=_short(loc.get("reason"), max_len=600),
+            ))
+        return lines + [""]
+    if d["locations"]:
+        return ["\n## 🗺️ Recommended Destinations",
+                f"- Destinations include: {', '.join([_short(loc) for loc in d['locations']])}", ""]
+    return []
+
+
+def _suggestion(sug: Dict[str, Any]) -> str:
+    text = T_SUGGESTION.format(
+        time_of_day=sug.get("time_of_day", "").capitalize(),
+        title=_short(sug.get("title"), max_len=200),
+        why=_short(sug.get("why"), max_len=400),
+    )
+    price_level, confidence, sources = sug.get("price_level", ""), sug.get("confidence", ""), sug.get("source_hints", [])
+    if price_level:
+        text += f"  - 💰 Price Level: {price_level.capitalize()}\n"
+    if confidence:
+        text += f"  - 📊 Confidence: {confidence}\n"
+    if sources:
+        text += f"  - 🔗 Sources: {', '.join(sources) if isinstance(sources, list) else str(sources)}\n"
+    return text.strip()
+
+
+def _activities(d: Dict[str, Any]) -> List[str]:
+    raw = d["activity_recs"]
+    if raw and isinstance(raw, dict) and raw.get("day_plans"):
+        lines = ["\n## 🎡 Daily Activities"]
+        for day in raw.get("day_plans", []):
+            lines.append(f"### 📅 {day.get('date', '')}")
+            lines.extend(_suggestion(sug) for sug in day.get("suggestions", []))
+            lines.append("")
+        return lines
+    if d["activities"]:
+        return ["\n## 🎡 Key Activities"] + [f"- {_short(act)}" for act in d["activities"]] + [""]
+    return []
+
+
+def _packing(d: Dict[str, Any]) -> List[str]:
+    packing = d["packing_list"]
+    if not packing:
+        return []
+    lines = ["\n## 🎒 Suggested Packing List"]
+    if not isinstance(packing, dict):
+        return lines + [f"- {item}" for item in packing] + [""]
+    if packing.get("summary"):
+        lines.append(f"**Overview:** {packing['summary']}")
+    if packing.get("duration_days"):
+        lines.append(f"**Duration:** {packing['duration_days']} days\n")
+    for cat in packing.get("categories") or []:
+        if cat.get("name"):
+            lines.append(f"### {cat['name']}")
+        for it in cat.get("items", []):
+            if isinstance(it, dict):
+                name, reason = it.get("name"), it.get("reason")
+                if (it.get("quantity") or 1) > 1:
+                    name = f"{it['quantity']} × {name}"
+                lines.append(T_ITEM.format(name=name, reason=reason) if reason else f"- **{name}**")
+            else:
+                lines.append(f"- {it}")
+        lines.append("")
+    if packing.get("notes"):
+        lines.append("### 📝 Notes")
+        lines.extend(f"- {note}" for note in packing["notes"])
+        lines.append("")
+    return lines
+
+
+def _additional(d: Dict[str, Any]) -> List[str]:
+    if not d["additional_info"]:
+        return []
+    return ["\n## ℹ️ Extra Details\n", f"{_short(d['additional_info'], max_len=800)}\n"]
+
+
+def _rai(d: Dict[str, Any]) -> List[str]:
+    return list(RAI_NOTES)
+
+
+def _status(d: Dict[str, Any]) -> List[str]:
+    if not (d["location_status"] or d["activity_status"]):
+        return []
+    return [T_STATUS.format(
+        location=d["location_status"] or "N/A",
+        activity=d["activity_status"] or "N/A",
+        packing="completed" if d["has_packing"] else "skipped",
+    )]
+
+
+# name -> (input fields, renderer), in document order
+SECTIONS: Sequence[Tuple[str, Tuple[str, ...], Callable[[Dict[str, Any]], List[str]]]] = (
+    ("title", ("destination",), _title),
+    ("index", ("has_dates", "has_locations", "has_activities", "has_packing"), _index),
+    ("intro", ("destination",), _intro),
+    ("dates", ("destination", "start_date", "end_date", "season"), _dates),
+    ("travelers", ("no_of_traveler", "type_of_trip", "budget"), _travelers),
+    ("preferences", ("user_preferences",), _preferences),
+    ("locations", ("location_recs", "locations"), _locations),
+    ("activities", ("activity_recs", "activities"), _activities),
+    ("packing", ("packing_list",), _packing),
+    ("additional", ("additional_info",), _additional),
+    ("rai", (), _rai),
+    ("status", ("location_status", "activity_status", "has_packing"), _status),
+)
+
+
+def _digest(name: str, inputs: Dict[str, Any]) -> str:
+    blob = json.dumps(inputs, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(f"{name}\0{blob}".encode("utf-8")).hexdigest()
+
+
+def render_section(name: str, render: Callable[[Dict[str, Any]], List[str]], inputs: Dict[str, Any]) -> Tuple[Optional[str], bool]:
+    """Rendered text of one section (None when it has no lines) and whether it came from the cache."""
+    key = _digest(name, inputs)
+    hit = _sections.get(key)
+    if hit is not None:
+        return hit[0], True
+    lines = render(inputs)
+    text = "\n".join(lines) if lines else None
+    _sections.set(key, (text,))
+    return text, False
+
+
+def render_document(fields: Dict[str, Any]) -> Tuple[str, List[str]]:
+    """The raw Markdown summary for `fields` and the names of the sections that were re-rendered."""
+    parts: List[str] = []
+    rendered: List[str] = []
+    for name, keys, render in SECTIONS:
+        text, cached = render_section(name, render, {k: fields.get(k) for k in keys})
+        if not cached:
+            rendered.append(name)
+        if text is not None:
+            parts.append(text)
+    return "\n".join(parts), rendered
+
+
+def section_text(name: str, fields: Dict[str, Any]) -> Optional[str]:
+    """Rendered text of the one named section for `fields` (None when it has no lines)."""
+    for n, keys, render in SECTIONS:
+        if n == name:
+            return render_section(name, render, {k: fields.get(k) for k in keys})[0]
+    raise KeyError(name)
+
+
+def stats() -> dict:
+    return _sections.stats()
@@ -4,11 +4,15 @@ from datetime import datetime
 from .schemas import WeatherResponse, DailyForecast
 import os
 from dotenv import load_dotenv
+from server.utils.deadline import llm_timeout
 
 load_dotenv()
 
 API_KEY = os.getenv("WEATHER_API_KEY")
 BASE_URL = os.getenv("WEATHER_BASE_URL")
+# (connect, read) seconds; the read timeout is capped by the time left in the request
+WEATHER_CONNECT_TIMEOUT = float(os.getenv("WEATHER_CONNECT_TIMEOUT", "5"))
+WEATHER_READ_TIMEOUT = float(os.getenv("WEATHER_READ_TIMEOUT", "10"))
 
 def get_weather_forecast(destination: str, start_date: str, end_date: str) -> WeatherResponse:
     params = {
@@ -16,7 +20,9 @@ def get_weather_forecast(destination: str, start_date: str, end_date: str) -> We
         "appid": API_KEY,
         "units": "metric"
     }
-    response = requests.get(BASE_URL, params=params)
+    read_timeout = llm_timeout(WEATHER_READ_TIMEOUT)
+    response = requests.get(BASE_URL, params=params,
+                            timeout=(min(WEATHER_CONNECT_TIMEOUT, read_timeout), read_timeout))
     response.raise_for_status()
     data = response.json()
 
@@ -6,6 +6,8 @@ from server.api.conversations import router as conversations_router
 from server.utils.db import connect_to_mongo, close_mongo_connection
 import uvicorn
 import os
+import threading
+from server.utils.config import LOCATION_CACHE_PREWARM
 
 app = FastAPI(title="Seasonal Travel Recommender API")
 
@@ -48,15 +50,46 @@ async def startup_event():
     except Exception as e:
         print(f"ERROR: Failed to connect to MongoDB: {e}")
 
+    # Optionally fill the location recommendation cache for popular trips
+    if LOCATION_CACHE_PREWARM:
+        try:
+            from server.agents.location_agent.location_agent import prewarm_location_cache
+            threading.Thread(target=prewarm_location_cache, daemon=True, name="location-prewarm").start()
+        except Exception as e:
+            print(f"WARN: Location cache pre-warm not started: {e}")
+
 @app.on_event("shutdown")
 async def shutdown_event():
     await close_mongo_connection()
+    try:
+        from server.agents.location_agent import location_cache
+        location_cache.save_popular()
+    except Exception:
+        pass
     print("[INFO] Server shutdown complete.")
 
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
 
+@app.get("/health/node-cache")
+def node_cache_stats():
+    # Hit rates of the memoized planning graph nodes
+    from server.workflow import node_cache
+    return node_cache.stats()
+
+@app.get("/health/prefetch")
+def prefetch_stats():
+    # Speculative work started while the orchestrator collects fields, and how much of it was used
+    from server.workflow import prefetch
+    return prefetch.stats()
+
+@app.get("/health/state-size")
+def state_size():
+    # Serialized per-turn TripPlanState size returned to the client
+    from server.workflow.app_state import state_size_stats
+    return state_size_stats()
+
 if __name__ == "__main__":
     # Ensure uvicorn is imported if running directly
     if 'uvicorn' in locals() or 'uvicorn' in globals():
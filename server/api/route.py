@@ -5,12 +5,16 @@ from pydantic import BaseModel
 from typing import Dict, Any, Optional
 from datetime import datetime
 import traceback
+import uuid
 from pydantic import ValidationError  # Added to catch schema errors
 
 # Internal dependencies
 from server.api.auth import get_current_user
 from server.workflow.workflow import build_trip_workflow
-from server.workflow.app_state import TripPlanState
+from server.workflow.app_state import TripPlanState, apply_update, normalize_state, record_state_size
+from server.utils.sanitizer import sanitize_scope
+from server.utils.deadline import request_deadline
+from server.utils.config import REQUEST_BUDGET_SECONDS
 from server.schemas.orchestrator_schemas import OrchestratorAgent4OutputSchema  # For initial state
 from server.schemas.location_agent_schemas import LocationAgentOutputSchema  # For serialization check
 
@@ -98,7 +102,8 @@ async def process_query(
         # --- 1. Prepare Initial State ---
         if initial_state_dict:
             # If coming from previous turns, use the state passed by the frontend
-            current_state = initial_state_dict
+            # (older clients may still send the mirrored legacy recommendation keys)
+            current_state = normalize_state(initial_state_dict)
         else:
             # Start a new conversation with base state
             # NOTE: Do NOT initialize `trip_data` with a Pydantic object set to
@@ -120,6 +125,9 @@ async def process_query(
 
         # Ensure the current query is set correctly
         current_state['user_query'] = user_query
+        # Session namespace for long inputs stored in the vector DB
+        if not current_state.get('session_id'):
+            current_state['session_id'] = uuid.uuid4().hex
 
         # Append human query to chat history
         # NOTE: We append here to include in the LLM context, but the final history update 
@@ -128,22 +136,25 @@ async def process_query(
         # --- 2. Execute Workflow ---
         final_state = current_state
         # Run the LangGraph
-        for step_output in app_workflow.stream(current_state):
-            # Update the state with the node's output
-            last_node = list(step_output.keys())[-1]
-            final_state.update(step_output[last_node])
-
-            # Record lightweight processing metadata
-            try:
-                final_state.setdefault("_processing_steps", [])
-                final_state["_processing_steps"].append({
-                    "node": last_node,
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "note": f"Completed node {last_node}",
-                })
-                final_state["_processing_last_node"] = last_node
-            except Exception:
-                pass
+        # One sanitizer memo per request: several nodes sanitize the same query.
+        # Planning nodes share the request's latency budget (server/utils/deadline.py).
+        with sanitize_scope(), request_deadline(REQUEST_BUDGET_SECONDS):
+            for step_output in app_workflow.stream(current_state):
+                # Merge the keys the node changed (list fields go through their reducers)
+                last_node = list(step_output.keys())[-1]
+                apply_update(final_state, step_output[last_node] or {})
+
+                # Record lightweight processing metadata
+                try:
+                    final_state.setdefault("_processing_steps", [])
+                    final_state["_processing_steps"].append({
+                        "node": last_node,
+                        "timestamp": datetime.utcnow().isoformat(),
+                        "note": f"Completed node {last_node}",
+                    })
+                    final_state["_processing_last_node"] = last_node
+                except Exception:
+                    pass
 
         # Add the final AI response to history
         # We must add the user query to the history *before* the loop 
@@ -153,6 +164,13 @@ async def process_query(
         # --- 3. Prepare Response ---
         # Ensure all Pydantic objects are converted to dictionaries for safe JSON serialization
         response_state = _serialize_state_for_api(final_state)
+        try:
+            sizes = record_state_size(response_state)
+            largest = sorted((k for k in sizes if k != "total"), key=sizes.get, reverse=True)[:3]
+            print(f"DEBUG: State size {sizes['total']} bytes (largest: "
+                  f"{', '.join(f'{k}={sizes[k]}' for k in largest)})")
+        except Exception:
+            pass
 
         return QueryResponse(
             response=final_state.get("final_response", "I could not generate a response."),
@@ -4,6 +4,8 @@ from pydantic import BaseModel, Field
 class PackingItem(BaseModel):
     name: str
     reason: Optional[str] = None
+    quantity: Optional[int] = None
+    quantity_note: Optional[str] = None
 
 
 class PackingCategory(BaseModel):
@@ -14,6 +16,7 @@ class PackingCategory(BaseModel):
 class PackingOutput(BaseModel):
     summary: Optional[str] = None
     duration_days: Optional[int] = None
+    no_of_traveler: Optional[int] = None
     categories: List[PackingCategory] = Field(default_factory=list)
     notes: List[str] = Field(default_factory=list)
 
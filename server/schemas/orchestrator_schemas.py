@@ -13,6 +13,7 @@ class Message(BaseModel):
 class OrchestratorAgent4InputSchema(BaseModel):
     """Input state for the Orchestrator Agent."""
     query: str = Field(..., description="The user's latest query or response.")
+    session_id: Optional[str] = Field(None, description="Conversation session; namespaces stored long inputs.")
 
 class OrchestratorAgent4OutputSchema(BaseModel):
     """Final output structure of the Orchestrator Agent's state."""
@@ -0,0 +1,148 @@
+"""
+Small thread-safe LRU + TTL cache shared by the agents.
+
+Entries expire after `ttl` seconds and the least recently used ones are
+evicted once `maxsize` entries (or `max_bytes`, measured with `sizeof`) are
+exceeded. `on_evict(key, value)` runs outside the lock for anything dropped,
+so callers can release resources such as in-memory vector collections.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    def __init__(
+        self,
+        maxsize: int = 128,
+        ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+        name: str = "cache",
+    ):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self.max_bytes = max_bytes if max_bytes and max_bytes > 0 else None
+        self.sizeof = sizeof
+        self.on_evict = on_evict
+        self.name = name
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def _size(self, value) -> int:
+        if self.sizeof is None:
+            return 0
+        try:
+            return int(self.sizeof(value))
+        except Exception:
+            return 0
+
+    def _drop(self, key, dropped: list):
+        _, size, value = self._data.pop(key)
+        self._bytes -= size
+        dropped.append((key, value))
+
+    def _release(self, dropped: list):
+        if not self.on_evict:
+            return
+        for key, value in dropped:
+            try:
+                self.on_evict(key, value)
+            except Exception as e:
+                print(f"[{self.name}] on_evict failed for {key!r}: {e}")
+
+    def get(self, key: Hashable, default=None):
+        dropped = []
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is not None and (hit[0] is None or hit[0] > time.monotonic()):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return hit[2]
+            if hit is not None:
+                self._drop(key, dropped)
+            self.misses += 1
+        self._release(dropped)
+        return default
+
+    def set(self, key: Hashable, value) -> None:
+        size = self._size(value)
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        dropped = []
+        with self._lock:
+            if key in self._data:
+                self._drop(key, dropped)
+            self._data[key] = (expires, size, value)
+            self._bytes += size
+            self._evict(dropped, keep=key)
+        self._release(dropped)
+
+    def _evict(self, dropped: list, keep=None):
+        now = time.monotonic()
+        for k in [k for k, (exp, _, _) in self._data.items() if exp is not None and exp <= now]:
+            self._drop(k, dropped)
+        while len(self._data) > self.maxsize or (self.max_bytes and self._bytes > self.max_bytes and len(self._data) > 1):
+            oldest = next(iter(self._data))
+            if oldest == keep:
+                break
+            self._drop(oldest, dropped)
+
+    def peek(self, key: Hashable, default=None):
+        """Like get() but without touching LRU order or hit/miss counters."""
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is not None and (hit[0] is None or hit[0] > time.monotonic()):
+                return hit[2]
+        return default
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]):
+        """Return the cached value or build, store and return it (factory runs outside the lock)."""
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is not sentinel:
+            return value
+        value = factory()
+        self.set(key, value)
+        return value
+
+    def pop(self, key: Hashable, default=None):
+        dropped = []
+        with self._lock:
+            if key in self._data:
+                self._drop(key, dropped)
+        self._release(dropped)
+        return dropped[0][1] if dropped else default
+
+    def clear(self) -> None:
+        dropped = []
+        with self._lock:
+            for key in list(self._data):
+                self._drop(key, dropped)
+        self._release(dropped)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            hit = self._data.get(key)
+            return hit is not None and (hit[0] is None or hit[0] > time.monotonic())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "name": self.name,
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
@@ -0,0 +1,224 @@
+"""
+Precomputed Sri Lankan climate table: region x month -> rain probability,
+monsoon and temperature band.
+
+Lookups are dict hits keyed by canonical place (see server.utils.places), so
+the activity, packing and summary agents can ask "is the 14th risky in Ella?"
+per day or per suggestion at no cost. Figures are rounded climatology (share
+of rainy days per month), not forecasts.
+
+An optional live overlay (CLIMATE_LIVE_OVERLAY=true) blends in the weather
+agent's short-range forecast for dates it covers; results are cached per
+place/day so a request triggers at most one forecast call per place.
+"""
+
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Union
+
+from server.utils.places import PLACE_REGIONS, canonical_place, region_for
+
+try:
+    from server.utils.config import CLIMATE_LIVE_OVERLAY, WEATHER_API_KEY
+except Exception:
+    CLIMATE_LIVE_OVERLAY = False
+    WEATHER_API_KEY = None
+
+RAIN_RISK_THRESHOLD = 0.4
+
+# Monthly share of rainy days, Jan..Dec
+_REGION_RAIN = {
+    "west_south":        (0.25, 0.25, 0.35, 0.55, 0.70, 0.65, 0.55, 0.50, 0.55, 0.65, 0.60, 0.40),
+    "east":              (0.55, 0.35, 0.20, 0.20, 0.15, 0.10, 0.15, 0.20, 0.25, 0.45, 0.70, 0.75),
+    "hill":              (0.35, 0.25, 0.30, 0.50, 0.50, 0.55, 0.50, 0.45, 0.50, 0.65, 0.65, 0.50),
+    "cultural_triangle": (0.35, 0.20, 0.20, 0.40, 0.25, 0.15, 0.15, 0.15, 0.25, 0.55, 0.65, 0.55),
+    "deep_south":        (0.30, 0.20, 0.25, 0.40, 0.20, 0.15, 0.15, 0.15, 0.20, 0.45, 0.55, 0.45),
+    "north":             (0.30, 0.10, 0.10, 0.20, 0.15, 0.05, 0.10, 0.10, 0.20, 0.50, 0.70, 0.55),
+    "north_west":        (0.20, 0.15, 0.25, 0.45, 0.35, 0.25, 0.20, 0.20, 0.30, 0.60, 0.60, 0.35),
+}
+# which side of the island each monsoon soaks
+_WET_SIDE = {
+    "Southwest Monsoon": {"west_south", "hill"},
+    "Northeast Monsoon": {"east", "north", "cultural_triangle"},
+    "Inter-monsoon": {"west_south", "hill", "north_west"},
+}
+# same month ranges as orchestrator_utils.SRI_LANKA_SEASONS
+_MONSOON_BY_MONTH = {m: "Southwest Monsoon" for m in range(5, 10)}
+_MONSOON_BY_MONTH.update({m: "Northeast Monsoon" for m in (10, 11, 12, 1)})
+_MONSOON_BY_MONTH.update({m: "Inter-monsoon" for m in (2, 3, 4)})
+
+_HOT_MONTHS = {3, 4, 5, 6, 7, 8}
+# highland towns are cooler than their region's default
+_PLACE_TEMP = {
+    "Nuwara Eliya": "cool", "Haputale": "cool", "Hatton": "cool", "Talawakelle": "cool",
+    "Maskeliya": "cool", "St. Clair's Falls": "cool", "Devon Falls": "cool", "Poonagala": "cool",
+    "Ella": "mild", "Ella Rock": "mild", "Little Adam's Peak": "mild", "Knuckles Range": "mild",
+    "Kandy": "warm",
+}
+
+
+class MonthClimate(NamedTuple):
+    region: str
+    month: int
+    rain_probability: float
+    monsoon: str
+    wet_side: bool
+    temperature_band: str  # cool | mild | warm | hot
+
+
+def _temperature_band(region: str, place: Optional[str], month: int) -> str:
+    if place in _PLACE_TEMP:
+        return _PLACE_TEMP[place]
+    if region == "hill":
+        return "mild"
+    if region in ("cultural_triangle", "north", "deep_south", "north_west", "east"):
+        return "hot" if month in _HOT_MONTHS else "warm"
+    return "hot" if month in (3, 4, 5) else "warm"
+
+
+def _row(region: str, place: Optional[str] = None) -> tuple:
+    rain = _REGION_RAIN[region]
+    out = []
+    for m in range(1, 13):
+        monsoon = _MONSOON_BY_MONTH[m]
+        out.append(MonthClimate(
+            region=region,
+            month=m,
+            rain_probability=rain[m - 1],
+            monsoon=monsoon,
+            wet_side=region in _WET_SIDE[monsoon],
+            temperature_band=_temperature_band(region, place, m),
+        ))
+    return tuple(out)
+
+
+# island-wide fallback for places we cannot place on the map
+_ISLAND_RAIN = tuple(round(sum(r[i] for r in _REGION_RAIN.values()) / len(_REGION_RAIN), 2) for i in range(12))
+_REGION_RAIN["island"] = _ISLAND_RAIN
+
+# place (lowercase) -> 12 MonthClimate rows; built once at import
+_TABLE_MAX = 4096
+_TABLE: Dict[str, tuple] = {"": _row("island")}
+for _region, _places in PLACE_REGIONS.items():
+    _TABLE[_region] = _row(_region)
+    for _place in _places:
+        _TABLE[_place.lower()] = _row(_region, _place)
+
+
+def _rows_for(place: Optional[str]) -> tuple:
+    key = (place or "").strip().lower()
+    rows = _TABLE.get(key)
+    if rows is not None:
+        return rows
+    canon = canonical_place(place)
+    if canon:
+        rows = _TABLE.get(canon.lower())
+    if rows is None:
+        rows = _TABLE.get(region_for(place) or "") or _TABLE[""]
+    if len(_TABLE) < _TABLE_MAX:
+        _TABLE[key] = rows  # memoize free-text spellings too (bounded)
+    return rows
+
+
+def _month_of(when: Union[date, datetime, int]) -> int:
+    return when if isinstance(when, int) else when.month
+
+
+def climate_for(place: Optional[str], when: Union[date, datetime, int]) -> MonthClimate:
+    """Climate row for a place (free text is fine) and a date or month number."""
+    return _rows_for(place)[_month_of(when) - 1]
+
+
+def dry_months(region: str, threshold: float = RAIN_RISK_THRESHOLD) -> List[int]:
+    """Months whose rain probability is below `threshold` for a region."""
+    rows = _TABLE.get(region) or _TABLE[""]
+    return [r.month for r in rows if r.rain_probability < threshold]
+
+
+# --- optional live overlay -------------------------------------------------
+
+_LIVE_TTL_SECONDS = 3 * 60 * 60
+_LIVE_HORIZON_DAYS = 5
+_RAIN_WORDS = ("rain", "shower", "storm", "thunder", "drizzle")
+_live_cache: Dict[str, tuple] = {}
+_live_lock = threading.Lock()
+
+
+def _live_forecast(place: str) -> Dict[str, float]:
+    """date -> rain probability from the weather agent, cached per place."""
+    key = place.lower()
+    now = time.time()
+    with _live_lock:
+        hit = _live_cache.get(key)
+        if hit and now - hit[0] < _LIVE_TTL_SECONDS:
+            return hit[1]
+    by_day: Dict[str, float] = {}
+    try:
+        from server.agents.weather_agent.api_client import get_weather_forecast
+        today = date.today()
+        resp = get_weather_forecast(place, today.isoformat(), (today + timedelta(days=_LIVE_HORIZON_DAYS)).isoformat())
+        for f in resp.forecasts:
+            wet = any(w in (f.weather or "").lower() for w in _RAIN_WORDS)
+            by_day[f.date] = max(by_day.get(f.date, 0.0), 0.8 if wet else 0.2)
+    except Exception as e:
+        print(f"[climate] Live forecast unavailable for {place}: {e}")
+    with _live_lock:
+        _live_cache[key] = (now, by_day)
+    return by_day
+
+
+def rain_probability(place: Optional[str], when: Union[date, datetime], live: Optional[bool] = None) -> float:
+    base = climate_for(place, when).rain_probability
+    use_live = CLIMATE_LIVE_OVERLAY if live is None else live
+    if not use_live or not place or not WEATHER_API_KEY:
+        return base
+    d = when.date() if isinstance(when, datetime) else when
+    if not (0 <= (d - date.today()).days <= _LIVE_HORIZON_DAYS):
+        return base
+    forecast = _live_forecast(canonical_place(place) or place).get(d.isoformat())
+    return base if forecast is None else round(0.3 * base + 0.7 * forecast, 2)
+
+
+def is_rain_risky(place: Optional[str], when: Union[date, datetime], threshold: float = RAIN_RISK_THRESHOLD,
+                  live: Optional[bool] = None) -> bool:
+    return rain_probability(place, when, live) >= threshold
+
+
+def _as_date(value) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+    except Exception:
+        return None
+
+
+def trip_climate(place: Optional[str], start, end=None) -> Optional[dict]:
+    """
+    Roll the table up over a trip's months: worst/mean rain, bands and
+    monsoons seen. `start`/`end` may be dates or YYYY-MM-DD strings.
+    """
+    s = _as_date(start)
+    if s is None:
+        return None
+    e = _as_date(end) or s
+    if e < s:
+        s, e = e, s
+    months = []
+    cur = date(s.year, s.month, 1)
+    while cur <= e and len(months) < 13:
+        months.append(cur.month)
+        cur = date(cur.year + (cur.month == 12), cur.month % 12 + 1, 1)
+    rows = [climate_for(place, m) for m in months]
+    return {
+        "region": rows[0].region,
+        "months": months,
+        "max_rain_probability": max(r.rain_probability for r in rows),
+        "mean_rain_probability": round(sum(r.rain_probability for r in rows) / len(rows), 2),
+        "monsoons": list(dict.fromkeys(r.monsoon for r in rows)),
+        "wet_side": any(r.wet_side for r in rows),
+        "temperature_bands": list(dict.fromkeys(r.temperature_band for r in rows)),
+    }
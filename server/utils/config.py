@@ -41,6 +41,8 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES', '60')
 # Weather
 WEATHER_API_KEY = os.getenv('WEATHER_API_KEY')
 WEATHER_BASE_URL = os.getenv('WEATHER_BASE_URL')
+# Blend short-range forecasts from the weather agent into the climate table (server/utils/climate.py)
+CLIMATE_LIVE_OVERLAY = os.getenv('CLIMATE_LIVE_OVERLAY', 'false').lower() in ('1', 'true', 'yes')
 
 # Agents
 CONVERSATION_AGENT_URL = os.getenv('CONVERSATION_AGENT_URL')
@@ -49,6 +51,42 @@ ACTIVITY_AGENT_URL = os.getenv('ACTIVITY_AGENT_URL')
 PACKING_AGENT_URL = os.getenv('PACKING_AGENT_URL')
 ORCHESTRATOR_AGENT_URL = os.getenv('ORCHESTRATOR_AGENT_URL')
 
+# Packing lists come from the rule tables; the LLM may add at most this many extra items (0 = never call it)
+PACKING_LLM_EXTRAS = int(os.getenv('PACKING_LLM_EXTRAS', '5'))
+# Finished packing lists cached by weather, region, activity tags, duration/traveler buckets and trip type
+PACKING_CACHE_MAX = int(os.getenv('PACKING_CACHE_MAX', '256'))
+PACKING_CACHE_TTL_HOURS = float(os.getenv('PACKING_CACHE_TTL_HOURS', '24'))
+PACKING_CACHE_DIR = os.getenv('PACKING_CACHE_DIR', os.path.join(BASE_DIR, 'data', 'packing_cache'))
+PACKING_CACHE_PERSIST_DAYS = float(os.getenv('PACKING_CACHE_PERSIST_DAYS', '30'))
+# Clothing quantities assume a wash at least this often on longer trips
+PACKING_LAUNDRY_CYCLE_DAYS = int(os.getenv('PACKING_LAUNDRY_CYCLE_DAYS', '7'))
+# Summary agent: rendered sections cached by a hash of their inputs
+SUMMARY_SECTION_CACHE_MAX = int(os.getenv('SUMMARY_SECTION_CACHE_MAX', '512'))
+# Summary refiner: concurrent LLM calls when feedback targets several sections
+SUMMARY_REFINE_WORKERS = int(os.getenv('SUMMARY_REFINE_WORKERS', '4'))
+# Planning graph node memoization: memory | disk | off
+NODE_CACHE_BACKEND = os.getenv('NODE_CACHE_BACKEND', 'memory').lower()
+NODE_CACHE_MAX = int(os.getenv('NODE_CACHE_MAX', '512'))
+NODE_CACHE_DIR = os.getenv('NODE_CACHE_DIR', os.path.join(BASE_DIR, 'data', 'node_cache'))
+NODE_CACHE_TTL_SECONDS = float(os.getenv('NODE_CACHE_TTL_SECONDS', '3600'))
+# How often the disk backend deletes expired entry files (at most once per interval, on a write)
+NODE_CACHE_SWEEP_SECONDS = float(os.getenv('NODE_CACHE_SWEEP_SECONDS', '600'))
+# Latency budget per API request; a planning node that overruns its share uses its deterministic fallback
+REQUEST_BUDGET_SECONDS = float(os.getenv('REQUEST_BUDGET_SECONDS', '90'))
+NODE_TIMEOUT_SECONDS = float(os.getenv('NODE_TIMEOUT_SECONDS', '45'))
+# Client timeout/retries for a single LLM call (capped by the time left in the request)
+LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', '30'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '1'))
+DEADLINE_WORKERS = int(os.getenv('DEADLINE_WORKERS', '16'))
+# Speculative destination-level work while the orchestrator is still collecting fields
+PREFETCH_ENABLE = os.getenv('PREFETCH_ENABLE', 'true').lower() in ('1', 'true', 'yes')
+PREFETCH_WORKERS = int(os.getenv('PREFETCH_WORKERS', '4'))
+PREFETCH_TTL_SECONDS = float(os.getenv('PREFETCH_TTL_SECONDS', '900'))
+PREFETCH_MAX_SESSIONS = int(os.getenv('PREFETCH_MAX_SESSIONS', '256'))
+PREFETCH_WAIT_SECONDS = float(os.getenv('PREFETCH_WAIT_SECONDS', '30'))
+# Debug: fail a graph node that returns unchanged state keys instead of only the keys it changed
+STATE_DELTA_CHECK = os.getenv('STATE_DELTA_CHECK', 'false').lower() in ('1', 'true', 'yes')
+
 # OAuth2 - Google
 OAUTH_GOOGLE_CLIENT_ID = os.getenv('OAUTH_GOOGLE_CLIENT_ID')
 OAUTH_GOOGLE_CLIENT_SECRET = os.getenv('OAUTH_GOOGLE_CLIENT_SECRET')
@@ -67,11 +105,45 @@ EMAIL_PORT = os.getenv('EMAIL_PORT')
 # Activity Recommender
 ACTIVITY_FAISS_DIR = os.getenv('ACTIVITY_FAISS_DIR', "data/activity_faiss")
 ACTIVITY_SOURCES_JSON = os.getenv('ACTIVITY_SOURCES_JSON', "data/activity_sources.json")
+# Trips longer than ACTIVITY_WINDOW_DAYS are planned in day windows, generated concurrently
+ACTIVITY_WINDOW_DAYS = int(os.getenv('ACTIVITY_WINDOW_DAYS', '5'))
+ACTIVITY_WINDOW_WORKERS = int(os.getenv('ACTIVITY_WINDOW_WORKERS', '4'))
+# "rag" (retrieval + LLM) or "catalog" (deterministic plans from the offline activity catalog)
+ACTIVITY_MODE = os.getenv('ACTIVITY_MODE', 'rag').lower()
+ACTIVITY_CATALOG_POLISH = os.getenv('ACTIVITY_CATALOG_POLISH', 'false').lower() in ('1', 'true', 'yes')
+ACTIVITY_CATALOG_PATH = os.getenv('ACTIVITY_CATALOG_PATH', os.path.join(BASE_DIR, 'data', 'activity_catalog.json.gz'))
 
 ORCHESTRATOR_CHROMA_DIR = os.getenv('ORCHESTRATOR_CHROMA_DIR', "data/orchestrator_chroma")
+# Long user inputs stored in the orchestrator collection expire after this many hours (0 = keep)
+LONG_INPUT_TTL_HOURS = float(os.getenv('LONG_INPUT_TTL_HOURS', '24'))
+
+# Explorer agent: built per-page retrievers are reused for follow-up questions
+EXPLORER_CACHE_MAX_PAGES = int(os.getenv('EXPLORER_CACHE_MAX_PAGES', '32'))
+EXPLORER_CACHE_TTL_SECONDS = int(os.getenv('EXPLORER_CACHE_TTL_SECONDS', '3600'))
+EXPLORER_CACHE_MAX_MB = int(os.getenv('EXPLORER_CACHE_MAX_MB', '256'))
+# Explorer page fetcher limits
+EXPLORER_FETCH_CONNECT_TIMEOUT = float(os.getenv('EXPLORER_FETCH_CONNECT_TIMEOUT', '5'))
+EXPLORER_FETCH_READ_TIMEOUT = float(os.getenv('EXPLORER_FETCH_READ_TIMEOUT', '10'))
+EXPLORER_FETCH_MAX_BYTES = int(os.getenv('EXPLORER_FETCH_MAX_BYTES', str(2 * 1024 * 1024)))
+# Map-reduce page summaries: chunks per map call, concurrent LLM calls
+EXPLORER_SUMMARY_GROUP_CHUNKS = int(os.getenv('EXPLORER_SUMMARY_GROUP_CHUNKS', '4'))
+EXPLORER_SUMMARY_WORKERS = int(os.getenv('EXPLORER_SUMMARY_WORKERS', '4'))
+# Content-addressed page chunks/embeddings; state only keeps a reference
+EXPLORER_CONTENT_DIR = os.getenv('EXPLORER_CONTENT_DIR', os.path.join(BASE_DIR, 'data', 'explorer_content'))
+# Stored pages unused for this long are deleted, and the oldest go first past the size cap
+EXPLORER_CONTENT_TTL_SECONDS = float(os.getenv('EXPLORER_CONTENT_TTL_SECONDS', '86400'))
+EXPLORER_CONTENT_MAX_MB = int(os.getenv('EXPLORER_CONTENT_MAX_MB', os.getenv('EXPLORER_CACHE_MAX_MB', '256')))
+
+# Location agent recommendation cache (keyed by destination, months, preferences, trip type, budget, travelers)
+LOCATION_CACHE_MAX = int(os.getenv('LOCATION_CACHE_MAX', '512'))
+LOCATION_CACHE_TTL_HOURS = float(os.getenv('LOCATION_CACHE_TTL_HOURS', '24'))
+LOCATION_CACHE_PREWARM = os.getenv('LOCATION_CACHE_PREWARM', 'false').lower() in ('1', 'true', 'yes')
+LOCATION_CACHE_POPULAR_PATH = os.getenv('LOCATION_CACHE_POPULAR_PATH', os.path.join(BASE_DIR, 'data', 'location_popular.json'))
 
 # Geocoder (OpenStreetMap Nominatim) - optional
 # Set GEOCODER_ENABLE=true in .env to enable remote geocoding lookups
 GEOCODER_ENABLE = os.getenv('GEOCODER_ENABLE', 'false').lower() in ('1', 'true', 'yes')
 GEOCODER_USER_AGENT = os.getenv('GEOCODER_USER_AGENT', 'seasonal-travel-recommender/1.0 (contact: you@example.com)')
-GEOCODER_CACHE_PATH = os.getenv('GEOCODER_CACHE_PATH', os.path.join(BASE_DIR, 'data', 'geocode_cache.json'))
\ No newline at end of file
+GEOCODER_CACHE_PATH = os.getenv('GEOCODER_CACHE_PATH', os.path.join(BASE_DIR, 'data', 'geocode_cache.json'))
+# Seed coordinates for the canonical places (server/utils/geo.py)
+PLACE_COORDS_PATH = os.getenv('PLACE_COORDS_PATH', os.path.join(BASE_DIR, 'data', 'place_coords.json'))
\ No newline at end of file
@@ -0,0 +1,196 @@
+"""
+Content-addressed store for fetched page chunks (and their embeddings).
+
+Chunks are saved once under the SHA-256 of their text as gzip JSON, with an
+optional gzip'd float32 embedding matrix next to them, so users exploring the
+same page share one copy and the conversation state only has to carry a small
+reference ({"content_ref", "url", "chunks"}) instead of the whole page.
+Recently used entries are also kept decoded in memory.
+
+The directory is bounded like the explorer's in-memory retriever cache: a
+read refreshes an entry's file times, and sweep() (run on a write, at most
+every _SWEEP_INTERVAL seconds) deletes entries unused for
+EXPLORER_CONTENT_TTL_SECONDS, then the least recently used ones until the
+store fits in EXPLORER_CONTENT_MAX_MB. A reference to a swept entry reads
+as None, as if it had never been stored.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from server.utils.cache import TTLCache
+
+try:
+    from server.utils.config import EXPLORER_CONTENT_DIR, EXPLORER_CONTENT_TTL_SECONDS, EXPLORER_CONTENT_MAX_MB
+except Exception:
+    EXPLORER_CONTENT_DIR = os.getenv('EXPLORER_CONTENT_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'explorer_content'))
+    EXPLORER_CONTENT_TTL_SECONDS = float(os.getenv('EXPLORER_CONTENT_TTL_SECONDS', '86400'))
+    EXPLORER_CONTENT_MAX_MB = int(os.getenv('EXPLORER_CONTENT_MAX_MB', os.getenv('EXPLORER_CACHE_MAX_MB', '256')))
+
+_HEX = set("0123456789abcdef")
+_SUFFIXES = (".json.gz", ".npy.gz")
+_SWEEP_INTERVAL = 600.0
+_memory = TTLCache(maxsize=64, ttl=60 * 60, name="content_store")
+_sweep_lock = threading.Lock()
+_last_sweep = 0.0
+
+
+def content_hash(texts: Iterable[str]) -> str:
+    """Stable SHA-256 over chunk texts; the store's address for a page."""
+    h = hashlib.sha256()
+    for t in texts:
+        h.update((t or "").encode("utf-8", "ignore"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def _path(digest: str, suffix: str) -> str:
+    if len(digest) != 64 or not set(digest) <= _HEX:
+        raise ValueError(f"Invalid content reference: {digest!r}")
+    return os.path.join(EXPLORER_CONTENT_DIR, digest[:2], f"{digest}{suffix}")
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _touch(digest: str) -> None:
+    # mark the entry as used so the sweep keeps it
+    for suffix in _SUFFIXES:
+        try:
+            os.utime(_path(digest, suffix))
+        except OSError:
+            pass
+
+
+def sweep(ttl: Optional[float] = None, max_bytes: Optional[int] = None) -> int:
+    """
+    Delete entries unused for `ttl` seconds, then the least recently used ones
+    until the store fits in `max_bytes` (defaults: EXPLORER_CONTENT_TTL_SECONDS,
+    EXPLORER_CONTENT_MAX_MB). Returns the number of entries removed.
+    """
+    global _last_sweep
+    ttl = EXPLORER_CONTENT_TTL_SECONDS if ttl is None else ttl
+    max_bytes = EXPLORER_CONTENT_MAX_MB * 1024 * 1024 if max_bytes is None else max_bytes
+    if not _sweep_lock.acquire(blocking=False):
+        return 0  # another thread is already sweeping
+    try:
+        _last_sweep = time.monotonic()
+        entries: Dict[str, list] = {}  # digest -> [last used, bytes, paths]
+        for dirpath, _, files in os.walk(EXPLORER_CONTENT_DIR):
+            for name in files:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                digest = name.split(".", 1)[0]
+                row = entries.setdefault(digest, [0.0, 0, []])
+                row[0] = max(row[0], st.st_mtime)
+                row[1] += st.st_size
+                row[2].append(path)
+        now = time.time()
+        total = sum(row[1] for row in entries.values())
+        removed = 0
+        for digest, (used, size, paths) in sorted(entries.items(), key=lambda kv: kv[1][0]):
+            if not (ttl and used < now - ttl) and not (max_bytes and total > max_bytes):
+                break
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            _memory.pop(digest)
+            total -= size
+            removed += 1
+    finally:
+        _sweep_lock.release()
+    if removed:
+        print(f"[content_store] Swept {removed} entr{'y' if removed == 1 else 'ies'} ({total / 1e6:.1f} MB left)")
+    return removed
+
+
+def _maybe_sweep() -> None:
+    if time.monotonic() - _last_sweep >= _SWEEP_INTERVAL:
+        try:
+            sweep()
+        except Exception as e:
+            print(f"[content_store] Sweep failed: {e}")
+
+
+def put_chunks(url: Optional[str], chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Store chunk dicts ({"page_content", "metadata"}) and return the reference
+    to keep in state. Storing the same content again is a no-op.
+    """
+    digest = content_hash(c.get("page_content", "") for c in chunks)
+    path = _path(digest, ".json.gz")
+    if not os.path.exists(path):
+        payload = json.dumps({"url": url, "chunks": chunks}, ensure_ascii=False).encode("utf-8")
+        _atomic_write(path, gzip.compress(payload, compresslevel=6))
+        _maybe_sweep()
+    else:
+        _touch(digest)
+    _memory.set(digest, chunks)
+    return {"content_ref": digest, "url": url, "chunks": len(chunks)}
+
+
+def get_chunks(digest: str) -> Optional[List[Dict[str, Any]]]:
+    """Chunk dicts for a reference, or None if it was never stored or has been cleaned up."""
+    cached = _memory.get(digest)
+    if cached is not None:
+        _touch(digest)
+        return cached
+    try:
+        with gzip.open(_path(digest, ".json.gz"), "rt", encoding="utf-8") as f:
+            chunks = json.load(f).get("chunks") or []
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"[content_store] Could not read {digest[:12]}: {e}")
+        return None
+    _touch(digest)
+    _memory.set(digest, chunks)
+    return chunks
+
+
+def put_embeddings(digest: str, vectors) -> None:
+    """Save the embedding matrix for stored chunks (float32, row per chunk)."""
+    buf = io.BytesIO()
+    np.save(buf, np.asarray(vectors, dtype=np.float32), allow_pickle=False)
+    _atomic_write(_path(digest, ".npy.gz"), gzip.compress(buf.getvalue(), compresslevel=1))
+
+
+def get_embeddings(digest: str) -> Optional[np.ndarray]:
+    try:
+        with gzip.open(_path(digest, ".npy.gz"), "rb") as f:
+            return np.load(io.BytesIO(f.read()), allow_pickle=False)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"[content_store] Could not read embeddings for {digest[:12]}: {e}")
+        return None
+
+
+def is_reference(content: Any) -> bool:
+    return isinstance(content, dict) and isinstance(content.get("content_ref"), str)
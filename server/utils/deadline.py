@@ -0,0 +1,155 @@
+# server/utils/deadline.py
+"""
+Request-level latency budget.
+
+The API opens request_deadline(REQUEST_BUDGET_SECONDS) around the graph run;
+the deadline lives in a ContextVar, so every node and helper on the request
+can ask how much time is left (remaining()). run_with_timeout() runs a call
+in a worker thread and stops waiting for it after `timeout` seconds (or at
+the request deadline, whichever comes first), raising DeadlineExceeded; the
+call sees the tighter deadline, so llm_timeout() inside it never outlives
+its caller. A call that timed out keeps running in the background until its
+own client timeout ends it - its result is simply dropped, so every call
+run this way must carry a client/HTTP timeout of its own (llm_timeout()).
+
+Each call runs on its own daemon thread. At most DEADLINE_WORKERS top-level
+calls run at once; a call that timed out gives its slot back straight away,
+so a hung client cannot starve later requests - it only lingers until
+its (deadline-capped) client timeout. A run_with_timeout() made from
+inside one of these calls takes no slot: it could otherwise wait behind the
+very calls waiting for it.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as _FutureTimeout
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Any, Callable, Optional
+
+try:
+    from server.utils.config import DEADLINE_WORKERS, LLM_TIMEOUT_SECONDS
+except Exception:
+    DEADLINE_WORKERS = int(os.getenv('DEADLINE_WORKERS', '16'))
+    LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', '30'))
+
+# the shortest client timeout handed out, even when the budget is (nearly) spent
+_MIN_CALL_SECONDS = 1.0
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+_in_worker: ContextVar[bool] = ContextVar("deadline_worker", default=False)
+_slots = threading.BoundedSemaphore(DEADLINE_WORKERS)
+
+
+class DeadlineExceeded(TimeoutError):
+    """A call ran past its timeout or the request deadline."""
+
+
+@contextmanager
+def request_deadline(seconds: Optional[float]):
+    """Give everything inside the block `seconds` in total (None or <= 0: no deadline)."""
+    if not seconds or seconds <= 0:
+        yield
+        return
+    token = _deadline.set(_earliest(_deadline.get(), time.monotonic() + seconds))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def _earliest(a: Optional[float], b: Optional[float]) -> Optional[float]:
+    if a is None:
+        return b
+    return a if b is None else min(a, b)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the request deadline (never negative), or None without one."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def llm_timeout(default: float = LLM_TIMEOUT_SECONDS) -> float:
+    """Client timeout for one LLM/network call: `default`, capped by the time left."""
+    left = remaining()
+    if left is None:
+        return default
+    return max(_MIN_CALL_SECONDS, min(default, left))
+
+
+class _Slot:
+    """One of the DEADLINE_WORKERS slots, given back once: when the call ends or when its caller gives up."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._held = True
+
+    def release(self) -> None:
+        with self._lock:
+            if not self._held:
+                return
+            self._held = False
+        _slots.release()
+
+
+def _start_thread(slot: Optional[_Slot], fn: Callable[..., Any], *args, **kwargs) -> Future:
+    future: Future = Future()
+
+    def run() -> None:
+        try:
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+        finally:
+            if slot is not None:
+                slot.release()
+
+    threading.Thread(target=run, name="deadline" if slot else "deadline-nested", daemon=True).start()
+    return future
+
+
+def run_with_timeout(fn: Callable[..., Any], timeout: Optional[float], *args, **kwargs) -> Any:
+    """
+    fn(*args, **kwargs), giving up after `timeout` seconds or at the request
+    deadline (time spent waiting for a free slot included). Raises
+    DeadlineExceeded; exceptions from `fn` propagate. Without either limit
+    `fn` runs inline.
+    """
+    left = remaining()
+    if timeout is None and left is None:
+        return fn(*args, **kwargs)
+    limit = left if timeout is None else (timeout if left is None else min(timeout, left))
+    name = getattr(fn, '__name__', 'call')
+    if limit <= 0:
+        raise DeadlineExceeded(f"{name}: no time left")
+
+    end = time.monotonic() + limit
+    ctx = copy_context()
+    ctx.run(_deadline.set, end)
+    nested = ctx.run(_in_worker.get)
+    ctx.run(_in_worker.set, True)
+    slot = None
+    if not nested:
+        if not _slots.acquire(timeout=limit):
+            raise DeadlineExceeded(f"{name}: no free worker within {limit:.1f}s")
+        slot = _Slot()
+    future = _start_thread(slot, ctx.run, fn, *args, **kwargs)
+    try:
+        return future.result(timeout=max(0.0, end - time.monotonic()))
+    except _FutureTimeout:
+        # the call runs on until its client timeout, but no longer counts against the pool
+        if slot is not None:
+            slot.release()
+        raise DeadlineExceeded(f"{name}: no result after {limit:.1f}s")
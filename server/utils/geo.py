@@ -0,0 +1,393 @@
+"""
+Coordinates, proximity queries and travel times for Sri Lankan places.
+
+Coordinates for the canonical places (server/utils/places.py) come from the
+seed file server/data/place_coords.json. Any other name is looked up in the
+geocode cache (GEOCODER_CACHE_PATH) and, only if GEOCODER_ENABLE is set,
+resolved with OpenStreetMap Nominatim and written back to that cache, so a
+name is geocoded at most once per install. Failed lookups are cached too.
+
+The seeded places are held in a uniform lat/lon grid (about 25 km cells) for
+radius and k-nearest queries, and a place-to-place travel-time matrix is
+computed once on first use. Travel times are estimates: great-circle
+distance times a road-winding factor, at a speed that depends on the
+regions at either end (hill-country roads are much slower).
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from server.utils.places import canonical_place, load_places, region_for
+
+try:
+    from server.utils.config import (
+        BASE_DIR,
+        GEOCODER_ENABLE,
+        GEOCODER_USER_AGENT,
+        GEOCODER_CACHE_PATH,
+    )
+except Exception:
+    BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+    GEOCODER_ENABLE = os.getenv('GEOCODER_ENABLE', 'false').lower() in ('1', 'true', 'yes')
+    GEOCODER_USER_AGENT = os.getenv('GEOCODER_USER_AGENT', 'seasonal-travel-recommender/1.0')
+    GEOCODER_CACHE_PATH = os.getenv('GEOCODER_CACHE_PATH', os.path.join(BASE_DIR, 'data', 'geocode_cache.json'))
+
+try:
+    from server.utils.config import PLACE_COORDS_PATH
+except Exception:
+    PLACE_COORDS_PATH = os.getenv('PLACE_COORDS_PATH', os.path.join(BASE_DIR, 'data', 'place_coords.json'))
+
+Coord = Tuple[float, float]
+PlaceOrCoord = Union[str, Coord]
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+EARTH_RADIUS_KM = 6371.0088
+GRID_CELL_DEG = 0.25
+
+# roads wind; straight-line distance times this is a fair road-distance estimate
+ROAD_FACTOR = 1.35
+# average driving speed (km/h) by region; a trip uses the slower of its two ends
+REGION_SPEED_KMH = {
+    "hill": 32.0,
+    "west_south": 42.0,
+    "cultural_triangle": 45.0,
+    "east": 45.0,
+    "deep_south": 45.0,
+    "north": 50.0,
+    "north_west": 50.0,
+}
+DEFAULT_SPEED_KMH = 40.0
+# minimum door-to-door minutes for two distinct places (parking, getting out of town)
+MIN_HOP_MINUTES = 10.0
+
+_geocode_lock = threading.Lock()
+_geocode_cache: Optional[Dict[str, Optional[List[float]]]] = None
+_geocode_inflight: Dict[str, threading.Event] = {}
+_rate_lock = threading.Lock()
+_next_request = 0.0
+
+
+def haversine_km(a: Coord, b: Coord) -> float:
+    lat1, lon1 = map(math.radians, a)
+    lat2, lon2 = map(math.radians, b)
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(h)))
+
+
+# --- coordinates -------------------------------------------------------------
+
+@lru_cache(maxsize=1)
+def seed_coords() -> Dict[str, Coord]:
+    """Canonical place -> (lat, lon) from the seed file, restricted to known places."""
+    try:
+        with open(PLACE_COORDS_PATH, "r", encoding="utf-8") as f:
+            raw = json.load(f).get("places", {})
+    except Exception as e:
+        print(f"[geo] Could not load {PLACE_COORDS_PATH}: {e}")
+        raw = {}
+    coords = {}
+    for name in load_places():
+        row = raw.get(name)
+        if row and row.get("lat") is not None and row.get("lon") is not None:
+            coords[name] = (float(row["lat"]), float(row["lon"]))
+    missing = [p for p in load_places() if p not in coords]
+    if missing:
+        print(f"[geo] No seed coordinates for: {', '.join(missing)}")
+    return coords
+
+
+def _cache_key(name: str) -> str:
+    return " ".join(name.lower().split())
+
+
+def _load_geocode_cache() -> Dict[str, Optional[List[float]]]:
+    global _geocode_cache
+    if _geocode_cache is None:
+        try:
+            with open(GEOCODER_CACHE_PATH, "r", encoding="utf-8") as f:
+                _geocode_cache = json.load(f)
+        except FileNotFoundError:
+            _geocode_cache = {}
+        except Exception as e:
+            print(f"[geo] Could not read geocode cache: {e}")
+            _geocode_cache = {}
+    return _geocode_cache
+
+
+def _save_geocode_cache() -> None:
+    try:
+        os.makedirs(os.path.dirname(GEOCODER_CACHE_PATH), exist_ok=True)
+        tmp = GEOCODER_CACHE_PATH + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(_geocode_cache, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp, GEOCODER_CACHE_PATH)
+    except Exception as e:
+        print(f"[geo] Could not save geocode cache: {e}")
+
+
+def _nominatim(name: str) -> Optional[Coord]:
+    """One Nominatim lookup, restricted to Sri Lanka; respects the 1 request/second policy."""
+    global _next_request
+    import requests
+
+    # reserve the next free one-second slot; the wait happens outside the lock
+    with _rate_lock:
+        now = time.monotonic()
+        at = max(now, _next_request)
+        _next_request = at + 1.0
+    if at > now:
+        time.sleep(at - now)
+    resp = requests.get(
+        NOMINATIM_URL,
+        params={"q": name, "format": "json", "limit": 1, "countrycodes": "lk"},
+        headers={"User-Agent": GEOCODER_USER_AGENT},
+        timeout=10,
+    )
+    resp.raise_for_status()
+    rows = resp.json()
+    if not rows:
+        return None
+    return float(rows[0]["lat"]), float(rows[0]["lon"])
+
+
+def geocode(name: str) -> Optional[Coord]:
+    """Cached geocode of a free-text place name; remote lookups only when GEOCODER_ENABLE is set."""
+    key = _cache_key(name or "")
+    if not key:
+        return None
+    # the lock guards the cache only; the remote call runs outside it
+    with _geocode_lock:
+        cache = _load_geocode_cache()
+        if key in cache:
+            hit = cache[key]
+            return (hit[0], hit[1]) if hit else None
+        if not GEOCODER_ENABLE:
+            return None
+        pending = _geocode_inflight.get(key)
+        if pending is None:
+            _geocode_inflight[key] = threading.Event()
+    if pending is not None:
+        # another thread is already looking this name up: share its answer
+        pending.wait()
+        with _geocode_lock:
+            hit = _load_geocode_cache().get(key)
+        return (hit[0], hit[1]) if hit else None
+    try:
+        found = _nominatim(name)
+        with _geocode_lock:
+            _load_geocode_cache()[key] = list(found) if found else None
+            _save_geocode_cache()
+        return found
+    except Exception as e:
+        # network trouble is not a negative answer; try again next time
+        print(f"[geo] Geocoding '{name}' failed: {e}")
+        return None
+    finally:
+        with _geocode_lock:
+            _geocode_inflight.pop(key).set()
+
+
+def coords_for(place: Optional[str]) -> Optional[Coord]:
+    """(lat, lon) for a place name: seed file for known places, geocode cache/Nominatim otherwise."""
+    if not place:
+        return None
+    seeds = seed_coords()
+    if place in seeds:
+        return seeds[place]
+    canon = canonical_place(place)
+    if canon and canon in seeds:
+        return seeds[canon]
+    return geocode(place)
+
+
+def _as_coord(p: PlaceOrCoord) -> Optional[Coord]:
+    if isinstance(p, str):
+        return coords_for(p)
+    if p is None:
+        return None
+    return float(p[0]), float(p[1])
+
+
+# --- spatial index -----------------------------------------------------------
+
+class PlaceIndex:
+    """
+    Uniform lat/lon grid over named points. Queries scan rings of cells
+    outward from the query point and stop once no unscanned cell can hold
+    anything closer than what has been found.
+    """
+
+    def __init__(self, points: Dict[str, Coord], cell_deg: float = GRID_CELL_DEG):
+        self.cell_deg = cell_deg
+        self.points = dict(points)
+        self._cells: Dict[Tuple[int, int], List[str]] = {}
+        for name, (lat, lon) in self.points.items():
+            self._cells.setdefault(self._cell(lat, lon), []).append(name)
+        rows = [c[0] for c in self._cells] or [0]
+        cols = [c[1] for c in self._cells] or [0]
+        self._bounds = (min(rows), max(rows), min(cols), max(cols))
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg))
+
+    def _ring(self, center: Tuple[int, int], r: int) -> Iterable[str]:
+        ci, cj = center
+        for i in range(ci - r, ci + r + 1):
+            for j in range(cj - r, cj + r + 1):
+                if max(abs(i - ci), abs(j - cj)) == r:
+                    yield from self._cells.get((i, j), ())
+
+    def _ring_min_km(self, lat: float, r: int) -> float:
+        # anything first seen in ring r+1 is at least r cells away (longitude cells shrink with latitude)
+        if r <= 0:
+            return 0.0
+        return r * self.cell_deg * 111.32 * min(1.0, math.cos(math.radians(abs(lat) + r * self.cell_deg)))
+
+    def nearest(self, coord: Coord, k: int = 5, max_km: Optional[float] = None,
+                exclude: Iterable[str] = ()) -> List[Tuple[str, float]]:
+        """Up to k (name, km) pairs closest to `coord`, nearest first."""
+        lat, lon = coord
+        center = self._cell(lat, lon)
+        skip = set(exclude)
+        found: List[Tuple[float, str]] = []
+        # the query point may lie outside the grid, so rings must be able to reach its far corner
+        ci, cj = center
+        r0, r1, c0, c1 = self._bounds
+        reach = max(abs(ci - r0), abs(ci - r1), abs(cj - c0), abs(cj - c1))
+        for r in range(reach + 1):
+            for name in self._ring(center, r):
+                if name not in skip:
+                    found.append((haversine_km(coord, self.points[name]), name))
+            if len(found) >= k:
+                found.sort()
+                bound = self._ring_min_km(lat, r)
+                if found[k - 1][0] <= bound:
+                    break
+            if max_km is not None and self._ring_min_km(lat, r) > max_km:
+                break
+        found.sort()
+        if max_km is not None:
+            found = [f for f in found if f[0] <= max_km]
+        return [(name, km) for km, name in found[:k]]
+
+    def within(self, coord: Coord, radius_km: float, exclude: Iterable[str] = ()) -> List[Tuple[str, float]]:
+        """All (name, km) pairs within `radius_km` of `coord`, nearest first."""
+        return self.nearest(coord, k=len(self.points), max_km=radius_km, exclude=exclude)
+
+
+@lru_cache(maxsize=1)
+def place_index() -> PlaceIndex:
+    return PlaceIndex(seed_coords())
+
+
+# --- travel times ------------------------------------------------------------
+
+def _speed_kmh(a: Optional[str], b: Optional[str]) -> float:
+    speeds = [REGION_SPEED_KMH.get(region_for(p) or "", DEFAULT_SPEED_KMH) for p in (a, b) if p]
+    return min(speeds) if speeds else DEFAULT_SPEED_KMH
+
+
+def estimate_minutes(km: float, speed_kmh: float = DEFAULT_SPEED_KMH) -> float:
+    if km <= 0.05:
+        return 0.0
+    return max(MIN_HOP_MINUTES, km * ROAD_FACTOR / speed_kmh * 60.0)
+
+
+class _TravelMatrix:
+    def __init__(self, coords: Dict[str, Coord]):
+        self.names = list(coords)
+        self.index = {n: i for i, n in enumerate(self.names)}
+        n = len(self.names)
+        self.km = [[0.0] * n for _ in range(n)]
+        self.minutes = [[0.0] * n for _ in range(n)]
+        for i, a in enumerate(self.names):
+            for j in range(i + 1, n):
+                b = self.names[j]
+                km = haversine_km(coords[a], coords[b])
+                mins = estimate_minutes(km, _speed_kmh(a, b))
+                self.km[i][j] = self.km[j][i] = km
+                self.minutes[i][j] = self.minutes[j][i] = mins
+
+
+@lru_cache(maxsize=1)
+def _travel_matrix() -> _TravelMatrix:
+    return _TravelMatrix(seed_coords())
+
+
+def _canon(p: PlaceOrCoord) -> Optional[str]:
+    if not isinstance(p, str):
+        return None
+    if p in seed_coords():
+        return p
+    return canonical_place(p)
+
+
+def distance_km(a: PlaceOrCoord, b: PlaceOrCoord) -> Optional[float]:
+    """Great-circle km between two places or coordinates; None if either is unknown."""
+    m = _travel_matrix()
+    ca, cb = _canon(a), _canon(b)
+    if ca in m.index and cb in m.index:
+        return m.km[m.index[ca]][m.index[cb]]
+    pa, pb = _as_coord(a), _as_coord(b)
+    if pa is None or pb is None:
+        return None
+    return haversine_km(pa, pb)
+
+
+def travel_minutes(a: PlaceOrCoord, b: PlaceOrCoord) -> Optional[float]:
+    """Estimated driving minutes between two places or coordinates; None if either is unknown."""
+    m = _travel_matrix()
+    ca, cb = _canon(a), _canon(b)
+    if ca in m.index and cb in m.index:
+        return m.minutes[m.index[ca]][m.index[cb]]
+    km = distance_km(a, b)
+    if km is None:
+        return None
+    return estimate_minutes(km, _speed_kmh(ca, cb))
+
+
+def travel_matrix(stops: Sequence[PlaceOrCoord], unknown: float = float("inf")) -> List[List[float]]:
+    """
+    Pairwise driving minutes for `stops` (names or coordinates). Stops that
+    cannot be located get `unknown` to everything else.
+    """
+    m = _travel_matrix()
+    canon = [_canon(s) for s in stops]
+    coords = [seed_coords()[c] if c in m.index else _as_coord(s) for s, c in zip(stops, canon)]
+    n = len(stops)
+    out = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(i + 1, n):
+            if canon[i] in m.index and canon[j] in m.index:
+                mins = m.minutes[m.index[canon[i]]][m.index[canon[j]]]
+            elif coords[i] is not None and coords[j] is not None:
+                mins = estimate_minutes(haversine_km(coords[i], coords[j]), _speed_kmh(canon[i], canon[j]))
+            else:
+                mins = unknown
+            out[i][j] = out[j][i] = mins
+    return out
+
+
+def nearby_places(place: PlaceOrCoord, max_minutes: float = 90.0, k: Optional[int] = None) -> List[Tuple[str, float]]:
+    """
+    Canonical places reachable from `place` within `max_minutes`, as
+    (name, minutes) pairs, closest first. The place itself is excluded.
+    """
+    coord = _as_coord(place)
+    if coord is None:
+        return []
+    own = _canon(place)
+    # no speed is faster than the fastest region, which bounds the search radius
+    radius = max_minutes / 60.0 * max(REGION_SPEED_KMH.values()) / ROAD_FACTOR
+    out = []
+    for name, _km in place_index().within(coord, radius, exclude=(own,) if own else ()):
+        mins = travel_minutes(own or coord, name)
+        if mins is not None and mins <= max_minutes:
+            out.append((name, mins))
+    out.sort(key=lambda t: (t[1], t[0]))
+    return out[:k] if k else out
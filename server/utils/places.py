@@ -0,0 +1,134 @@
+"""
+Canonical Sri Lankan place names shared by the agents.
+
+Backed by server/data/sri_lanka_places.json. Names are matched on word
+boundaries, longest alias first, so "Ella Rock" wins over "Ella" and the
+parenthetical alias in "Tissa (Tissamaharama)" resolves to "Tissa".
+"""
+
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from server.utils.config import BASE_DIR
+
+PLACES_JSON = os.path.join(BASE_DIR, "data", "sri_lanka_places.json")
+
+# a few common spellings/abbreviations not covered by the places file
+_EXTRA_ALIASES = {
+    "trinco": "Trincomalee",
+    "nuwaraeliya": "Nuwara Eliya",
+    "arugambay": "Arugam Bay",
+    "tissamaharamaya": "Tissa",
+    "benthota": "Bentota",
+    "unawatuna": "Galle",
+    "minneriya": "Sigiriya",
+}
+
+# coarse climate/travel regions; weather and routing logic key off these
+PLACE_REGIONS = {
+    "west_south": (
+        "Colombo", "Galle", "Mirissa", "Hikkaduwa", "Negombo", "Matara", "Bentota", "Kalutara",
+        "Koggala", "Talpe", "Polhena", "Madu River", "Sinharaja", "Ratnapura", "Horagolla",
+        "Kitulgala", "Pinnawala", "Polgahawela",
+    ),
+    "east": (
+        "Trincomalee", "Arugam Bay", "Batticaloa", "Pasikuda", "Nilaveli", "Kalkudah", "Panama", "Kumana",
+    ),
+    "hill": (
+        "Kandy", "Ella", "Nuwara Eliya", "Haputale", "Hatton", "Diyaluma Falls", "Ravana Falls", "Ella Rock",
+        "Little Adam's Peak", "Knuckles Range", "Talawakelle", "Maskeliya", "St. Clair's Falls",
+        "Devon Falls", "Poonagala", "Ginigathhena", "Kalthota",
+    ),
+    "cultural_triangle": (
+        "Sigiriya", "Anuradhapura", "Polonnaruwa", "Dambulla", "Ritigala", "Eppawala",
+        "Mahiyanganaya", "Mahiyangana",
+    ),
+    "deep_south": ("Tissa", "Yala", "Udawalawe", "Kataragama"),
+    "north": ("Jaffna", "Mannar", "Mullaitivu", "Kayts", "Vavuniya"),
+    "north_west": ("Puttalam", "Kalpitiya"),
+}
+_REGION_BY_PLACE = {p.lower(): region for region, places in PLACE_REGIONS.items() for p in places}
+
+
+def _split_alias(name: str):
+    m = re.match(r"(.+?)\s*\((.+)\)\s*$", name)
+    if m:
+        return m.group(1).strip(), m.group(2).strip()
+    return name.strip(), None
+
+
+@lru_cache(maxsize=1)
+def load_places() -> List[str]:
+    """Canonical display names, in file order."""
+    try:
+        with open(PLACES_JSON, "r", encoding="utf-8") as f:
+            raw = json.load(f).get("places", [])
+    except Exception as e:
+        print(f"[places] Could not load {PLACES_JSON}: {e}")
+        raw = []
+    return [_split_alias(p)[0] for p in raw]
+
+
+@lru_cache(maxsize=1)
+def _alias_table() -> Dict[str, str]:
+    aliases = {}
+    try:
+        with open(PLACES_JSON, "r", encoding="utf-8") as f:
+            raw = json.load(f).get("places", [])
+    except Exception:
+        raw = []
+    for name in raw:
+        canon, alias = _split_alias(name)
+        aliases[canon.lower()] = canon
+        # curly apostrophes are common in scraped text
+        aliases[canon.lower().replace("'", "’")] = canon
+        if alias:
+            aliases[alias.lower()] = canon
+    for alias, canon in _EXTRA_ALIASES.items():
+        aliases.setdefault(alias, canon)
+    return aliases
+
+
+@lru_cache(maxsize=1)
+def _place_regex():
+    aliases = sorted(_alias_table(), key=len, reverse=True)
+    if not aliases:
+        return None
+    return re.compile(r"\b(" + "|".join(re.escape(a) for a in aliases) + r")\b", re.IGNORECASE)
+
+
+def find_places(text: Optional[str]) -> List[str]:
+    """All canonical places mentioned in `text`, in order of first mention."""
+    rx = _place_regex()
+    if not text or rx is None:
+        return []
+    table = _alias_table()
+    found = []
+    for m in rx.finditer(text):
+        canon = table.get(m.group(1).lower())
+        if canon and canon not in found:
+            found.append(canon)
+    return found
+
+
+def canonical_place(text: Optional[str]) -> Optional[str]:
+    """First canonical place mentioned in `text` (e.g. "ella, sri lanka" -> "Ella"), or None."""
+    found = find_places(text)
+    return found[0] if found else None
+
+
+def region_for(place: Optional[str]) -> Optional[str]:
+    if not place:
+        return None
+    region = _REGION_BY_PLACE.get(place.lower())
+    if region is None:
+        canon = canonical_place(place)
+        region = _REGION_BY_PLACE.get(canon.lower()) if canon else None
+    return region
+
+
+def places_in_region(region: Optional[str]) -> List[str]:
+    return list(PLACE_REGIONS.get(region or "", ()))
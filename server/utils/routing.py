@@ -0,0 +1,144 @@
+"""
+Visiting order for a handful of stops.
+
+solve_route() builds a tour with nearest-neighbour from the start stop and
+improves it with 2-opt (open path: no return leg). split_days() cuts the
+ordered stops into consecutive per-day clusters of roughly equal weight,
+where a heavy stop (e.g. the base town with many activities) can span
+several days. plan_route() wires both to geo.travel_matrix() for place
+names. For the ~50 stops a trip ever has this runs in a few milliseconds,
+so it replaces asking the LLM to reason about geography.
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+from server.utils.geo import PlaceOrCoord, coords_for, travel_matrix
+
+# stop 2-opt after this many full passes even if it is still improving (never hit in practice)
+MAX_2OPT_PASSES = 50
+_EPS = 1e-9
+
+
+def route_minutes(order: Sequence[int], matrix: Sequence[Sequence[float]]) -> float:
+    return sum(matrix[a][b] for a, b in zip(order, order[1:]))
+
+
+def nearest_neighbour(matrix: Sequence[Sequence[float]], start: int = 0) -> List[int]:
+    n = len(matrix)
+    order, left = [start], set(range(n)) - {start}
+    while left:
+        row = matrix[order[-1]]
+        nxt = min(left, key=lambda j: (row[j], j))
+        order.append(nxt)
+        left.discard(nxt)
+    return order
+
+
+def two_opt(order: List[int], matrix: Sequence[Sequence[float]], fixed_start: bool = True) -> List[int]:
+    """Reverse segments while that shortens the open path; the first stop stays put if fixed_start."""
+    order = list(order)
+    n = len(order)
+    first = 1 if fixed_start else 0
+    for _ in range(MAX_2OPT_PASSES):
+        improved = False
+        for i in range(first, n - 1):
+            a = order[i - 1] if i > 0 else None
+            b = order[i]
+            for j in range(i + 1, n):
+                c = order[j]
+                d = order[j + 1] if j + 1 < n else None
+                # edges (a,b) and (c,d) become (a,c) and (b,d); missing ends cost nothing
+                before = (matrix[a][b] if a is not None else 0.0) + (matrix[c][d] if d is not None else 0.0)
+                after = (matrix[a][c] if a is not None else 0.0) + (matrix[b][d] if d is not None else 0.0)
+                if after < before - _EPS:
+                    order[i:j + 1] = order[i:j + 1][::-1]
+                    b = order[i]
+                    improved = True
+        if not improved:
+            break
+    return order
+
+
+def _default_start(matrix: Sequence[Sequence[float]]) -> int:
+    # an open path usually starts at an extreme: the stop with the largest total distance to the rest
+    return max(range(len(matrix)), key=lambda i: (sum(matrix[i]), -i))
+
+
+def solve_route(matrix: Sequence[Sequence[float]], start: Optional[int] = None) -> List[int]:
+    """Indices in visiting order. `start` pins the first stop; otherwise one is chosen."""
+    n = len(matrix)
+    if n <= 2:
+        return [start] + [i for i in range(n) if i != start] if start is not None else list(range(n))
+    fixed = start is not None
+    order = nearest_neighbour(matrix, start if fixed else _default_start(matrix))
+    return two_opt(order, matrix, fixed_start=fixed)
+
+
+def split_days(order: Sequence[int], n_days: int, weights: Optional[Sequence[float]] = None) -> List[List[int]]:
+    """
+    Cut `order` into n_days consecutive clusters of about equal total weight.
+    A stop whose weight spans a cut appears in both clusters; every day gets
+    at least one stop when there are stops at all.
+    """
+    n_days = max(1, n_days)
+    if not order:
+        return [[] for _ in range(n_days)]
+    w = [max(0.0, float(weights[i])) if weights else 1.0 for i in order]
+    total = sum(w) or float(len(order))
+    if not sum(w):
+        w = [1.0] * len(order)
+    per_day = total / n_days
+    days: List[List[int]] = [[] for _ in range(n_days)]
+    pos = 0.0
+    for stop, weight in zip(order, w):
+        first_day = min(n_days - 1, int((pos + _EPS) // per_day))
+        last_day = min(n_days - 1, int(max(pos, pos + weight - _EPS) // per_day))
+        for d in range(first_day, last_day + 1):
+            days[d].append(stop)
+        pos += weight
+    # more days than stops: repeat the nearest earlier cluster's last stop
+    for d in range(n_days):
+        if not days[d]:
+            days[d] = [days[d - 1][-1]] if d else [order[0]]
+    return days
+
+
+def _locatable(p: PlaceOrCoord) -> bool:
+    return (coords_for(p) if isinstance(p, str) else p) is not None
+
+
+def plan_route(
+    stops: Sequence[PlaceOrCoord],
+    start: Optional[PlaceOrCoord] = None,
+    n_days: int = 1,
+    weights: Optional[Sequence[float]] = None,
+) -> Dict:
+    """
+    Visiting order and per-day clusters for place names or coordinates.
+
+    `start` (e.g. the trip's base town) is a fixed origin that is not itself a
+    stop. Stops that cannot be located keep their relative order at the end
+    of "order", are left out of "days" and are listed in "unlocated".
+    Returns indices into `stops`:
+    {"order", "days", "legs_minutes", "total_minutes", "unlocated"}.
+    """
+    located = [i for i, s in enumerate(stops) if _locatable(s)]
+    unlocated = [i for i in range(len(stops)) if i not in set(located)]
+    origin = start if start is not None and _locatable(start) else None
+    points = ([origin] if origin is not None else []) + [stops[i] for i in located]
+    matrix = travel_matrix(points)
+    path = solve_route(matrix, start=0 if origin is not None else None)
+    legs = [matrix[a][b] for a, b in zip(path, path[1:])]
+    if origin is not None:
+        path = [p - 1 for p in path[1:]]
+    order = [located[i] for i in path]
+    days = split_days(order, n_days, weights)
+    order += unlocated
+    return {
+        "order": order,
+        "days": days,
+        "legs_minutes": [round(m, 1) for m in legs],
+        "total_minutes": round(sum(legs), 1),
+        "unlocated": unlocated,
+    }
+
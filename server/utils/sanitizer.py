@@ -0,0 +1,105 @@
+"""
+Precompiled text and HTML sanitizers shared by the agents.
+
+clean_text() strips script tags, javascript:/data:text/html URIs, SQL
+keywords and shell metacharacters with one combined regex pass (re-run only
+if something was removed, so nested obfuscation like "javajavascript:script:"
+cannot survive) and then collapses whitespace. clean_html() is the
+bleach.clean(strip=True) wrapper the location, packing and summary agents
+use for LLM/user fields; text with nothing bleach would touch skips it.
+
+Both are memoized. sanitize_scope() additionally gives a request its own memo
+for callers with side effects (see text_security.sanitize_input), so the same
+query sanitized by several nodes in one request is handled once.
+"""
+
+import json
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Optional
+
+try:
+    import bleach
+except Exception:
+    bleach = None
+
+_STRIP_RE = re.compile(
+    # the lookahead rejects most positions with one class test before trying the branches
+    r"(?=[<;|&`$jdsuiate])(?:"
+    r"<\s*script.*?>.*?<\s*/\s*script\s*>"          # HTML/JS script blocks
+    r"|javascript:|data:text/html"                   # inline JS / suspicious URIs
+    r"|\b(?:SELECT|UPDATE|DELETE|INSERT|DROP|ALTER|TRUNCATE|EXEC)\b"  # basic SQLi keywords
+    r"|\|\||;|&&|`|\$\(.*?\))",                     # command injection
+    re.IGNORECASE,
+)
+_MAX_STRIP_PASSES = 4
+# cheap substring screen: text containing none of these cannot match _STRIP_RE
+_STRIP_TRIGGERS = ("<", "javascript:", "data:text/html", ";", "||", "&&", "`", "$(",
+                   "select", "update", "delete", "insert", "drop", "alter", "truncate", "exec")
+# characters bleach.clean may escape, drop or rewrite; text without them is returned as is
+_HTML_SENSITIVE_RE = re.compile(r"[<>&\x00-\x08\x0b-\x1f\x7f-\x9f\ud800-\udfff﷐-﷯￾￿]")
+_TAG_RE = re.compile(r"<[^>]*>")
+
+_request_memo: ContextVar[Optional[dict]] = ContextVar("sanitize_request_memo", default=None)
+
+
+@lru_cache(maxsize=2048)
+def clean_text(text: str) -> str:
+    """Injection patterns removed, whitespace normalized."""
+    folded = text.casefold()  # casefold, not lower: IGNORECASE also matches e.g. 'ſelect'
+    if not any(t in folded for t in _STRIP_TRIGGERS):
+        return " ".join(text.split())
+    for _ in range(_MAX_STRIP_PASSES):
+        text, removed = _STRIP_RE.subn("", text)
+        if not removed:
+            break
+    return " ".join(text.split())
+
+
+@lru_cache(maxsize=4096)
+def _bleach(text: str) -> str:
+    if not _HTML_SENSITIVE_RE.search(text):
+        return text
+    if bleach is not None:
+        return bleach.clean(text, strip=True)
+    return _TAG_RE.sub("", text)
+
+
+def to_text(value: Any) -> str:
+    """None -> '', dict/list -> JSON, anything else -> str()."""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        try:
+            return json.dumps(value, ensure_ascii=False)
+        except Exception:
+            return str(value)
+    return str(value)
+
+
+def clean_html(value: Any, max_len: Optional[int] = None) -> str:
+    """Coerce to text, strip HTML like bleach.clean(strip=True) and optionally truncate."""
+    cleaned = _bleach(to_text(value))
+    return cleaned[:max_len] if max_len is not None else cleaned
+
+
+@contextmanager
+def sanitize_scope():
+    """Per-request memo for request_memo(); nested scopes reuse the outer one."""
+    if _request_memo.get() is not None:
+        yield
+        return
+    token = _request_memo.set({})
+    try:
+        yield
+    finally:
+        _request_memo.reset(token)
+
+
+def request_memo() -> Optional[dict]:
+    """The current request's memo dict, or None outside sanitize_scope()."""
+    return _request_memo.get()
@@ -2,7 +2,8 @@ import re
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from typing import Optional
 
-from server.utils.vector_store import add_texts_to_vectorstore
+from server.utils.vector_store import store_session_texts
+from server.utils.sanitizer import clean_text, request_memo
 
 # Character limit (2000 chars max)
 SAFE_TEXT_PATTERNS = re.compile(r"^[\s\S]{0,2000}$")
@@ -10,9 +11,10 @@ SAFE_TEXT_PATTERNS = re.compile(r"^[\s\S]{0,2000}$")
 # Word limit (e.g., 300 words max)
 MAX_WORDS = 300
 
-def sanitize_input(text: Optional[str]) -> str:
+def sanitize_input(text: Optional[str], session_id: Optional[str] = None) -> str:
     """Sanitize input to prevent XSS, SQLi, and script injection.
     Safely handles None/empty input by returning an empty string.
+    Over-long input is stored in the vector DB under `session_id`.
     """
     if not text:
         print('Debug: sanitize_input received empty or None input.')
@@ -32,34 +34,29 @@ def sanitize_input(text: Optional[str]) -> str:
     #         detail="Input exceeds maximum word limit."
     #     )
 
-    print(f"\nDebug: Original input length: {len(text)} characters, {len(text.split())} words")
+    memo = request_memo()
+    key = (text, session_id)
+    if memo is not None and key in memo:
+        return memo[key]
 
-    # Remove HTML/JS script tags
-    text = re.sub(r"(?i)<\s*script.*?>.*?<\s*/\s*script\s*>", "", text)
+    print(f"\nDebug: Original input length: {len(text)} characters")
 
-    # Remove inline JavaScript and suspicious URIs
-    text = re.sub(r"(?i)javascript:", "", text)
-    text = re.sub(r"(?i)data:text/html", "", text)
-
-    # Remove SQL injection keywords (basic protection)
-    sql_patterns = r"(?i)\b(SELECT|UPDATE|DELETE|INSERT|DROP|ALTER|TRUNCATE|EXEC)\b"
-    text = re.sub(sql_patterns, "", text)
-
-    # Remove command injection patterns
-    cmd_patterns = r"(\|\||;|&&|`|\$\(.*?\))"
-    text = re.sub(cmd_patterns, "", text)
-
-    # Normalize whitespace (prevent obfuscation)
-    text = re.sub(r"\s+", " ", text).strip()
+    # Script tags, JS/data URIs, SQL keywords, command injection and
+    # whitespace obfuscation, in one precompiled pass (see server.utils.sanitizer)
+    text = clean_text(text)
 
     # if exceed word limit chunk + store in vector DB
-    if len(text.split()) > MAX_WORDS:
+    # (whitespace is already normalized, so words = spaces + 1)
+    if text.count(" ") + 1 > MAX_WORDS:
         splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
         # print(f"\nWord Splitting into chunks for storage. Total words: {len(text.split())}\n{splitter}")
         chunks = splitter.split_text(text)
         # print(f"\nChunks: {chunks}\n")
-        for i, chunk in enumerate(chunks):
-            add_texts_to_vectorstore([chunk], metadatas=[{"chunk_id": i}])
-        return "LONG_INPUT_STORED"
+        # one embedding batch + one write for the whole input, namespaced per session
+        stored = store_session_texts(session_id, chunks)
+        print(f"Debug: Stored {stored} new of {len(chunks)} chunks for session {session_id}")
+        text = "LONG_INPUT_STORED"
 
+    if memo is not None:
+        memo[key] = text
     return text
@@ -1,9 +1,25 @@
+import hashlib
 import os
+import threading
+import time
+from typing import List, Optional
+
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import Chroma
 
 from server.utils.config import OPENAI_API_KEY, ORCHESTRATOR_CHROMA_DIR
 
+try:
+    from server.utils.config import LONG_INPUT_TTL_HOURS
+except Exception:
+    LONG_INPUT_TTL_HOURS = float(os.getenv('LONG_INPUT_TTL_HOURS', '24'))
+
+# namespace for text stored without a session (e.g. scripts, older clients)
+DEFAULT_NAMESPACE = "shared"
+_CLEANUP_INTERVAL_SECONDS = 10 * 60
+_last_cleanup = 0.0
+_cleanup_lock = threading.Lock()
+
 # Initialize embeddings
 embeddings = OpenAIEmbeddings(api_key=OPENAI_API_KEY)
 
@@ -22,10 +38,77 @@ print(f"Current working directory: {os.getcwd()}")
 print(f"ChromaDB path: {os.path.abspath('chroma_db')}")
 
 
-def add_texts_to_vectorstore(texts: list[str], metadatas: list[dict] = None):
-    """Add texts with optional metadata to the vector DB."""
-    vectorstore.add_texts(texts=texts, metadatas=metadatas)
-    vectorstore.persist()
+def add_texts_to_vectorstore(texts: list[str], metadatas: list[dict] = None, ids: list[str] = None):
+    """Add texts with optional metadata to the vector DB (one embedding batch, one persist)."""
+    if not texts:
+        return []
+    added = vectorstore.add_texts(texts=texts, metadatas=metadatas, ids=ids)
+    try:
+        vectorstore.persist()
+    except Exception:
+        pass  # Chroma >= 0.4 persists automatically
+    return added
+
+
+def _chunk_id(namespace: str, text: str) -> str:
+    return hashlib.sha256(f"{namespace}\x00{text}".encode("utf-8", "ignore")).hexdigest()[:40]
+
+
+def store_session_texts(session_id: Optional[str], texts: List[str]) -> int:
+    """
+    Store chunks of a long user input under the caller's session.
+
+    Chunk ids are derived from session + text, so the same paste sanitized by
+    several nodes in one turn is only embedded once. Returns the number of
+    newly stored chunks.
+    """
+    namespace = session_id or DEFAULT_NAMESPACE
+    ids = [_chunk_id(namespace, t) for t in texts]
+    try:
+        existing = set(vectorstore.get(ids=ids, include=[]).get("ids") or [])
+    except Exception:
+        existing = set()
+    now = int(time.time())
+    new = [(cid, text, i) for i, (cid, text) in enumerate(zip(ids, texts)) if cid not in existing]
+    if new:
+        add_texts_to_vectorstore(
+            [text for _, text, _ in new],
+            metadatas=[{"session_id": namespace, "chunk_id": i, "stored_at": now} for _, _, i in new],
+            ids=[cid for cid, _, _ in new],
+        )
+    cleanup_expired_texts()
+    return len(new)
+
+
+def session_filter(session_id: Optional[str]) -> dict:
+    return {"session_id": session_id or DEFAULT_NAMESPACE}
+
+
+def search_session_texts(query: str, session_id: Optional[str], k: int = 4):
+    """Similarity search restricted to one session's stored text."""
+    return vectorstore.similarity_search(query, k=k, filter=session_filter(session_id))
+
+
+def cleanup_expired_texts(force: bool = False) -> int:
+    """Delete stored chunks older than LONG_INPUT_TTL_HOURS (runs at most every few minutes)."""
+    global _last_cleanup
+    now = time.time()
+    with _cleanup_lock:
+        if not force and now - _last_cleanup < _CLEANUP_INTERVAL_SECONDS:
+            return 0
+        _last_cleanup = now
+    if LONG_INPUT_TTL_HOURS <= 0:
+        return 0
+    cutoff = int(now - LONG_INPUT_TTL_HOURS * 3600)
+    try:
+        expired = vectorstore.get(where={"stored_at": {"$lt": cutoff}}, include=[]).get("ids") or []
+        if expired:
+            vectorstore.delete(ids=expired)
+            print(f"[vector_store] Removed {len(expired)} expired long-input chunks.")
+        return len(expired)
+    except Exception as e:
+        print(f"[vector_store] Cleanup failed: {e}")
+        return 0
 
 def get_vectorstore():
     """Return the initialized vectorstore."""
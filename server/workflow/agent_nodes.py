@@ -7,20 +7,43 @@ from datetime import datetime, timedelta
 
 # --- LangGraph/State Imports ---
 from langgraph.graph import StateGraph
-from server.workflow.app_state import TripPlanState
+from server.workflow.app_state import TripPlanState, apply_update, get_recs
 
 # --- Agent Imports (Assuming your files are accessible) ---
 # NOTE: Replace these with your actual import paths
 from server.agents.decision_agent.decision_agent import decision_agent_node as _run_decision_agent
 from server.agents.chat_agent.chat_agent import chat_agent_node as _run_chat_agent
-from server.agents.orchestrator_agent.orchestrator_agent import call_orchestrator_agent
-from server.agents.location_agent.location_agent import run_location_agent as _run_location_agent
+from server.agents.orchestrator_agent.orchestrator_agent import call_orchestrator_agent, run_llm_agent
+from server.agents.location_agent.location_agent import run_location_agent as _run_location_agent, fallback_locations
+from server.agents.location_agent.location_route import order_recommendations
 from server.agents.summary_agent.summary_agent import generate_summary as _run_summary_agent
 from server.agents.summary_agent.summary_refiner import refine_summary as _run_summary_refiner
-from server.agents.activity_agent.activity_indexer import suggest_activities
-from server.agents.packing_agent.packing_agent import generate_packing_list
-from server.agents.explorer_agent.explorer_agent import run_explorer_rag, extract_url_and_question, format_docs_for_state
-from server.schemas.orchestrator_schemas import OrchestratorAgent4InputSchema
+from server.agents.summary_agent.section_refiner import replace_section
+from server.agents.summary_agent.summary_sections import section_text
+from server.agents.activity_agent.activity_indexer import fallback_activities, suggest_activities
+from server.agents.packing_agent.packing_agent import generate_packing_list, requantify
+from server.agents.explorer_agent.explorer_agent import (
+    run_explorer_rag, extract_url_and_question, store_page_content, answer_from_session_text
+)
+from server.utils.text_security import sanitize_input
+from server.schemas.orchestrator_schemas import OrchestratorAgent4InputSchema, OrchestratorAgent4OutputSchema
+from server.workflow.replan import affected_agents, apply_changes, changed_fields, is_question, parse_trip_changes
+from server.workflow.node_cache import fingerprint, memoize_node, module_deps
+from server.workflow.node_deadline import with_deadline
+from server.workflow import prefetch
+from server.agents.location_agent import location_agent as _location_module, location_route as _location_route_module
+from server.agents.activity_agent import (
+    activity_indexer as _activity_module,
+    activity_catalog as _activity_catalog_module,
+    activity_scheduler as _activity_scheduler_module,
+)
+from server.agents.packing_agent import (
+    packing_agent as _packing_module,
+    rules as _packing_rules_module,
+    prompt as _packing_prompt_module,
+    quantities as _packing_quantities_module,
+)
+from server.agents.summary_agent import summary_agent as _summary_module, summary_sections as _summary_sections_module
 
 
 # --- Utility Functions to Format Structured Agent Outputs ---
@@ -46,6 +69,8 @@ def format_packing_list(packing_data: Dict[str, Any]) -> str:
         for item in items:
             item_name = item.get('name', 'Unknown Item')
             reason = item.get('reason')
+            if (item.get('quantity') or 1) > 1:
+                item_name = f"{item['quantity']} × {item_name}"
 
             if reason:
                 # Use a slightly cleaner format for reasons
@@ -110,26 +135,113 @@ def format_activity_list(activity_data: Dict[str, Any]) -> str:
     return "\n".join(summary_parts)
 
 
+# === Node Memoization ===
+# Each planning node is keyed by the state keys it reads plus a fingerprint of
+# its agent's code and prompts and of the server modules they import (see
+# server/workflow/node_cache.py).
+_TRIP_INPUTS = ("trip_data",)
+_SUMMARY_INPUTS = ("trip_data", "location_recs", "activity_recs", "packing_recs")
+
+_memoize_location = memoize_node(
+    "location_agent", inputs=_TRIP_INPUTS,
+    outputs=("location_recs", "final_response"),
+    version=fingerprint(*module_deps(_location_module, _location_route_module)), ttl=24 * 3600,
+)
+_memoize_activity = memoize_node(
+    "activity_agent", inputs=_TRIP_INPUTS,
+    outputs=("activity_recs", "final_response"),
+    version=fingerprint(*module_deps(_activity_module, _activity_catalog_module, _activity_scheduler_module)),
+    ttl=6 * 3600,
+)
+_memoize_packing = memoize_node(
+    "packing_agent", inputs=_TRIP_INPUTS + ("activity_recs",),
+    outputs=("packing_recs", "final_response"),
+    version=fingerprint(*module_deps(_packing_module, _packing_rules_module, _packing_prompt_module,
+                                     _packing_quantities_module)),
+    ttl=24 * 3600,
+)
+_memoize_summary = memoize_node(
+    "summary_agent", inputs=_SUMMARY_INPUTS,
+    outputs=("latest_summary", "final_response"),
+    version=fingerprint(*module_deps(_summary_module, _summary_sections_module)), ttl=3600,
+)
+
+
+# === Node Deadlines ===
+# Each planning node may use a share of the time left in the request (see
+# server/workflow/node_deadline.py); on overrun the deterministic fallback
+# below fills its section and the section is listed in state['degraded'].
+# Shares leave later nodes enough time even when every earlier one overruns.
+def _trip_for(state: Dict[str, Any]) -> Dict[str, Any]:
+    return state['trip_data'].dict() if state.get('trip_data') else {}
+
+
+def _summary_input(state: Dict[str, Any]) -> Dict[str, Any]:
+    # The Summary Agent's input schema keeps its own field names
+    return {
+        **_trip_for(state),
+        "location_recommendations": get_recs(state, 'location_recs') or {},
+        "activity_recommendations": get_recs(state, 'activity_recs') or {},
+        "packing_list": get_recs(state, 'packing_recs') or {},
+        "status": "completed",
+    }
+
+
+def _location_fallback(state: Dict[str, Any]) -> Dict[str, Any]:
+    trip = _trip_for(state)
+    return {
+        'location_recs': order_recommendations(
+            fallback_locations(trip), trip.get('destination'), trip.get('start_date'), trip.get('end_date')),
+        'final_response': f"Location recommendations generated for {trip.get('destination')}.",
+    }
+
+
+def _activity_fallback(state: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'activity_recs': fallback_activities(_trip_for(state)),
+        'final_response': "Activity plans have been generated.",
+    }
+
+
+def _packing_fallback(state: Dict[str, Any]) -> Dict[str, Any]:
+    # rule tables only; the LLM extras are what takes time
+    return {
+        'packing_recs': generate_packing_list(
+            _trip_for(state), suggested_activities=_activity_titles(state), use_llm=False),
+        'final_response': "Packing list is ready!",
+    }
+
+
+def _summary_fallback(state: Dict[str, Any]) -> Dict[str, Any]:
+    # the section template document, without the LLM polish
+    summary = _run_summary_agent(_summary_input(state), use_llm=False).summary
+    return {'latest_summary': summary, 'final_response': summary}
+
+
+_deadline_location = with_deadline("location", 0.3, _location_fallback,
+                                   status_keys=("location_recs",))
+_deadline_activity = with_deadline("activity", 0.5, _activity_fallback,
+                                   status_keys=("activity_recs",))
+_deadline_packing = with_deadline("packing", 0.4, _packing_fallback)
+_deadline_summary = with_deadline("summary", 0.9, _summary_fallback)
+
+
 # === Internal Agent Runner Nodes ===
 
+@_deadline_activity
+@_memoize_activity
 def _run_activity_agent(state: Dict[str, Any]) -> Dict[str, Any]:
     print("Executing Activity Agent: Generating activity plans...")
     # The suggest_activities function likely expects a dict of the trip details
     trip_data_for_activity = state['trip_data'].dict() if state.get('trip_data') else {}
+    # Retrieval may already have run speculatively while the orchestrator was collecting fields
+    docs = prefetch.take(state.get('session_id'), "activity_docs", trip_data_for_activity)
     # --- Actual Agent Logic ---
-    activity_output = suggest_activities(trip_data_for_activity)
-    state['activity_recs'] = activity_output
-    # Mirror naming convention to be robust for downstream consumers
-    state['activity_recommendations'] = state['activity_recs']
-    state['final_response'] = "Activity plans have been generated."
-    return state
-
+    activity_output = suggest_activities(trip_data_for_activity, prefetched_docs=docs)
+    return {'activity_recs': activity_output, 'final_response': "Activity plans have been generated."}
 
-def _run_packing_agent(state: Dict[str, Any]) -> Dict[str, Any]:
-    print("Executing Packing Agent: Generating packing list...")
-    # The generate_packing_list function expects a dict of the trip details
-    trip_data_for_packing = state['trip_data'].dict() if state.get('trip_data') else {}
 
+def _activity_titles(state: Dict[str, Any]) -> List[str]:
     # Extract existing activity recs if available, or pass an empty list
     activity_titles = []
     activity_recs = state.get('activity_recs')
@@ -137,28 +249,37 @@ def _run_packing_agent(state: Dict[str, Any]) -> Dict[str, Any]:
         for day in activity_recs['day_plans']:
             for suggestion in day.get('suggestions', []):
                 activity_titles.append(suggestion.get('title'))
+    return activity_titles
+
+
+@_deadline_packing
+@_memoize_packing
+def _run_packing_agent(state: Dict[str, Any]) -> Dict[str, Any]:
+    print("Executing Packing Agent: Generating packing list...")
+    # The generate_packing_list function expects a dict of the trip details
+    trip_data_for_packing = state['trip_data'].dict() if state.get('trip_data') else {}
+    activity_titles = _activity_titles(state)
 
     # --- Actual Agent Logic ---
-    # The generate_packing_list function returns a DICT now
+    # The generate_packing_list function returns a DICT now; the rule tables always
+    # produce a full list, the LLM only adds a few extras on top
     packing_output = generate_packing_list(trip_data_for_packing, suggested_activities=activity_titles)
+    return {'packing_recs': packing_output, 'final_response': "Packing list is ready!"}
 
-    # Heuristic: if the LLM-produced packing output looks sparse (e.g., very few categories
-    # or categories with very few items), prefer deterministic fallback to ensure useful results.
-    try:
-        cats = packing_output.get("categories") if isinstance(packing_output, dict) else None
-        total_items = sum(len(c.get("items", [])) for c in cats) if cats else 0
-        if not cats or total_items <= 1:
-            # Re-generate using deterministic rules (no LLM) for more robust coverage
-            packing_output = generate_packing_list(trip_data_for_packing, suggested_activities=activity_titles, use_llm=False)
-    except Exception:
-        # If any error occurs during the heuristic, just proceed with original packing_output
-        pass
-
-    state['packing_recs'] = packing_output
-    # Mirror naming convention so the Summary node can read either key
-    state['packing_list'] = state['packing_recs']
-    state['final_response'] = "Packing list is ready!"
-    return state
+
+def _requantify_packing(state: Dict[str, Any]) -> Dict[str, Any]:
+    # only the group size changed: same items, new quantities, no rule or LLM pass
+    packing = requantify(get_recs(state, 'packing_recs'), no_of_traveler=_trip_for(state).get('no_of_traveler'))
+    return {'packing_recs': packing, 'final_response': "Packing list is ready!"}
+
+
+def _resummarize_packing(state: Dict[str, Any]) -> Dict[str, Any]:
+    # after a requantify only the packing section is stale: splice a fresh render into the summary, no LLM
+    packing = section_text("packing", {"packing_list": get_recs(state, 'packing_recs')})
+    summary = replace_section(state.get('latest_summary') or "", "packing", packing) if packing else None
+    if summary is None:
+        return _summary_fallback(state)
+    return {'latest_summary': summary, 'final_response': summary}
 
 
 # === 1. Router/Decision Node ===
@@ -169,8 +290,8 @@ def route_user_query(state: TripPlanState) -> Dict[str, Any]:
     """
     print(f"--- ROUTER: Classifying user intent for: {state['user_query'][:50]}...")
 
-    state_dict = dict(state)
-    updated_state = _run_decision_agent(state_dict)
+    # The Decision Agent only reads the query and session; it must not rewrite the graph's user_query
+    updated_state = _run_decision_agent({"user_query": state['user_query'], "session_id": state.get('session_id')})
 
     # 1. Determine the raw intent from the LLM
     raw_intent = updated_state.get("intent", "chat_agent")
@@ -224,11 +345,17 @@ def route_user_query(state: TripPlanState) -> Dict[str, Any]:
                 print("DEBUG: Forcing 'explorer_agent' path for follow-up RAG query.")
                 return {"intent": "explorer_agent"}
 
-    # If we have a previous summary and the user asks to modify the plan,
-    # prefer the refiner path so we update the existing plan instead of
-    # restarting extraction which may re-ask missing fields.
-    if state.get("latest_summary") and (
-            any(k in query for k in style_keywords) or any(k in query for k in modify_keywords)):
+    # If we have a previous summary and the user changes trip data (dates,
+    # travelers, preferences...), re-run only the agents that depend on it;
+    # pure style feedback goes to the refiner. Neither restarts extraction,
+    # which may re-ask missing fields. A question only re-plans when it
+    # spells out a change ("can we switch to Kandy?").
+    asks = is_question(state['user_query'])
+    if state.get("latest_summary") and _trip_dict(trip_data) and (
+            (not asks and any(k in query for k in modify_keywords))
+            or parse_trip_changes(state['user_query'], _trip_dict(trip_data))):
+        determined_intent = "replan"
+    elif state.get("latest_summary") and any(k in query for k in style_keywords):
         determined_intent = "refine_summary"
     else:
         determined_intent = raw_intent
@@ -241,13 +368,14 @@ def route_user_query(state: TripPlanState) -> Dict[str, Any]:
 def chat_node(state: TripPlanState) -> Dict[str, Any]:
     """Handles general conversational flow."""
     print("--- NODE: Chat Agent Executing...")
-    state_dict = dict(state)
-    updated_state = _run_chat_agent(state_dict)  # The original chat_agent_node updates chat_history and final_summary
+    update = _run_chat_agent(state)  # Returns the new chat_history turns and final_summary
 
-    # Map the chat agent's output back to the final_response key
-    state['final_response'] = updated_state.get('final_summary')
-    state['chat_history'] = updated_state.get('chat_history', [])
-    return state
+    # Map the chat agent's output back to the final_response key; the
+    # chat_history reducer appends the new turns
+    return {
+        'final_response': update.get('final_summary'),
+        'chat_history': update.get('chat_history', []),
+    }
 
 
 # === 3. Orchestrator Node (The Data Gatherer) ===
@@ -257,7 +385,8 @@ def orchestrator_node(state: TripPlanState) -> Dict[str, Any]:
 
     # 1. Prepare input schema for the orchestrator function
     orchestrator_input = OrchestratorAgent4InputSchema(
-        query=state['user_query']
+        query=state['user_query'],
+        session_id=state.get('session_id'),
     )
 
 
@@ -286,17 +415,18 @@ def orchestrator_node(state: TripPlanState) -> Dict[str, Any]:
         # Normal fresh invocation
         final_data_pydantic = call_orchestrator_agent(orchestrator_input, user_responses=[])
 
-    # Update State. Convert the returned Pydantic object to a dictionary for LangGraph's TypedDict state update.
     # The orchestrator agent returns a Pydantic object (OrchestratorAgent4OutputSchema).
     # We store the Pydantic object itself in the state to maintain type integrity.
-    state['trip_data'] = final_data_pydantic
+    update = {'trip_data': final_data_pydantic}
 
     # Conditional: Decide if we continue planning or ask a follow-up question
     # Now that trip_data is a Pydantic object, use .model_dump() to check status.
     final_data_dict = final_data_pydantic.model_dump()
+    # Start destination-level work while we wait for the remaining answers (or drop it if the trip moved)
+    prefetch.update(state.get('session_id'), final_data_dict)
 
     if final_data_dict.get('status') == 'complete':
-        return state  # Continue to Location Agent
+        return update  # Continue to Location Agent
     else:
         # The orchestrator should have set a message detailing the missing info
         if final_data_dict.get('messages'):
@@ -310,53 +440,54 @@ def orchestrator_node(state: TripPlanState) -> Dict[str, Any]:
                 # Fallback to raw string messages
                 question = str(last_msg)
 
-            state['final_response'] = question or "What else can I help you plan?"
+            update['final_response'] = question or "What else can I help you plan?"
         else:
-            state['final_response'] = "What else can I help you plan?"
+            update['final_response'] = "What else can I help you plan?"
 
         # The Orchestrator's job is complete for this turn; it awaits user input.
-        return state
+        return update
 
 
 # === 4. Location Node ===
+@_deadline_location
+@_memoize_location
 def location_node(state: TripPlanState) -> Dict[str, Any]:
     """Generates structured location recommendations."""
     print("--- NODE: Location Agent Executing...")
 
     # The Location Agent expects a dict/pydantic of the trip details
     trip_data_for_location = state['trip_data'].dict() if state['trip_data'] else {}
+    # A speculative run still in flight fills location_cache; wait for it instead of asking Gemini twice
+    prefetch.take(state.get('session_id'), "locations", trip_data_for_location)
 
     location_output = _run_location_agent(trip_data_for_location)
-    state['location_recs'] = location_output  # LocationAgentOutputSchema.parse_obj(location_output)
-    # Mirror naming convention to support summary agent expectations
-    state['location_recommendations'] = state['location_recs']
-    state['final_response'] = f"Location recommendations generated for {trip_data_for_location.get('destination')}."
-    return state
+    # Put the places in driving order with per-day clusters instead of the model's order
+    location_output = order_recommendations(
+        location_output,
+        trip_data_for_location.get('destination'),
+        trip_data_for_location.get('start_date'),
+        trip_data_for_location.get('end_date'),
+    )
+    return {
+        'location_recs': location_output,  # LocationAgentOutputSchema.parse_obj(location_output)
+        'final_response': f"Location recommendations generated for {trip_data_for_location.get('destination')}.",
+    }
 
 
 # === 5. Summary Node ===
+@_deadline_summary
+@_memoize_summary
 def summary_node(state: TripPlanState) -> Dict[str, Any]:
     """Aggregates all results and generates the final user-facing summary."""
     print("--- NODE: Summary Agent Executing...")
 
     # Combine all structured data into a single dict for the Summary Agent Input Schema
-    # Use .get with sensible fallbacks so standalone agent outputs or differently
-    # named keys don't cause KeyError and are still picked up by the summary.
-    trip_data_dict = state['trip_data'].dict() if state.get('trip_data') else {}
-
-    summary_input = {
-        **trip_data_dict,
-        "location_recommendations": state.get('location_recs') or state.get('location_recommendations') or {},
-        "activity_recommendations": state.get('activity_recs') or state.get('activity_recommendations') or {},
-        "packing_list": state.get('packing_recs') or state.get('packing_list') or {},
-        "status": "completed",
-    }
-
-    summary_output_pydantic = _run_summary_agent(summary_input, use_llm=True)
+    summary_output_pydantic = _run_summary_agent(_summary_input(state), use_llm=True)
 
-    state['latest_summary'] = summary_output_pydantic.summary
-    state['final_response'] = summary_output_pydantic.summary  # Show the summary to the user
-    return state
+    return {
+        'latest_summary': summary_output_pydantic.summary,
+        'final_response': summary_output_pydantic.summary,  # Show the summary to the user
+    }
 
 
 # === 6. Refiner Node ===
@@ -369,9 +500,72 @@ def refiner_node(state: TripPlanState) -> Dict[str, Any]:
 
     new_summary = _run_summary_refiner(previous_summary, user_feedback)
 
-    state['latest_summary'] = new_summary
-    state['final_response'] = new_summary  # Show the refined summary to the user
-    return state
+    return {
+        'latest_summary': new_summary,
+        'final_response': new_summary,  # Show the refined summary to the user
+    }
+
+
+# === 6b. Partial Re-plan Node ===
+def _trip_dict(trip_data: Any) -> Dict[str, Any]:
+    if hasattr(trip_data, 'model_dump'):
+        return trip_data.model_dump()
+    return dict(trip_data) if isinstance(trip_data, dict) else {}
+
+
+def _llm_trip_changes(state: TripPlanState, trip: Dict[str, Any]) -> Dict[str, Any]:
+    """Fallback: let the orchestrator's extractor re-read the message on top of the current trip."""
+    try:
+        extracted = run_llm_agent(
+            OrchestratorAgent4InputSchema(query=state['user_query'], session_id=state.get('session_id')),
+            prev_response_pydantic=OrchestratorAgent4OutputSchema(**trip),
+        ).model_dump()
+    except Exception as e:
+        print(f"WARNING: Could not extract trip changes: {e}")
+        return {}
+    return {k: v for k, v in extracted.items()
+            if k not in ("status", "messages") and v not in (None, "", []) and v != trip.get(k)}
+
+
+# graph node per agent name in server/workflow/replan.py
+_PLAN_NODES = {
+    "location_agent": location_node,
+    "activity_agent": _run_activity_agent,
+    "packing_agent": _run_packing_agent,
+    "summary_agent": summary_node,
+}
+
+
+def replan_node(state: TripPlanState) -> Dict[str, Any]:
+    """
+    Applies trip-data changes from the user's message and re-runs only the
+    agents that depend on the changed fields; the other agents' outputs are
+    kept from the previous plan. A traveler-count-only change rescales the
+    existing packing list instead of rebuilding it and swaps just the packing
+    section of the current summary, without an LLM call.
+    """
+    print("--- NODE: Partial Re-plan Executing...")
+
+    trip = _trip_dict(state.get('trip_data'))
+    updates = parse_trip_changes(state['user_query'], trip) or _llm_trip_changes(state, trip)
+    if not updates:
+        print("DEBUG: No trip data changes found; refining the summary text instead.")
+        return refiner_node(state)
+
+    new_trip = apply_changes(trip, updates)
+    changed = changed_fields(trip, new_trip)
+    agents = affected_agents(changed)
+    print(f"DEBUG: Re-plan changed {sorted(updates)}; re-running {agents}")
+    nodes = dict(_PLAN_NODES)
+    if changed == {"no_of_traveler"} and get_recs(state, 'packing_recs'):
+        nodes["packing_agent"] = _requantify_packing
+        nodes["summary_agent"] = _resummarize_packing
+
+    # Later agents read the earlier ones' outputs, so run them on a merged view
+    view = apply_update(dict(state), {'trip_data': OrchestratorAgent4OutputSchema(**new_trip)})
+    for agent in agents:
+        apply_update(view, nodes[agent](view))
+    return {k: v for k, v in view.items() if k not in state or state[k] is not v}
 
 
 # === 7. Explorer Node ===
@@ -382,6 +576,17 @@ def explorer_agent_node(state: TripPlanState) -> Dict[str, Any]:
     user_query = state["user_query"]
     current_url = state.get("current_link_url")
     link_content = state.get("current_link_content")
+    update: Dict[str, Any] = {}
+
+    # Long pasted text: the decision agent already stored it for this session
+    if sanitize_input(user_query, session_id=state.get("session_id")) == "LONG_INPUT_STORED":
+        print("--- NODE: Explorer Agent Executing (session text RAG)")
+        try:
+            update["final_response"] = answer_from_session_text(user_query, state.get("session_id"))
+        except Exception as e:
+            print(f"ERROR: Failed RAG on long input. {e}")
+            update["final_response"] = "Sorry, I had trouble analyzing the long text you provided. Could you summarize your core question?"
+        return update
 
     # 1. Check for a new URL in the current query
     new_url, question = extract_url_and_question(user_query)  # Use the helper from my previous response
@@ -389,27 +594,26 @@ def explorer_agent_node(state: TripPlanState) -> Dict[str, Any]:
     # CASE A: A new URL is detected or the state is empty (clear previous context)
     if new_url and new_url != current_url:
         print(f"--- NODE: Explorer Agent Executing (NEW URL): {new_url}")
-        state["current_link_url"] = new_url
-        state["current_link_content"] = None  # Clear old content
+        update["current_link_url"] = new_url
+        update["current_link_content"] = None  # Clear old content
 
         # Load and process content (using logic from previous response)
         try:
             # This function should: scrape the URL, split the text, and return the answer AND the chunked documents
             answer, doc_chunks = run_explorer_rag(new_url, question, content=None)
 
-            # Persist the content for future questions
-            state["current_link_content"] = format_docs_for_state(
-                doc_chunks)  # Helper to convert Document objects to JSON/Dict
-            state["final_response"] = answer
-            return state
+            # Persist the content server-side; state only carries a small reference
+            update["current_link_content"] = store_page_content(new_url, doc_chunks)
+            update["final_response"] = answer
+            return update
         except Exception as e:
             error_msg = f"Error processing link {new_url}: {str(e)}"
             print(f"ERROR: {error_msg}")
-            state["final_response"] = error_msg
+            update["final_response"] = error_msg
             # Clear URL and content on failure
-            state["current_link_url"] = None
-            state["current_link_content"] = None
-            return state
+            update["current_link_url"] = None
+            update["current_link_content"] = None
+            return update
 
     # CASE B: No new URL, but content is already in state (RESUME RAG)
     elif link_content:
@@ -419,62 +623,62 @@ def explorer_agent_node(state: TripPlanState) -> Dict[str, Any]:
             # This function should: re-create the VectorStore from the stored content
             # and run the RAG chain on the new question.
             answer, _ = run_explorer_rag(current_url, user_query, content=link_content)
-            state["final_response"] = answer
-            return state
+            update["final_response"] = answer
+            return update
         except Exception as e:
             error_msg = f"Error answering question from stored content: {str(e)}"
             print(f"ERROR: {error_msg}")
-            state["final_response"] = error_msg
+            update["final_response"] = error_msg
             # Clear URL and content on failure
-            state["current_link_url"] = None
-            state["current_link_content"] = None
-            return state
+            update["current_link_url"] = None
+            update["current_link_content"] = None
+            return update
 
     # CASE C: No URL provided and no content stored (Fallback to Chat)
     else:
         print("--- NODE: Explorer Agent received query without link/context. Routing to Chat.")
         # Fallback to chat_agent or give a prompt
-        state["intent"] = "chat_agent"
-        state["final_response"] = "To use the explorer, please provide a link and your question/summary request."
-        return state
+        update["intent"] = "chat_agent"
+        update["final_response"] = "To use the explorer, please provide a link and your question/summary request."
+        return update
 
 
 # === 8. Simple Agent Nodes (Location/Activity/Packing) ===
 def simple_location_node(state: TripPlanState) -> Dict[str, Any]:
     """Runs the Location Agent and formats the raw JSON for a direct user response."""
     # Runs the location agent as a single step and returns control
-    state = location_node(state)  # Reuse the location logic
+    update = location_node(state)  # Reuse the location logic
     # Use json.dumps for the raw location recs since we don't have a simple formatter defined for this output
-    state[
-        'final_response'] = f"Here are some location ideas based on your query:\n\n{json.dumps(state['location_recs'], indent=2)}"
-    return state
+    update[
+        'final_response'] = f"Here are some location ideas based on your query:\n\n{json.dumps(update['location_recs'], indent=2)}"
+    return update
 
 
 def simple_activity_node(state: TripPlanState) -> Dict[str, Any]:
     """Runs the Activity Agent and formats the structured result for a direct user response."""
     # Runs the activity agent as a single step and returns control
-    state = _run_activity_agent(state)
+    update = _run_activity_agent(state)
 
     # CRITICAL FIX: Use the utility function to format the structured activity plan
-    activity_data = state.get('activity_recs') or state.get('activity_recommendations')
+    activity_data = get_recs(update, 'activity_recs')
     formatted_plan = format_activity_list(activity_data)
 
     # The final response is now the readable Markdown plan
-    state['final_response'] = formatted_plan
+    update['final_response'] = formatted_plan
 
-    return state
+    return update
 
 
 def simple_packing_node(state: TripPlanState) -> Dict[str, Any]:
     """Runs the Packing Agent and formats the structured result for a direct user response."""
     # Runs the packing agent as a single step and returns control
-    state = _run_packing_agent(state)
+    update = _run_packing_agent(state)
 
     # CRITICAL FIX: Use the utility function to format the structured packing list
-    packing_data = state.get('packing_recs') or state.get('packing_list')
+    packing_data = get_recs(update, 'packing_recs')
     formatted_list = format_packing_list(packing_data)
 
     # The final response is now the readable Markdown list
-    state['final_response'] = formatted_list
+    update['final_response'] = formatted_list
 
-    return state
+    return update
@@ -1,6 +1,11 @@
 # app_state.py
 
-from typing import TypedDict, List, Tuple, Optional, Any, Dict
+import functools
+import json
+import os
+import threading
+from typing import Annotated, Callable, TypedDict, List, Tuple, Optional, Any, Dict, Union, get_type_hints
+from pydantic import BaseModel
 from server.schemas.orchestrator_schemas import OrchestratorAgent4OutputSchema
 from server.schemas.location_agent_schemas import LocationAgentOutputSchema
 
@@ -11,6 +16,31 @@ from server.schemas.location_agent_schemas import LocationAgentOutputSchema
 # We'll use a generic Dict[str, Any] for now as the exact schemas weren't provided.
 from server.agents.packing_agent.packing_agent import PackingOutput
 
+try:
+    from server.utils.config import STATE_DELTA_CHECK
+except Exception:
+    STATE_DELTA_CHECK = os.getenv('STATE_DELTA_CHECK', 'false').lower() in ('1', 'true', 'yes')
+
+
+# === Reducers ===
+# Nodes return only the keys they change. Plain keys are overwritten by the
+# returned value; the list fields below are merged, so parallel branches can
+# write to them in the same step.
+def add_turns(current: Optional[List[Tuple[str, str]]], new: Optional[List[Tuple[str, str]]]) -> List[Tuple[str, str]]:
+    """chat_history: a node returns only the turns it adds."""
+    return list(current or []) + list(new or [])
+
+
+def merge_degraded(current: Optional[List[str]], update: Union[Dict[str, bool], List[str], None]) -> List[str]:
+    """
+    degraded: a node returns {section: True/False} to add or clear its own
+    section; a list (e.g. the client's previous state) replaces the value.
+    """
+    if not isinstance(update, dict):
+        return list(update or [])
+    sections = [s for s in current or [] if s not in update]
+    return sections + [s for s, degraded in update.items() if degraded]
+
 
 class TripPlanState(TypedDict):
     """
@@ -19,7 +49,9 @@ class TripPlanState(TypedDict):
     """
     # === Conversation State ===
     user_query: str  # The latest query from the user
-    chat_history: List[Tuple[str, str]]  # History of the conversation: (role, content)
+    # History of the conversation: (role, content)
+    chat_history: Annotated[List[Tuple[str, str]], add_turns]
+    session_id: Optional[str]  # Server-assigned; namespaces long inputs stored in the vector DB
 
     # === Routing State ===
     intent: Optional[str]  # Determined by the Decision Agent (e.g., 'orchestrator_agent')
@@ -27,8 +59,9 @@ class TripPlanState(TypedDict):
     # === Explorer Agent State ===
     # Stores the URL provided by the user, persisted across turns.
     current_link_url: Optional[str]
-    # Stores the loaded and chunked documents/text from the URL for RAG.
-    current_link_content: Optional[List[Dict[str, Any]]]
+    # Reference to the chunked page in the server-side content store
+    # ({"content_ref", "url", "chunks"}); older sessions may carry the chunk list itself.
+    current_link_content: Optional[Dict[str, Any]]
 
     # === Planning Data (Structured Schemas) ===
     # This stores the mandatory, validated planning data
@@ -38,7 +71,111 @@ class TripPlanState(TypedDict):
     location_recs: Optional[LocationAgentOutputSchema]  # Output from Location Agent
     activity_recs: Optional[Dict[str, Any]]  # Output from Activity Agent (Placeholder)
     packing_recs: Optional[Dict[str, Any]]  # Output from Packing Agent (Placeholder)
+    # Sections filled by a fallback because their agent ran out of time
+    degraded: Annotated[Optional[List[str]], merge_degraded]
 
     # === Final Output State ===
     latest_summary: Optional[str]  # The final, polished Markdown summary text
     final_response: Optional[str]  # The text response to be returned to the user immediately
+
+
+REDUCERS = {
+    key: hint.__metadata__[0]
+    for key, hint in get_type_hints(TripPlanState, include_extras=True).items()
+    if getattr(hint, "__metadata__", None)
+}
+
+
+def apply_update(state: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge a node's returned keys into `state` in place, the way the graph does."""
+    for key, value in update.items():
+        state[key] = REDUCERS[key](state.get(key), value) if key in REDUCERS else value
+    return state
+
+
+def check_delta(node: str, state: Dict[str, Any], update: Any) -> None:
+    """
+    Debug check (STATE_DELTA_CHECK): raise if a node handed back the state
+    itself or unchanged dict/list/model values from it. A returned full state
+    re-applies every key and doubles the reducer fields.
+    """
+    if update is None:
+        return
+    if update is state:
+        raise AssertionError(f"{node} returned the whole state; return only the keys it changes")
+    echoed = sorted(k for k, v in update.items()
+                    if k in state and v is state[k] and isinstance(v, (dict, list, BaseModel)))
+    if echoed:
+        raise AssertionError(f"{node} returned unchanged state keys {echoed}; return only the keys it changes")
+
+
+def delta_checked(node: str, fn: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Wrap a graph node with check_delta() when STATE_DELTA_CHECK is on; otherwise return it as is."""
+    if not STATE_DELTA_CHECK:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(state: Dict[str, Any]) -> Dict[str, Any]:
+        update = fn(state)
+        check_delta(node, state, update)
+        return update
+
+    return wrapper
+
+
+# === Recommendation Keys ===
+# Each agent output lives under one canonical key. Older clients and saved
+# sessions may still send the legacy mirror names; normalize_state() folds
+# them into the canonical key and get_recs() reads either.
+RECS_KEYS = {
+    "location_recs": "location_recommendations",
+    "activity_recs": "activity_recommendations",
+    "packing_recs": "packing_list",
+}
+
+
+def get_recs(state: Optional[Dict[str, Any]], key: str) -> Any:
+    """The output under canonical `key` (e.g. 'activity_recs'), or under its legacy name."""
+    if not state:
+        return None
+    return state.get(key) or state.get(RECS_KEYS[key])
+
+
+def normalize_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Move legacy recommendation keys to their canonical key, in place."""
+    for key, legacy in RECS_KEYS.items():
+        if legacy in state:
+            value = state.pop(legacy)
+            if not state.get(key):
+                state[key] = value
+    return state
+
+
+# === State Size Metric ===
+_size_lock = threading.Lock()
+_size_stats = {"turns": 0, "last_bytes": 0, "max_bytes": 0, "total_bytes": 0}
+
+
+def state_size(state: Dict[str, Any]) -> Dict[str, int]:
+    """JSON payload bytes per top-level key, plus 'total'."""
+    sizes = {k: len(json.dumps(v, ensure_ascii=False, default=str).encode("utf-8")) for k, v in state.items()}
+    sizes["total"] = len(json.dumps(state, ensure_ascii=False, default=str).encode("utf-8"))
+    return sizes
+
+
+def record_state_size(state: Dict[str, Any]) -> Dict[str, int]:
+    """Measure a serialized per-turn state and add it to the running stats."""
+    sizes = state_size(state)
+    with _size_lock:
+        _size_stats["turns"] += 1
+        _size_stats["last_bytes"] = sizes["total"]
+        _size_stats["max_bytes"] = max(_size_stats["max_bytes"], sizes["total"])
+        _size_stats["total_bytes"] += sizes["total"]
+    return sizes
+
+
+def state_size_stats() -> Dict[str, Any]:
+    with _size_lock:
+        out = dict(_size_stats)
+    out["mean_bytes"] = round(out["total_bytes"] / out["turns"]) if out["turns"] else 0
+    return out
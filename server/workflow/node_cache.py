@@ -0,0 +1,301 @@
+# server/workflow/node_cache.py
+"""
+Memoization for LangGraph planning nodes.
+
+A retry, a re-sent message or two users planning the same trip hand the
+location/activity/packing/summary nodes identical inputs. memoize_node()
+wraps a node so it is keyed by a canonical hash of the state keys it
+declares as inputs plus a version fingerprint of the code and prompts it
+depends on; on a hit the cached output keys are returned as the update and
+the node body does not run. The fingerprint covers the agent modules and
+every server module they import (module_deps()), so editing an agent, its
+prompts or a helper it relies on (scoring, climate, geo, routing, ...)
+invalidates that node's entries.
+
+Storage is pluggable (NODE_CACHE_BACKEND): "memory" (LRU), "disk" (one JSON
+file per key under NODE_CACHE_DIR, shared by workers; expired files are
+swept every NODE_CACHE_SWEEP_SECONDS) or "off". Each node has its own TTL;
+stats() reports hits and misses per node.
+"""
+
+import copy
+import functools
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from server.utils.cache import TTLCache
+
+try:
+    from server.utils.config import (
+        NODE_CACHE_BACKEND, NODE_CACHE_MAX, NODE_CACHE_DIR, NODE_CACHE_TTL_SECONDS, NODE_CACHE_SWEEP_SECONDS,
+    )
+except Exception:
+    NODE_CACHE_BACKEND = os.getenv('NODE_CACHE_BACKEND', 'memory').lower()
+    NODE_CACHE_MAX = int(os.getenv('NODE_CACHE_MAX', '512'))
+    NODE_CACHE_DIR = os.getenv('NODE_CACHE_DIR', os.path.join(
+        os.path.dirname(os.path.dirname(__file__)), 'data', 'node_cache'))
+    NODE_CACHE_TTL_SECONDS = float(os.getenv('NODE_CACHE_TTL_SECONDS', '3600'))
+    NODE_CACHE_SWEEP_SECONDS = float(os.getenv('NODE_CACHE_SWEEP_SECONDS', '600'))
+
+# fields of an input (e.g. trip_data's follow-up messages) that never change a node's output
+_VOLATILE_FIELDS = ("messages",)
+
+
+class MemoryNodeStore:
+    """In-process LRU; entries carry their own expiry so nodes can use different TTLs."""
+
+    def __init__(self, maxsize: int = NODE_CACHE_MAX):
+        self._cache = TTLCache(maxsize=maxsize, name="node_cache")
+
+    def get(self, key: str) -> Optional[dict]:
+        row = self._cache.get(key)
+        if row is None:
+            return None
+        if row[0] and row[0] < time.time():
+            self._cache.pop(key)
+            return None
+        return row[1]
+
+    def set(self, key: str, value: dict, ttl: Optional[float]) -> None:
+        self._cache.set(key, (time.time() + ttl if ttl else None, value))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+class DiskNodeStore:
+    """One JSON file per key under `root/<key[:2]>/`; values must be JSON-serializable."""
+
+    def __init__(self, root: str = NODE_CACHE_DIR, sweep_interval: float = NODE_CACHE_SWEEP_SECONDS):
+        self.root = root
+        self.sweep_interval = sweep_interval
+        self._last_sweep = time.monotonic()
+        self._sweep_lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                row = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[NodeCache] Could not read {path}: {e}")
+            return None
+        if row.get("expires_at") and row["expires_at"] < time.time():
+            self._remove(path)
+            return None
+        return row.get("value")
+
+    def set(self, key: str, value: dict, ttl: Optional[float]) -> None:
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"expires_at": time.time() + ttl if ttl else None, "value": value}, f,
+                          ensure_ascii=False, default=str)
+            os.replace(tmp, path)
+        except Exception as e:
+            print(f"[NodeCache] Could not write {path}: {e}")
+        if self.sweep_interval and time.monotonic() - self._last_sweep >= self.sweep_interval:
+            self.sweep()
+
+    def sweep(self) -> int:
+        """Delete expired entries (and temp files a crashed writer left behind); returns how many."""
+        if not self._sweep_lock.acquire(blocking=False):
+            return 0  # another thread is already sweeping
+        removed = 0
+        try:
+            self._last_sweep = time.monotonic()
+            now = time.time()
+            for dirpath, _, files in os.walk(self.root):
+                for name in files:
+                    path = os.path.join(dirpath, name)
+                    try:
+                        if name.endswith(".tmp"):
+                            stale = os.path.getmtime(path) < now - 3600
+                        else:
+                            with open(path, "r", encoding="utf-8") as f:
+                                expires_at = json.load(f).get("expires_at")
+                            stale = bool(expires_at) and expires_at < now
+                    except Exception:
+                        stale = True  # unreadable: get() would never return it either
+                    if stale:
+                        self._remove(path)
+                        removed += 1
+        finally:
+            self._sweep_lock.release()
+        if removed:
+            print(f"[NodeCache] Swept {removed} expired file(s) from {self.root}")
+        return removed
+
+    def clear(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def _default_store():
+    if NODE_CACHE_BACKEND in ("off", "none", "false", "0"):
+        return None
+    if NODE_CACHE_BACKEND == "disk":
+        return DiskNodeStore()
+    return MemoryNodeStore()
+
+
+_store = _default_store()
+_stats: Dict[str, Dict[str, int]] = {}
+_stats_lock = threading.Lock()
+
+
+def set_store(store) -> None:
+    """Swap the backing store (anything with get(key) / set(key, value, ttl); None disables caching)."""
+    global _store
+    _store = store
+
+
+def fingerprint(*parts: Any) -> str:
+    """Short version hash of modules, functions or strings (prompt templates, version tags)."""
+    h = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, str):
+            try:
+                part = inspect.getsource(part)
+            except (OSError, TypeError):
+                part = repr(part)
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()[:16]
+
+
+def module_deps(*modules: Any) -> list:
+    """
+    `modules` plus every server.* module they reach through their imports,
+    in name order - pass the result to fingerprint() so a node's version also
+    changes when a helper it relies on changes.
+    """
+    seen: Dict[str, Any] = {}
+    stack = list(modules)
+    while stack:
+        module = stack.pop()
+        if module.__name__ in seen:
+            continue
+        seen[module.__name__] = module
+        for value in list(vars(module).values()):
+            try:
+                name = value.__name__ if inspect.ismodule(value) else getattr(value, "__module__", None)
+            except Exception:
+                continue
+            if isinstance(name, str) and name.startswith("server.") and name not in seen and name in sys.modules:
+                stack.append(sys.modules[name])
+    return [seen[name] for name in sorted(seen)]
+
+
+def _plain(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        value = value.model_dump()
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    return value
+
+
+def _canonical_input(value: Any) -> Any:
+    value = _plain(value)
+    if isinstance(value, dict):
+        return {k: v for k, v in value.items() if k not in _VOLATILE_FIELDS}
+    return value
+
+
+def node_key(node: str, version: str, state: Dict[str, Any], inputs: Iterable[str]) -> str:
+    payload = {"node": node, "version": version, "inputs": {k: _canonical_input(state.get(k)) for k in inputs}}
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _count(node: str, field: str) -> Dict[str, int]:
+    with _stats_lock:
+        row = _stats.setdefault(node, {"hits": 0, "misses": 0})
+        row[field] += 1
+        return dict(row)
+
+
+def memoize_node(
+    node: str,
+    inputs: Tuple[str, ...],
+    outputs: Tuple[str, ...],
+    version: str = "",
+    ttl: Optional[float] = None,
+) -> Callable:
+    """
+    Decorator for a node `fn(state) -> update`: skip it when the `inputs`
+    state keys hash to a cached entry and return the cached `outputs` keys
+    instead. `ttl` (seconds) defaults to NODE_CACHE_TTL_SECONDS.
+    """
+    ttl = NODE_CACHE_TTL_SECONDS if ttl is None else ttl
+
+    def wrap(fn: Callable[[Dict[str, Any]], Dict[str, Any]]):
+        @functools.wraps(fn)
+        def wrapper(state: Dict[str, Any]) -> Dict[str, Any]:
+            store = _store
+            if store is None:
+                return fn(state)
+            try:
+                key = node_key(node, version, state, inputs)
+                hit = store.get(key)
+            except Exception as e:
+                print(f"[NodeCache] {node}: lookup failed, running node: {e}")
+                return fn(state)
+            if hit is not None:
+                row = _count(node, "hits")
+                print(f"[NodeCache] {node}: hit ({row['hits'] / (row['hits'] + row['misses']):.0%} hit rate)")
+                return {k: copy.deepcopy(hit[k]) for k in outputs if k in hit}
+
+            _count(node, "misses")
+            result = fn(state)
+            try:
+                store.set(key, _plain({k: result.get(k) for k in outputs}), ttl)
+            except Exception as e:
+                print(f"[NodeCache] {node}: could not store result: {e}")
+            return result
+
+        wrapper.node_name = node
+        wrapper.uncached = fn
+        return wrapper
+
+    return wrap
+
+
+def stats() -> Dict[str, Any]:
+    with _stats_lock:
+        rows = {node: dict(row) for node, row in _stats.items()}
+    for row in rows.values():
+        total = row["hits"] + row["misses"]
+        row["hit_rate"] = round(row["hits"] / total, 3) if total else 0.0
+    backend = type(_store).__name__ if _store is not None else "off"
+    return {"backend": backend, "nodes": rows}
+
+
+def clear() -> None:
+    if _store is not None:
+        _store.clear()
+    with _stats_lock:
+        _stats.clear()
@@ -0,0 +1,74 @@
+# server/workflow/node_deadline.py
+"""
+Per-node deadlines for the planning graph.
+
+with_deadline() wraps a node so it runs with a share of the time left in
+the request (see server/utils/deadline.py), capped at NODE_TIMEOUT_SECONDS.
+When the node overruns, the graph does not wait for it: the node's
+deterministic fallback fills in the state instead, the section is added to
+state["degraded"], and the recs it produced get status "degraded". A later
+successful run of the node removes the section from the list again.
+
+Nodes return only the keys they change, so a node that timed out and is
+still finishing in the background has nothing to write into the live
+state; its update is dropped. Fallback results bypass memoize_node, so they
+are never cached.
+"""
+
+import functools
+import os
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from server.utils.deadline import DeadlineExceeded, remaining, run_with_timeout
+
+try:
+    from server.utils.config import NODE_TIMEOUT_SECONDS
+except Exception:
+    NODE_TIMEOUT_SECONDS = float(os.getenv('NODE_TIMEOUT_SECONDS', '45'))
+
+
+def node_budget(share: float, cap: Optional[float] = None) -> float:
+    """Seconds a node may take: `share` of the time left in the request, at most `cap`."""
+    cap = NODE_TIMEOUT_SECONDS if cap is None else cap
+    left = remaining()
+    return cap if left is None else min(cap, left * share)
+
+
+def with_deadline(
+    section: str,
+    share: float,
+    fallback: Callable[[Dict[str, Any]], Dict[str, Any]],
+    status_keys: Iterable[str] = (),
+    cap: Optional[float] = None,
+) -> Callable:
+    """
+    Decorator for a node `fn(state) -> update`: give it `share` (0-1) of the
+    remaining request time; on overrun return `fallback(state)` instead and
+    mark `section` degraded, setting status "degraded" on the dict outputs
+    named in `status_keys`. The returned update carries
+    {"degraded": {section: bool}} for the merge_degraded reducer. Other
+    exceptions from the node propagate as before.
+    """
+    status_keys = tuple(status_keys)
+
+    def wrap(fn: Callable[[Dict[str, Any]], Dict[str, Any]]):
+        @functools.wraps(fn)
+        def wrapper(state: Dict[str, Any]) -> Dict[str, Any]:
+            budget = node_budget(share, cap)
+            try:
+                update = run_with_timeout(fn, budget, state)
+            except DeadlineExceeded as e:
+                print(f"WARNING: [{section}] Over its {budget:.1f}s budget, using the fallback: {e}")
+            else:
+                return {**update, "degraded": {section: False}}
+
+            update = fallback(state)
+            for key in status_keys:
+                if isinstance(update.get(key), dict):
+                    update[key]["status"] = "degraded"
+            return {**update, "degraded": {section: True}}
+
+        wrapper.section = section
+        return wrapper
+
+    return wrap
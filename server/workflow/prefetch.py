@@ -0,0 +1,277 @@
+# server/workflow/prefetch.py
+"""
+Speculative destination-level work while the orchestrator is still asking
+for fields.
+
+Once trip_data has a destination and dates but is still
+"awaiting_user_input" (e.g. for type_of_trip), update() starts these tasks
+in the background for the session, so they overlap with the user's typing
+instead of running serially after the last answer:
+
+    activity_docs  index retrieval for the destination (suggest_activities
+                   uses the docs instead of retrieving again)
+    climate        trip climate, warming the live forecast overlay cache
+    locations      the Gemini recommendations once every field in their
+                   cache key is known (location_cache then answers the
+                   location node); otherwise nearby candidates, which warms
+                   the geo index the route ordering uses
+
+Results are parked per session, keyed by (destination, start, end). take()
+hands a result to the full chain only when the final trip still has that
+key, waiting for a task that is still running rather than starting the same
+work twice. Tasks whose input is more than the key (the activity retrieval
+query also reads trip type, budget and preferences) carry a signature too:
+a later answer that changes it re-runs the task, and take() refuses a result
+whose signature does not match the final trip. A new destination or new
+dates cancel the old speculation: queued tasks never start and running ones
+are discarded when they finish. Each task is handed out once; when the chain
+has taken all of them the speculation is dropped, so a later re-plan never
+sees it.
+"""
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from server.utils.cache import TTLCache
+from server.utils.deadline import remaining
+from server.utils.places import canonical_place
+
+try:
+    from server.utils.config import (
+        PREFETCH_ENABLE, PREFETCH_WORKERS, PREFETCH_TTL_SECONDS, PREFETCH_MAX_SESSIONS, PREFETCH_WAIT_SECONDS,
+        ACTIVITY_MODE,
+    )
+except Exception:
+    PREFETCH_ENABLE = os.getenv('PREFETCH_ENABLE', 'true').lower() in ('1', 'true', 'yes')
+    PREFETCH_WORKERS = int(os.getenv('PREFETCH_WORKERS', '4'))
+    PREFETCH_TTL_SECONDS = float(os.getenv('PREFETCH_TTL_SECONDS', '900'))
+    PREFETCH_MAX_SESSIONS = int(os.getenv('PREFETCH_MAX_SESSIONS', '256'))
+    PREFETCH_WAIT_SECONDS = float(os.getenv('PREFETCH_WAIT_SECONDS', '30'))
+    ACTIVITY_MODE = os.getenv('ACTIVITY_MODE', 'rag').lower()
+
+_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+_stats = {"started": 0, "cancelled": 0, "used": 0, "missed": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(field: str) -> None:
+    with _stats_lock:
+        _stats[field] += 1
+
+
+class Speculation:
+    """Background tasks for one session and one (destination, start, end) key."""
+
+    def __init__(self, key: Tuple[str, str, str], trip: Dict[str, Any]):
+        self.key = key
+        self.trip = dict(trip)
+        self.futures: Dict[str, Future] = {}
+        self.signatures: Dict[str, Any] = {}
+        self.cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        if self.cancelled.is_set():
+            return
+        self.cancelled.set()
+        pending = [f for f in self.futures.values() if not f.done()]
+        for future in pending:
+            future.cancel()
+        if pending:
+            _count("cancelled")
+
+    def __repr__(self) -> str:
+        return f"Speculation({self.key}, {sorted(self.futures)})"
+
+
+_sessions = TTLCache(maxsize=PREFETCH_MAX_SESSIONS, ttl=PREFETCH_TTL_SECONDS,
+                     on_evict=lambda _key, spec: spec.cancel(), name="prefetch")
+
+
+def speculation_key(trip: Optional[Dict[str, Any]]) -> Optional[Tuple[str, str, str]]:
+    """(destination, start_date, end_date), or None until all three are known."""
+    trip = trip or {}
+    destination = str(trip.get("destination") or "").strip()
+    start, end = trip.get("start_date"), trip.get("end_date")
+    if not (destination and start and end):
+        return None
+    return ((canonical_place(destination) or destination).lower(), str(start)[:10], str(end)[:10])
+
+
+# --- speculative tasks -------------------------------------------------------
+
+def _num_days(trip: Dict[str, Any]) -> int:
+    try:
+        start = datetime.strptime(str(trip["start_date"])[:10], "%Y-%m-%d")
+        end = datetime.strptime(str(trip["end_date"])[:10], "%Y-%m-%d")
+        return max(1, (end - start).days + 1)
+    except Exception:
+        return 1
+
+
+def _activity_query(trip: Dict[str, Any]) -> str:
+    # the same query suggest_activities() builds for the final trip
+    from server.agents.activity_agent.activity_indexer import activity_query
+    prefs = trip.get("user_preferences") or trip.get("preferences") or []
+    return activity_query(str(trip.get("destination") or "").strip(), trip.get("type_of_trip"),
+                          trip.get("budget", "any"), trip.get("season", "any"), ", ".join(prefs),
+                          trip.get("suggest_locations") or [])
+
+
+def _activity_docs(trip: Dict[str, Any]) -> Optional[list]:
+    if ACTIVITY_MODE == "catalog":
+        return None
+    from server.agents.activity_agent.activity_indexer import retrieve_activity_docs
+    destination = str(trip.get("destination") or "").strip()
+    return retrieve_activity_docs(destination, trip.get("suggest_locations") or [], _num_days(trip),
+                                  _activity_query(trip))
+
+
+def _climate(trip: Dict[str, Any]) -> Optional[dict]:
+    from server.utils.climate import rain_probability, trip_climate
+    start = datetime.strptime(str(trip["start_date"])[:10], "%Y-%m-%d").date()
+    for i in range(min(_num_days(trip), 31)):
+        rain_probability(trip.get("destination"), start + timedelta(days=i))
+    return trip_climate(trip.get("destination"), trip.get("start_date"), trip.get("end_date"))
+
+
+def _locations(trip: Dict[str, Any]) -> Optional[dict]:
+    from server.agents.location_agent.location_agent import fallback_locations, run_location_agent
+    # the Gemini answer is only reusable once every field in its cache key is final
+    if trip.get("type_of_trip") and trip.get("user_preferences"):
+        return run_location_agent(trip)
+    fallback_locations(trip)
+    return None
+
+
+TASKS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "activity_docs": _activity_docs,
+    "climate": _climate,
+    "locations": _locations,
+}
+# task -> what else its result depends on; the location answer is keyed by location_cache itself
+SIGNATURES: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "activity_docs": _activity_query,
+}
+# tasks the full chain takes; the climate task only warms caches
+CONSUMED = ("activity_docs", "locations")
+
+
+def _run(spec: Speculation, name: str, fn: Callable[[Dict[str, Any]], Any], trip: Dict[str, Any]) -> Any:
+    if spec.cancelled.is_set():
+        return None
+    try:
+        return fn(trip)
+    except Exception as e:
+        print(f"[Prefetch] {name} for {spec.key[0]} failed: {e}")
+        return None
+
+
+def _submit(spec: Speculation, name: str, trip: Dict[str, Any]) -> None:
+    sign = SIGNATURES.get(name)
+    spec.signatures[name] = sign(trip) if sign else None
+    spec.futures[name] = _pool.submit(_run, spec, name, TASKS[name], dict(trip))
+
+
+def _refresh(spec: Speculation, trip: Dict[str, Any]) -> None:
+    # a later answer may change a task's signature: drop the old run and start again
+    for name, sign in SIGNATURES.items():
+        if name in spec.futures and name in TASKS and sign(trip) != spec.signatures.get(name):
+            spec.futures[name].cancel()
+            _submit(spec, name, trip)
+    # or complete the location cache key; the skipped Gemini call can run now
+    future = spec.futures.get("locations")
+    if future is None or not future.done() or future.cancelled() or future.result() is not None:
+        return
+    if trip.get("type_of_trip") and trip.get("user_preferences"):
+        spec.trip = dict(trip)
+        _submit(spec, "locations", trip)
+
+
+# --- session API ---------------------------------------------------------------
+
+def update(session_id: Optional[str], trip: Optional[Dict[str, Any]]) -> Optional[Speculation]:
+    """
+    Start speculation for a trip that is still awaiting input, keep the
+    running one if its key is unchanged, and cancel it when the destination
+    or dates moved.
+    """
+    if not PREFETCH_ENABLE or not session_id:
+        return None
+    trip = trip or {}
+    key = speculation_key(trip)
+    current = _sessions.get(session_id)
+    if current is not None and current.key == key:
+        # also on the final answer: the re-run overlaps with the location node
+        _refresh(current, trip)
+        return current
+    if current is not None:
+        print(f"[Prefetch] Trip changed from {current.key} to {key}; cancelling speculative work.")
+        _sessions.pop(session_id)  # on_evict cancels it
+    if key is None or trip.get("status") != "awaiting_user_input":
+        return None
+
+    spec = Speculation(key, trip)
+    for name in TASKS:
+        _submit(spec, name, trip)
+    _sessions.set(session_id, spec)
+    _count("started")
+    print(f"[Prefetch] Started {', '.join(TASKS)} for {key[0]} ({key[1]} to {key[2]}).")
+    return spec
+
+
+def take(session_id: Optional[str], name: str, trip: Optional[Dict[str, Any]]) -> Optional[Any]:
+    """
+    The parked result of task `name` if the session's speculation matches
+    `trip` (key and task signature), waiting for a running task up to
+    PREFETCH_WAIT_SECONDS (or the request deadline). None when there is
+    nothing usable. A task is handed out at most once; the speculation is
+    dropped when the chain has taken every CONSUMED task.
+    """
+    spec = _sessions.get(session_id) if session_id else None
+    if spec is None or spec.cancelled.is_set() or name not in spec.futures:
+        return None
+    if spec.key != speculation_key(trip):
+        _count("missed")
+        return None
+    future = spec.futures.pop(name)
+    try:
+        return _result(spec, name, future, trip)
+    finally:
+        if not any(n in spec.futures for n in CONSUMED) and _sessions.get(session_id) is spec:
+            _sessions.pop(session_id)  # used up; on_evict cancels whatever is still queued
+
+
+def _result(spec: Speculation, name: str, future: Future, trip: Optional[Dict[str, Any]]) -> Optional[Any]:
+    sign = SIGNATURES.get(name)
+    if sign and sign(trip or {}) != spec.signatures.get(name):
+        print(f"[Prefetch] {name} for {spec.key[0]} ran for different trip details; not using it.")
+        future.cancel()
+        _count("missed")
+        return None
+    left = remaining()
+    wait = PREFETCH_WAIT_SECONDS if left is None else min(PREFETCH_WAIT_SECONDS, left)
+    try:
+        result = future.result(timeout=wait)
+    except Exception as e:
+        print(f"[Prefetch] {name} for {spec.key[0]} not available: {e!r}")
+        _count("missed")
+        return None
+    if spec.cancelled.is_set() or result is None:
+        return None
+    _count("used")
+    return result
+
+
+def cancel(session_id: Optional[str]) -> None:
+    if session_id:
+        _sessions.pop(session_id)
+
+
+def stats() -> Dict[str, Any]:
+    with _stats_lock:
+        out = dict(_stats)
+    out["sessions"] = len(_sessions)
+    return out
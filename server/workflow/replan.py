@@ -0,0 +1,258 @@
+# server/workflow/replan.py
+"""
+Dependency-aware partial re-planning.
+
+When a user changes trip data after a plan exists ("change dates to next
+week", "no hiking", "make it 4 people"), only the agents that read the
+changed fields - and the agents downstream of them - need to run again:
+
+    destination       -> location, activity, packing, summary
+    dates             -> (months, season, duration) -> activity, packing, summary
+    months / season   -> location (its cache is keyed by travel months)
+    preferences       -> location, activity (packing follows activity)
+    travelers, budget, trip type -> the agents that read them
+
+parse_trip_changes() turns the common phrasings into field updates without
+an LLM; apply_changes() fills in the derived fields; affected_agents()
+resolves which graph nodes to re-run, in plan order. Everything else keeps
+its previous output from the state.
+"""
+
+import re
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from server.agents.activity_agent.activity_catalog import AVOID_SYNONYMS, TAG_KEYWORDS
+from server.agents.orchestrator_agent.orchestrator_utils import get_sri_lanka_season
+from server.utils.places import find_places
+
+PLAN_ORDER = ("location_agent", "activity_agent", "packing_agent", "summary_agent")
+
+# agent -> trip fields it reads
+AGENT_INPUTS: Dict[str, Set[str]] = {
+    "location_agent": {"destination", "months", "season", "user_preferences", "type_of_trip", "budget"},
+    "activity_agent": {"destination", "start_date", "end_date", "season", "user_preferences", "type_of_trip",
+                       "budget"},
+    "packing_agent": {"destination", "start_date", "end_date", "trip_duration", "season", "user_preferences",
+                      "type_of_trip", "no_of_traveler"},
+    "summary_agent": {"destination", "start_date", "end_date", "season", "no_of_traveler", "budget",
+                      "user_preferences", "type_of_trip"},
+}
+# agent -> agents whose output it consumes
+AGENT_UPSTREAM: Dict[str, tuple] = {
+    "location_agent": (),
+    "activity_agent": (),
+    "packing_agent": ("activity_agent",),
+    "summary_agent": ("location_agent", "activity_agent", "packing_agent"),
+}
+
+_NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+                 "nine": 9, "ten": 10}
+_NUM = r"\b(\d+|" + "|".join(_NUMBER_WORDS) + r")\b"
+_PEOPLE = r"(?:people|persons?|travell?ers?|adults?|pax)\b"
+
+_ISO_RE = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+_NEXT_WEEK_RE = re.compile(r"\b(?:to|for|until|till) next week\b", re.IGNORECASE)
+_WEEK_SHIFT_RE = re.compile(r"\b(following|previous) week\b", re.IGNORECASE)
+# "a day later" is unambiguous here, unlike "a" in general
+_DAY_SHIFT_RE = re.compile(r"\b(\d+|an?|" + "|".join(_NUMBER_WORDS) + r") (day|week)s? (later|earlier|sooner|forward|back)", re.IGNORECASE)
+_DURATION_RE = re.compile(r"\b(?:make it|extend(?: it)? to|shorten(?: it)? to|change (?:it )?to|only|for)\s+"
+                          + _NUM + r"[- ](day|night|week)s?\b", re.IGNORECASE)
+_TRAVELER_RE = re.compile(_NUM + r" (?:people|persons|travell?ers|adults|of us|pax)\b", re.IGNORECASE)
+# "add 2 people", "two more travelers", "one extra person", "3 fewer people": relative to the current count
+_MORE_TRAVELERS_RE = re.compile(r"\badd(?:ing)?\s+" + _NUM + r"\s+(?:more\s+|extra\s+|additional\s+)?" + _PEOPLE
+                                + r"|" + _NUM + r"\s+(more|extra|additional|fewer|less)\s+" + _PEOPLE, re.IGNORECASE)
+_SOLO_RE = re.compile(r"\b(just me|only me|solo|by myself|alone)\b", re.IGNORECASE)
+_BUDGET_RE = re.compile(r"\b(low|medium|mid|high|luxury)(?:[- ]range)?(?: budget)\b|\bbudget (?:to |is |of )?(low|medium|mid|high|luxury)\b",
+                        re.IGNORECASE)
+_TRIP_TYPE_RE = re.compile(r"\b(family|honeymoon|leisure|adventure|business|friends|romantic|backpacking)\s+trip\b",
+                           re.IGNORECASE)
+# an explicit move names the place after it; "visit"/"go to"/"instead" only count outside a question
+_DESTINATION_RE = re.compile(r"\b(?:switch(?:ing)?|chang(?:e|ing)|mov(?:e|ing))\s+(?:the\s+)?(?:destination\s+|base\s+|trip\s+|it\s+)?to\b"
+                             r"|\bchange (?:the )?destination\b|\bbase (?:ourselves |us )?(?:in|at)\b", re.IGNORECASE)
+_SOFT_DESTINATION_RE = re.compile(r"\b(go(?:ing)? to|visit|instead|stay in)\b", re.IGNORECASE)
+_QUESTION_RE = re.compile(r"\?|^\s*(?:what|when|where|which|who|how|why|is|are|do|does|can|could|should|will|would)\b",
+                          re.IGNORECASE)
+_AVOID_RE = re.compile(r"\b(?:no|avoid|skip|without|remove|don'?t (?:like|want)|not into)\s+(?:the |any )?"
+                       r"([a-z][a-z\-]{2,20})", re.IGNORECASE)
+_ADD_RE = re.compile(r"\b(?:add|include|more|also (?:like|love|want))\s+(?:some |more )?([a-z][a-z\-]{2,20})",
+                     re.IGNORECASE)
+# words that follow "no"/"add" without naming an activity
+_NOT_ACTIVITIES = {"more", "longer", "need", "problem", "thanks", "changes", "rush", "way", "idea", "days", "day",
+                   "week", "people", "person", "persons", "travelers", "travellers", "adults", "extra", "another",
+                   "budget", "items", "item", "the", "packing", "summary"} | set(_NUMBER_WORDS)
+# what "no X" / "add X" may name: the catalog's activity words and tags, plus a few preferences it lacks
+_ACTIVITY_WORDS = (set(TAG_KEYWORDS) | {w for kws in TAG_KEYWORDS.values() for w in kws if " " not in w}
+                   | set(AVOID_SYNONYMS) | {w for ws in AVOID_SYNONYMS.values() for w in ws}
+                   | {"nightlife", "photography", "relaxation", "nature", "sightseeing", "history", "art"})
+
+
+def _stem(word: str) -> str:
+    word = word.lower()
+    return re.sub(r"(ing|es|e|s)$", "", word) if len(word) > 3 else word
+
+
+_ACTIVITY_STEMS = {_stem(w) for w in _ACTIVITY_WORDS}
+
+
+def is_question(query: str) -> bool:
+    return bool(_QUESTION_RE.search(query or ""))
+
+
+def _is_activity(term: str, prefs: List[str]) -> bool:
+    """True when `term` names an activity or one of the trip's preferences ("sharks", "questions" do not)."""
+    stem = _stem(term)
+    return stem in _ACTIVITY_STEMS or any(_stem(p.lower().replace("no ", "", 1)) == stem for p in prefs)
+
+
+def _to_int(word: str) -> int:
+    if word.isdigit():
+        return int(word)
+    return 1 if word.lower() in ("a", "an") else _NUMBER_WORDS[word.lower()]
+
+
+def _parse_date(value: Any) -> Optional[date]:
+    try:
+        return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def _date_changes(query: str, trip: Dict[str, Any]) -> Dict[str, Any]:
+    start, end = _parse_date(trip.get("start_date")), _parse_date(trip.get("end_date"))
+    iso = [_parse_date(d) for d in _ISO_RE.findall(query)]
+    iso = [d for d in iso if d]
+    if len(iso) >= 2:
+        return {"start_date": iso[0].isoformat(), "end_date": iso[1].isoformat()}
+    if start is None:
+        return {}
+    length = (end - start).days if end else 0
+    if len(iso) == 1:
+        return {"start_date": iso[0].isoformat(), "end_date": (iso[0] + timedelta(days=length)).isoformat()}
+
+    shift = 0
+    m = _DAY_SHIFT_RE.search(query)
+    if m:
+        n = _to_int(m.group(1)) * (7 if m.group(2).lower() == "week" else 1)
+        shift = -n if m.group(3).lower() in ("earlier", "sooner", "back") else n
+    elif _NEXT_WEEK_RE.search(query):
+        # "change dates to next week": the same length, starting next Monday
+        today = date.today()
+        shift = (today + timedelta(days=7 - today.weekday()) - start).days
+    elif _WEEK_SHIFT_RE.search(query):
+        shift = 7 if _WEEK_SHIFT_RE.search(query).group(1).lower() == "following" else -7
+    m = _DURATION_RE.search(query)
+    if m:
+        n = _to_int(m.group(1))
+        unit = m.group(2).lower()
+        length = n * 7 - 1 if unit == "week" else (n if unit == "night" else n - 1)
+    if not shift and not m:
+        return {}
+    new_start = start + timedelta(days=shift)
+    return {"start_date": new_start.isoformat(), "end_date": (new_start + timedelta(days=max(0, length))).isoformat()}
+
+
+def _preference_changes(query: str, prefs: List[str]) -> Optional[List[str]]:
+    new = list(prefs or [])
+    for m in _AVOID_RE.finditer(query):
+        term = m.group(1).lower()
+        if term in _NOT_ACTIVITIES or find_places(term) or not _is_activity(term, prefs or []):
+            continue
+        stem = re.sub(r"(ing|es|s)$", "", term) if len(term) > 4 else term
+        new = [p for p in new if stem not in p.lower() or p.lower().startswith("no ")]
+        if f"no {term}" not in new:
+            new.append(f"no {term}")
+    for m in _ADD_RE.finditer(query):
+        term = m.group(1).lower()
+        if (term in _NOT_ACTIVITIES or find_places(term) or term in (p.lower() for p in new)
+                or not _is_activity(term, prefs or [])):
+            continue
+        new = [p for p in new if p.lower() != f"no {term}"] + [term]
+    return new if new != list(prefs or []) else None
+
+
+def parse_trip_changes(query: str, trip: Dict[str, Any]) -> Dict[str, Any]:
+    """Field updates the user asked for in `query` (only fields whose value changes)."""
+    query = query or ""
+    updates: Dict[str, Any] = dict(_date_changes(query, trip))
+
+    more = _MORE_TRAVELERS_RE.search(query)
+    m = _TRAVELER_RE.search(query)
+    if more:
+        n = _to_int(more.group(1) or more.group(2))
+        if (more.group(3) or "").lower() in ("fewer", "less"):
+            n = -n
+        updates["no_of_traveler"] = max(1, int(trip.get("no_of_traveler") or 1) + n)
+    elif m:
+        updates["no_of_traveler"] = _to_int(m.group(1))
+    elif _SOLO_RE.search(query):
+        updates["no_of_traveler"] = 1
+
+    m = _BUDGET_RE.search(query)
+    if m:
+        level = (m.group(1) or m.group(2)).lower()
+        updates["budget"] = "medium" if level == "mid" else level
+
+    m = _TRIP_TYPE_RE.search(query)
+    if m:
+        updates["type_of_trip"] = m.group(1).lower()
+
+    m = _DESTINATION_RE.search(query)
+    if m or (not is_question(query) and _SOFT_DESTINATION_RE.search(query)):
+        current = str(trip.get("destination") or "").lower()
+        places = [p for p in find_places(query[m.end():] if m else query) if p.lower() != current]
+        if places:
+            updates["destination"] = places[0]
+
+    prefs = _preference_changes(query, trip.get("user_preferences") or [])
+    if prefs is not None:
+        updates["user_preferences"] = prefs
+
+    return {k: v for k, v in updates.items() if trip.get(k) != v}
+
+
+def _months(start: Optional[date], end: Optional[date]) -> List[int]:
+    if not start:
+        return []
+    end = end or start
+    months, d = [], start.replace(day=1)
+    while d <= end and len(months) < 12:
+        months.append(d.month)
+        d = (d + timedelta(days=32)).replace(day=1)
+    return months
+
+
+def with_derived(trip: Dict[str, Any]) -> Dict[str, Any]:
+    """`trip` plus the fields derived from its dates (months, season, trip_duration)."""
+    out = dict(trip)
+    start, end = _parse_date(out.get("start_date")), _parse_date(out.get("end_date"))
+    out["months"] = _months(start, end)
+    if start:
+        out["season"] = get_sri_lanka_season(start) or out.get("season")
+        if end:
+            out["trip_duration"] = (end - start).days + 1
+    return out
+
+
+def apply_changes(trip: Dict[str, Any], updates: Dict[str, Any]) -> Dict[str, Any]:
+    """The trip with `updates` applied and the derived fields recomputed when the dates moved."""
+    new = {**trip, **updates}
+    if {"start_date", "end_date"} & set(updates):
+        new = with_derived(new)
+        new.pop("months", None)
+    return new
+
+
+def changed_fields(old: Dict[str, Any], new: Dict[str, Any]) -> Set[str]:
+    old, new = with_derived(old), with_derived(new)
+    return {k for k in set(old) | set(new) if k not in ("status", "messages") and old.get(k) != new.get(k)}
+
+
+def affected_agents(changed: Iterable[str]) -> List[str]:
+    """Agents to re-run for the changed fields, including everything downstream, in plan order."""
+    changed = set(changed)
+    rerun: Set[str] = set()
+    for agent in PLAN_ORDER:
+        if AGENT_INPUTS[agent] & changed or rerun & set(AGENT_UPSTREAM[agent]):
+            rerun.add(agent)
+    return [a for a in PLAN_ORDER if a in rerun]
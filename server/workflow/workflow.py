@@ -4,7 +4,7 @@ import os
 from typing import Optional
 
 from langgraph.graph import StateGraph, END
-from server.workflow.app_state import TripPlanState
+from server.workflow.app_state import TripPlanState, apply_update, delta_checked
 from server.workflow.agent_nodes import (
     route_user_query,
     chat_node,
@@ -14,12 +14,14 @@ from server.workflow.agent_nodes import (
     _run_packing_agent,
     summary_node,
     refiner_node,
+    replan_node,
     simple_location_node,
     simple_activity_node,
     simple_packing_node,
     explorer_agent_node
 )
 from server.schemas.orchestrator_schemas import OrchestratorAgent4OutputSchema
+from server.utils.sanitizer import sanitize_scope
 
 
 # --- 1. Graph Definition ---
@@ -28,25 +30,31 @@ def build_trip_workflow():
 
     workflow = StateGraph(TripPlanState)
 
+    def add_node(name, fn):
+        # Nodes return only the keys they change; STATE_DELTA_CHECK fails full-state returns
+        workflow.add_node(name, delta_checked(name, fn))
+
     # --- 2. Define Nodes ---
-    workflow.add_node("router", route_user_query)
-    workflow.add_node("chat_agent", chat_node)
-    workflow.add_node("orchestrator_agent", orchestrator_node)
-    workflow.add_node("explorer_agent", explorer_agent_node)
+    add_node("router", route_user_query)
+    add_node("chat_agent", chat_node)
+    add_node("orchestrator_agent", orchestrator_node)
+    add_node("explorer_agent", explorer_agent_node)
 
     # Full Planning Chain Nodes
-    workflow.add_node("location_agent", location_node)
-    workflow.add_node("activity_agent", _run_activity_agent)
-    workflow.add_node("packing_agent", _run_packing_agent)
-    workflow.add_node("summary_agent", summary_node)
+    add_node("location_agent", location_node)
+    add_node("activity_agent", _run_activity_agent)
+    add_node("packing_agent", _run_packing_agent)
+    add_node("summary_agent", summary_node)
 
     # Simple, Single-Shot Agents
-    workflow.add_node("simple_location", simple_location_node)
-    workflow.add_node("simple_activity", simple_activity_node)
-    workflow.add_node("simple_packing", simple_packing_node)
+    add_node("simple_location", simple_location_node)
+    add_node("simple_activity", simple_activity_node)
+    add_node("simple_packing", simple_packing_node)
 
     # Summary Refiner Node
-    workflow.add_node("refine_summary", refiner_node)
+    add_node("refine_summary", refiner_node)
+    # Partial re-plan after trip data changes (re-runs only dependent agents)
+    add_node("replan", replan_node)
 
     # --- 3. Define Edges and Conditionals ---
 
@@ -74,6 +82,7 @@ def build_trip_workflow():
             "activity_agent": "chat_agent",  # Path 3: Single-Shot Activity Query
             "packing_agent": "chat_agent",  # Path 3: Single-Shot Packing Query
             "refine_summary": "refine_summary",  # Path 4: Summary Editing
+            "replan": "replan",  # Path 4b: Trip data changes after a plan exists
             "explorer_agent": "explorer_agent",  # Path 5: Explorer Agent (RAG)
         }
     )
@@ -102,6 +111,7 @@ def build_trip_workflow():
     workflow.add_edge("chat_agent", END)
     workflow.add_edge("summary_agent", END)
     workflow.add_edge("refine_summary", END)
+    workflow.add_edge("replan", END)
     workflow.add_edge("explorer_agent", END)
     workflow.add_edge("simple_location", END)
     workflow.add_edge("simple_activity", END)
@@ -142,10 +152,11 @@ if __name__ == "__main__":
             state['chat_history'].append(("human", query))
 
         # The LangGraph is run with the current state as input
-        for step_output in app.stream(state):
-            # The last key in the dict indicates the final node executed
-            last_node = list(step_output.keys())[-1]
-            state.update(step_output[last_node])  # Update the state with the node's output
+        with sanitize_scope():
+            for step_output in app.stream(state):
+                # The last key in the dict indicates the final node executed
+                last_node = list(step_output.keys())[-1]
+                apply_update(state, step_output[last_node] or {})  # Merge the keys the node changed
 
         # Add the final response to the chat history for context
         if state.get("final_response"):